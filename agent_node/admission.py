@@ -0,0 +1,177 @@
+"""
+Admission control for backend calls on a worker node.
+
+Each model gets a lane with a concurrency limit (how many requests the node
+lets through to the backend at once) and a bounded FIFO wait queue. A request
+that finds its lane full waits its turn for at most ``queue_timeout`` seconds.
+A request that finds the queue full, or whose wait runs out, is rejected with
+:class:`Overloaded`, which the node turns into ``429`` + ``Retry-After`` so the
+client can try another node straight away.
+
+Without this, a burst is forwarded to the backend in full. Every request in it
+then slows down together, and most of them outlive their 60–90 s timeouts, so
+the backend does the work and nobody gets the answer. With a limit, the
+backend runs at the concurrency it handles well, and the excess is shed before
+any work is done.
+
+Lanes are created on first use and dropped when idle, and the controller is
+per process. When given a :class:`~agent_node.stats.NodeStats`, it keeps that
+object's ``queue_depth`` equal to the number of waiting requests, so the depth
+reaches the registry with each heartbeat.
+"""
+
+import asyncio
+import math
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+
+def parse_limits(spec: str) -> Dict[str, int]:
+    """``"llama3=2,tinyllama=8"`` → ``{"llama3": 2, "tinyllama": 8}``."""
+    limits = {}
+    for item in spec.split(","):
+        if item.strip():
+            model, _, limit = item.rpartition("=")
+            limits[model.strip()] = int(limit)
+    return limits
+
+
+class Overloaded(Exception):
+    """The lane is full; ``retry_after`` is the suggested wait in whole seconds."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Lane:
+    __slots__ = ("limit", "active", "waiters", "service_s")
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        # EWMA of how long a request holds its slot, for Retry-After.
+        self.service_s = 1.0
+
+
+class Slot:
+    """One admitted request's place in its lane. :meth:`release` is idempotent."""
+
+    __slots__ = ("_controller", "_model", "_lane", "_t0", "_released")
+
+    def __init__(self, controller: "AdmissionController", model: str, lane: _Lane):
+        self._controller = controller
+        self._model = model
+        self._lane = lane
+        self._t0 = asyncio.get_running_loop().time()
+        self._released = False
+
+    def __enter__(self) -> "Slot":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        held = asyncio.get_running_loop().time() - self._t0
+        self._lane.service_s += 0.2 * (held - self._lane.service_s)
+        self._controller._release(self._model, self._lane)
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        concurrency: int = 4,
+        max_queue: int = 32,
+        queue_timeout: float = 10.0,
+        limits: Optional[Dict[str, int]] = None,
+        stats: Optional[Any] = None,
+    ):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        # model → concurrency, overriding the default for that model
+        self.limits = dict(limits or {})
+        self.rejected = 0
+        self.timed_out = 0
+        self._stats = stats
+        self._lanes: Dict[str, _Lane] = {}
+        self._queued = 0
+
+    @property
+    def queued(self) -> int:
+        """Requests waiting for a slot, across all models."""
+        return self._queued
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """Per-model ``active`` / ``queued`` / ``limit`` for the lanes in use."""
+        return {model: {"active": lane.active, "queued": len(lane.waiters), "limit": lane.limit}
+                for model, lane in self._lanes.items()}
+
+    async def acquire(self, model: str) -> Slot:
+        """Wait for a slot on *model*'s lane, or raise :class:`Overloaded`."""
+        lane = self._lanes.get(model)
+        if lane is None:
+            lane = self._lanes[model] = _Lane(self.limits.get(model, self.concurrency))
+        if lane.active < lane.limit and not lane.waiters:
+            lane.active += 1
+            return Slot(self, model, lane)
+        if len(lane.waiters) >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(f"Model {model!r} is at capacity ({lane.limit} running, "
+                             f"{len(lane.waiters)} queued)", self._retry_after(lane))
+
+        waiter = asyncio.get_running_loop().create_future()
+        lane.waiters.append(waiter)
+        self._set_queued(1)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            # A slot granted in the same tick as the timeout is handed on, not leaked.
+            if waiter.done() and not waiter.cancelled():
+                self._release(model, lane)
+            self.timed_out += 1
+            raise Overloaded(f"Timed out after {self.queue_timeout:g}s waiting for model {model!r}",
+                             self._retry_after(lane)) from None
+        except BaseException:
+            # Cancelled (client went away): hand on a slot granted meanwhile.
+            if waiter.done() and not waiter.cancelled():
+                self._release(model, lane)
+            raise
+        finally:
+            if not waiter.done() or waiter.cancelled():
+                self._discard(lane, waiter)
+        return Slot(self, model, lane)
+
+    def _retry_after(self, lane: _Lane) -> int:
+        # Roughly how long until the current queue has drained.
+        wait = (len(lane.waiters) + 1) / max(1, lane.limit) * lane.service_s
+        return max(1, min(60, math.ceil(wait)))
+
+    def _discard(self, lane: _Lane, waiter: asyncio.Future) -> None:
+        try:
+            lane.waiters.remove(waiter)
+        except ValueError:
+            return
+        self._set_queued(-1)
+
+    def _release(self, model: str, lane: _Lane) -> None:
+        # Hand the slot straight to the oldest waiter; active stays the same.
+        while lane.waiters:
+            waiter = lane.waiters.popleft()
+            self._set_queued(-1)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        lane.active -= 1
+        if lane.active == 0 and self._lanes.get(model) is lane:
+            del self._lanes[model]
+
+    def _set_queued(self, delta: int) -> None:
+        self._queued += delta
+        if self._stats is not None:
+            self._stats.queue_depth = self._queued
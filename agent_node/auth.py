@@ -0,0 +1,84 @@
+"""
+Session-token verification shared by the worker nodes.
+
+A session token from ``/handshake`` is reused for every call in its session
+(up to 300 s), so nodes see the same token many times. :class:`TokenVerifier`
+HMAC-verifies a token once and then serves its claims from memory until the
+token's own ``exp``; repeat calls skip the decode and signature check.
+
+Entries are keyed by a SHA-256 digest of the token, so the cache never holds
+usable credentials, and a hit means the exact same signed string was already
+verified. Tokens without ``exp`` are verified every time. Failures are never
+cached.
+
+The cache is per-process and not locked: every access happens on the event
+loop thread of the worker that owns it.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict
+
+import jwt
+
+
+class TokenVerifier:
+    def __init__(
+        self,
+        secret: str,
+        audience: str,
+        max_entries: int = 10_000,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.secret = secret
+        self.audience = audience
+        self.max_entries = max_entries
+        self._clock = clock
+        # sha256(token) → (exp, claims)
+        self._verified: "OrderedDict[bytes, tuple]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """
+        Return the token's claims, or raise ``jwt.ExpiredSignatureError`` /
+        ``jwt.InvalidTokenError`` exactly as ``jwt.decode`` would.
+        """
+        key = hashlib.sha256(token.encode()).digest()
+
+        entry = self._verified.get(key)
+        if entry is not None:
+            if self._clock() < entry[0]:
+                self._verified.move_to_end(key)
+                self.hits += 1
+                return dict(entry[1])
+            del self._verified[key]
+            raise jwt.ExpiredSignatureError("Signature has expired")
+
+        self.misses += 1
+        claims = jwt.decode(token, self.secret, algorithms=["HS256"], audience=self.audience)
+
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)) and self.max_entries > 0:
+            self._verified[key] = (exp, claims)
+            if len(self._verified) > self.max_entries:
+                self._verified.popitem(last=False)
+                self.evictions += 1
+        return dict(claims)
+
+    def clear(self) -> None:
+        self._verified.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits":      self.hits,
+            "misses":    self.misses,
+            "evictions": self.evictions,
+            "size":      len(self._verified),
+        }
+
+    def __len__(self) -> int:
+        return len(self._verified)
@@ -0,0 +1,90 @@
+"""
+Micro-batching of single-prompt calls for batch-capable backends.
+
+vLLM and other OpenAI-compatible servers generate a list of prompts in one
+forward pass for little more than the cost of one. :class:`MicroBatcher` lets
+each ``/generate`` handler submit its own prompt while concurrent prompts for
+the same batch key (model + sampling parameters) share one upstream call:
+
+    batcher = MicroBatcher(dispatch, max_batch=16, window=0.005)
+    text = await batcher.submit(("llama3", 0.7, None, 256), prompt)
+
+The first prompt for a key opens a batch. The batch is dispatched when it
+reaches ``max_batch`` prompts or ``window`` seconds after it opened,
+whichever comes first, so a lone request waits at most ``window``. Results
+fan back out in submission order. A failed dispatch fails every prompt in the
+batch. A submitter that is cancelled before its batch goes out (the client
+disconnected) is left out of the batch.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Set
+
+# dispatch(key, prompts) → one completion per prompt, in order
+Dispatch = Callable[[Hashable, List[str]], Awaitable[List[str]]]
+
+
+class _Batch:
+    __slots__ = ("prompts", "futures", "timer")
+
+    def __init__(self):
+        self.prompts: List[str] = []
+        self.futures: List[asyncio.Future] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class MicroBatcher:
+    def __init__(self, dispatch: Dispatch, max_batch: int = 16, window: float = 0.005):
+        self._dispatch = dispatch
+        self.max_batch = max_batch
+        self.window = window
+        self.batches = 0
+        self.prompts = 0
+        self._open: Dict[Hashable, _Batch] = {}
+        self._running: Set[asyncio.Task] = set()
+
+    async def submit(self, key: Hashable, prompt: str) -> str:
+        """Queue *prompt* on *key*'s open batch and wait for its completion."""
+        loop = asyncio.get_running_loop()
+        batch = self._open.get(key)
+        if batch is None:
+            batch = self._open[key] = _Batch()
+            batch.timer = loop.call_later(self.window, self._flush, key, batch)
+        future = loop.create_future()
+        batch.prompts.append(prompt)
+        batch.futures.append(future)
+        if len(batch.prompts) >= self.max_batch:
+            self._flush(key, batch)
+        return await future
+
+    def _flush(self, key: Hashable, batch: _Batch) -> None:
+        if self._open.get(key) is batch:
+            del self._open[key]
+        batch.timer.cancel()
+        task = asyncio.get_running_loop().create_task(self._run(key, batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, key: Hashable, batch: _Batch) -> None:
+        live = [(p, f) for p, f in zip(batch.prompts, batch.futures) if not f.done()]
+        if not live:
+            return
+        prompts = [p for p, _ in live]
+        self.batches += 1
+        self.prompts += len(prompts)
+        try:
+            results = await self._dispatch(key, prompts)
+            if len(results) != len(prompts):
+                raise RuntimeError(f"Backend returned {len(results)} completions for {len(prompts)} prompts")
+        except asyncio.CancelledError:
+            for _, future in live:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future in live:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(live, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,45 @@
+"""
+``aris-node`` entry point.
+
+:mod:`agent_node.llm_agent` reads its configuration from the environment when
+it is imported, so the command-line flags have to be exported before it is.
+This module parses them without importing the app, exports them, then hands
+uvicorn the app's import string: the import in this process (one worker) or
+in each spawned worker then sees the flags.
+"""
+
+import argparse
+import logging
+import os
+
+from aris_server.launcher import add_server_arguments, serve
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGISTRY_URL = "http://localhost:8000/register"
+DEFAULT_NODE_PORT    = 9006
+
+APP = "agent_node.llm_agent:app"
+
+
+def start():
+    """Entry point used by setup.py console_scripts (``aris-node``) and ``python -m agent_node.llm_agent``."""
+    parser = argparse.ArgumentParser(description="Aris Worker Node")
+    parser.add_argument("--registry", type=str, default=os.getenv("ARIS_REGISTRY", DEFAULT_REGISTRY_URL),
+                        help="Registry URL")
+    # One worker by default: budget meters and load stats are per process.
+    add_server_arguments(parser, port=int(os.getenv("ARIS_NODE_PORT", DEFAULT_NODE_PORT)), workers=1)
+    args = parser.parse_args()
+
+    os.environ["ARIS_NODE_PORT"] = str(args.port)
+    os.environ["ARIS_REGISTRY"]  = args.registry
+    if args.workers > 1:
+        logger.warning(
+            "Running %d workers under one DID: prepaid budgets are metered per worker, "
+            "so a session can spend its budget once per worker.", args.workers,
+        )
+    serve(APP, args)
+
+
+if __name__ == "__main__":
+    start()
@@ -1,62 +1,218 @@
-import uvicorn
 import jwt
 import os
 import httpx
 import asyncio
-import argparse
 import contextlib
+import json
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Header
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import AsyncIterator, Callable, List, Optional
 
+from aris_server.metrics import Registry, install as install_metrics
 from aris.session_defaults import DEFAULT_SESSION_HS256_SECRET
+from agent_node.admission import AdmissionController, Overloaded, Slot, parse_limits
+from agent_node.auth import TokenVerifier
+from agent_node.batching import MicroBatcher
+from agent_node.launcher import DEFAULT_NODE_PORT, DEFAULT_REGISTRY_URL
+from agent_node.metering import BudgetExhausted, BudgetMeter, report_usage, session_usage
+from agent_node.stats import NodeStats
 
 logger = logging.getLogger(__name__)
 
 # --- CONFIG (read before lifespan — imported app startup uses these) ---
-REGISTRY_URL   = os.getenv("ARIS_REGISTRY",      "http://localhost:8000/register")
-NODE_PORT      = int(os.getenv("ARIS_NODE_PORT",  9006))
+REGISTRY_URL   = os.getenv("ARIS_REGISTRY",      DEFAULT_REGISTRY_URL)
+NODE_PORT      = int(os.getenv("ARIS_NODE_PORT",  DEFAULT_NODE_PORT))
 MY_DID         = "did:aris:llm-node-01"
 MY_ENDPOINT    = os.getenv("ARIS_NODE_ENDPOINT",  f"http://localhost:{NODE_PORT}")
 ARIS_PUBLIC_KEY = os.getenv("ARIS_PUBLIC_KEY", DEFAULT_SESSION_HS256_SECRET)
-OLLAMA_GENERATE_URL = "http://localhost:11434/api/generate"
-OLLAMA_CHAT_URL     = "http://localhost:11434/api/chat"
+# LLM_ENDPOINT is the name used by the docker-compose example in docs/scaling.mdx.
+OLLAMA_URL          = os.getenv("ARIS_OLLAMA_URL", os.getenv("LLM_ENDPOINT", "http://localhost:11434")).rstrip("/")
+OLLAMA_GENERATE_URL = f"{OLLAMA_URL}/api/generate"
+OLLAMA_CHAT_URL     = f"{OLLAMA_URL}/api/chat"
 NODE_CAPABILITIES   = ["ai.generate", "ai.chat"]
 
+# Outbound HTTP pool shared by backend calls and heartbeats. Ollama serves a few
+# requests at a time per model, so keep enough idle connections to cover the
+# concurrency it queues rather than reconnecting per job.
+HTTP_MAX_CONNECTIONS = int(os.getenv("ARIS_HTTP_MAX_CONNECTIONS", 200))
+HTTP_MAX_KEEPALIVE   = int(os.getenv("ARIS_HTTP_MAX_KEEPALIVE",   100))
+HTTP_KEEPALIVE_S     = float(os.getenv("ARIS_HTTP_KEEPALIVE",     60))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("ARIS_HTTP_CONNECT_TIMEOUT", 5))
+
+TOKEN_CACHE_SIZE     = int(os.getenv("ARIS_TOKEN_CACHE_SIZE", 10000))
+
+# The node registers once, then sends lightweight beats (registration version +
+# load) every HEARTBEAT_INTERVAL_S; it re-registers when the registry asks.
+HEARTBEAT_URL        = os.getenv("ARIS_HEARTBEAT_URL", REGISTRY_URL.rsplit("/", 1)[0] + "/heartbeat")
+HEARTBEAT_INTERVAL_S = float(os.getenv("ARIS_HEARTBEAT_INTERVAL", 30))
+
+# Optional micro-batching: with BATCH_URL set (an OpenAI-compatible
+# /v1/completions endpoint, e.g. vLLM), non-streaming /generate calls for the
+# same model and sampling parameters that arrive within BATCH_WINDOW_MS are
+# sent upstream together, up to BATCH_MAX_SIZE prompts per call. Streaming
+# and /chat still go to Ollama.
+BATCH_URL       = os.getenv("ARIS_BATCH_URL", "")
+BATCH_MAX_SIZE  = int(os.getenv("ARIS_BATCH_MAX_SIZE", 16))
+BATCH_WINDOW_MS = float(os.getenv("ARIS_BATCH_WINDOW_MS", 5))
+
+# Admission control: at most MAX_CONCURRENCY backend calls per model at once
+# (MODEL_CONCURRENCY overrides it per model, e.g. "llama3=2,tinyllama=8").
+# Up to MAX_QUEUE more wait in FIFO order for QUEUE_TIMEOUT_S; the rest get
+# 429 + Retry-After so clients fail over instead of timing out. A batch
+# carries many calls, so batching nodes admit enough to fill two batches.
+MAX_CONCURRENCY   = int(os.getenv("ARIS_MAX_CONCURRENCY", 2 * BATCH_MAX_SIZE if BATCH_URL else 4))
+MODEL_CONCURRENCY = parse_limits(os.getenv("ARIS_MODEL_CONCURRENCY", ""))
+MAX_QUEUE         = int(os.getenv("ARIS_MAX_QUEUE", 32))
+QUEUE_TIMEOUT_S   = float(os.getenv("ARIS_QUEUE_TIMEOUT", 10))
+
+# Calls served on prepaid-budget sessions are reported to the registry in bulk;
+# a session new to this process is first looked up next to the report URL.
+METER_REPORT_URL        = os.getenv("ARIS_METER_REPORT_URL", REGISTRY_URL.rsplit("/", 1)[0] + "/usage/report")
+METER_SESSION_URL       = METER_REPORT_URL.rsplit("/", 1)[0] + "/session"
+METER_REPORT_INTERVAL_S = float(os.getenv("ARIS_METER_REPORT_INTERVAL", 10))
+
+# Load signals reported to the registry with every heartbeat; served in full at /status.
+node_stats = NodeStats()
+
+admission = AdmissionController(MAX_CONCURRENCY, MAX_QUEUE, QUEUE_TIMEOUT_S, MODEL_CONCURRENCY, stats=node_stats)
+
+# Session tokens are reused across a whole session; verify each one once.
+token_verifier = TokenVerifier(ARIS_PUBLIC_KEY, audience=MY_DID, max_entries=TOKEN_CACHE_SIZE)
+
+# Per-session call counts for tokens issued with a prepaid budget.
+meter = BudgetMeter()
+
+# Served at /metrics. Ollama time vs node overhead: compare the "ollama"
+# dependency histogram with the per-route request histogram.
+metrics = Registry()
+DEPENDENCY_SECONDS = metrics.histogram(
+    "aris_dependency_duration_seconds", "Latency of calls to the LLM backend and the registry.",
+    ("dependency", "operation"),
+)
+
+# Created in lifespan; one client (and connection pool) per process.
+http_client: Optional[httpx.AsyncClient] = None
+
+
+def _build_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_S,
+        ),
+        timeout=_timeout(60.0),
+    )
+
+
+def _timeout(read_s: float) -> httpx.Timeout:
+    # No pool timeout: jobs queued behind a saturated pool wait rather than fail.
+    return httpx.Timeout(read_s, connect=HTTP_CONNECT_TIMEOUT, pool=None)
+
+
+async def _report_usage() -> None:
+    """Send calls served since the last report; kept for the next attempt on failure."""
+    async def post(body, headers):
+        with DEPENDENCY_SECONDS.time("registry", "usage_report"):
+            return await http_client.post(METER_REPORT_URL, json=body, headers=headers, timeout=_timeout(10.0))
+
+    await report_usage(meter, post, MY_DID, ARIS_PUBLIC_KEY)
+
+
+async def _session_usage(jti: str) -> Optional[int]:
+    """Calls the registry has on record for a budget session issued to this node."""
+    async def get(jti, headers):
+        with DEPENDENCY_SECONDS.time("registry", "session_usage"):
+            return await http_client.get(f"{METER_SESSION_URL}/{jti}", headers=headers, timeout=_timeout(10.0))
+
+    return await session_usage(get, jti, MY_DID, ARIS_PUBLIC_KEY)
+
+
+async def _heartbeat(version: Optional[str]) -> Optional[str]:
+    """
+    One beat. With a registration *version*, send only that and the load;
+    register in full when there is none yet or the registry answers 404/409
+    (it restarted, expired this node, or predates ``/heartbeat``). Returns the
+    version to quote next time.
+    """
+    load = node_stats.load()
+    if version is not None:
+        with DEPENDENCY_SECONDS.time("registry", "heartbeat"):
+            resp = await http_client.post(HEARTBEAT_URL, json={"did": MY_DID, "version": version, "load": load},
+                                          timeout=_timeout(10.0))
+        if resp.status_code not in (404, 409):
+            resp.raise_for_status()
+            return version
+    with DEPENDENCY_SECONDS.time("registry", "register"):
+        resp = await http_client.post(REGISTRY_URL, json={
+            "did":          MY_DID,
+            "endpoint":     MY_ENDPOINT,
+            "capabilities": NODE_CAPABILITIES,
+            "load":         load,
+        }, timeout=_timeout(10.0))
+    resp.raise_for_status()
+    logger.info("Registered with registry (capabilities=%s, port=%s)", ",".join(NODE_CAPABILITIES), NODE_PORT)
+    # Registries without /heartbeat return no version: keep registering in full.
+    return resp.json().get("version")
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Worker node listening at %s", MY_ENDPOINT)
     logger.info("Registry registration URL: %s", REGISTRY_URL)
+    logger.info("LLM backend: %s", OLLAMA_URL)
+
+    global http_client
+    http_client = _build_http_client()
 
     async def heartbeat():
+        version = None
         while True:
-            async with httpx.AsyncClient() as client:
-                try:
-                    await client.post(REGISTRY_URL, json={
-                        "did":          MY_DID,
-                        "endpoint":     MY_ENDPOINT,
-                        "capabilities": NODE_CAPABILITIES,
-                    })
-                    logger.debug(
-                        "Registry heartbeat ok (capabilities=%s, port=%s)",
-                        ",".join(NODE_CAPABILITIES),
-                        NODE_PORT,
-                    )
-                except Exception as e:
-                    logger.warning("Registry unreachable: %s", e)
-            await asyncio.sleep(30)
-
-    task = asyncio.create_task(heartbeat())
+            try:
+                version = await _heartbeat(version)
+            except Exception as e:
+                logger.warning("Registry unreachable: %s", e)
+            await asyncio.sleep(HEARTBEAT_INTERVAL_S)
+
+    async def usage_reports():
+        while True:
+            await asyncio.sleep(METER_REPORT_INTERVAL_S)
+            await _report_usage()
+
+    tasks = [asyncio.create_task(heartbeat()), asyncio.create_task(usage_reports())]
     yield
-    task.cancel()
-    with contextlib.suppress(asyncio.CancelledError):
-        await task
+    for task in tasks:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+    await _report_usage()
+    await http_client.aclose()
+    http_client = None
 
 
 app = FastAPI(title="Aris Node: LLM Specialist", lifespan=lifespan)
+install_metrics(app, metrics)
+
+BATCH_SIZE = metrics.histogram(
+    "aris_node_batch_size", "Prompts per batched backend call.", buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+
+metrics.callback("aris_node_jobs_in_flight", "Backend jobs in progress.", lambda: node_stats.in_flight)
+metrics.callback("aris_node_queue_depth", "Requests waiting for a backend slot.", lambda: admission.queued)
+metrics.callback(
+    "aris_node_requests_shed_total", "Requests answered 429 by admission control.",
+    lambda: {("queue_full",): admission.rejected, ("queue_timeout",): admission.timed_out},
+    kind="counter", labelnames=("reason",),
+)
+metrics.callback(
+    "aris_token_cache_lookups_total", "Session token verifications by cache result.",
+    lambda: {("hit",): token_verifier.hits, ("miss",): token_verifier.misses},
+    kind="counter", labelnames=("result",),
+)
 
 
 # ── Shared JWT verification ───────────────────────────────────────────────────
@@ -64,18 +220,67 @@ app = FastAPI(title="Aris Node: LLM Specialist", lifespan=lifespan)
 def _verify_token(token: str) -> dict:
     """Decode and validate an Aris session token. Raises HTTPException on failure."""
     try:
-        return jwt.decode(token, ARIS_PUBLIC_KEY, algorithms=["HS256"], audience=MY_DID)
+        return token_verifier.verify(token)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Session token has expired.")
     except jwt.InvalidTokenError as exc:
         raise HTTPException(status_code=401, detail=f"Invalid token: {exc}")
 
 
+async def _charge(claims: dict) -> None:
+    """
+    Count one call against a prepaid session budget (no-op for plain sessions).
+    A session new to this process starts from the calls the registry has on
+    record, so a restart or another worker can't spend its budget again.
+    """
+    if meter.needs_seed(claims):
+        try:
+            await meter.seed(claims, _session_usage)
+        except Exception as exc:
+            logger.warning("Could not look up session usage: %s", exc)
+            raise HTTPException(status_code=503, detail="Could not check the session budget with the registry.")
+    try:
+        meter.charge(claims)
+    except BudgetExhausted as exc:
+        raise HTTPException(status_code=402, detail=str(exc))
+
+
+async def _admit(model: str, claims: dict) -> Slot:
+    """Wait for a backend slot for *model*, then charge the call (429 if the node is at capacity)."""
+    try:
+        slot = await admission.acquire(model)
+    except Overloaded as exc:
+        raise HTTPException(status_code=429, detail=str(exc), headers={"Retry-After": str(exc.retry_after)})
+    try:
+        await _charge(claims)
+    except BaseException:
+        slot.release()
+        raise
+    return slot
+
+
 # ── Models ───────────────────────────────────────────────────────────────────
 
 class PromptRequest(BaseModel):
     model: str = "tinyllama"
     prompt: str
+    stream: bool = False
+    # Sampling parameters; the backend's defaults apply when unset.
+    temperature: Optional[float] = None
+    top_p: Optional[float] = None
+    max_tokens: Optional[int] = None
+
+    def sampling(self) -> dict:
+        return {k: v for k, v in (("temperature", self.temperature), ("top_p", self.top_p),
+                                  ("max_tokens", self.max_tokens)) if v is not None}
+
+
+def _ollama_options(sampling: dict) -> dict:
+    """Sampling parameters in Ollama's ``options`` spelling."""
+    options = {k: v for k, v in sampling.items() if k != "max_tokens"}
+    if "max_tokens" in sampling:
+        options["num_predict"] = sampling["max_tokens"]
+    return {"options": options} if options else {}
 
 
 class ChatMessage(BaseModel):
@@ -86,29 +291,154 @@ class ChatMessage(BaseModel):
 class ChatRequest(BaseModel):
     model: str = "tinyllama"
     messages: List[ChatMessage]
+    stream: bool = False
 
 
-# ── /generate — single-turn text generation (unchanged) ──────────────────────
+# ── Streaming ────────────────────────────────────────────────────────────────
+
+def _ndjson(obj: dict) -> bytes:
+    return (json.dumps(obj) + "\n").encode()
+
+
+async def _proxy_stream(url: str, body: dict, model: str, read_s: float,
+                        extract: Callable[[dict], str], slot: Slot) -> AsyncIterator[bytes]:
+    """
+    Relay an Ollama NDJSON stream as ``{"token": ...}`` lines, ending with
+    ``{"done": true, "status": "success" | "error", ...}``.
+
+    The HTTP status is already 200 once streaming starts, so backend failures
+    are reported in the final line rather than as a status code. The admission
+    *slot* is held until the stream ends.
+    """
+    timer = DEPENDENCY_SECONDS.time("ollama", url.rsplit("/", 1)[-1] + ".stream")
+    with slot, node_stats.track(model) as job, timer:
+        try:
+            # Backend time here includes waiting on the client to read each chunk.
+            with job.backend():
+                async with http_client.stream("POST", url, json={**body, "stream": True},
+                                              timeout=_timeout(read_s)) as resp:
+                    if resp.status_code >= 400:
+                        detail = (await resp.aread()).decode(errors="replace")
+                        job.fail()
+                        yield _ndjson({"done": True, "status": "error", "model": model,
+                                       "error": f"Ollama error {resp.status_code}: {detail}"})
+                        return
+                    async for line in resp.aiter_lines():
+                        if not line:
+                            continue
+                        chunk = json.loads(line)
+                        if chunk.get("error"):
+                            job.fail()
+                            yield _ndjson({"done": True, "status": "error", "model": model,
+                                           "error": f"Ollama error: {chunk['error']}"})
+                            return
+                        token = extract(chunk)
+                        if token:
+                            yield _ndjson({"token": token})
+                        if chunk.get("done"):
+                            break
+            yield _ndjson({"done": True, "status": "success", "model": model})
+        except Exception as e:
+            job.fail()
+            yield _ndjson({"done": True, "status": "error", "model": model, "error": f"LLM Error: {e}"})
+
+
+def _stream_response(chunks: AsyncIterator[bytes], slot: Slot) -> StreamingResponse:
+    return StreamingResponse(
+        chunks,
+        media_type="application/x-ndjson",
+        # Stop reverse proxies (nginx) from buffering the stream.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Frees the slot even if the stream was never started.
+        background=BackgroundTask(slot.release),
+    )
+
+
+# ── /status — live node stats ────────────────────────────────────────────────
+
+@app.get("/status")
+async def status():
+    """
+    Uptime, job totals, QPS, latency percentiles (backend vs node overhead),
+    per-model counts, each model's admission lane and, when micro-batching is
+    on, how many batches carried how many prompts.
+    """
+    body = {"status": "active", "did": MY_DID, **node_stats.status(), "admission": admission.snapshot()}
+    if batcher is not None:
+        body["batching"] = {"batches": batcher.batches, "prompts": batcher.prompts}
+    return body
+
+
+# ── Micro-batching ───────────────────────────────────────────────────────────
+
+async def _complete_batch(key: tuple, prompts: List[str]) -> List[str]:
+    """One OpenAI-style completions call for a batch of prompts sharing *key*."""
+    model, temperature, top_p, max_tokens = key
+    body = {"model": model, "prompt": prompts}
+    for name, value in (("temperature", temperature), ("top_p", top_p), ("max_tokens", max_tokens)):
+        if value is not None:
+            body[name] = value
+    BATCH_SIZE.observe(len(prompts))
+    with DEPENDENCY_SECONDS.time("openai", "completions"):
+        resp = await http_client.post(BATCH_URL, json=body, timeout=_timeout(120.0))
+    resp.raise_for_status()
+    # One choice per prompt; "index" is the prompt's position in the batch.
+    choices = sorted(resp.json()["choices"], key=lambda c: c.get("index", 0))
+    return [c.get("text", "") for c in choices]
+
+
+batcher = MicroBatcher(_complete_batch, BATCH_MAX_SIZE, BATCH_WINDOW_MS / 1000) if BATCH_URL else None
+
+
+# ── /generate — single-turn text generation ──────────────────────────────────
 
 @app.post("/generate")
 async def generate_text(job: PromptRequest, x_aris_token: str = Header(...)):
+    """
+    Single-turn generation. With ``"stream": true`` the reply is NDJSON: one
+    ``{"token": "..."}`` line per chunk, then a final ``{"done": true, "status": ...}``.
+
+    When micro-batching is on (``ARIS_BATCH_URL``), non-streaming calls are
+    answered from a batched completions call shared with concurrent requests
+    for the same model and sampling parameters.
+    """
     payload = _verify_token(x_aris_token)
     logger.info(
-        "generate request caller=%s model=%s",
+        "generate request caller=%s model=%s stream=%s",
         payload.get("sub", "unknown"),
         job.model,
+        job.stream,
     )
-
-    async with httpx.AsyncClient() as client:
+    slot = await _admit(job.model, payload)
+
+    if job.stream:
+        return _stream_response(_proxy_stream(
+            OLLAMA_GENERATE_URL,
+            {"model": job.model, "prompt": job.prompt, **_ollama_options(job.sampling())},
+            job.model,
+            60.0,
+            lambda chunk: chunk.get("response", ""),
+            slot,
+        ), slot)
+
+    with slot, node_stats.track(job.model) as tracked:
         try:
-            resp = await client.post(
-                OLLAMA_GENERATE_URL,
-                json={"model": job.model, "prompt": job.prompt, "stream": False},
-                timeout=60.0,
-            )
+            if batcher is not None:
+                key = (job.model, job.temperature, job.top_p, job.max_tokens)
+                with tracked.backend():
+                    result = await batcher.submit(key, job.prompt)
+                return {"result": result, "status": "success"}
+            with tracked.backend(), DEPENDENCY_SECONDS.time("ollama", "generate"):
+                resp = await http_client.post(
+                    OLLAMA_GENERATE_URL,
+                    json={"model": job.model, "prompt": job.prompt, "stream": False,
+                          **_ollama_options(job.sampling())},
+                    timeout=_timeout(60.0),
+                )
             resp.raise_for_status()
             return {"result": resp.json().get("response", ""), "status": "success"}
         except Exception as e:
+            tracked.fail()
             return {"result": f"LLM Error: {str(e)}", "status": "error"}
 
 
@@ -141,13 +471,18 @@ async def chat(req: ChatRequest, x_aris_token: str = Header(...)):
           "model":   "tinyllama",
           "status":  "success"
         }
+
+    With ``"stream": true`` the reply is NDJSON instead: one ``{"token": "..."}``
+    line per chunk of the assistant turn, then
+    ``{"done": true, "status": "success", "model": "tinyllama"}``.
     """
     payload = _verify_token(x_aris_token)
     logger.info(
-        "chat request caller=%s turns=%s model=%s",
+        "chat request caller=%s turns=%s model=%s stream=%s",
         payload.get("sub", "unknown"),
         len(req.messages),
         req.model,
+        req.stream,
     )
 
     # Validate: messages must not be empty and must end with a user turn
@@ -157,14 +492,26 @@ async def chat(req: ChatRequest, x_aris_token: str = Header(...)):
         raise HTTPException(status_code=422, detail="Last message must have role='user'.")
 
     ollama_messages = [{"role": m.role, "content": m.content} for m in req.messages]
-
-    async with httpx.AsyncClient() as http:
+    slot = await _admit(req.model, payload)
+
+    if req.stream:
+        return _stream_response(_proxy_stream(
+            OLLAMA_CHAT_URL,
+            {"model": req.model, "messages": ollama_messages},
+            req.model,
+            90.0,
+            lambda chunk: (chunk.get("message") or {}).get("content", ""),
+            slot,
+        ), slot)
+
+    with slot, node_stats.track(req.model) as tracked:
         try:
-            resp = await http.post(
-                OLLAMA_CHAT_URL,
-                json={"model": req.model, "messages": ollama_messages, "stream": False},
-                timeout=90.0,
-            )
+            with tracked.backend(), DEPENDENCY_SECONDS.time("ollama", "chat"):
+                resp = await http_client.post(
+                    OLLAMA_CHAT_URL,
+                    json={"model": req.model, "messages": ollama_messages, "stream": False},
+                    timeout=_timeout(90.0),
+                )
             resp.raise_for_status()
             data     = resp.json()
             msg      = data.get("message", {})
@@ -178,6 +525,7 @@ async def chat(req: ChatRequest, x_aris_token: str = Header(...)):
         except httpx.HTTPStatusError as e:
             raise HTTPException(status_code=502, detail=f"Ollama error: {e.response.text}")
         except Exception as e:
+            tracked.fail()
             return {
                 "role":    "assistant",
                 "content": f"LLM Error: {str(e)}",
@@ -187,18 +535,8 @@ async def chat(req: ChatRequest, x_aris_token: str = Header(...)):
 
 
 # --- ENTRY POINT ---
-def start():
-    """Entry point used by setup.py console_scripts."""
-    parser = argparse.ArgumentParser(description="Aris Worker Node")
-    parser.add_argument("--port",     type=int, default=9006,                        help="Port to run the node on")
-    parser.add_argument("--registry", type=str, default="http://localhost:8000/register", help="Registry URL")
-    args = parser.parse_args()
-
-    os.environ["ARIS_NODE_PORT"] = str(args.port)
-    os.environ["ARIS_REGISTRY"]  = args.registry
-
-    uvicorn.run(app, host="0.0.0.0", port=args.port)
-
-
 if __name__ == "__main__":
-    start()
\ No newline at end of file
+    # ``python -m agent_node.llm_agent``: the launcher re-imports this module
+    # by name once the flags are in the environment.
+    from agent_node.launcher import start
+    start()
@@ -1,17 +1,80 @@
 import os
+import asyncio
+import contextlib
 import uvicorn
+import httpx
 import jwt
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Header
 from pydantic import BaseModel
+from typing import Optional
 import logging
 
 from aris.session_defaults import DEFAULT_SESSION_HS256_SECRET
+from agent_node.auth import TokenVerifier
+from agent_node.launcher import DEFAULT_REGISTRY_URL
+from agent_node.metering import BudgetExhausted, BudgetMeter, report_usage, session_usage
+from agent_node.stats import NodeStats
 
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Aris Node: Math Specialist")
-
 ARIS_PUBLIC_KEY = os.getenv("ARIS_PUBLIC_KEY", DEFAULT_SESSION_HS256_SECRET)
+MY_DID = "did:aris:math-node-01"
+REGISTRY_URL = os.getenv("ARIS_REGISTRY", DEFAULT_REGISTRY_URL)
+METER_REPORT_URL        = os.getenv("ARIS_METER_REPORT_URL", REGISTRY_URL.rsplit("/", 1)[0] + "/usage/report")
+METER_SESSION_URL       = METER_REPORT_URL.rsplit("/", 1)[0] + "/session"
+METER_REPORT_INTERVAL_S = float(os.getenv("ARIS_METER_REPORT_INTERVAL", 10))
+
+token_verifier = TokenVerifier(ARIS_PUBLIC_KEY, audience=MY_DID,
+                               max_entries=int(os.getenv("ARIS_TOKEN_CACHE_SIZE", 10000)))
+
+# Per-session call counts for tokens issued with a prepaid budget, as on the LLM node.
+meter = BudgetMeter()
+
+# Served at /status.
+node_stats = NodeStats()
+
+# Created in lifespan; carries the usage reports to the registry.
+http_client: Optional[httpx.AsyncClient] = None
+
+
+async def _report_usage() -> None:
+    """Send calls served since the last report; kept for the next attempt on failure."""
+    async def post(body, headers):
+        return await http_client.post(METER_REPORT_URL, json=body, headers=headers, timeout=10.0)
+
+    await report_usage(meter, post, MY_DID, ARIS_PUBLIC_KEY)
+
+
+async def _session_usage(jti: str) -> Optional[int]:
+    """Calls the registry has on record for a budget session issued to this node."""
+    async def get(jti, headers):
+        return await http_client.get(f"{METER_SESSION_URL}/{jti}", headers=headers, timeout=10.0)
+
+    return await session_usage(get, jti, MY_DID, ARIS_PUBLIC_KEY)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global http_client
+    http_client = httpx.AsyncClient()
+
+    async def usage_reports():
+        while True:
+            await asyncio.sleep(METER_REPORT_INTERVAL_S)
+            await _report_usage()
+
+    task = asyncio.create_task(usage_reports())
+    yield
+    task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task
+    await _report_usage()
+    await http_client.aclose()
+    http_client = None
+
+
+app = FastAPI(title="Aris Node: Math Specialist", lifespan=lifespan)
 
 class JobRequest(BaseModel):
     a: int
@@ -25,7 +88,7 @@ async def execute_task(job: JobRequest, x_aris_token: str = Header(...)):
     """
     try:
         # 1. Verify the signature (Did Aris sign this?)
-        payload = jwt.decode(x_aris_token, ARIS_PUBLIC_KEY, algorithms=["HS256"], audience="did:aris:math-node-01")
+        payload = token_verifier.verify(x_aris_token)
         
         # 2. Check Scope
         if "math.add" not in payload.get("scope", ""):
@@ -38,11 +101,33 @@ async def execute_task(job: JobRequest, x_aris_token: str = Header(...)):
     except jwt.InvalidTokenError as e:
         raise HTTPException(401, f"Invalid Token: {str(e)}")
 
-    # 3. Do the Work (The Capability)
-    if job.operation == "add":
+    # 3. Check the work is something this node does, before it is paid for.
+    if job.operation != "add":
+        with node_stats.track(job.operation) as tracked:
+            tracked.fail()
+        return {"error": "Unsupported operation"}
+
+    # Prepaid sessions: count the call against the token's budget, starting
+    # from the registry's count for a session this process hasn't seen.
+    if meter.needs_seed(payload):
+        try:
+            await meter.seed(payload, _session_usage)
+        except Exception as e:
+            logger.warning("Could not look up session usage: %s", e)
+            raise HTTPException(503, "Could not check the session budget with the registry.")
+    try:
+        meter.charge(payload)
+    except BudgetExhausted as e:
+        raise HTTPException(402, str(e))
+
+    # 4. Do the Work (The Capability)
+    with node_stats.track(job.operation):
         return {"result": job.a + job.b, "status": "success"}
-    
-    return {"error": "Unsupported operation"}
+
+@app.get("/status")
+async def status():
+    """Uptime, job totals, QPS and latency percentiles for this node."""
+    return {"status": "active", "did": MY_DID, **node_stats.status()}
 
 if __name__ == "__main__":
     # Runs on Port 9005 (Math Node)
@@ -0,0 +1,157 @@
+"""
+Node-side metering for prepaid session budgets.
+
+A handshake made with ``"calls": N`` returns a token carrying ``jti`` and
+``budget`` claims: the caller has prepaid N calls to this node. The node counts
+calls per ``jti`` in memory, rejects calls once the budget is spent, and
+periodically reports the calls served since the last report to the registry
+in one bulk request, so the registry stays off the per-call path.
+
+Tokens without a ``budget`` claim (plain 300 s sessions) are not metered.
+Every node app charges its meter on each call and runs :func:`report_usage`
+periodically and at shutdown.
+
+Counts are per process. The first call on a session this process hasn't seen
+(after a restart, or on another worker) seeds its count with the calls the
+registry has on record (:func:`session_usage`), and each report's reply names
+the sessions the registry counts as used up. A session served by several
+workers at once can still overrun its budget by what they serve between two
+reports; the registry flags such sessions.
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+import jwt
+
+logger = logging.getLogger(__name__)
+
+# post(body, headers) → the registry's HTTP response
+Post = Callable[[Dict[str, Any], Dict[str, str]], Awaitable[Any]]
+# get(jti, headers) → the registry's HTTP response about that session
+Get = Callable[[str, Dict[str, str]], Awaitable[Any]]
+
+
+class BudgetExhausted(Exception):
+    """The session's prepaid call budget is used up."""
+
+
+class BudgetMeter:
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self._clock = clock
+        # jti → [calls used, budget, exp]
+        self._sessions: Dict[str, list] = {}
+        # jti → calls not yet reported to the registry
+        self._pending: Counter = Counter()
+        # jti → registry lookup in flight, shared by concurrent first calls
+        self._seeding: Dict[str, asyncio.Future] = {}
+
+    def needs_seed(self, claims: Dict[str, Any]) -> bool:
+        """True for a metered token whose session this process hasn't counted yet."""
+        return isinstance(claims.get("budget"), int) and bool(claims.get("jti")) and claims["jti"] not in self._sessions
+
+    async def seed(self, claims: Dict[str, Any], lookup: Callable[[str], Awaitable[Optional[int]]]) -> None:
+        """
+        Start counting the token's session from the calls ``await lookup(jti)``
+        says were already used; None means the session is unknown and gets
+        nothing. Concurrent first calls share one lookup; its errors propagate.
+        """
+        jti = claims["jti"]
+        lookup_done = self._seeding.get(jti)
+        if lookup_done is None:
+            lookup_done = self._seeding[jti] = asyncio.ensure_future(lookup(jti))
+            lookup_done.add_done_callback(lambda _: self._seeding.pop(jti, None))
+        used = await asyncio.shield(lookup_done)
+        if jti not in self._sessions:
+            budget = claims["budget"]
+            self._sessions[jti] = [budget if used is None else used, budget, claims.get("exp", 0)]
+
+    def spend(self, jtis: Iterable[str]) -> None:
+        """Mark sessions the registry counts as used up, whatever this process counted."""
+        for jti in jtis:
+            entry = self._sessions.get(jti)
+            if entry is not None:
+                entry[0] = max(entry[0], entry[1])
+
+    def charge(self, claims: Dict[str, Any]) -> int:
+        """
+        Count one call against the token's budget and return the calls left.
+        Returns -1 for unmetered tokens; raises :class:`BudgetExhausted` when spent.
+        """
+        budget, jti = claims.get("budget"), claims.get("jti")
+        if not isinstance(budget, int) or not jti:
+            return -1
+
+        entry = self._sessions.get(jti)
+        if entry is None:
+            entry = self._sessions[jti] = [0, budget, claims.get("exp", 0)]
+        if entry[0] >= entry[1]:
+            raise BudgetExhausted(f"Session budget of {entry[1]} calls is used up.")
+        entry[0] += 1
+        self._pending[jti] += 1
+        return entry[1] - entry[0]
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """Take the unreported counts, as ``[{"jti": ..., "calls": n}]``."""
+        reports = [{"jti": jti, "calls": n} for jti, n in self._pending.items()]
+        self._pending.clear()
+        return reports
+
+    def restore(self, reports: List[Dict[str, Any]]) -> None:
+        """Put back reports that failed to send so the next report retries them."""
+        for r in reports:
+            self._pending[r["jti"]] += r["calls"]
+
+    def expire(self) -> int:
+        """Forget sessions whose token has expired and whose usage is reported."""
+        now = self._clock()
+        dead = [jti for jti, (_, _, exp) in self._sessions.items() if exp <= now and jti not in self._pending]
+        for jti in dead:
+            del self._sessions[jti]
+        return len(dead)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+def _node_token(did: str, secret: str) -> str:
+    """A short-lived token the registry accepts as coming from node *did*."""
+    return jwt.encode({"iss": did, "aud": "aris-registry", "exp": time.time() + 60}, secret, algorithm="HS256")
+
+
+async def report_usage(meter: BudgetMeter, post: Post, did: str, secret: str) -> None:
+    """
+    Send the calls served since the last report to the registry's
+    ``/usage/report`` with a short-lived node token signed as *did*. Reports
+    that fail to send are kept for the next attempt; sessions the reply names
+    as used up are closed.
+    """
+    reports = meter.drain()
+    if reports:
+        try:
+            resp = await post({"reports": reports}, {"x-aris-node-token": _node_token(did, secret)})
+            resp.raise_for_status()
+        except Exception as e:
+            meter.restore(reports)
+            logger.warning("Usage report failed (%d sessions pending): %s", len(reports), e)
+        else:
+            try:
+                meter.spend(resp.json().get("exhausted", []))
+            except ValueError:
+                pass                    # registries that predate the reply body
+    meter.expire()
+
+
+async def session_usage(get: Get, jti: str, did: str, secret: str) -> Optional[int]:
+    """
+    Calls the registry has on record for budget session *jti*, or None if it
+    issued no such session to *did*. Raises if the registry can't answer.
+    """
+    resp = await get(jti, {"x-aris-node-token": _node_token(did, secret)})
+    if resp.status_code == 404:
+        return None
+    resp.raise_for_status()
+    return int(resp.json()["calls_used"])
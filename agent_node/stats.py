@@ -0,0 +1,165 @@
+"""
+In-memory load tracking for worker nodes.
+
+The node wraps every job in :meth:`NodeStats.track`, and the backend call
+inside it in :meth:`Job.backend`, so each job's latency splits into time
+spent waiting on the backend and the node's own overhead (token checks,
+serialisation, streaming to the client). :meth:`NodeStats.load` is reported
+with each registry heartbeat, so ``/discover`` can hand clients per-node load
+signals; :meth:`NodeStats.status` is the fuller view served at ``/status``.
+
+Everything is per process and updated from the event-loop thread, so there
+is no locking. Latency percentiles cover the last ``window`` jobs; QPS counts
+jobs finished in the last ``qps_window`` seconds, in one-second buckets.
+"""
+
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+def _percentile(sorted_values, q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+def _summary(values) -> Dict[str, Optional[float]]:
+    recent = sorted(values)
+    return {
+        "p50_ms": _ms(_percentile(recent, 0.50)),
+        "p95_ms": _ms(_percentile(recent, 0.95)),
+        "p99_ms": _ms(_percentile(recent, 0.99)),
+    }
+
+
+class Job:
+    """One tracked job: where its backend time went and whether it failed."""
+
+    __slots__ = ("model", "backend_s", "failed")
+
+    def __init__(self, model: Optional[str]):
+        self.model = model
+        self.backend_s = 0.0
+        self.failed = False
+
+    @contextmanager
+    def backend(self) -> Iterator[None]:
+        """Count the enclosed block as backend time (may be entered more than once)."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.backend_s += time.perf_counter() - t0
+
+    def fail(self) -> None:
+        """Mark the job failed without raising (handlers that return an error body)."""
+        self.failed = True
+
+
+class NodeStats:
+    def __init__(self, window: int = 256, qps_window: int = 60,
+                 clock: Callable[[], float] = time.monotonic):
+        self.in_flight = 0
+        self.queue_depth = 0
+        self.completed = 0
+        self.failed = 0
+        self.last_job_at: Optional[float] = None
+        # model → {"completed": n, "failed": n}
+        self.models: Dict[str, Dict[str, int]] = {}
+        self.qps_window = qps_window
+        self._clock = clock
+        self._started = clock()
+        self._latencies = deque(maxlen=window)
+        self._backend = deque(maxlen=window)
+        self._overhead = deque(maxlen=window)
+        # (whole second, jobs finished in it), oldest first
+        self._finished = deque()
+
+    @contextmanager
+    def track(self, model: Optional[str] = None) -> Iterator[Job]:
+        """Count one in-flight job and record its outcome and latency when it finishes."""
+        job = Job(model)
+        self.in_flight += 1
+        t0 = time.perf_counter()
+        try:
+            yield job
+        except BaseException:
+            job.failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - t0
+            self.in_flight -= 1
+            self._record(job, elapsed)
+
+    def _record(self, job: Job, elapsed: float) -> None:
+        self._latencies.append(elapsed)
+        self._backend.append(job.backend_s)
+        self._overhead.append(max(0.0, elapsed - job.backend_s))
+        outcome = "failed" if job.failed else "completed"
+        if job.failed:
+            self.failed += 1
+        else:
+            self.completed += 1
+        if job.model is not None:
+            counts = self.models.get(job.model)
+            if counts is None:
+                counts = self.models[job.model] = {"completed": 0, "failed": 0}
+            counts[outcome] += 1
+        self.last_job_at = time.time()
+
+        second = int(self._clock())
+        if self._finished and self._finished[-1][0] == second:
+            self._finished[-1][1] += 1
+        else:
+            self._finished.append([second, 1])
+        self._expire(second)
+
+    def _expire(self, now: int) -> None:
+        while self._finished and self._finished[0][0] <= now - self.qps_window:
+            self._finished.popleft()
+
+    def qps(self) -> float:
+        """Jobs finished per second over the last ``qps_window`` seconds."""
+        now = int(self._clock())
+        self._expire(now)
+        # Until the node has been up a full window, average over its uptime.
+        span = min(self.qps_window, max(1.0, self._clock() - self._started))
+        return round(sum(n for _, n in self._finished) / span, 2)
+
+    def load(self) -> Dict[str, Any]:
+        """Load signals sent with the heartbeat (latencies over the recent window, in ms)."""
+        return {
+            "in_flight":      self.in_flight,
+            "queue_depth":    self.queue_depth,
+            "qps":            self.qps(),
+            **_summary(self._latencies),
+            "jobs_completed": self.completed,
+            "jobs_failed":    self.failed,
+        }
+
+    def status(self) -> Dict[str, Any]:
+        """Everything tracked, served at the node's ``/status``."""
+        last = self.last_job_at
+        return {
+            "uptime_seconds": int(self._clock() - self._started),
+            "in_flight":      self.in_flight,
+            "queue_depth":    self.queue_depth,
+            "jobs_completed": self.completed,
+            "jobs_failed":    self.failed,
+            "last_job_at":    (datetime.fromtimestamp(last, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+                               if last is not None else None),
+            "qps":            self.qps(),
+            "latency": {
+                "total":    _summary(self._latencies),
+                "backend":  _summary(self._backend),
+                "overhead": _summary(self._overhead),
+            },
+            "models": {model: dict(counts) for model, counts in self.models.items()},
+        }
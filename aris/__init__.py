@@ -1,4 +1,5 @@
 # aris/__init__.py
 from .client import Aris, generate
+from .async_client import AsyncAris, AsyncConversation
 
-__version__ = "0.1.4"
\ No newline at end of file
+__version__ = "0.1.4"
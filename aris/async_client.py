@@ -0,0 +1,557 @@
+import asyncio
+import json
+import os
+import time
+import logging
+from typing import Optional, Dict, Any, AsyncIterator, Awaitable, Callable, List, Tuple, TypeVar
+
+import httpx
+
+from .client import (
+    ArisError, ArisAuthError, ArisPaymentError, ArisNodeError, ArisOverloadedError, _BusyNodes, _Session,
+    _TokenExpiredError, _overloaded, _session_deadlines,
+)
+from .routing import NodeSelector, PowerOfTwoChoices
+
+T = TypeVar("T")
+
+logger = logging.getLogger("aris")
+
+_RETRY_STATUSES = (502, 503, 504)
+
+
+# --- The asyncio client ---
+class AsyncAris:
+    """
+    asyncio counterpart of :class:`aris.Aris`, built on ``httpx.AsyncClient``.
+
+    One instance is safe to share across tasks. Sessions are kept per
+    capability: concurrent calls reuse the same token, and only one handshake
+    per capability is ever in flight, so a burst of requests on a cold client
+    pays for a single session.
+
+    Example::
+
+        async with AsyncAris(api_key="aris_live_...") as client:
+            replies = await asyncio.gather(*(client.chat(m) for m in batches))
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        registry_url: Optional[str] = None,
+        node_selector: Optional[NodeSelector] = None,
+        pool_size: int = 100,
+        retries: int = 2,
+        http_client: Optional[httpx.AsyncClient] = None,
+        session_calls: Optional[int] = None,
+        refresh_margin_s: float = 30.0,
+        max_failovers: int = 2,
+    ):
+        """
+        Initialize the async Aris client.
+
+        Args:
+            api_key: Your Aris API Key. Defaults to ARIS_API_KEY env var.
+            registry_url: URL of the Aris Registry.
+                          Defaults to ARIS_REGISTRY_URL env var or localhost:8000.
+            node_selector: Strategy for picking a worker node (see :mod:`aris.routing`).
+            pool_size: Maximum open connections. Requests beyond this wait for a
+                       free connection rather than failing.
+            retries: Retries for failed connections, and for registry reads that
+                     hit a 502/503/504.
+            http_client: Bring your own ``httpx.AsyncClient`` (e.g. to share one
+                         pool between clients). It is not closed by :meth:`aclose`.
+            session_calls: Prepay this many calls per session. See :class:`aris.Aris`.
+            refresh_margin_s: Renew a session this long before its token's ``exp``.
+                              The renewal runs as a background task, so calls
+                              keep using the current token meanwhile.
+            max_failovers: Nodes to fail over to when one answers 429. See :class:`aris.Aris`.
+        """
+        self.api_key = api_key or os.getenv("ARIS_API_KEY")
+        if not self.api_key:
+            raise ArisAuthError("Missing API Key. Pass it to AsyncAris() or set ARIS_API_KEY env var.")
+
+        self.registry_url = (registry_url or os.getenv("ARIS_REGISTRY_URL", "http://localhost:8000")).rstrip("/")
+        self.node_selector = node_selector or PowerOfTwoChoices()
+        self.retries = retries
+        self.session_calls = session_calls
+        # (capability, node DID) → session, as in Aris: after a failover, sessions
+        # on several nodes stay live side by side; _active is the one each capability uses.
+        self._sessions: Dict[Tuple[str, str], _Session] = {}
+        self._active: Dict[str, _Session] = {}
+        self._handshake_locks: Dict[str, asyncio.Lock] = {}
+        self.refresh_margin_s = refresh_margin_s
+        self._refresh_tasks: Dict[str, asyncio.Task] = {}
+        self.max_failovers = max_failovers
+        self._busy = _BusyNodes()
+        self._owns_http = http_client is None
+        # Transport-level retries cover connection failures only, so a paid
+        # POST that reached the registry is never replayed.
+        self._http = http_client or httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(
+                retries=retries,
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            ),
+        )
+
+    async def aclose(self) -> None:
+        """Close pooled connections (unless the httpx client was passed in)."""
+        tasks = [t for t in self._refresh_tasks.values() if not t.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._refresh_tasks.clear()
+        if self._owns_http:
+            await self._http.aclose()
+
+    async def __aenter__(self) -> "AsyncAris":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+    @staticmethod
+    def _timeout(seconds: float) -> httpx.Timeout:
+        # No pool timeout: with thousands of concurrent calls, waiting for a
+        # pooled connection is expected and must not surface as an error.
+        return httpx.Timeout(seconds, pool=None)
+
+    async def _registry_get(self, path: str, timeout: float, **kwargs) -> httpx.Response:
+        """GET against the registry, retrying 502/503/504 with backoff."""
+        for attempt in range(self.retries + 1):
+            resp = await self._http.get(f"{self.registry_url}{path}", timeout=self._timeout(timeout), **kwargs)
+            if resp.status_code not in _RETRY_STATUSES or attempt == self.retries:
+                return resp
+            await asyncio.sleep(0.1 * 2 ** attempt)
+
+    # ------------------------------------------------------------------ #
+    #  Account APIs                                                        #
+    # ------------------------------------------------------------------ #
+
+    async def balance(self) -> Dict[str, Any]:
+        """Fetch the current credit balance. See :meth:`aris.Aris.balance`."""
+        try:
+            resp = await self._registry_get("/balance", 10, headers={"x-api-key": self.api_key})
+        except httpx.HTTPError as e:
+            raise ArisError(f"Network error fetching balance: {e}")
+        return self._account_response(resp)
+
+    async def usage(self, limit: int = 50, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Fetch one page of usage history for this API key. See :meth:`aris.Aris.usage`."""
+        if not isinstance(limit, int) or limit < 1:
+            raise ValueError("limit must be a positive integer.")
+
+        params: Dict[str, Any] = {"limit": min(limit, 200)}
+        if cursor:
+            params["cursor"] = cursor
+
+        try:
+            resp = await self._registry_get(
+                "/usage",
+                10,
+                headers={"x-api-key": self.api_key},
+                params=params,
+            )
+        except httpx.HTTPError as e:
+            raise ArisError(f"Network error fetching usage: {e}")
+        return self._account_response(resp)
+
+    async def iter_usage(self, page_size: int = 200) -> AsyncIterator[Dict[str, Any]]:
+        """Iterate lazily over the full usage history. See :meth:`aris.Aris.iter_usage`."""
+        cursor = None
+        while True:
+            page = await self.usage(limit=page_size, cursor=cursor)
+            for event in page["usage"]:
+                yield event
+            cursor = page.get("next_cursor")
+            if not cursor:
+                return
+
+    async def usage_summary(
+        self,
+        granularity: str = "day",
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        capability: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Fetch spend totals and a time series. See :meth:`aris.Aris.usage_summary`."""
+        if granularity not in ("hour", "day"):
+            raise ValueError("granularity must be 'hour' or 'day'.")
+
+        params: Dict[str, Any] = {"granularity": granularity}
+        for name, value in (("since", since), ("until", until), ("capability", capability)):
+            if value is not None:
+                params[name] = value
+
+        try:
+            resp = await self._registry_get("/usage/summary", 10, headers={"x-api-key": self.api_key}, params=params)
+        except httpx.HTTPError as e:
+            raise ArisError(f"Network error fetching usage summary: {e}")
+        return self._account_response(resp)
+
+    @staticmethod
+    def _account_response(resp: httpx.Response) -> Dict[str, Any]:
+        if resp.status_code == 401:
+            raise ArisAuthError("Missing API Key in request.")
+        if resp.status_code == 403:
+            raise ArisAuthError("Invalid API Key.")
+        if resp.status_code != 200:
+            raise ArisError(f"Unexpected error from registry: {resp.text}")
+        return resp.json()
+
+    # ------------------------------------------------------------------ #
+    #  Sessions                                                            #
+    # ------------------------------------------------------------------ #
+
+    async def _ensure_session(self, capability: str, stale: Optional[_Session] = None) -> _Session:
+        """
+        Return the session for *capability*, handshaking if there is none.
+
+        *stale* is a session a caller saw rejected: it is dropped, but only if
+        no other task has already replaced it, so a burst of 401s triggers one
+        re-handshake rather than one each.
+
+        A session within ``refresh_margin_s`` of its token's ``exp`` is renewed
+        by a background task while callers keep using it; only a session that
+        has actually expired makes callers wait for a handshake.
+        """
+        session = self._active.get(capability)
+        if session is not None and session is not stale and not session.expired():
+            if session.needs_refresh():
+                self._schedule_refresh(capability, session)
+            return session
+
+        lock = self._handshake_locks.setdefault(capability, asyncio.Lock())
+        async with lock:
+            session = self._active.get(capability)
+            if session is not None and session is not stale and not session.expired():
+                return session
+            self._active.pop(capability, None)
+            if stale is not None and self._sessions.get((capability, stale.did)) is stale:
+                del self._sessions[(capability, stale.did)]
+            session = await self._connect_to_swarm(capability)
+            self._store(capability, session)
+            return session
+
+    def _store(self, capability: str, session: _Session) -> None:
+        self._sessions[(capability, session.did)] = session
+        self._active[capability] = session
+
+    def _schedule_refresh(self, capability: str, session: _Session) -> None:
+        task = self._refresh_tasks.get(capability)
+        if task is None or task.done():
+            self._refresh_tasks[capability] = asyncio.create_task(self._refresh(capability, session))
+
+    async def _refresh(self, capability: str, session: _Session) -> None:
+        lock = self._handshake_locks.setdefault(capability, asyncio.Lock())
+        async with lock:
+            if self._active.get(capability) is not session:
+                return                          # already replaced
+            try:
+                fresh = await self._connect_to_swarm(capability)
+            except ArisError as e:
+                logger.warning("Background session refresh failed (%s); retrying on next use.", e)
+                return
+            self._store(capability, fresh)
+
+    async def _connect_to_swarm(self, capability: str) -> _Session:
+        """
+        Discover a node that exposes *capability* and complete handshake
+        (billing), reusing a live session on the selected node. See
+        :meth:`aris.Aris._connect_to_swarm`.
+        """
+        logger.info("Discovering worker node for capability=%s", capability)
+
+        try:
+            resp = await self._registry_get("/discover", 5, params={"capability": capability})
+            resp.raise_for_status()
+            data = resp.json()
+
+            if not data.get("agents"):
+                raise ArisNodeError("No active worker nodes found in the network.")
+
+            agents = self._busy.available(data["agents"])
+            if not agents:
+                raise ArisOverloadedError(
+                    f"All {len(data['agents'])} worker nodes for {capability} are at capacity.",
+                    self._busy.retry_after(),
+                )
+
+            target = self.node_selector.select(agents)
+
+            known = self._sessions.get((capability, target["did"]))
+            if known is not None and not known.needs_refresh():
+                logger.info("Reusing session target_did=%s capability=%s", target["did"], capability)
+                return known
+
+            logger.info("Handshake target_did=%s capability=%s", target["did"], capability)
+
+            handshake_body = {
+                "payer_did": "did:aris:customer-sdk",
+                "target_did": target["did"],
+                "capability": capability,
+            }
+            if self.session_calls:
+                handshake_body["calls"] = self.session_calls
+
+            pay_resp = await self._http.post(
+                f"{self.registry_url}/handshake",
+                json=handshake_body,
+                headers={"x-api-key": self.api_key},
+                timeout=self._timeout(10),
+            )
+
+            if pay_resp.status_code == 402:
+                raise ArisPaymentError("Insufficient Balance. Please top up your Aris account.")
+            elif pay_resp.status_code != 200:
+                raise ArisError(f"Handshake failed: {pay_resp.text}")
+
+            session_data = pay_resp.json()
+            logger.info(
+                "Session established; remaining_balance_usd=%s",
+                session_data.get("remaining_balance"),
+            )
+            token = session_data["session_token"]
+            refresh_at, expires_at = _session_deadlines(token, self.refresh_margin_s)
+            return _Session(token, target["endpoint"], target["did"], refresh_at, expires_at)
+
+        except httpx.HTTPError as e:
+            raise ArisError(f"Network error connecting to Registry: {e}")
+
+    async def _post_to_node(self, session: _Session, path: str, body: Dict[str, Any], timeout: float) -> httpx.Response:
+        t0 = time.perf_counter()
+        try:
+            response = await self._http.post(
+                f"{session.endpoint}{path}",
+                json=body,
+                headers={"x-aris-token": session.token},
+                timeout=self._timeout(timeout),
+            )
+        except httpx.HTTPError as e:
+            self.node_selector.observe(session.endpoint, time.perf_counter() - t0, ok=False)
+            raise ArisNodeError(f"Failed to communicate with Worker Node: {e}")
+        self.node_selector.observe(session.endpoint, time.perf_counter() - t0, response.status_code == 200)
+        return response
+
+    # ------------------------------------------------------------------ #
+    #  Inference APIs                                                      #
+    # ------------------------------------------------------------------ #
+
+    async def generate(self, prompt: str, model: str = "tinyllama") -> str:
+        """Generate text using the Aris network. See :meth:`aris.Aris.generate`."""
+        return await self._call_node("ai.generate", lambda session: self._execute_request(session, prompt, model))
+
+    async def _call_node(self, capability: str, call: Callable[[_Session], Awaitable[T]]) -> T:
+        """Await ``call(session)`` with token refresh and 429 failover. See :meth:`aris.Aris._call_node`."""
+        session = await self._ensure_session(capability)
+        if self._busy.busy(session.endpoint):
+            session = await self._fail_over(capability, session)
+        refreshed, failovers = False, 0
+        while True:
+            try:
+                return await call(session)
+            except _TokenExpiredError as e:
+                if refreshed:
+                    raise
+                refreshed = True
+                logger.warning("Request failed (%s); refreshing session and retrying once.", e)
+                session = await self._ensure_session(capability, stale=session)
+            except ArisOverloadedError as e:
+                self._busy.mark(session.endpoint, e.retry_after)
+                if failovers >= self.max_failovers:
+                    raise
+                failovers += 1
+                logger.warning("Node %s is at capacity; failing over (retry after %ss).",
+                               session.endpoint, e.retry_after)
+                session = await self._fail_over(capability, session)
+
+    async def _fail_over(self, capability: str, busy: _Session) -> _Session:
+        """Return a session on a node other than *busy*'s (whose token is kept for later)."""
+        if self._active.get(capability) is busy:
+            del self._active[capability]
+        return await self._ensure_session(capability)
+
+    async def _execute_request(self, session: _Session, prompt: str, model: str) -> str:
+        response = await self._post_to_node(session, "/generate", {"model": model, "prompt": prompt}, 60)
+        if response.status_code == 200:
+            return response.json().get("result", "")
+        elif response.status_code in [401, 402, 403]:
+            raise _TokenExpiredError("Session Token Expired, Invalid or Out of Budget")
+        elif response.status_code == 429:
+            raise _overloaded(response)
+        else:
+            raise ArisNodeError(f"Worker Node Error: {response.text}")
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        model: str = "tinyllama",
+    ) -> Dict[str, str]:
+        """Send a multi-turn conversation to the Aris network. See :meth:`aris.Aris.chat`."""
+        if not messages:
+            raise ValueError("messages must not be empty.")
+        if messages[-1].get("role") != "user":
+            raise ValueError("The last message must have role='user'.")
+
+        return await self._call_node("ai.chat", lambda session: self._execute_chat(session, messages, model))
+
+    async def _execute_chat(self, session: _Session, messages: List[Dict[str, str]], model: str) -> Dict[str, str]:
+        response = await self._post_to_node(session, "/chat", {"model": model, "messages": messages}, 90)
+        if response.status_code == 200:
+            return response.json()
+        elif response.status_code == 422:
+            raise ValueError(f"Invalid chat request: {response.json().get('detail', response.text)}")
+        elif response.status_code in [401, 402, 403]:
+            raise _TokenExpiredError("Session Token Expired, Invalid or Out of Budget")
+        elif response.status_code == 429:
+            raise _overloaded(response)
+        else:
+            raise ArisNodeError(f"Worker Node Error {response.status_code}: {response.text}")
+
+    async def generate_stream(self, prompt: str, model: str = "tinyllama") -> AsyncIterator[str]:
+        """Yield generated text in chunks. See :meth:`aris.Aris.generate_stream`."""
+        async for chunk in self._stream("ai.generate", "/generate", {"model": model, "prompt": prompt}, 60):
+            yield chunk
+
+    async def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        model: str = "tinyllama",
+    ) -> AsyncIterator[str]:
+        """Yield the assistant's reply in chunks. See :meth:`aris.Aris.chat_stream`."""
+        if not messages:
+            raise ValueError("messages must not be empty.")
+        if messages[-1].get("role") != "user":
+            raise ValueError("The last message must have role='user'.")
+        async for chunk in self._stream("ai.chat", "/chat", {"model": model, "messages": messages}, 90):
+            yield chunk
+
+    async def _stream(self, capability: str, path: str, body: Dict[str, Any], timeout: float) -> AsyncIterator[str]:
+        async def open_stream(session: _Session):
+            return (session, *await self._open_stream(session, path, body, timeout))
+
+        # Only opening the stream is retried: nothing has been yielded yet.
+        session, response, t0 = await self._call_node(capability, open_stream)
+
+        ok = False
+        try:
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event.get("done"):
+                    if event.get("status") != "success":
+                        raise ArisNodeError(f"Worker Node Error: {event.get('error', 'stream failed')}")
+                    ok = True
+                    return
+                yield event.get("token", "")
+            raise ArisNodeError("Worker Node closed the stream before it finished.")
+        except httpx.HTTPError as e:
+            raise ArisNodeError(f"Stream from Worker Node interrupted: {e}")
+        finally:
+            await response.aclose()
+            self.node_selector.observe(session.endpoint, time.perf_counter() - t0, ok)
+
+    async def _open_stream(self, session: _Session, path: str, body: Dict[str, Any], timeout: float):
+        t0 = time.perf_counter()
+        request = self._http.build_request(
+            "POST",
+            f"{session.endpoint}{path}",
+            json={**body, "stream": True},
+            headers={"x-aris-token": session.token},
+            timeout=self._timeout(timeout),
+        )
+        try:
+            response = await self._http.send(request, stream=True)
+        except httpx.HTTPError as e:
+            self.node_selector.observe(session.endpoint, time.perf_counter() - t0, ok=False)
+            raise ArisNodeError(f"Failed to communicate with Worker Node: {e}")
+
+        if response.status_code == 200:
+            return response, t0
+        await response.aread()
+        await response.aclose()
+        self.node_selector.observe(session.endpoint, time.perf_counter() - t0, ok=False)
+        if response.status_code == 422:
+            raise ValueError(f"Invalid request: {response.json().get('detail', response.text)}")
+        elif response.status_code in [401, 402, 403]:
+            raise _TokenExpiredError("Session Token Expired, Invalid or Out of Budget")
+        elif response.status_code == 429:
+            raise _overloaded(response)
+        raise ArisNodeError(f"Worker Node Error {response.status_code}: {response.text}")
+
+    def conversation(self, system_prompt: Optional[str] = None, model: str = "tinyllama") -> "AsyncConversation":
+        """Start a stateful multi-turn conversation bound to this client."""
+        return AsyncConversation(client=self, system_prompt=system_prompt, model=model)
+
+
+# ------------------------------------------------------------------ #
+#  AsyncConversation — stateful multi-turn helper                     #
+# ------------------------------------------------------------------ #
+
+class AsyncConversation:
+    """
+    Stateful wrapper around :meth:`AsyncAris.chat` that maintains message history.
+
+    Don't instantiate directly — use :meth:`AsyncAris.conversation` instead.
+    Turns within one conversation must be awaited one at a time; run separate
+    conversations concurrently instead.
+    """
+
+    def __init__(self, client: "AsyncAris", system_prompt: Optional[str] = None, model: str = "tinyllama"):
+        self._client = client
+        self._model  = model
+        self._history: List[Dict[str, str]] = []
+
+        if system_prompt:
+            self._history.append({"role": "system", "content": system_prompt})
+
+    async def say(self, text: str) -> str:
+        """Send a user message, get the assistant's reply, and advance history."""
+        self._history.append({"role": "user", "content": text})
+        try:
+            reply = await self._client.chat(self._history, model=self._model)
+        except BaseException:
+            self._history.pop()
+            raise
+        assistant_text = reply.get("content", "")
+        self._history.append({"role": "assistant", "content": assistant_text})
+        return assistant_text
+
+    async def say_stream(self, text: str) -> AsyncIterator[str]:
+        """
+        Yield the reply in chunks, appending it to history once complete.
+        See :meth:`aris.client.Conversation.say_stream`.
+        """
+        self._history.append({"role": "user", "content": text})
+        parts: List[str] = []
+        finished = False
+        try:
+            async for chunk in self._client.chat_stream(self._history, model=self._model):
+                parts.append(chunk)
+                yield chunk
+            finished = True
+        finally:
+            if finished:
+                self._history.append({"role": "assistant", "content": "".join(parts)})
+            else:
+                self._history.pop()
+
+    def reset(self, keep_system: bool = True) -> None:
+        """Clear conversation history, optionally preserving the system prompt."""
+        if keep_system and self._history and self._history[0]["role"] == "system":
+            self._history = [self._history[0]]
+        else:
+            self._history = []
+
+    @property
+    def history(self) -> List[Dict[str, str]]:
+        """Read-only view of the full message history."""
+        return list(self._history)
+
+    def __len__(self) -> int:
+        return len(self._history)
+
+    def __repr__(self) -> str:
+        return f"<AsyncConversation turns={len(self._history)} model={self._model}>"
@@ -1,7 +1,19 @@
 import os
+import json
+import base64
+import time
+import atexit
+import threading
 import requests
 import logging
-from typing import Optional, Dict, Any, List
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Callable, Iterator, List, Tuple, TypeVar
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .routing import Agent, NodeSelector, PowerOfTwoChoices
+
+T = TypeVar("T")
 
 # Configure library logging (NullHandler by default so we don't spam unless configured)
 logger = logging.getLogger("aris")
@@ -23,13 +35,142 @@ class ArisNodeError(ArisError):
     """Raised when the worker node fails to respond."""
     pass
 
+class ArisOverloadedError(ArisNodeError):
+    """
+    Raised when worker nodes are at capacity (HTTP 429) and failing over to
+    other nodes did not help. ``retry_after`` is the suggested wait in
+    seconds, or None if no node said.
+    """
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
 class _TokenExpiredError(ArisError):
     """Internal: session token is expired or invalid — triggers one reconnect."""
     pass
 
+@dataclass(frozen=True)
+class _Session:
+    """A session token from /handshake and the node it was issued for."""
+    token: str
+    endpoint: str
+    did: str = ""
+    # time.monotonic() deadlines; None for tokens without a readable exp.
+    refresh_at: Optional[float] = None
+    expires_at: Optional[float] = None
+
+    def needs_refresh(self) -> bool:
+        return self.refresh_at is not None and time.monotonic() >= self.refresh_at
+
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+def _session_deadlines(token: str, margin_s: float) -> Tuple[Optional[float], Optional[float]]:
+    """
+    ``(refresh_at, expires_at)`` for *token*, read from its ``exp`` claim without
+    verifying it (only nodes hold the key) and moved onto the monotonic clock.
+
+    The margin is capped at half the token's lifetime so short-lived tokens are
+    still used. Tokens without a readable ``exp``, or that already look expired
+    (a badly skewed local clock), get no deadlines and are only replaced once a
+    node rejects them.
+    """
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        lifetime = float(claims["exp"]) - time.time()
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None, None
+    if lifetime <= 0:
+        return None, None
+    now = time.monotonic()
+    return now + lifetime - min(margin_s, lifetime / 2), now + lifetime
+
+def _overloaded(response) -> ArisOverloadedError:
+    """The error for a node's 429 (a ``requests`` or ``httpx`` response)."""
+    try:
+        retry_after = float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        retry_after = None
+    return ArisOverloadedError(f"Worker Node at capacity: {response.text}", retry_after)
+
+class _BusyNodes:
+    """
+    Nodes that answered 429, left out of node selection until their
+    Retry-After has passed (``default_s`` when they gave none). Safe to share
+    between the threads using one client.
+    """
+    def __init__(self, default_s: float = 5.0):
+        self.default_s = default_s
+        self._until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, endpoint: str, retry_after: Optional[float]) -> None:
+        with self._lock:
+            self._until[endpoint] = time.monotonic() + (self.default_s if retry_after is None else retry_after)
+
+    def busy(self, endpoint: str) -> bool:
+        with self._lock:
+            until = self._until.get(endpoint)
+        return until is not None and until > time.monotonic()
+
+    def available(self, agents: List[Agent]) -> List[Agent]:
+        if not self._until:
+            return agents
+        now = time.monotonic()
+        with self._lock:
+            for endpoint, until in list(self._until.items()):
+                if until <= now:
+                    del self._until[endpoint]
+            busy = set(self._until)
+        return [a for a in agents if a.get("endpoint") not in busy]
+
+    def retry_after(self) -> Optional[float]:
+        """Seconds until the first busy node may be tried again."""
+        with self._lock:
+            if not self._until:
+                return None
+            first = min(self._until.values())
+        return max(0.0, first - time.monotonic())
+
+def _build_http_session(pool_size: int, retries: int) -> requests.Session:
+    """
+    A keep-alive session shared by every call a client makes.
+
+    Connection failures are retried for all methods (nothing reached the server).
+    Read errors and 502/503/504 are retried for GET only, so a paid POST such as
+    /handshake is never replayed.
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=0.1,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET"}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
 # --- The Main Client ---
 class Aris:
-    def __init__(self, api_key: Optional[str] = None, registry_url: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        registry_url: Optional[str] = None,
+        node_selector: Optional[NodeSelector] = None,
+        pool_size: int = 10,
+        retries: int = 2,
+        session_calls: Optional[int] = None,
+        refresh_margin_s: float = 30.0,
+        max_failovers: int = 2,
+    ):
         """
         Initialize the Aris Client.
 
@@ -38,16 +179,55 @@ class Aris:
                      Defaults to ARIS_API_KEY env var.
             registry_url: URL of the Aris Registry.
                           Defaults to ARIS_REGISTRY_URL env var or localhost:8000.
+            node_selector: Strategy for picking a worker node from /discover
+                           (see :mod:`aris.routing`). Defaults to power-of-two-choices
+                           on the load each node reports.
+            pool_size: Keep-alive connections kept open per host (registry and
+                       each worker node).
+            retries: Retries for failed connections, and for idempotent registry
+                     reads that hit a 502/503/504.
+            session_calls: Prepay this many calls per session instead of the flat
+                           per-handshake fee. The token then lasts up to an hour
+                           and is renewed automatically when its budget runs out.
+            refresh_margin_s: Renew a session this long before its token's
+                              ``exp``, so calls don't stall on an expired token.
+            max_failovers: When a node answers 429 (at capacity), move the call
+                           to another node up to this many times. The busy node
+                           is skipped until its Retry-After has passed. Moving to
+                           a node without a live session costs a handshake.
+
+        The client holds pooled connections; use it as a context manager or call
+        :meth:`close` when you are done with it. One instance is safe to share
+        across threads: each capability keeps its own session, and concurrent
+        callers on a cold or expired session wait for a single handshake.
         """
         self.api_key = api_key or os.getenv("ARIS_API_KEY")
         if not self.api_key:
             raise ArisAuthError("Missing API Key. Pass it to Aris() or set ARIS_API_KEY env var.")
 
         self.registry_url = (registry_url or os.getenv("ARIS_REGISTRY_URL", "http://localhost:8000")).rstrip("/")
-        self.session_token: Optional[str] = None
-        self.target_endpoint: Optional[str] = None
-        # Must match the capability negotiated in the last successful handshake.
-        self._session_capability: Optional[str] = None
+        self.node_selector = node_selector or PowerOfTwoChoices()
+        self.session_calls = session_calls
+        self.refresh_margin_s = refresh_margin_s
+        self._http = _build_http_session(pool_size, retries)
+        # (capability, node DID) → session. Tokens for several capabilities and
+        # nodes stay live side by side; _active is the one each capability uses.
+        self._sessions: Dict[Tuple[str, str], _Session] = {}
+        self._active: Dict[str, _Session] = {}
+        self._sessions_lock = threading.Lock()
+        self._handshake_locks: Dict[str, threading.Lock] = {}
+        self.max_failovers = max_failovers
+        self._busy = _BusyNodes()
+
+    def close(self) -> None:
+        """Close pooled connections. The client must not be used afterwards."""
+        self._http.close()
+
+    def __enter__(self) -> "Aris":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
 
     # ------------------------------------------------------------------ #
     #  Account APIs                                                        #
@@ -71,7 +251,7 @@ class Aris:
             print(f"Balance: ${info['balance_usd']:.4f}")
         """
         try:
-            resp = requests.get(
+            resp = self._http.get(
                 f"{self.registry_url}/balance",
                 headers={"x-api-key": self.api_key},
                 timeout=10,
@@ -88,19 +268,21 @@ class Aris:
 
         return resp.json()
 
-    def usage(self, limit: int = 50) -> Dict[str, Any]:
+    def usage(self, limit: int = 50, cursor: Optional[str] = None) -> Dict[str, Any]:
         """
         Fetch usage history (handshake log) for this API key.
 
         Args:
             limit: Max records to return (1–200, default 50).
+            cursor: ``next_cursor`` from a previous page, to fetch the page after it.
 
         Returns:
             dict with keys:
                 email (str),
                 records_returned (int),
-                total_spent_usd (float),
-                usage (list of dicts, newest first)
+                total_spent_usd (float, all-time spend of the account),
+                usage (list of dicts, newest first),
+                next_cursor (str, or None on the last page)
 
         Raises:
             ArisAuthError: If the API key is invalid.
@@ -116,11 +298,15 @@ class Aris:
         if not isinstance(limit, int) or limit < 1:
             raise ValueError("limit must be a positive integer.")
 
+        params: Dict[str, Any] = {"limit": min(limit, 200)}
+        if cursor:
+            params["cursor"] = cursor
+
         try:
-            resp = requests.get(
+            resp = self._http.get(
                 f"{self.registry_url}/usage",
                 headers={"x-api-key": self.api_key},
-                params={"limit": min(limit, 200)},
+                params=params,
                 timeout=10,
             )
         except requests.RequestException as e:
@@ -135,6 +321,81 @@ class Aris:
 
         return resp.json()
 
+    def iter_usage(self, page_size: int = 200) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over the full usage history, newest first.
+
+        Pages are fetched lazily as the iterator advances, so memory stays
+        bounded by *page_size* however long the history is. For bulk exports,
+        ``GET /usage/export`` streams the same records as NDJSON or CSV.
+
+        Example::
+
+            spent = sum(event["cost_usd"] for event in client.iter_usage())
+        """
+        cursor = None
+        while True:
+            page = self.usage(limit=page_size, cursor=cursor)
+            yield from page["usage"]
+            cursor = page.get("next_cursor")
+            if not cursor:
+                return
+
+    def usage_summary(
+        self,
+        granularity: str = "day",
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        capability: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Fetch spend totals and a time series for this API key.
+
+        Args:
+            granularity: "hour" or "day" buckets.
+            since, until: Unix-time window (default: the last 30 days).
+            capability: Only count this capability.
+
+        Returns:
+            dict with keys:
+                total (dict: events, cost_usd, calls),
+                by_capability (dict of capability → totals),
+                series (list of dicts with bucket start plus totals, oldest first),
+                granularity, since, until
+
+        Example::
+
+            summary = client.usage_summary(granularity="day")
+            for point in summary["series"]:
+                print(point["bucket"], point["cost_usd"])
+        """
+        if granularity not in ("hour", "day"):
+            raise ValueError("granularity must be 'hour' or 'day'.")
+
+        params: Dict[str, Any] = {"granularity": granularity}
+        for name, value in (("since", since), ("until", until), ("capability", capability)):
+            if value is not None:
+                params[name] = value
+
+        try:
+            resp = self._http.get(
+                f"{self.registry_url}/usage/summary",
+                headers={"x-api-key": self.api_key},
+                params=params,
+                timeout=10,
+            )
+        except requests.RequestException as e:
+            raise ArisError(f"Network error fetching usage summary: {e}")
+
+        if resp.status_code == 401:
+            raise ArisAuthError("Missing API Key in request.")
+        if resp.status_code == 403:
+            raise ArisAuthError("Invalid API Key.")
+        if resp.status_code != 200:
+            raise ArisError(f"Unexpected error from registry: {resp.text}")
+
+        return resp.json()
+
     # ------------------------------------------------------------------ #
     #  Inference APIs                                                      #
     # ------------------------------------------------------------------ #
@@ -150,36 +411,104 @@ class Aris:
         Returns:
             The generated text string.
         """
-        self._ensure_session("ai.generate")
+        return self._call_node("ai.generate", lambda session: self._execute_request(session, prompt, model))
 
+    def _call_node(self, capability: str, call: Callable[[_Session], T]) -> T:
+        """
+        Run ``call(session)`` on the node serving *capability*.
+
+        An expired token or spent budget gets one fresh session and a retry. A
+        node at capacity (429) rejected the call before doing any work, so it
+        moves to another node, up to ``max_failovers`` times. Other node errors
+        are not retried, since every handshake is billed.
+        """
+        session = self._ensure_session(capability)
+        if self._busy.busy(session.endpoint):
+            session = self._fail_over(capability, session)
+        refreshed, failovers = False, 0
+        while True:
+            try:
+                return call(session)
+            except _TokenExpiredError as e:
+                if refreshed:
+                    raise
+                refreshed = True
+                logger.warning("Request failed (%s); refreshing session and retrying once.", e)
+                session = self._ensure_session(capability, stale=session)
+            except ArisOverloadedError as e:
+                self._busy.mark(session.endpoint, e.retry_after)
+                if failovers >= self.max_failovers:
+                    raise
+                failovers += 1
+                logger.warning("Node %s is at capacity; failing over (retry after %ss).",
+                               session.endpoint, e.retry_after)
+                session = self._fail_over(capability, session)
+
+    def _fail_over(self, capability: str, busy: _Session) -> _Session:
+        """Return a session on a node other than *busy*'s (whose token is kept for later)."""
+        with self._sessions_lock:
+            if self._active.get(capability) is busy:
+                del self._active[capability]
+        return self._ensure_session(capability)
+
+    def _ensure_session(self, capability: str, stale: Optional[_Session] = None) -> _Session:
+        """
+        Return the session for *capability*, handshaking if there is none.
+
+        *stale* is a session a caller saw rejected: it is dropped, but only if
+        no other thread has already replaced it, so a burst of 401s triggers one
+        re-handshake rather than one each.
+
+        A session within ``refresh_margin_s`` of its token's ``exp`` is renewed by
+        the first caller to notice. Other threads keep using the old token, which
+        is still valid, rather than waiting on that handshake.
+        """
+        session = self._active.get(capability)
+        usable = session is not None and session is not stale and not session.expired()
+        if usable and not session.needs_refresh():
+            return session
+
+        with self._sessions_lock:
+            lock = self._handshake_locks.setdefault(capability, threading.Lock())
+        if not lock.acquire(blocking=not usable):
+            return session                      # another thread is already renewing it
         try:
-            return self._execute_request(prompt, model)
-        except ArisError as e:
-            # If token expired, try one refresh
-            logger.warning("Request failed (%s); refreshing session and retrying once.", e)
-            self._invalidate_session()
-            self._ensure_session("ai.generate")
-            return self._execute_request(prompt, model)
-
-    def _invalidate_session(self) -> None:
-        self.session_token = None
-        self.target_endpoint = None
-        self._session_capability = None
-
-    def _ensure_session(self, capability: str) -> None:
-        """Ensure we hold a session token obtained for *capability* (fresh handshake if mismatch)."""
-        if self.session_token and self._session_capability != capability:
-            self._invalidate_session()
-        if not self.session_token:
-            self._connect_to_swarm(capability)
-
-    def _connect_to_swarm(self, capability: str) -> None:
-        """Discover a node that exposes *capability* and complete handshake (billing)."""
+            current = self._active.get(capability)
+            if current is not None and current is not stale and not current.needs_refresh():
+                return current
+            if stale is not None:
+                with self._sessions_lock:
+                    if self._active.get(capability) is stale:
+                        del self._active[capability]
+                    if self._sessions.get((capability, stale.did)) is stale:
+                        del self._sessions[(capability, stale.did)]
+            try:
+                session = self._connect_to_swarm(capability)
+            except ArisError as e:
+                if current is None or current is stale or current.expired():
+                    raise
+                logger.warning("Early session refresh failed (%s); keeping the current token until it expires.", e)
+                return current
+            with self._sessions_lock:
+                self._sessions[(capability, session.did)] = session
+                self._active[capability] = session
+            return session
+        finally:
+            lock.release()
+
+    def _connect_to_swarm(self, capability: str) -> _Session:
+        """
+        Discover a node that exposes *capability* and complete handshake (billing).
+
+        If the selected node already holds a live session for *capability* (say,
+        after failing over away from it and back), that token is reused and no
+        handshake is paid for.
+        """
         logger.info("Discovering worker node for capability=%s", capability)
 
         try:
             # 1. Discover
-            resp = requests.get(
+            resp = self._http.get(
                 f"{self.registry_url}/discover",
                 params={"capability": capability},
                 timeout=5,
@@ -190,11 +519,21 @@ class Aris:
             if not data.get("agents"):
                 raise ArisNodeError("No active worker nodes found in the network.")
 
-            # Simple routing: Pick the first one (Future: pick based on latency/price)
-            target = data["agents"][0]
-            self.target_endpoint = target["endpoint"]
+            agents = self._busy.available(data["agents"])
+            if not agents:
+                raise ArisOverloadedError(
+                    f"All {len(data['agents'])} worker nodes for {capability} are at capacity.",
+                    self._busy.retry_after(),
+                )
+
+            target = self.node_selector.select(agents)
             target_did = target["did"]
 
+            known = self._sessions.get((capability, target_did))
+            if known is not None and not known.needs_refresh():
+                logger.info("Reusing session target_did=%s capability=%s", target_did, capability)
+                return known
+
             # 2. Handshake (The Transaction)
             logger.info(
                 "Handshake target_did=%s capability=%s",
@@ -202,13 +541,17 @@ class Aris:
                 capability,
             )
 
-            pay_resp = requests.post(
+            handshake_body = {
+                "payer_did": "did:aris:customer-sdk",
+                "target_did": target_did,
+                "capability": capability,
+            }
+            if self.session_calls:
+                handshake_body["calls"] = self.session_calls
+
+            pay_resp = self._http.post(
                 f"{self.registry_url}/handshake",
-                json={
-                    "payer_did": "did:aris:customer-sdk",
-                    "target_did": target_did,
-                    "capability": capability,
-                },
+                json=handshake_body,
                 headers={"x-api-key": self.api_key},
                 timeout=10,
             )
@@ -219,36 +562,38 @@ class Aris:
                 raise ArisError(f"Handshake failed: {pay_resp.text}")
 
             session_data = pay_resp.json()
-            self.session_token = session_data["session_token"]
-            self._session_capability = capability
-
             logger.info(
                 "Session established; remaining_balance_usd=%s",
                 session_data.get("remaining_balance"),
             )
+            token = session_data["session_token"]
+            refresh_at, expires_at = _session_deadlines(token, self.refresh_margin_s)
+            return _Session(token, target["endpoint"], target_did, refresh_at, expires_at)
 
         except requests.RequestException as e:
             raise ArisError(f"Network error connecting to Registry: {e}")
 
-    def _execute_request(self, prompt: str, model: str) -> str:
+    def _execute_request(self, session: _Session, prompt: str, model: str) -> str:
         """Direct Peer-to-Peer text generation with the Worker Node."""
-        if not self.target_endpoint:
-            raise ArisError("No target endpoint configured.")
-
         try:
-            response = requests.post(
-                f"{self.target_endpoint}/generate",
+            t0 = time.perf_counter()
+            response = self._http.post(
+                f"{session.endpoint}/generate",
                 json={"model": model, "prompt": prompt},
-                headers={"x-aris-token": self.session_token},
+                headers={"x-aris-token": session.token},
                 timeout=60,
             )
+            self.node_selector.observe(session.endpoint, time.perf_counter() - t0, response.status_code == 200)
             if response.status_code == 200:
                 return response.json().get("result", "")
-            elif response.status_code in [401, 403]:
-                raise ArisError("Session Token Expired or Invalid")
+            elif response.status_code in [401, 402, 403]:
+                raise _TokenExpiredError("Session Token Expired, Invalid or Out of Budget")
+            elif response.status_code == 429:
+                raise _overloaded(response)
             else:
                 raise ArisNodeError(f"Worker Node Error: {response.text}")
         except requests.RequestException as e:
+            self.node_selector.observe(session.endpoint, time.perf_counter() - t0, ok=False)
             raise ArisNodeError(f"Failed to communicate with Worker Node: {e}")
 
     # ── chat ───────────────────────────────────────────────────────────── #
@@ -299,39 +644,118 @@ class Aris:
         if messages[-1].get("role") != "user":
             raise ValueError("The last message must have role='user'.")
 
-        self._ensure_session("ai.chat")
+        return self._call_node("ai.chat", lambda session: self._execute_chat(session, messages, model))
 
-        try:
-            return self._execute_chat(messages, model)
-        except _TokenExpiredError:
-            logger.warning("Chat request failed: session expired; reconnecting.")
-            self._invalidate_session()
-            self._ensure_session("ai.chat")
-            return self._execute_chat(messages, model)
-
-    def _execute_chat(self, messages: List[Dict[str, str]], model: str) -> Dict[str, str]:
+    def _execute_chat(self, session: _Session, messages: List[Dict[str, str]], model: str) -> Dict[str, str]:
         """Direct P2P chat execution with the Worker Node."""
-        if not self.target_endpoint:
-            raise ArisError("No target endpoint configured.")
-
         try:
-            response = requests.post(
-                f"{self.target_endpoint}/chat",
+            t0 = time.perf_counter()
+            response = self._http.post(
+                f"{session.endpoint}/chat",
                 json={"model": model, "messages": messages},
-                headers={"x-aris-token": self.session_token},
+                headers={"x-aris-token": session.token},
                 timeout=90,
             )
+            self.node_selector.observe(session.endpoint, time.perf_counter() - t0, response.status_code == 200)
             if response.status_code == 200:
                 return response.json()
             elif response.status_code == 422:
                 raise ValueError(f"Invalid chat request: {response.json().get('detail', response.text)}")
-            elif response.status_code in [401, 403]:
-                raise _TokenExpiredError("Session Token Expired or Invalid")
+            elif response.status_code in [401, 402, 403]:
+                raise _TokenExpiredError("Session Token Expired, Invalid or Out of Budget")
+            elif response.status_code == 429:
+                raise _overloaded(response)
             else:
                 raise ArisNodeError(f"Worker Node Error {response.status_code}: {response.text}")
         except requests.RequestException as e:
+            self.node_selector.observe(session.endpoint, time.perf_counter() - t0, ok=False)
             raise ArisNodeError(f"Failed to communicate with Worker Node: {e}")
 
+    # ── streaming ──────────────────────────────────────────────────────── #
+
+    def generate_stream(self, prompt: str, model: str = "tinyllama") -> Iterator[str]:
+        """
+        Like :meth:`generate`, but yields the completion in chunks as the
+        worker node produces them.
+
+        Example::
+
+            for chunk in client.generate_stream("Write a haiku about GPUs"):
+                print(chunk, end="", flush=True)
+        """
+        return self._stream("ai.generate", "/generate", {"model": model, "prompt": prompt}, 60)
+
+    def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        model: str = "tinyllama",
+    ) -> Iterator[str]:
+        """
+        Like :meth:`chat`, but yields the assistant's reply in chunks as it is
+        generated. Accepts the same ``messages`` as :meth:`chat`.
+
+        Raises:
+            ArisNodeError: If the node reports an error, before or mid-stream.
+        """
+        if not messages:
+            raise ValueError("messages must not be empty.")
+        if messages[-1].get("role") != "user":
+            raise ValueError("The last message must have role='user'.")
+        return self._stream("ai.chat", "/chat", {"model": model, "messages": messages}, 90)
+
+    def _stream(self, capability: str, path: str, body: Dict[str, Any], timeout: float) -> Iterator[str]:
+        # Only opening the stream is retried: nothing has been yielded yet.
+        session, response, t0 = self._call_node(
+            capability, lambda session: (session, *self._open_stream(session, path, body, timeout)))
+        return self._iter_stream(response, session.endpoint, t0)
+
+    def _open_stream(self, session: _Session, path: str, body: Dict[str, Any], timeout: float):
+        t0 = time.perf_counter()
+        try:
+            response = self._http.post(
+                f"{session.endpoint}{path}",
+                json={**body, "stream": True},
+                headers={"x-aris-token": session.token},
+                timeout=timeout,
+                stream=True,
+            )
+        except requests.RequestException as e:
+            self.node_selector.observe(session.endpoint, time.perf_counter() - t0, ok=False)
+            raise ArisNodeError(f"Failed to communicate with Worker Node: {e}")
+
+        if response.status_code == 200:
+            return response, t0
+        response.content        # read the short error body before releasing the connection
+        response.close()
+        self.node_selector.observe(session.endpoint, time.perf_counter() - t0, ok=False)
+        if response.status_code == 422:
+            raise ValueError(f"Invalid request: {response.json().get('detail', response.text)}")
+        elif response.status_code in [401, 402, 403]:
+            raise _TokenExpiredError("Session Token Expired, Invalid or Out of Budget")
+        elif response.status_code == 429:
+            raise _overloaded(response)
+        raise ArisNodeError(f"Worker Node Error {response.status_code}: {response.text}")
+
+    def _iter_stream(self, response: requests.Response, endpoint: str, t0: float) -> Iterator[str]:
+        ok = False
+        try:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event.get("done"):
+                    if event.get("status") != "success":
+                        raise ArisNodeError(f"Worker Node Error: {event.get('error', 'stream failed')}")
+                    ok = True
+                    return
+                yield event.get("token", "")
+            raise ArisNodeError("Worker Node closed the stream before it finished.")
+        except requests.RequestException as e:
+            raise ArisNodeError(f"Stream from Worker Node interrupted: {e}")
+        finally:
+            response.close()
+            self.node_selector.observe(endpoint, time.perf_counter() - t0, ok)
+
     def conversation(self, system_prompt: Optional[str] = None, model: str = "tinyllama") -> "Conversation":
         """
         Start a stateful multi-turn conversation.
@@ -390,6 +814,33 @@ class Conversation:
         self._history.append({"role": "assistant", "content": assistant_text})
         return assistant_text
 
+    def say_stream(self, text: str) -> Iterator[str]:
+        """
+        Like :meth:`say`, but yields the reply in chunks as it is generated.
+
+        The assembled reply is appended to history once the stream finishes.
+        If the stream fails or is abandoned part-way, the turn is dropped from
+        history so the conversation can simply be retried.
+
+        Example::
+
+            for chunk in conv.say_stream("Explain recursion briefly."):
+                print(chunk, end="", flush=True)
+        """
+        self._history.append({"role": "user", "content": text})
+        parts: List[str] = []
+        finished = False
+        try:
+            for chunk in self._client.chat_stream(self._history, model=self._model):
+                parts.append(chunk)
+                yield chunk
+            finished = True
+        finally:
+            if finished:
+                self._history.append({"role": "assistant", "content": "".join(parts)})
+            else:
+                self._history.pop()
+
     def reset(self, keep_system: bool = True) -> None:
         """
         Clear conversation history.
@@ -420,22 +871,46 @@ class Conversation:
 #  Module-level helpers for quick scripts                              #
 # ------------------------------------------------------------------ #
 
+# One pooled client per (api_key, registry_url), reused across helper calls so
+# quick scripts keep their connections and sessions between calls.
+_shared_clients: Dict[Tuple[Optional[str], str], Aris] = {}
+_shared_clients_lock = threading.Lock()
+
+
+def _shared_client(api_key: Optional[str] = None) -> Aris:
+    key = (
+        api_key or os.getenv("ARIS_API_KEY"),
+        os.getenv("ARIS_REGISTRY_URL", "http://localhost:8000").rstrip("/"),
+    )
+    with _shared_clients_lock:
+        client = _shared_clients.get(key)
+        if client is None:
+            client = Aris(api_key=key[0], registry_url=key[1])
+            _shared_clients[key] = client
+        return client
+
+
+@atexit.register
+def _close_shared_clients() -> None:
+    with _shared_clients_lock:
+        for client in _shared_clients.values():
+            client.close()
+        _shared_clients.clear()
+
+
 def generate(prompt: str, api_key: Optional[str] = None) -> str:
     """Quick helper for one-off text generation."""
-    client = Aris(api_key=api_key)
-    return client.generate(prompt)
+    return _shared_client(api_key).generate(prompt)
 
 
 def balance(api_key: Optional[str] = None) -> Dict[str, Any]:
     """Quick helper to check balance without instantiating a client."""
-    client = Aris(api_key=api_key)
-    return client.balance()
+    return _shared_client(api_key).balance()
 
 
 def usage(limit: int = 50, api_key: Optional[str] = None) -> Dict[str, Any]:
     """Quick helper to fetch usage history without instantiating a client."""
-    client = Aris(api_key=api_key)
-    return client.usage(limit=limit)
+    return _shared_client(api_key).usage(limit=limit)
 
 
 def chat(
@@ -444,5 +919,4 @@ def chat(
     model: str = "tinyllama",
 ) -> Dict[str, str]:
     """Quick helper for a one-shot multi-turn chat request."""
-    client = Aris(api_key=api_key)
-    return client.chat(messages, model=model)
\ No newline at end of file
+    return _shared_client(api_key).chat(messages, model=model)
@@ -0,0 +1,102 @@
+"""
+Node selection strategies for the Aris SDK.
+
+``/discover`` returns every live node for a capability, each with the load
+signals it reported in its last heartbeat::
+
+    {"did": ..., "endpoint": ..., "load": {"in_flight": 3, "queue_depth": 0,
+                                           "p50_ms": 812.0, "p95_ms": 1430.5}}
+
+A selector picks one of them when the client opens a session. Pass an instance
+to ``Aris(node_selector=...)``; the default is :class:`PowerOfTwoChoices`.
+"""
+
+import random
+import threading
+from typing import Any, Dict, List, Optional
+
+Agent = Dict[str, Any]
+
+
+def load_score(agent: Agent) -> float:
+    """Outstanding work on a node as last reported to the registry (0 when unknown)."""
+    load = agent.get("load") or {}
+    return (load.get("in_flight") or 0) + (load.get("queue_depth") or 0)
+
+
+class NodeSelector:
+    """Base class: pick a node from a non-empty ``/discover`` result."""
+
+    def select(self, agents: List[Agent]) -> Agent:
+        raise NotImplementedError
+
+    def observe(self, endpoint: str, latency_s: float, ok: bool = True) -> None:
+        """Feedback hook called after every request to a node. No-op by default."""
+
+
+class FirstNode(NodeSelector):
+    """Always the first node listed (the SDK's original behaviour)."""
+
+    def select(self, agents: List[Agent]) -> Agent:
+        return agents[0]
+
+
+class LeastLoaded(NodeSelector):
+    """The node reporting the least outstanding work; ties broken at random."""
+
+    def select(self, agents: List[Agent]) -> Agent:
+        best = min(load_score(a) for a in agents)
+        return random.choice([a for a in agents if load_score(a) == best])
+
+
+class PowerOfTwoChoices(NodeSelector):
+    """
+    Sample two nodes at random and take the less loaded one.
+
+    Nearly as good as least-loaded when reports are fresh, and far better when
+    they are stale: clients acting on the same heartbeat don't all stampede the
+    single node that looked idle.
+    """
+
+    def select(self, agents: List[Agent]) -> Agent:
+        if len(agents) == 1:
+            return agents[0]
+        a, b = random.sample(agents, 2)
+        return a if load_score(a) <= load_score(b) else b
+
+
+class EwmaLatency(NodeSelector):
+    """
+    Lowest expected latency: an EWMA of latencies this client observed per node,
+    scaled by the node's outstanding work. Nodes without observations fall back
+    to their reported p50, and nodes with neither are tried first.
+    """
+
+    def __init__(self, alpha: float = 0.3, failure_penalty_s: float = 30.0):
+        self.alpha = alpha
+        self.failure_penalty_s = failure_penalty_s
+        self._ewma: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint: str, latency_s: float, ok: bool = True) -> None:
+        sample = latency_s if ok else max(latency_s, self.failure_penalty_s)
+        with self._lock:
+            prev = self._ewma.get(endpoint)
+            self._ewma[endpoint] = sample if prev is None else prev + self.alpha * (sample - prev)
+
+    def expected_latency(self, agent: Agent) -> Optional[float]:
+        latency = self._ewma.get(agent.get("endpoint"))
+        if latency is None:
+            p50_ms = (agent.get("load") or {}).get("p50_ms")
+            if p50_ms is None:
+                return None
+            latency = p50_ms / 1000
+        return latency * (load_score(agent) + 1)
+
+    def select(self, agents: List[Agent]) -> Agent:
+        scored = [(self.expected_latency(a), a) for a in agents]
+        unknown = [a for cost, a in scored if cost is None]
+        if unknown:
+            return random.choice(unknown)
+        best = min(cost for cost, _ in scored)
+        return random.choice([a for cost, a in scored if cost == best])
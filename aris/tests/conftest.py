@@ -1,27 +1,48 @@
 """
 conftest.py — sandbox shims
 ===========================
-The test sandbox has an OpenSSL/pymongo version conflict that prevents motor
-from importing. We stub out motor and stripe at the sys.modules level BEFORE
-any test file imports registry.main, so the registry app loads cleanly and
-we can patch its collection globals per-test.
+The registry runs on the in-memory storage backend under test, so motor is
+never imported and no Mongo is needed. Tests still patch the collection
+globals in registry.main per-test where they want to assert on exact queries.
+
+Stripe is stubbed at the sys.modules level BEFORE any test file imports
+registry.main.
+
+Shared fixtures: ``clock`` (a fake clock for the ``clock=`` hooks) and
+``make_agent`` (an agent registration document).
 """
+import os
 import sys
 from unittest.mock import MagicMock
 
-# ── motor shim ────────────────────────────────────────────────────────────────
-motor_mock          = MagicMock()
-motor_asyncio_mock  = MagicMock()
-motor_mock.motor_asyncio = motor_asyncio_mock
+import pytest
 
-sys.modules.setdefault("motor",                motor_mock)
-sys.modules.setdefault("motor.motor_asyncio",  motor_asyncio_mock)
-sys.modules.setdefault("pymongo",              MagicMock())
+os.environ.setdefault("ARIS_STORAGE_URL", "memory://")
 
 # ── stripe shim ───────────────────────────────────────────────────────────────
 stripe_mock = MagicMock()
 sys.modules.setdefault("stripe", stripe_mock)
 
-# ── dnspython shim (motor dep) ────────────────────────────────────────────────
-sys.modules.setdefault("dns",         MagicMock())
-sys.modules.setdefault("dns.resolver", MagicMock())
+
+# ── fixtures ──────────────────────────────────────────────────────────────────
+class FakeClock:
+    """Stands in for ``time.time`` / ``time.monotonic``; tests move it by changing ``now``."""
+
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def make_agent():
+    """Builds the registration document of a worker node reachable at ``http://<did>:9006``."""
+    def make(did, caps=("ai.generate",)):
+        return {"did": did, "endpoint": f"http://{did}:9006", "capabilities": list(caps)}
+    return make
@@ -0,0 +1,73 @@
+"""
+Feature 10: shared pooled HTTP client in the LLM worker node
+============================================================
+Test structure
+--------------
+NODE TESTS  (FastAPI TestClient, backend mocked)
+    test_one_client_serves_all_requests
+    test_client_closed_on_shutdown
+    test_backend_url_is_configurable
+"""
+
+import importlib
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import jwt
+from fastapi.testclient import TestClient
+
+import agent_node.llm_agent as node
+
+
+def _token():
+    return jwt.encode(
+        {"sub": "did:aris:test", "aud": node.MY_DID, "exp": time.time() + 300},
+        node.ARIS_PUBLIC_KEY,
+        algorithm="HS256",
+    )
+
+
+def _backend():
+    resp = MagicMock()
+    resp.json.return_value = {"response": "42", "message": {"role": "assistant", "content": "hi"}}
+    resp.raise_for_status = MagicMock()
+    http = MagicMock()
+    http.post = AsyncMock(return_value=resp)
+    http.aclose = AsyncMock()
+    return http
+
+
+class TestNodeHttpPool:
+
+    def test_one_client_serves_all_requests(self):
+        http = _backend()
+        headers = {"x-aris-token": _token()}
+        with patch("agent_node.llm_agent.httpx.AsyncClient", return_value=http) as ctor:
+            with TestClient(node.app) as tc:
+                for _ in range(3):
+                    assert tc.post("/generate", json={"prompt": "2+2"}, headers=headers).json()["result"] == "42"
+                    assert tc.post("/chat", json={"messages": [{"role": "user", "content": "yo"}]},
+                                   headers=headers).json()["content"] == "hi"
+
+        assert ctor.call_count == 1
+        backend_calls = [c[0][0] for c in http.post.call_args_list if c[0][0] != node.REGISTRY_URL]
+        assert backend_calls.count(node.OLLAMA_GENERATE_URL) == 3
+        assert backend_calls.count(node.OLLAMA_CHAT_URL) == 3
+
+    def test_client_closed_on_shutdown(self):
+        http = _backend()
+        with patch("agent_node.llm_agent.httpx.AsyncClient", return_value=http):
+            with TestClient(node.app):
+                assert node.http_client is http
+        http.aclose.assert_awaited_once()
+        assert node.http_client is None
+
+    def test_backend_url_is_configurable(self, monkeypatch):
+        monkeypatch.setenv("ARIS_OLLAMA_URL", "http://gpu-box:11434/")
+        try:
+            reloaded = importlib.reload(node)
+            assert reloaded.OLLAMA_GENERATE_URL == "http://gpu-box:11434/api/generate"
+            assert reloaded.OLLAMA_CHAT_URL == "http://gpu-box:11434/api/chat"
+        finally:
+            monkeypatch.delenv("ARIS_OLLAMA_URL")
+            importlib.reload(node)
@@ -0,0 +1,258 @@
+"""
+Feature 11: token streaming for /generate and /chat
+===================================================
+Test structure
+--------------
+NODE TESTS  (FastAPI TestClient, Ollama stream via httpx.MockTransport)
+    test_generate_stream_relays_tokens
+    test_chat_stream_relays_tokens
+    test_stream_reports_backend_error_in_final_line
+    test_stream_rejects_bad_token_before_streaming
+    test_non_stream_requests_unchanged
+
+SDK TESTS  (requests mocked)
+    test_chat_stream_yields_tokens
+    test_stream_error_line_raises_node_error
+    test_stream_rehandshakes_on_expired_token
+    test_say_stream_appends_assembled_reply
+    test_say_stream_drops_turn_on_failure
+
+ASYNC SDK TESTS
+    test_async_chat_stream_and_say_stream
+
+END-TO-END  (SDK → node TestClient → mocked Ollama)
+    test_e2e_generate_stream
+"""
+
+import asyncio
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+import httpx
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+
+import agent_node.llm_agent as node
+from aris import AsyncAris
+from aris.client import Aris, ArisNodeError
+
+VALID_KEY = "aris_live_testkey123"
+
+
+def _token():
+    return jwt.encode(
+        {"sub": "did:aris:test", "aud": node.MY_DID, "exp": time.time() + 300},
+        node.ARIS_PUBLIC_KEY,
+        algorithm="HS256",
+    )
+
+
+def _ollama(chunks, status=200, seen=None):
+    """MockTransport handler speaking Ollama's NDJSON streaming format."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path not in ("/api/generate", "/api/chat"):
+            return httpx.Response(200, json={"status": "registered"})      # heartbeat
+        body = json.loads(request.content)
+        if seen is not None:
+            seen.append(body)
+        if status != 200:
+            return httpx.Response(status, text="model not found")
+        chat = request.url.path == "/api/chat"
+        lines = [
+            {"message": {"role": "assistant", "content": c}, "done": False} if chat else {"response": c, "done": False}
+            for c in chunks
+        ] + [{"done": True}]
+        return httpx.Response(200, content="".join(json.dumps(l) + "\n" for l in lines))
+
+    return handler
+
+
+def _node_client(handler):
+    backend = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return patch("agent_node.llm_agent.httpx.AsyncClient", return_value=backend)
+
+
+def _events(resp):
+    return [json.loads(line) for line in resp.text.splitlines() if line]
+
+
+class TestNodeStreaming:
+
+    def test_generate_stream_relays_tokens(self):
+        seen = []
+        with _node_client(_ollama(["Hel", "lo"], seen=seen)), TestClient(node.app) as tc:
+            resp = tc.post("/generate", json={"prompt": "hi", "stream": True},
+                           headers={"x-aris-token": _token()})
+        assert resp.headers["content-type"].startswith("application/x-ndjson")
+        assert _events(resp) == [
+            {"token": "Hel"}, {"token": "lo"},
+            {"done": True, "status": "success", "model": "tinyllama"},
+        ]
+        assert seen[0]["stream"] is True
+
+    def test_chat_stream_relays_tokens(self):
+        with _node_client(_ollama(["Par", "is"])), TestClient(node.app) as tc:
+            resp = tc.post("/chat", json={"messages": [{"role": "user", "content": "capital?"}], "stream": True},
+                           headers={"x-aris-token": _token()})
+        assert "".join(e.get("token", "") for e in _events(resp)) == "Paris"
+
+    def test_stream_reports_backend_error_in_final_line(self):
+        with _node_client(_ollama([], status=404)), TestClient(node.app) as tc:
+            resp = tc.post("/generate", json={"prompt": "hi", "stream": True},
+                           headers={"x-aris-token": _token()})
+        final = _events(resp)[-1]
+        assert final["done"] and final["status"] == "error"
+        assert "404" in final["error"]
+
+    def test_stream_rejects_bad_token_before_streaming(self):
+        with _node_client(_ollama(["x"])), TestClient(node.app) as tc:
+            resp = tc.post("/chat", json={"messages": [{"role": "user", "content": "hi"}], "stream": True},
+                           headers={"x-aris-token": "garbage"})
+        assert resp.status_code == 401
+
+    def test_non_stream_requests_unchanged(self):
+        def handler(request):
+            return httpx.Response(200, json={"response": "42", "done": True})
+
+        with _node_client(handler), TestClient(node.app) as tc:
+            resp = tc.post("/generate", json={"prompt": "2+2"}, headers={"x-aris-token": _token()})
+        assert resp.json() == {"result": "42", "status": "success"}
+
+
+def _stream_resp(events, status=200):
+    m = MagicMock()
+    m.status_code = status
+    m.iter_lines.return_value = [json.dumps(e).encode() for e in events]
+    m.json.return_value = {"detail": "expired"}
+    m.text = "expired"
+    return m
+
+
+def _http(status, body):
+    m = MagicMock()
+    m.status_code = status
+    m.json.return_value = body
+    m.text = str(body)
+    m.raise_for_status = MagicMock()
+    return m
+
+
+_DISCOVER = {"agents": [{"did": "did:aris:n1", "endpoint": "http://node-1:9006", "capabilities": ["ai.chat"]}]}
+_OK_STREAM = [{"token": "Hi"}, {"token": " there"}, {"done": True, "status": "success", "model": "tinyllama"}]
+
+
+def _routed(node_responses):
+    """requests.Session.post side effect: handshakes succeed, node calls pop *node_responses*."""
+    calls = {"handshake": 0, "node": []}
+
+    def post(url, json=None, headers=None, timeout=None, stream=False):
+        if url.endswith("/handshake"):
+            calls["handshake"] += 1
+            return _http(200, {"session_token": f"tok-{calls['handshake']}", "remaining_balance": 1.0})
+        calls["node"].append(json)
+        return node_responses.pop(0)
+
+    return post, calls
+
+
+class TestSdkStreaming:
+
+    def _run(self, node_responses, fn):
+        post, calls = _routed(node_responses)
+        with patch("requests.Session.get", return_value=_http(200, _DISCOVER)), \
+                patch("requests.Session.post", side_effect=post):
+            client = Aris(api_key=VALID_KEY)
+            result = fn(client)
+        return result, calls
+
+    def test_chat_stream_yields_tokens(self):
+        chunks, calls = self._run([_stream_resp(_OK_STREAM)],
+                                  lambda c: list(c.chat_stream([{"role": "user", "content": "hi"}])))
+        assert chunks == ["Hi", " there"]
+        assert calls["node"][0]["stream"] is True
+
+    def test_stream_error_line_raises_node_error(self):
+        bad = [{"token": "Hi"}, {"done": True, "status": "error", "error": "LLM Error: boom"}]
+        with pytest.raises(ArisNodeError, match="boom"):
+            self._run([_stream_resp(bad)], lambda c: list(c.generate_stream("hi")))
+
+    def test_stream_rehandshakes_on_expired_token(self):
+        chunks, calls = self._run(
+            [_stream_resp([], status=401), _stream_resp(_OK_STREAM)],
+            lambda c: list(c.chat_stream([{"role": "user", "content": "hi"}])),
+        )
+        assert chunks == ["Hi", " there"]
+        assert calls["handshake"] == 2
+
+    def test_say_stream_appends_assembled_reply(self):
+        def run(client):
+            conv = client.conversation(system_prompt="be nice")
+            return conv, list(conv.say_stream("hello"))
+
+        (conv, chunks), _ = self._run([_stream_resp(_OK_STREAM)], run)
+        assert chunks == ["Hi", " there"]
+        assert conv.history[-2:] == [
+            {"role": "user", "content": "hello"},
+            {"role": "assistant", "content": "Hi there"},
+        ]
+
+    def test_say_stream_drops_turn_on_failure(self):
+        bad = [{"token": "Hi"}, {"done": True, "status": "error", "error": "boom"}]
+
+        def run(client):
+            conv = client.conversation()
+            with pytest.raises(ArisNodeError):
+                list(conv.say_stream("hello"))
+            return conv
+
+        conv, _ = self._run([_stream_resp(bad)], run)
+        assert conv.history == []
+
+
+class TestAsyncStreaming:
+
+    def test_async_chat_stream_and_say_stream(self):
+        body = "".join(json.dumps(e) + "\n" for e in _OK_STREAM)
+
+        def handler(request):
+            if request.url.path == "/discover":
+                return httpx.Response(200, json=_DISCOVER)
+            if request.url.path == "/handshake":
+                return httpx.Response(200, json={"session_token": "tok", "remaining_balance": 1.0})
+            assert json.loads(request.content)["stream"] is True
+            return httpx.Response(200, content=body)
+
+        async def run():
+            client = AsyncAris(api_key=VALID_KEY, registry_url="http://registry.test",
+                               http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+            chunks = [c async for c in client.chat_stream([{"role": "user", "content": "hi"}])]
+            conv = client.conversation()
+            said = [c async for c in conv.say_stream("hello")]
+            return chunks, said, conv.history
+
+        chunks, said, history = asyncio.run(run())
+        assert chunks == said == ["Hi", " there"]
+        assert history[-1] == {"role": "assistant", "content": "Hi there"}
+
+
+class TestEndToEndStreaming:
+
+    def test_e2e_generate_stream(self):
+        with _node_client(_ollama(["4", "2"])), TestClient(node.app) as tc:
+
+            def post(url, json=None, headers=None, timeout=None, stream=False):
+                if url.endswith("/handshake"):
+                    return _http(200, {"session_token": _token(), "remaining_balance": 1.0})
+                r = tc.post("/" + url.split("/", 3)[-1], json=json, headers=headers)
+                m = MagicMock()
+                m.status_code = r.status_code
+                m.iter_lines.return_value = r.iter_lines()
+                return m
+
+            discover = {"agents": [{"did": node.MY_DID, "endpoint": "http://node", "capabilities": ["ai.generate"]}]}
+            with patch("requests.Session.get", return_value=_http(200, discover)), \
+                    patch("requests.Session.post", side_effect=post):
+                assert "".join(Aris(api_key=VALID_KEY).generate_stream("6*7")) == "42"
@@ -0,0 +1,135 @@
+"""
+Feature 12: cached session-token verification on worker nodes
+=============================================================
+Test structure
+--------------
+VERIFIER UNIT TESTS  (fake clock)
+    test_repeat_verification_skips_decode
+    test_cached_token_expires_at_exp
+    test_invalid_tokens_are_not_cached
+    test_wrong_audience_rejected
+    test_cache_is_bounded
+    test_tokens_without_exp_are_not_cached
+
+NODE TESTS
+    test_llm_node_verifies_session_token_once
+    test_math_node_uses_shared_verifier
+"""
+
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+
+from agent_node.auth import TokenVerifier
+
+SECRET = "test-secret-that-is-at-least-thirty-two-bytes-long"
+AUD = "did:aris:node-under-test"
+
+
+def _tok(exp_in=300.0, aud=AUD, secret=SECRET, now=1_700_000_000.0, **claims):
+    body = {"sub": "did:aris:caller", "aud": aud, **claims}
+    if exp_in is not None:
+        body["exp"] = now + exp_in
+    return jwt.encode(body, secret, algorithm="HS256")
+
+
+class TestTokenVerifier:
+
+    def test_repeat_verification_skips_decode(self):
+        verifier = TokenVerifier(SECRET, AUD)
+        token = _tok(now=time.time())
+        with patch("agent_node.auth.jwt.decode", wraps=jwt.decode) as decode:
+            for _ in range(5):
+                assert verifier.verify(token)["sub"] == "did:aris:caller"
+        assert decode.call_count == 1
+        assert verifier.stats() == {"hits": 4, "misses": 1, "evictions": 0, "size": 1}
+
+    def test_cached_token_expires_at_exp(self, clock):
+        verifier = TokenVerifier(SECRET, AUD, clock=clock)
+        with patch("agent_node.auth.jwt.decode", return_value={"sub": "x", "exp": clock.now + 300}):
+            verifier.verify("opaque")
+        clock.now += 299
+        assert verifier.verify("opaque")["sub"] == "x"
+        clock.now += 1
+        with pytest.raises(jwt.ExpiredSignatureError):
+            verifier.verify("opaque")
+        assert len(verifier) == 0
+
+    def test_invalid_tokens_are_not_cached(self):
+        verifier = TokenVerifier(SECRET, AUD)
+        bad = _tok(now=time.time(), secret="another-secret-that-is-thirty-two-bytes!!")
+        for _ in range(2):
+            with pytest.raises(jwt.InvalidSignatureError):
+                verifier.verify(bad)
+        assert verifier.stats()["misses"] == 2
+        assert len(verifier) == 0
+
+    def test_wrong_audience_rejected(self):
+        verifier = TokenVerifier(SECRET, AUD)
+        with pytest.raises(jwt.InvalidAudienceError):
+            verifier.verify(_tok(now=time.time(), aud="did:aris:someone-else"))
+
+    def test_cache_is_bounded(self):
+        verifier = TokenVerifier(SECRET, AUD, max_entries=3)
+        now = time.time()
+        tokens = [_tok(now=now, n=i) for i in range(5)]
+        for t in tokens:
+            verifier.verify(t)
+        assert len(verifier) == 3
+        assert verifier.evictions == 2
+        verifier.verify(tokens[-1])
+        assert verifier.hits == 1
+
+    def test_tokens_without_exp_are_not_cached(self):
+        verifier = TokenVerifier(SECRET, AUD)
+        verifier.verify(_tok(exp_in=None))
+        assert len(verifier) == 0
+
+
+class TestNodeVerification:
+
+    def test_llm_node_verifies_session_token_once(self):
+        import agent_node.llm_agent as node
+
+        token = jwt.encode(
+            {"sub": "did:aris:caller", "aud": node.MY_DID, "exp": time.time() + 300},
+            node.ARIS_PUBLIC_KEY,
+            algorithm="HS256",
+        )
+        resp = MagicMock()
+        resp.json.return_value = {"response": "ok"}
+        backend = MagicMock()
+        backend.post = AsyncMock(return_value=resp)
+        backend.aclose = AsyncMock()
+        node.token_verifier.clear()
+        before = node.token_verifier.stats()
+        with patch("agent_node.llm_agent.httpx.AsyncClient", return_value=backend):
+            with TestClient(node.app) as tc:
+                for _ in range(4):
+                    assert tc.post("/generate", json={"prompt": "hi"},
+                                   headers={"x-aris-token": token}).status_code == 200
+                assert tc.post("/generate", json={"prompt": "hi"},
+                               headers={"x-aris-token": "garbage"}).status_code == 401
+
+        after = node.token_verifier.stats()
+        assert after["misses"] - before["misses"] == 2          # first call + garbage
+        assert after["hits"] - before["hits"] == 3
+
+    def test_math_node_uses_shared_verifier(self):
+        import agent_node.math_agent as math_node
+
+        token = jwt.encode(
+            {"sub": "did:aris:caller", "aud": math_node.MY_DID, "scope": "math.add", "exp": time.time() + 300},
+            math_node.ARIS_PUBLIC_KEY,
+            algorithm="HS256",
+        )
+        assert isinstance(math_node.token_verifier, TokenVerifier)
+        with TestClient(math_node.app) as tc:
+            for _ in range(2):
+                resp = tc.post("/execute", json={"a": 2, "b": 3, "operation": "add"},
+                               headers={"x-aris-token": token})
+                assert resp.json() == {"result": 5, "status": "success"}
+        assert math_node.token_verifier.hits >= 1
@@ -0,0 +1,397 @@
+"""
+Feature 13: prepaid-budget session tokens with node-side metering
+=================================================================
+Test structure
+--------------
+REGISTRY TESTS  (mocked motor collections)
+    test_budget_handshake_prepays_calls
+    test_budget_handshake_rejects_out_of_range_calls
+    test_usage_report_updates_sessions_in_bulk
+    test_usage_report_flags_sessions_past_budget
+    test_usage_report_requires_node_token
+    test_session_usage_is_served_to_the_issuing_node_only
+
+METER UNIT TESTS
+    test_meter_enforces_budget_and_drains_reports
+    test_meter_restore_and_expire
+    test_meter_seeds_sessions_once_and_closes_spent_ones
+
+NODE TESTS
+    test_node_rejects_calls_past_budget_and_reports_usage
+    test_node_counts_on_from_the_registry_after_a_restart
+    test_math_node_meters_budget_sessions_too
+    test_math_node_does_not_charge_unsupported_operations
+
+SDK TESTS  (requests mocked)
+    test_sdk_requests_budget_and_renews_when_spent
+    test_generate_node_error_does_not_rehandshake
+"""
+
+import asyncio
+import contextlib
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+
+from agent_node.metering import BudgetExhausted, BudgetMeter
+from aris.client import Aris, ArisNodeError
+
+VALID_KEY = "aris_live_testkey123"
+HANDSHAKE_BODY = {
+    "payer_did":  "did:aris:test-payer",
+    "target_did": "did:aris:llm-node-01",
+    "capability": "ai.generate",
+}
+
+
+def _registry_mocks(balance_after=4.0):
+    accounts = MagicMock()
+    accounts.find_one_and_update = AsyncMock(
+        return_value={"api_key": VALID_KEY, "email": "test@aris.ai", "balance": balance_after}
+    )
+    accounts.find_one = AsyncMock()
+    usage = MagicMock()
+    usage.insert_many = AsyncMock()
+    sessions = MagicMock()
+    sessions.insert_one = AsyncMock()
+    sessions.bulk_write = AsyncMock()
+    sessions.find_one = AsyncMock(return_value=None)
+    _find_returns(sessions, [])
+    return accounts, usage, sessions
+
+
+def _find_returns(collection, docs):
+    cursor = MagicMock()
+    cursor.to_list = AsyncMock(return_value=docs)
+    collection.find = MagicMock(return_value=cursor)
+
+
+def _node_token(reg, did="did:aris:llm-node-01"):
+    return jwt.encode({"iss": did, "aud": "aris-registry", "exp": time.time() + 60},
+                      reg.ARIS_PRIVATE_KEY, algorithm="HS256")
+
+
+@contextlib.contextmanager
+def _registry(reg, accounts, usage, sessions):
+    with (
+        patch.object(reg, "accounts_collection", accounts),
+        patch.object(reg, "usage_collection", usage),
+        patch.object(reg, "sessions_collection", sessions),
+        patch.object(reg, "_sync_discovery", AsyncMock()),
+        patch.object(reg, "_ensure_indexes", AsyncMock()),
+        TestClient(reg.app) as tc,
+    ):
+        yield tc
+
+
+class TestRegistryBudgets:
+
+    def test_budget_handshake_prepays_calls(self):
+        import registry.main as reg
+
+        accounts, usage, sessions = _registry_mocks()
+        with _registry(reg, accounts, usage, sessions) as tc:
+            resp = tc.post("/handshake", json={**HANDSHAKE_BODY, "calls": 50}, headers={"x-api-key": VALID_KEY})
+            tc.portal.call(reg.usage_writer.flush)
+
+        assert resp.status_code == 200
+        cost = round(50 * reg.CALL_COST_USD, 6)
+        assert resp.json()["budget"]["calls"] == 50
+        assert resp.json()["budget"]["cost_usd"] == cost
+
+        query, update = accounts.find_one_and_update.call_args[0]
+        assert query["balance"] == {"$gte": cost}
+        assert update == {"$inc": {"balance": -cost}}
+
+        claims = jwt.decode(resp.json()["session_token"], reg.ARIS_PRIVATE_KEY,
+                            algorithms=["HS256"], audience=HANDSHAKE_BODY["target_did"])
+        assert claims["budget"] == 50 and claims["jti"]
+        assert claims["exp"] - time.time() > reg.SESSION_TOKEN_TTL_S
+
+        session_doc = sessions.insert_one.call_args[0][0]
+        assert session_doc["jti"] == claims["jti"]
+        assert session_doc["calls"] == 50 and session_doc["calls_used"] == 0
+        event = usage.insert_many.call_args[0][0][0]
+        assert event["calls"] == 50 and event["cost_usd"] == cost
+
+    def test_budget_handshake_rejects_out_of_range_calls(self):
+        import registry.main as reg
+
+        accounts, usage, sessions = _registry_mocks()
+        with _registry(reg, accounts, usage, sessions) as tc:
+            resp = tc.post("/handshake", json={**HANDSHAKE_BODY, "calls": 0}, headers={"x-api-key": VALID_KEY})
+        assert resp.status_code == 422
+        accounts.find_one_and_update.assert_not_awaited()
+
+    def test_usage_report_updates_sessions_in_bulk(self):
+        import registry.main as reg
+
+        accounts, usage, sessions = _registry_mocks()
+        _find_returns(sessions, [{"jti": "a", "calls": 10, "calls_used": 3}, {"jti": "b", "calls": 10, "calls_used": 7}])
+        with patch.object(reg, "UpdateOne", side_effect=lambda f, u: (f, u)):
+            with _registry(reg, accounts, usage, sessions) as tc:
+                resp = tc.post("/usage/report",
+                               json={"reports": [{"jti": "a", "calls": 3}, {"jti": "b", "calls": 7}]},
+                               headers={"x-aris-node-token": _node_token(reg)})
+
+        assert resp.json() == {"status": "ok", "sessions": 2, "exhausted": []}
+        sessions.bulk_write.assert_awaited_once()
+        ops = sessions.bulk_write.call_args[0][0]
+        assert ops == [
+            ({"jti": "a", "target_did": "did:aris:llm-node-01"}, {"$inc": {"calls_used": 3}}),
+            ({"jti": "b", "target_did": "did:aris:llm-node-01"}, {"$inc": {"calls_used": 7}}),
+        ]
+
+    def test_usage_report_flags_sessions_past_budget(self):
+        import registry.main as reg
+
+        accounts, usage, sessions = _registry_mocks()
+        # Two workers each served a 5-call session in full before either reported.
+        _find_returns(sessions, [{"jti": "a", "calls": 5, "calls_used": 10}, {"jti": "b", "calls": 5, "calls_used": 5}])
+        with patch.object(reg, "UpdateOne", side_effect=lambda f, u: (f, u)):
+            with _registry(reg, accounts, usage, sessions) as tc:
+                resp = tc.post("/usage/report",
+                               json={"reports": [{"jti": "a", "calls": 5}, {"jti": "b", "calls": 5}]},
+                               headers={"x-aris-node-token": _node_token(reg)})
+
+        assert resp.json()["exhausted"] == ["a", "b"]
+        query = sessions.find.call_args[0][0]
+        assert query == {"jti": {"$in": ["a", "b"]}, "target_did": "did:aris:llm-node-01"}
+        assert sessions.bulk_write.call_args[0][0] == [({"jti": "a"}, {"$set": {"calls_over": 5}})]
+
+    def test_usage_report_requires_node_token(self):
+        import registry.main as reg
+
+        accounts, usage, sessions = _registry_mocks()
+        forged = jwt.encode({"iss": "did:aris:evil", "aud": "aris-registry", "exp": time.time() + 60},
+                            "not-the-shared-secret-but-long-enough-32b", algorithm="HS256")
+        with _registry(reg, accounts, usage, sessions) as tc:
+            assert tc.post("/usage/report", json={"reports": []}).status_code == 401
+            assert tc.post("/usage/report", json={"reports": []},
+                           headers={"x-aris-node-token": forged}).status_code == 401
+        sessions.bulk_write.assert_not_awaited()
+
+    def test_session_usage_is_served_to_the_issuing_node_only(self):
+        import registry.main as reg
+
+        accounts, usage, sessions = _registry_mocks()
+        sessions.find_one = AsyncMock(side_effect=lambda q: {"jti": "a", "calls": 5, "calls_used": 2}
+                                      if q == {"jti": "a", "target_did": "did:aris:llm-node-01"} else None)
+        with _registry(reg, accounts, usage, sessions) as tc:
+            own = tc.get("/usage/session/a", headers={"x-aris-node-token": _node_token(reg)})
+            other = tc.get("/usage/session/a", headers={"x-aris-node-token": _node_token(reg, "did:aris:other")})
+            anonymous = tc.get("/usage/session/a")
+
+        assert own.json() == {"jti": "a", "calls": 5, "calls_used": 2}
+        assert (other.status_code, anonymous.status_code) == (404, 401)
+
+
+class TestBudgetMeter:
+
+    def test_meter_enforces_budget_and_drains_reports(self):
+        meter = BudgetMeter()
+        claims = {"jti": "s1", "budget": 2, "exp": time.time() + 60}
+        assert meter.charge(claims) == 1
+        assert meter.charge(claims) == 0
+        with pytest.raises(BudgetExhausted):
+            meter.charge(claims)
+        assert meter.charge({"sub": "plain-session"}) == -1
+        assert meter.drain() == [{"jti": "s1", "calls": 2}]
+        assert meter.drain() == []
+
+    def test_meter_restore_and_expire(self, clock):
+        meter = BudgetMeter(clock=clock)
+        meter.charge({"jti": "s1", "budget": 5, "exp": clock.now + 10})
+        reports = meter.drain()
+        meter.restore(reports)
+        clock.now += 20
+        assert meter.expire() == 0                   # unreported usage keeps the session
+        assert meter.drain() == [{"jti": "s1", "calls": 1}]
+        assert meter.expire() == 1
+        assert len(meter) == 0
+
+    def test_meter_seeds_sessions_once_and_closes_spent_ones(self):
+        meter = BudgetMeter()
+        lookups = []
+
+        async def lookup(jti):
+            lookups.append(jti)
+            await asyncio.sleep(0.01)
+            return {"s1": 2, "s2": 0}.get(jti)
+
+        async def scenario():
+            s1, s2, s3 = ({"jti": jti, "budget": 3, "exp": time.time() + 60} for jti in ("s1", "s2", "s3"))
+            assert meter.needs_seed(s1) and not meter.needs_seed({"sub": "plain-session"})
+            await asyncio.gather(*(meter.seed(s1, lookup) for _ in range(5)))
+            assert not meter.needs_seed(s1)
+            assert meter.charge(s1) == 0                 # 2 of 3 used before this process started
+            with pytest.raises(BudgetExhausted):
+                meter.charge(s1)
+            await meter.seed(s2, lookup)
+            meter.charge(s2)
+            meter.spend(["s2"])                         # the registry counts it as used up
+            with pytest.raises(BudgetExhausted):
+                meter.charge(s2)
+            await meter.seed(s3, lookup)                # unknown to the registry
+            with pytest.raises(BudgetExhausted):
+                meter.charge(s3)
+
+        asyncio.run(scenario())
+        assert lookups == ["s1", "s2", "s3"]
+
+
+class TestNodeMetering:
+
+    def test_node_rejects_calls_past_budget_and_reports_usage(self):
+        import agent_node.llm_agent as node
+
+        token = jwt.encode(
+            {"sub": "did:aris:caller", "aud": node.MY_DID, "jti": "sess-1", "budget": 2, "exp": time.time() + 600},
+            node.ARIS_PUBLIC_KEY,
+            algorithm="HS256",
+        )
+        ok = MagicMock()
+        ok.json.return_value = {"response": "hi"}
+        backend = MagicMock()
+        backend.post = AsyncMock(return_value=ok)
+        backend.get = AsyncMock(return_value=_http(200, {"jti": "sess-1", "calls": 2, "calls_used": 0}))
+        backend.aclose = AsyncMock()
+
+        with patch("agent_node.llm_agent.httpx.AsyncClient", return_value=backend):
+            with TestClient(node.app) as tc:
+                codes = [tc.post("/generate", json={"prompt": "x"}, headers={"x-aris-token": token}).status_code
+                         for _ in range(3)]
+
+        assert codes == [200, 200, 402]
+        report = [c for c in backend.post.call_args_list if c[0][0] == node.METER_REPORT_URL]
+        assert len(report) == 1                      # flushed once on shutdown
+        assert report[0].kwargs["json"] == {"reports": [{"jti": "sess-1", "calls": 2}]}
+        node_claims = jwt.decode(report[0].kwargs["headers"]["x-aris-node-token"], node.ARIS_PUBLIC_KEY,
+                                 algorithms=["HS256"], audience="aris-registry")
+        assert node_claims["iss"] == node.MY_DID
+        backend.get.assert_awaited_once()
+        assert backend.get.call_args[0][0] == f"{node.METER_SESSION_URL}/sess-1"
+
+    def test_node_counts_on_from_the_registry_after_a_restart(self):
+        import agent_node.llm_agent as node
+
+        def token(jti):
+            return jwt.encode({"sub": "did:aris:caller", "aud": node.MY_DID, "jti": jti, "budget": 2,
+                               "exp": time.time() + 600}, node.ARIS_PUBLIC_KEY, algorithm="HS256")
+
+        async def registry_get(url, headers=None, timeout=None):
+            if url.endswith("/down"):
+                raise node.httpx.ConnectError("registry unreachable")
+            return _http(200, {"calls": 2, "calls_used": 2})     # spent before the restart
+
+        ok = MagicMock()
+        ok.json.return_value = {"response": "hi"}
+        backend = MagicMock()
+        backend.post = AsyncMock(return_value=ok)
+        backend.get = AsyncMock(side_effect=registry_get)
+        backend.aclose = AsyncMock()
+
+        with patch("agent_node.llm_agent.httpx.AsyncClient", return_value=backend):
+            with TestClient(node.app) as tc:
+                spent = tc.post("/generate", json={"prompt": "x"}, headers={"x-aris-token": token("used")})
+                unchecked = tc.post("/generate", json={"prompt": "x"}, headers={"x-aris-token": token("down")})
+
+        assert (spent.status_code, unchecked.status_code) == (402, 503)
+
+    def test_math_node_meters_budget_sessions_too(self):
+        import agent_node.math_agent as node
+
+        token = jwt.encode(
+            {"sub": "did:aris:caller", "aud": node.MY_DID, "scope": "math.add", "jti": "sess-m", "budget": 1,
+             "exp": time.time() + 600},
+            node.ARIS_PUBLIC_KEY,
+            algorithm="HS256",
+        )
+        registry = MagicMock()
+        registry.post = AsyncMock(return_value=_http(200, {"status": "ok", "sessions": 1, "exhausted": ["sess-m"]}))
+        registry.get = AsyncMock(return_value=_http(200, {"jti": "sess-m", "calls": 1, "calls_used": 0}))
+        registry.aclose = AsyncMock()
+
+        with patch("agent_node.math_agent.httpx.AsyncClient", return_value=registry):
+            with TestClient(node.app) as tc:
+                codes = [tc.post("/execute", json={"a": 1, "b": 2, "operation": "add"},
+                                 headers={"x-aris-token": token}).status_code for _ in range(2)]
+
+        assert codes == [200, 402]
+        registry.post.assert_awaited_once()
+        assert registry.post.call_args.args[0] == node.METER_REPORT_URL
+        assert registry.post.call_args.kwargs["json"] == {"reports": [{"jti": "sess-m", "calls": 1}]}
+
+    def test_math_node_does_not_charge_unsupported_operations(self):
+        import agent_node.math_agent as node
+
+        token = jwt.encode(
+            {"sub": "did:aris:caller", "aud": node.MY_DID, "scope": "math.add", "jti": "sess-u", "budget": 1,
+             "exp": time.time() + 600},
+            node.ARIS_PUBLIC_KEY,
+            algorithm="HS256",
+        )
+        registry = MagicMock()
+        registry.post = AsyncMock(return_value=_http(200, {"status": "ok", "sessions": 1, "exhausted": []}))
+        registry.get = AsyncMock(return_value=_http(200, {"jti": "sess-u", "calls": 1, "calls_used": 0}))
+        registry.aclose = AsyncMock()
+
+        with patch("agent_node.math_agent.httpx.AsyncClient", return_value=registry):
+            with TestClient(node.app) as tc:
+                unsupported = tc.post("/execute", json={"a": 1, "b": 2, "operation": "mul"},
+                                      headers={"x-aris-token": token})
+                added = tc.post("/execute", json={"a": 1, "b": 2, "operation": "add"},
+                                headers={"x-aris-token": token})
+
+        assert unsupported.json() == {"error": "Unsupported operation"}
+        assert added.json() == {"result": 3, "status": "success"}
+        assert registry.post.call_args.kwargs["json"] == {"reports": [{"jti": "sess-u", "calls": 1}]}
+
+
+def _http(status, body):
+    m = MagicMock()
+    m.status_code = status
+    m.json.return_value = body
+    m.text = str(body)
+    m.raise_for_status = MagicMock()
+    return m
+
+
+_DISCOVER = {"agents": [{"did": "did:aris:n1", "endpoint": "http://node-1:9006", "capabilities": ["ai.generate"]}]}
+
+
+class TestSdkBudgets:
+
+    def _run(self, node_responses, **client_kw):
+        handshakes = []
+
+        def post(url, json=None, headers=None, timeout=None):
+            if url.endswith("/handshake"):
+                handshakes.append(json)
+                return _http(200, {"session_token": f"tok-{len(handshakes)}", "remaining_balance": 1.0})
+            return node_responses.pop(0)
+
+        with patch("requests.Session.get", return_value=_http(200, _DISCOVER)), \
+                patch("requests.Session.post", side_effect=post):
+            client = Aris(api_key=VALID_KEY, **client_kw)
+            try:
+                return client.generate("hi"), handshakes
+            except Exception as e:
+                return e, handshakes
+
+    def test_sdk_requests_budget_and_renews_when_spent(self):
+        result, handshakes = self._run(
+            [_http(402, {"detail": "budget used up"}), _http(200, {"result": "ok"})],
+            session_calls=100,
+        )
+        assert result == "ok"
+        assert [h["calls"] for h in handshakes] == [100, 100]
+
+    def test_generate_node_error_does_not_rehandshake(self):
+        result, handshakes = self._run([_http(500, {"detail": "boom"})])
+        assert isinstance(result, ArisNodeError)
+        assert len(handshakes) == 1
+        assert "calls" not in handshakes[0]
@@ -0,0 +1,188 @@
+"""
+Feature 14: per-(capability, node) session table in the SDK clients
+===================================================================
+Test structure
+--------------
+SESSION TABLE  (requests mocked)
+    test_alternating_generate_and_chat_keep_both_sessions
+    test_rejected_session_is_replaced_for_that_capability_only
+    test_failover_to_node_with_live_session_skips_handshake
+
+CONCURRENCY  (threads against a slow mocked registry)
+    test_cold_client_handshakes_once_under_concurrency
+    test_burst_of_401s_triggers_one_rehandshake
+
+ASYNC CLIENT  (httpx MockTransport over the same fake network)
+    test_async_failover_to_node_with_live_session_skips_handshake
+"""
+
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import httpx
+
+from aris.async_client import AsyncAris
+from aris.client import Aris, _Session
+from aris.routing import NodeSelector
+
+VALID_KEY = "aris_live_testkey123"
+
+
+def _http(status, body):
+    m = MagicMock()
+    m.status_code = status
+    m.json.return_value = body
+    m.text = str(body)
+    m.raise_for_status = MagicMock()
+    return m
+
+
+def _node(i):
+    return {"did": f"did:aris:n{i}", "endpoint": f"http://node-{i}:9006", "capabilities": ["ai.generate", "ai.chat"]}
+
+
+class _FakeNetwork:
+    """requests.Session side effects: a registry that mints numbered tokens and nodes that accept them."""
+
+    def __init__(self, agents=None, handshake_delay_s=0.0):
+        self.agents = agents or [_node(0)]
+        self.handshake_delay_s = handshake_delay_s
+        self.handshakes = []
+        self.revoked = set()
+        self._lock = threading.Lock()
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        return _http(200, {"agents": self.agents})
+
+    def post(self, url, json=None, headers=None, timeout=None):
+        if url.endswith("/handshake"):
+            time.sleep(self.handshake_delay_s)
+            with self._lock:
+                self.handshakes.append((json["capability"], json["target_did"]))
+                token = f"tok-{len(self.handshakes)}"
+            return _http(200, {"session_token": token, "remaining_balance": 1.0})
+        if headers["x-aris-token"] in self.revoked:
+            return _http(401, {"detail": "expired"})
+        if url.endswith("/chat"):
+            return _http(200, {"role": "assistant", "content": "hi", "model": "tinyllama", "status": "success"})
+        return _http(200, {"result": "ok", "status": "success"})
+
+    def patch(self):
+        return patch("requests.Session.get", side_effect=self.get), patch("requests.Session.post", side_effect=self.post)
+
+    def transport(self):
+        """The same network as an ``httpx.MockTransport``, for AsyncAris."""
+        def handle(request):
+            if request.method == "GET":
+                reply = self.get(str(request.url))
+            else:
+                reply = self.post(str(request.url), json=json.loads(request.content), headers=request.headers)
+            return httpx.Response(reply.status_code, json=reply.json.return_value)
+        return httpx.MockTransport(handle)
+
+
+class _Scripted(NodeSelector):
+    def __init__(self, order):
+        self.order = order
+
+    def select(self, agents):
+        return agents[self.order.pop(0)]
+
+
+def _chat(client):
+    return client.chat([{"role": "user", "content": "hello"}])["content"]
+
+
+class TestSessionTable:
+
+    def test_alternating_generate_and_chat_keep_both_sessions(self):
+        net = _FakeNetwork()
+        get, post = net.patch()
+        with get, post:
+            client = Aris(api_key=VALID_KEY)
+            for _ in range(3):
+                assert client.generate("hi") == "ok"
+                assert _chat(client) == "hi"
+
+        assert net.handshakes == [("ai.generate", "did:aris:n0"), ("ai.chat", "did:aris:n0")]
+        assert set(client._sessions) == {("ai.generate", "did:aris:n0"), ("ai.chat", "did:aris:n0")}
+
+    def test_rejected_session_is_replaced_for_that_capability_only(self):
+        net = _FakeNetwork()
+        get, post = net.patch()
+        with get, post:
+            client = Aris(api_key=VALID_KEY)
+            client.generate("hi")
+            _chat(client)
+            net.revoked.add(client._active["ai.generate"].token)
+            assert client.generate("hi") == "ok"
+            assert _chat(client) == "hi"
+
+        assert [cap for cap, _ in net.handshakes] == ["ai.generate", "ai.chat", "ai.generate"]
+        assert client._active["ai.chat"].token == "tok-2"
+
+    def test_failover_to_node_with_live_session_skips_handshake(self):
+        net = _FakeNetwork(agents=[_node(0), _node(1)])
+        get, post = net.patch()
+        with get, post:
+            client = Aris(api_key=VALID_KEY, node_selector=_Scripted([0, 1]))
+            client._sessions[("ai.generate", "did:aris:n1")] = _Session("tok-n1", "http://node-1:9006", "did:aris:n1")
+            client.generate("hi")                                        # n0: handshake
+            net.revoked.add("tok-1")
+            assert client.generate("hi") == "ok"                         # n0 rejects → n1, already known
+
+        assert net.handshakes == [("ai.generate", "did:aris:n0")]
+        assert client._active["ai.generate"].token == "tok-n1"
+        assert ("ai.generate", "did:aris:n0") not in client._sessions
+
+
+class TestConcurrency:
+
+    def test_cold_client_handshakes_once_under_concurrency(self):
+        net = _FakeNetwork(handshake_delay_s=0.05)
+        get, post = net.patch()
+        with get, post:
+            client = Aris(api_key=VALID_KEY)
+            with ThreadPoolExecutor(max_workers=16) as pool:
+                results = list(pool.map(lambda i: client.generate("hi") if i % 2 else _chat(client), range(32)))
+
+        assert results.count("ok") == 16 and results.count("hi") == 16
+        assert sorted(net.handshakes) == [("ai.chat", "did:aris:n0"), ("ai.generate", "did:aris:n0")]
+
+    def test_burst_of_401s_triggers_one_rehandshake(self):
+        net = _FakeNetwork(handshake_delay_s=0.05)
+        get, post = net.patch()
+        with get, post:
+            client = Aris(api_key=VALID_KEY)
+            client.generate("hi")
+            net.revoked.add(client._active["ai.generate"].token)
+            with ThreadPoolExecutor(max_workers=16) as pool:
+                results = list(pool.map(lambda _: client.generate("hi"), range(16)))
+
+        assert results == ["ok"] * 16
+        assert len(net.handshakes) == 2
+
+
+class TestAsyncClient:
+
+    def test_async_failover_to_node_with_live_session_skips_handshake(self):
+        net = _FakeNetwork(agents=[_node(0), _node(1)])
+
+        async def run():
+            http = httpx.AsyncClient(transport=net.transport())
+            async with AsyncAris(api_key=VALID_KEY, http_client=http, node_selector=_Scripted([0, 1])) as client:
+                client._sessions[("ai.generate", "did:aris:n1")] = _Session("tok-n1", "http://node-1:9006", "did:aris:n1")
+                await client.generate("hi")                              # n0: handshake
+                net.revoked.add("tok-1")
+                assert await client.generate("hi") == "ok"               # n0 rejects → n1, already known
+            await http.aclose()
+            return client
+
+        client = asyncio.run(run())
+        assert net.handshakes == [("ai.generate", "did:aris:n0")]
+        assert client._active["ai.generate"].token == "tok-n1"
+        assert ("ai.generate", "did:aris:n0") not in client._sessions
@@ -0,0 +1,230 @@
+"""
+Feature 15: proactive session refresh ahead of token expiry
+===========================================================
+Test structure
+--------------
+DEADLINES
+    test_deadlines_read_from_exp
+    test_margin_capped_for_short_lived_tokens
+    test_opaque_or_already_expired_tokens_have_no_deadlines
+
+SYNC CLIENT  (requests mocked)
+    test_session_near_expiry_refreshed_on_access
+    test_expired_session_replaced_before_the_call
+    test_failed_early_refresh_keeps_current_token
+    test_other_threads_keep_old_token_during_refresh
+
+ASYNC CLIENT  (httpx.MockTransport)
+    test_async_refreshes_in_background
+    test_async_expired_session_waits_for_handshake
+    test_aclose_cancels_pending_refresh
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import httpx
+import jwt
+import pytest
+
+from aris import AsyncAris
+from aris.client import Aris, ArisError, _Session, _session_deadlines
+
+VALID_KEY = "aris_live_testkey123"
+NODE = {"did": "did:aris:n0", "endpoint": "http://node-0:9006", "capabilities": ["ai.generate"]}
+
+
+def _jwt(exp_in):
+    return jwt.encode({"sub": "did:aris:test", "exp": time.time() + exp_in}, "k" * 32, algorithm="HS256")
+
+
+def _seed(client, refresh_at, expires_at, token="old-token"):
+    """Install an ai.generate session whose deadlines are relative to now."""
+    now = time.monotonic()
+    session = _Session(token, NODE["endpoint"], NODE["did"], now + refresh_at, now + expires_at)
+    client._sessions[("ai.generate", NODE["did"])] = session
+    client._active["ai.generate"] = session
+    return session
+
+
+def _http(status, body):
+    m = MagicMock()
+    m.status_code = status
+    m.json.return_value = body
+    m.text = str(body)
+    m.raise_for_status = MagicMock()
+    return m
+
+
+class _Network:
+    def __init__(self, handshake_status=200, handshake_gate=None):
+        self.handshake_status = handshake_status
+        self.handshake_gate = handshake_gate
+        self.handshakes = 0
+        self.node_tokens = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        return _http(200, {"agents": [NODE]})
+
+    def post(self, url, json=None, headers=None, timeout=None):
+        if url.endswith("/handshake"):
+            if self.handshake_gate is not None:
+                self.handshake_gate.wait(5)
+            self.handshakes += 1
+            return _http(self.handshake_status, {"session_token": "new-token", "remaining_balance": 1.0})
+        self.node_tokens.append(headers["x-aris-token"])
+        return _http(200, {"result": "ok", "status": "success"})
+
+    def patch(self):
+        return patch("requests.Session.get", side_effect=self.get), patch("requests.Session.post", side_effect=self.post)
+
+
+class TestDeadlines:
+
+    def test_deadlines_read_from_exp(self):
+        now = time.monotonic()
+        refresh_at, expires_at = _session_deadlines(_jwt(300), margin_s=30)
+        assert expires_at - now == pytest.approx(300, abs=1)
+        assert expires_at - refresh_at == pytest.approx(30)
+
+    def test_margin_capped_for_short_lived_tokens(self):
+        refresh_at, expires_at = _session_deadlines(_jwt(20), margin_s=30)
+        assert expires_at - refresh_at == pytest.approx(10, abs=0.1)
+
+    def test_opaque_or_already_expired_tokens_have_no_deadlines(self):
+        assert _session_deadlines("tok-1", 30) == (None, None)
+        assert _session_deadlines("a.!!!.c", 30) == (None, None)
+        assert _session_deadlines(_jwt(-5), 30) == (None, None)
+
+
+class TestSyncRefresh:
+
+    def test_session_near_expiry_refreshed_on_access(self):
+        net = _Network()
+        get, post = net.patch()
+        with get, post:
+            client = Aris(api_key=VALID_KEY)
+            _seed(client, refresh_at=-1, expires_at=20)
+            client.generate("hi")
+            client.generate("hi")
+
+        assert net.handshakes == 1
+        assert net.node_tokens == ["new-token", "new-token"]
+
+    def test_expired_session_replaced_before_the_call(self):
+        net = _Network()
+        get, post = net.patch()
+        with get, post:
+            client = Aris(api_key=VALID_KEY)
+            _seed(client, refresh_at=-30, expires_at=-1)
+            client.generate("hi")
+
+        assert net.node_tokens == ["new-token"]           # the node never saw the expired token
+
+    def test_failed_early_refresh_keeps_current_token(self):
+        net = _Network(handshake_status=500)
+        get, post = net.patch()
+        with get, post:
+            client = Aris(api_key=VALID_KEY)
+            _seed(client, refresh_at=-1, expires_at=20)
+            assert client.generate("hi") == "ok"
+            _seed(client, refresh_at=-30, expires_at=-1)
+            with pytest.raises(ArisError, match="Handshake failed"):
+                client.generate("hi")
+
+        assert net.node_tokens == ["old-token"]
+
+    def test_other_threads_keep_old_token_during_refresh(self):
+        gate = threading.Event()
+        net = _Network(handshake_gate=gate)
+        get, post = net.patch()
+        with get, post:
+            client = Aris(api_key=VALID_KEY)
+            _seed(client, refresh_at=-1, expires_at=20)
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                refreshing = pool.submit(client.generate, "hi")
+                while not (lock := client._handshake_locks.get("ai.generate")) or not lock.locked():
+                    time.sleep(0.001)
+                assert client.generate("hi") == "ok"            # does not wait for the handshake
+                gate.set()
+                refreshing.result(5)
+
+        assert net.node_tokens == ["old-token", "new-token"]
+        assert net.handshakes == 1
+
+
+def _async_network(handshake_event=None):
+    seen = {"handshakes": 0, "node_tokens": []}
+
+    async def handler(request):
+        if request.url.path == "/discover":
+            return httpx.Response(200, json={"agents": [NODE]})
+        if request.url.path == "/handshake":
+            if handshake_event is not None:
+                await handshake_event.wait()
+            seen["handshakes"] += 1
+            return httpx.Response(200, json={"session_token": "new-token", "remaining_balance": 1.0})
+        seen["node_tokens"].append(request.headers["x-aris-token"])
+        return httpx.Response(200, json={"result": "ok", "status": "success"})
+
+    return handler, seen
+
+
+def _async_client(handler):
+    return AsyncAris(api_key=VALID_KEY, registry_url="http://registry.test",
+                     http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+
+def _seed_async(client, refresh_at, expires_at):
+    now = time.monotonic()
+    session = _Session("old-token", NODE["endpoint"], NODE["did"], now + refresh_at, now + expires_at)
+    client._sessions[("ai.generate", NODE["did"])] = session
+    client._active["ai.generate"] = session
+
+
+class TestAsyncRefresh:
+
+    def test_async_refreshes_in_background(self):
+        async def run():
+            handler, seen = _async_network()
+            client = _async_client(handler)
+            _seed_async(client, refresh_at=-1, expires_at=20)
+            await client.generate("hi")                         # served on the old token
+            await client._refresh_tasks["ai.generate"]
+            await client.generate("hi")
+            return seen
+
+        seen = asyncio.run(run())
+        assert seen["node_tokens"] == ["old-token", "new-token"]
+        assert seen["handshakes"] == 1
+
+    def test_async_expired_session_waits_for_handshake(self):
+        async def run():
+            handler, seen = _async_network()
+            client = _async_client(handler)
+            _seed_async(client, refresh_at=-30, expires_at=-1)
+            await asyncio.gather(*(client.generate("hi") for _ in range(5)))
+            return seen, client
+
+        seen, client = asyncio.run(run())
+        assert seen["node_tokens"] == ["new-token"] * 5
+        assert seen["handshakes"] == 1
+        assert not client._refresh_tasks
+
+    def test_aclose_cancels_pending_refresh(self):
+        async def run():
+            handler, seen = _async_network(handshake_event=asyncio.Event())
+            client = _async_client(handler)
+            _seed_async(client, refresh_at=-1, expires_at=20)
+            await client.generate("hi")
+            task = client._refresh_tasks["ai.generate"]
+            await asyncio.sleep(0)
+            await client.aclose()
+            return task, seen
+
+        task, seen = asyncio.run(run())
+        assert task.cancelled()
+        assert seen["handshakes"] == 0
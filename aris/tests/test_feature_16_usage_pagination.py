@@ -0,0 +1,185 @@
+"""
+Feature 16: keyset-paginated /usage, streaming export, SDK iterators
+====================================================================
+Test structure
+--------------
+REGISTRY TESTS  (registry on memory:// storage)
+    test_pages_cover_full_history_without_gaps_or_duplicates
+    test_invalid_cursor_rejected
+    test_total_spent_is_account_wide_on_every_page
+    test_export_ndjson_streams_oldest_first_in_batches
+    test_export_csv_with_time_window
+    test_export_requires_api_key
+
+SDK TESTS  (SDK → registry TestClient)
+    test_iter_usage_fetches_pages_lazily
+    test_async_iter_usage_walks_all_pages
+"""
+
+import asyncio
+import contextlib
+import csv
+import io
+import json
+from unittest.mock import AsyncMock, patch
+
+import httpx
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+from aris import AsyncAris
+from aris.client import Aris
+from registry.rollups import fold
+from registry.storage.memory import MemoryStorage
+
+VALID_KEY = "aris_live_testkey123"
+ACCOUNT = {"api_key": VALID_KEY, "email": "test@aris.ai", "balance": 5.0}
+
+
+def _history(n, start=1_700_000_000.0):
+    # Every timestamp appears twice, so pages must break ties on _id.
+    return [
+        {"_id": ObjectId(), "api_key": VALID_KEY, "capability": "ai.generate", "payer_did": "did:aris:p",
+         "target_did": "did:aris:n", "cost_usd": 0.1, "timestamp": start + i // 2,
+         **({"calls": 10} if i % 3 == 0 else {})}
+        for i in range(n)
+    ] + [{"_id": ObjectId(), "api_key": "aris_live_someone_else", "cost_usd": 9.0, "timestamp": start}]
+
+
+@contextlib.contextmanager
+def _registry(docs):
+    """The registry on a fresh in-memory store holding *docs*; yields the cursors /usage opens, too."""
+    import registry.main as reg
+
+    storage = MemoryStorage()
+    asyncio.run(storage.accounts.insert_one(dict(ACCOUNT)))
+    asyncio.run(storage.usage_logs.insert_many([dict(d) for d in docs]))
+    asyncio.run(storage.usage_rollups.insert_many([
+        {"api_key": key, "capability": cap, "granularity": g, "bucket": bucket, **counters}
+        for (key, cap, g, bucket), counters in fold(docs).items()
+    ]))
+    usage, find, cursors = storage.usage_logs, storage.usage_logs.find, []
+
+    def record(*args, **kwargs):
+        cursor = find(*args, **kwargs)
+        cursor.close = AsyncMock(wraps=cursor.close)
+        cursors.append(cursor)
+        return cursor
+
+    with (
+        patch.object(reg, "accounts_collection", storage.accounts),
+        patch.object(reg, "usage_collection", usage),
+        patch.object(reg, "rollups_collection", storage.usage_rollups),
+        patch.object(usage, "find", record),
+    ):
+        reg.account_cache.clear()
+        with TestClient(reg.app) as tc:
+            yield tc, cursors, reg
+
+
+def _walk(tc, limit):
+    pages, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        body = tc.get("/usage", params=params, headers={"x-api-key": VALID_KEY}).json()
+        pages.append(body)
+        cursor = body["next_cursor"]
+        if not cursor:
+            return pages
+
+
+class TestRegistryPagination:
+
+    def test_pages_cover_full_history_without_gaps_or_duplicates(self):
+        docs = _history(23)
+        with _registry(docs) as (tc, *_):
+            pages = _walk(tc, limit=5)
+
+        assert [p["records_returned"] for p in pages] == [5, 5, 5, 5, 3]
+        events = [e for p in pages for e in p["usage"]]
+        expected = sorted((d for d in docs if d["api_key"] == VALID_KEY),
+                          key=lambda d: (d["timestamp"], d["_id"]), reverse=True)
+        assert [e["timestamp"] for e in events] == [d["timestamp"] for d in expected]
+        assert len(events) == 23 and all("_id" not in e and "api_key" not in e for e in events)
+
+    def test_invalid_cursor_rejected(self):
+        with _registry(_history(3)) as (tc, *_):
+            resp = tc.get("/usage", params={"cursor": "not-a-cursor"}, headers={"x-api-key": VALID_KEY})
+        assert resp.status_code == 400
+
+    def test_total_spent_is_account_wide_on_every_page(self):
+        # Spread over three days, so the total spans several daily buckets.
+        docs = _history(12) + _history(9, start=1_700_200_000.0)
+        with _registry(docs) as (tc, *_):
+            pages = _walk(tc, limit=5)
+
+        assert len(pages) == 5
+        assert {p["total_spent_usd"] for p in pages} == {round(21 * 0.1, 6)}
+
+
+class TestRegistryExport:
+
+    def test_export_ndjson_streams_oldest_first_in_batches(self):
+        with _registry(_history(10)) as (tc, cursors, reg):
+            with patch.object(reg, "USAGE_EXPORT_BATCH", 4):
+                resp = tc.get("/usage/export", headers={"x-api-key": VALID_KEY})
+
+        assert resp.headers["content-type"].startswith("application/x-ndjson")
+        rows = [json.loads(line) for line in resp.text.splitlines()]
+        assert len(rows) == 10
+        assert [r["timestamp"] for r in rows] == sorted(r["timestamp"] for r in rows)
+        cursor = cursors[-1]
+        assert cursor._batch_size == 4
+        cursor.close.assert_awaited_once()
+
+    def test_export_csv_with_time_window(self):
+        start = 1_700_000_000.0
+        with _registry(_history(10, start=start)) as (tc, _, reg):
+            resp = tc.get("/usage/export", params={"format": "csv", "since": start + 1, "until": start + 4},
+                          headers={"x-api-key": VALID_KEY})
+
+        rows = list(csv.DictReader(io.StringIO(resp.text)))
+        assert resp.headers["content-type"].startswith("text/csv")
+        assert tuple(rows[0].keys()) == reg.USAGE_EXPORT_FIELDS
+        assert len(rows) == 6
+        assert {r["calls"] for r in rows} == {"", "10"}
+
+    def test_export_requires_api_key(self):
+        with _registry(_history(2)) as (tc, *_):
+            assert tc.get("/usage/export").status_code == 401
+            assert tc.get("/usage/export", headers={"x-api-key": "aris_live_bogus"}).status_code == 403
+            assert tc.get("/usage/export", params={"format": "xml"},
+                          headers={"x-api-key": VALID_KEY}).status_code == 422
+
+
+class TestSdkIterUsage:
+
+    def test_iter_usage_fetches_pages_lazily(self):
+        with _registry(_history(25)) as (tc, *_):
+            def get(url, params=None, headers=None, timeout=None):
+                return tc.get("/usage", params=params, headers=headers)
+
+            with patch("requests.Session.get", side_effect=get) as mock_get:
+                events = Aris(api_key=VALID_KEY).iter_usage(page_size=10)
+                first = [next(events) for _ in range(3)]
+                assert mock_get.call_count == 1
+                rest = list(events)
+
+        assert len(first) + len(rest) == 25
+        assert mock_get.call_count == 3
+        assert "cursor" in mock_get.call_args.kwargs["params"]
+
+    def test_async_iter_usage_walks_all_pages(self):
+        with _registry(_history(12)) as (tc, *_):
+            def handler(request):
+                r = tc.get("/usage", params=dict(request.url.params), headers={"x-api-key": VALID_KEY})
+                return httpx.Response(r.status_code, content=r.content)
+
+            async def run():
+                client = AsyncAris(api_key=VALID_KEY, registry_url="http://registry.test",
+                                   http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+                return [e async for e in client.iter_usage(page_size=5)]
+
+            events = asyncio.run(run())
+
+        assert len(events) == 12
@@ -0,0 +1,224 @@
+"""
+Feature 17: pre-aggregated usage rollups and /usage/summary
+===========================================================
+Test structure
+--------------
+ROLLUP UNIT TESTS
+    test_fold_counts_each_event_into_hour_and_day
+    test_rollups_agree_with_raw_events
+
+REGISTRY TESTS  (mocked motor collections)
+    test_usage_batch_updates_rollups
+    test_rollup_failure_does_not_rewrite_events
+    test_summary_reads_rollup_buckets
+    test_summary_rejects_oversized_window
+
+ROLLUP RETRY TESTS  (memory:// collections)
+    test_failed_rollup_batch_is_retried_without_double_counting
+
+SDK TESTS
+    test_client_usage_summary
+    test_async_usage_summary_validates_granularity
+"""
+
+import asyncio
+import contextlib
+import random
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from aris import AsyncAris
+from aris.client import Aris
+from registry.rollups import GRANULARITIES, fold, summarize
+from registry.storage.memory import MemoryStorage
+
+VALID_KEY = "aris_live_testkey123"
+ACCOUNT = {"api_key": VALID_KEY, "email": "test@aris.ai", "balance": 5.0}
+DAY = 1_700_006_400                                  # a UTC midnight
+
+
+def _event(ts, capability="ai.generate", cost=0.1, **extra):
+    return {"api_key": VALID_KEY, "capability": capability, "cost_usd": cost, "timestamp": ts, **extra}
+
+
+class TestRollupFold:
+
+    def test_fold_counts_each_event_into_hour_and_day(self):
+        rollups = fold([
+            _event(DAY + 10),
+            _event(DAY + 20, calls=50, cost=0.5),
+            _event(DAY + 3600 + 5, capability="ai.chat"),
+        ])
+        assert rollups[(VALID_KEY, "ai.generate", "hour", DAY)] == {"events": 2, "cost_usd": 0.6, "calls": 50}
+        assert rollups[(VALID_KEY, "ai.chat", "hour", DAY + 3600)]["events"] == 1
+        assert rollups[(VALID_KEY, "ai.generate", "day", DAY)]["events"] == 2
+        assert len(rollups) == 4
+
+    def test_rollups_agree_with_raw_events(self):
+        rng = random.Random(7)
+        events = [_event(DAY + rng.uniform(0, 3 * 86400), rng.choice(["ai.generate", "ai.chat"]), rng.choice([0.1, 0.5]))
+                  for _ in range(2000)]
+        for granularity, size in GRANULARITIES.items():
+            docs = [{"capability": cap, "bucket": bucket, **c}
+                    for (_, cap, g, bucket), c in fold(events).items() if g == granularity]
+            summary = summarize(docs, granularity, DAY, DAY + 3 * 86400)
+            assert summary["total"]["events"] == 2000
+            assert summary["total"]["cost_usd"] == pytest.approx(sum(e["cost_usd"] for e in events))
+            assert summary["by_capability"]["ai.chat"]["events"] == sum(e["capability"] == "ai.chat" for e in events)
+            assert len(summary["series"]) == 3 * 86400 // size
+            assert [p["bucket"] for p in summary["series"]] == sorted(p["bucket"] for p in summary["series"])
+
+
+@contextlib.contextmanager
+def _registry(rollup_docs=(), rollups_fail=False):
+    import registry.main as reg
+
+    accounts = MagicMock()
+    accounts.find_one = AsyncMock(side_effect=lambda q, *a, **kw: ACCOUNT if q.get("api_key") == VALID_KEY else None)
+    accounts.find_one_and_update = AsyncMock(return_value=ACCOUNT)
+    usage = MagicMock()
+    usage.insert_many = AsyncMock()
+    rollups = MagicMock()
+    rollups.bulk_write = AsyncMock(side_effect=RuntimeError("mongo down") if rollups_fail else None)
+    cursor = MagicMock()
+    cursor.to_list = AsyncMock(return_value=[dict(d) for d in rollup_docs])
+    rollups.find = MagicMock(return_value=cursor)
+    with (
+        patch.object(reg, "accounts_collection", accounts),
+        patch.object(reg, "usage_collection", usage),
+        patch.object(reg, "rollups_collection", rollups),
+        patch.object(reg, "UpdateOne", side_effect=lambda f, u, upsert: (f, u, upsert)),
+        patch.object(reg, "_sync_discovery", AsyncMock()),
+        patch.object(reg, "_ensure_indexes", AsyncMock()),
+        TestClient(reg.app) as tc,
+    ):
+        yield tc, usage, rollups, reg
+
+
+def _handshake(tc, capability="ai.generate"):
+    return tc.post("/handshake", json={"payer_did": "did:aris:p", "target_did": "did:aris:n", "capability": capability},
+                   headers={"x-api-key": VALID_KEY})
+
+
+class TestRegistryRollups:
+
+    def test_usage_batch_updates_rollups(self):
+        with _registry() as (tc, usage, rollups, reg):
+            for cap in ("ai.generate", "ai.generate", "ai.chat"):
+                assert _handshake(tc, cap).status_code == 200
+            tc.portal.call(reg.usage_writer.flush)
+
+        usage.insert_many.assert_awaited_once()
+        rollups.bulk_write.assert_awaited_once()
+        ops = rollups.bulk_write.call_args[0][0]
+        by_key = {(f["capability"], f["granularity"]): u["$inc"] for f, u, upsert in ops}
+        assert all(upsert for *_, upsert in ops)
+        assert by_key[("ai.generate", "day")]["events"] == 2
+        assert by_key[("ai.chat", "hour")]["cost_usd"] == pytest.approx(reg.HANDSHAKE_COST_USD)
+
+    def test_rollup_failure_does_not_rewrite_events(self):
+        with _registry(rollups_fail=True) as (tc, usage, rollups, reg):
+            _handshake(tc)
+            tc.portal.call(reg.usage_writer.flush)
+            stats = reg.usage_writer.stats()
+
+        usage.insert_many.assert_awaited_once()
+        assert stats["events_dropped"] == 0
+
+    def test_summary_reads_rollup_buckets(self):
+        docs = [
+            {"capability": "ai.generate", "bucket": DAY, "events": 3, "cost_usd": 0.3, "calls": 0},
+            {"capability": "ai.chat", "bucket": DAY, "events": 1, "cost_usd": 0.1, "calls": 0},
+            {"capability": "ai.generate", "bucket": DAY + 86400, "events": 2, "cost_usd": 1.0, "calls": 100},
+        ]
+        with _registry(docs) as (tc, _, rollups, _reg):
+            resp = tc.get("/usage/summary", params={"since": DAY + 500, "until": DAY + 2 * 86400},
+                          headers={"x-api-key": VALID_KEY})
+
+        body = resp.json()
+        query = rollups.find.call_args[0][0]
+        assert query == {"api_key": VALID_KEY, "granularity": "day", "bucket": {"$gte": DAY, "$lt": DAY + 2 * 86400}}
+        assert body["total"] == {"events": 6, "cost_usd": 1.4, "calls": 100}
+        assert body["by_capability"]["ai.chat"]["events"] == 1
+        assert [(p["bucket"], p["events"]) for p in body["series"]] == [(DAY, 4), (DAY + 86400, 2)]
+
+    def test_summary_rejects_oversized_window(self):
+        with _registry() as (tc, _, rollups, reg):
+            too_long = tc.get("/usage/summary", params={"granularity": "hour", "since": 0, "until": 86400 * 365},
+                              headers={"x-api-key": VALID_KEY})
+            backwards = tc.get("/usage/summary", params={"since": DAY, "until": DAY - 1},
+                               headers={"x-api-key": VALID_KEY})
+            unauthenticated = tc.get("/usage/summary")
+        assert too_long.status_code == backwards.status_code == 400
+        assert unauthenticated.status_code == 401
+        rollups.find.assert_not_called()
+
+
+class _CutOffRollups:
+    """Rollups collection whose next bulk write applies only its first *cut_off* requests, then fails."""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self.cut_off = None
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    async def bulk_write(self, requests, ordered=True):
+        if self.cut_off is None:
+            return await self._collection.bulk_write(requests, ordered=ordered)
+        applied, self.cut_off = requests[:self.cut_off], None
+        await self._collection.bulk_write(applied, ordered=ordered)
+        raise RuntimeError("connection reset")
+
+
+class TestRollupRetry:
+
+    def test_failed_rollup_batch_is_retried_without_double_counting(self):
+        import registry.main as reg
+
+        storage = MemoryStorage()
+        rollups = _CutOffRollups(storage.usage_rollups)
+        first = [_event(DAY + 10), _event(DAY + 3600 + 5, capability="ai.chat", calls=20)]
+        second = [_event(DAY + 20)]
+        with (
+            patch.object(reg, "usage_collection", storage.usage_logs),
+            patch.object(reg, "rollups_collection", rollups),
+            patch.dict(reg._failed_rollups, clear=True),
+        ):
+            rollups.cut_off = 2                    # 2 of the first batch's 4 buckets land
+            asyncio.run(reg._write_usage_batch(first))
+            parked = len(reg._failed_rollups)
+            asyncio.run(reg._write_usage_batch(second))
+            still_parked = len(reg._failed_rollups)
+            docs = asyncio.run(storage.usage_rollups.find({}).to_list(None))
+
+        assert (parked, still_parked) == (1, 0)
+        counted = {(d["capability"], d["granularity"], d["bucket"]): (d["events"], d["calls"]) for d in docs}
+        expected = {(cap, g, bucket): (c["events"], c["calls"]) for (_, cap, g, bucket), c in fold(first + second).items()}
+        assert counted == expected
+        assert asyncio.run(storage.usage_logs.count_documents({})) == 3
+
+
+class TestSdkUsageSummary:
+
+    def test_client_usage_summary(self):
+        docs = [{"capability": "ai.generate", "bucket": DAY, "events": 3, "cost_usd": 0.3, "calls": 0}]
+        with _registry(docs) as (tc, _, rollups, _reg):
+            def get(url, params=None, headers=None, timeout=None):
+                return tc.get("/usage/summary", params=params, headers=headers)
+
+            with patch("requests.Session.get", side_effect=get):
+                summary = Aris(api_key=VALID_KEY).usage_summary(
+                    granularity="hour", since=DAY, until=DAY + 86400, capability="ai.generate")
+
+        assert summary["total"]["events"] == 3
+        assert rollups.find.call_args[0][0]["capability"] == "ai.generate"
+        assert rollups.find.call_args[0][0]["granularity"] == "hour"
+
+    def test_async_usage_summary_validates_granularity(self):
+        client = AsyncAris(api_key=VALID_KEY)
+        with pytest.raises(ValueError):
+            asyncio.run(client.usage_summary(granularity="week"))
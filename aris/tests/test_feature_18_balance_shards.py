@@ -0,0 +1,236 @@
+"""
+Feature 18: sharded balance counters for hot API keys
+=====================================================
+Test structure
+--------------
+SHARD UNIT TESTS  (memory:// collections, yielding like round trips)
+    test_split_is_exact_to_the_micro_dollar
+    test_concurrent_debits_never_overdraw
+    test_fragmented_shards_are_consolidated
+    test_load_account_sums_all_shards
+    test_debit_returns_the_charged_shard_balance
+    test_fold_moves_shards_past_the_count_back_in
+
+REGISTRY TESTS  (ARIS_BALANCE_SHARDS=4)
+    test_webhook_spreads_top_up_across_shards
+    test_handshakes_debit_several_shards
+    test_usage_log_records_the_charged_shard_balance
+    test_handshake_unknown_key_and_empty_wallet
+    test_lowering_the_shard_count_strands_no_funds
+"""
+
+import asyncio
+import contextlib
+import inspect
+import random
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from registry import balances
+from registry.storage.memory import MemoryStorage
+
+VALID_KEY = "aris_live_testkey123"
+EMAIL = "test@aris.ai"
+BODY = {"payer_did": "did:aris:p", "target_did": "did:aris:n", "capability": "ai.generate"}
+
+
+class _RoundTrips:
+    """A storage collection that yields to the event loop before every call, like a network round trip."""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if not inspect.iscoroutinefunction(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            await asyncio.sleep(0)
+            return await attr(*args, **kwargs)
+        return call
+
+
+def _collections():
+    storage = MemoryStorage()
+    return _RoundTrips(storage.accounts), _RoundTrips(storage.balance_shards)
+
+
+def _store(*shard_balances):
+    accounts, shards = _collections()
+    asyncio.run(accounts.insert_one({"api_key": VALID_KEY, "email": EMAIL, "balance": shard_balances[0]}))
+    for i, b in enumerate(shard_balances[1:], start=1):
+        asyncio.run(shards.insert_one({"api_key": VALID_KEY, "shard": i, "balance": b}))
+    return accounts, shards
+
+
+def _docs(collection):
+    return asyncio.run(collection.find({}).sort("shard").to_list(None))
+
+
+def _total(*collections):
+    return sum(d.get("balance", 0) for c in collections for d in _docs(c))
+
+
+class TestShardedBalances:
+
+    def test_split_is_exact_to_the_micro_dollar(self):
+        assert balances.split(10.0, 3) == [3.333334, 3.333333, 3.333333]
+        assert balances.split(0.25, 4) == [0.0625] * 4
+        assert balances.split(5.0, 1) == [5.0]
+
+    def test_concurrent_debits_never_overdraw(self):
+        # Binary-exact amounts: the backend adds doubles as Mongo does, without rounding.
+        accounts, shards = _store(0.25, 1.0, 0.125, 0.625)
+
+        async def run():
+            return await asyncio.gather(*[
+                balances.debit(accounts, shards, VALID_KEY, 0.125, 4, rng=random.Random(i)) for i in range(40)
+            ])
+
+        results = asyncio.run(run())
+
+        assert sum(r is not None for r in results) == 16
+        assert _total(accounts, shards) == pytest.approx(0.0)
+        assert all(d["balance"] >= 0 for d in _docs(accounts) + _docs(shards))
+
+    def test_fragmented_shards_are_consolidated(self):
+        accounts, shards = _store(0.04, 0.04, 0.04, 0.04)
+
+        assert asyncio.run(balances.debit(accounts, shards, VALID_KEY, 0.1, 4)) == pytest.approx(0.06)
+        assert _total(accounts, shards) == pytest.approx(0.06)
+        # What is left is spread evenly again.
+        assert [d["balance"] for d in _docs(accounts) + _docs(shards)] == pytest.approx([0.015] * 4)
+
+        assert asyncio.run(balances.debit(accounts, shards, VALID_KEY, 0.1, 4)) is None
+        assert _total(accounts, shards) == pytest.approx(0.06)
+
+    def test_load_account_sums_all_shards(self):
+        accounts, shards = _store(1.0, 2.5, 0.25)
+        account = asyncio.run(balances.load_account(accounts, shards, VALID_KEY))
+        assert account["balance"] == 3.75 and account["email"] == EMAIL
+        assert asyncio.run(balances.load_account(accounts, shards, "aris_live_nobody")) is None
+
+    def test_debit_returns_the_charged_shard_balance(self):
+        accounts, shards = _store(1.0, 0.5)
+
+        left = [asyncio.run(balances.debit(accounts, shards, VALID_KEY, 0.125, 2, rng=random.Random(i)))
+                for i in range(4)]
+
+        # Each result is the post-image of the shard it hit, not a running total.
+        assert all(v in (0.875, 0.75, 0.625, 0.375, 0.25, 0.125) for v in left)
+        assert sorted(d["balance"] for d in _docs(accounts) + _docs(shards)) == sorted(
+            [1.0 - 0.125 * sum(v >= 0.5 and v != 0.375 for v in left), 0.5 - 0.125 * sum(v <= 0.375 for v in left)])
+
+    def test_fold_moves_shards_past_the_count_back_in(self):
+        accounts, shards = _store(1.0, 2.0, 3.0, 0.0)
+
+        assert asyncio.run(balances.fold(accounts, shards, 2)) == 1
+        assert [d["balance"] for d in _docs(accounts) + _docs(shards)] == [2.5, 3.5, 0.0, 0.0]
+        assert asyncio.run(balances.fold(accounts, shards, 1)) == 1
+        assert [d["balance"] for d in _docs(accounts) + _docs(shards)] == [6.0, 0.0, 0.0, 0.0]
+        assert asyncio.run(balances.fold(accounts, shards, 1)) == 0
+
+
+@contextlib.contextmanager
+def _registry(accounts, shards, n=4):
+    import registry.main as reg
+
+    storage = MemoryStorage()
+    with (
+        patch.object(reg, "accounts_collection", accounts),
+        patch.object(reg, "balance_shards_collection", shards),
+        patch.object(reg, "usage_collection", storage.usage_logs),
+        patch.object(reg, "rollups_collection", storage.usage_rollups),
+        patch.object(reg, "_sync_discovery", AsyncMock()),
+        patch.object(reg, "BALANCE_SHARDS", n),
+    ):
+        yield reg
+
+
+class TestRegistryShardedBalances:
+
+    def test_webhook_spreads_top_up_across_shards(self):
+        accounts, shards = _collections()
+        event = {"id": "evt_shards", "type": "checkout.session.completed",
+                 "data": {"object": {"customer_details": {"email": EMAIL}, "amount_total": 1000}}}
+
+        with _registry(accounts, shards) as reg, TestClient(reg.app) as tc:
+            with patch.object(reg.stripe.Webhook, "construct_event", return_value=event):
+                assert tc.post("/webhook", content=b"{}", headers={"stripe-signature": "sig"}).status_code == 200
+            tc.portal.call(reg.topup_worker.drain)
+            account = tc.portal.call(accounts.find_one, {"email": EMAIL})
+            balance = tc.get("/balance", headers={"x-api-key": account["api_key"]}).json()
+
+        assert account["balance"] == 2.5
+        assert [(d["shard"], d["balance"]) for d in _docs(shards)] == [(1, 2.5), (2, 2.5), (3, 2.5)]
+        assert balance["balance_usd"] == 10.0
+
+    def test_handshakes_debit_several_shards(self):
+        accounts, shards = _store(1.0, 1.0, 1.0, 1.0)
+
+        async def scenario(reg):
+            transport = httpx.ASGITransport(app=reg.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://registry") as http:
+                responses = await asyncio.gather(*[
+                    http.post("/handshake", json=BODY, headers={"x-api-key": VALID_KEY}) for _ in range(30)
+                ])
+            await reg.usage_writer.stop()
+            return responses
+
+        with _registry(accounts, shards) as reg:
+            reg.account_cache.clear()
+            responses = asyncio.run(scenario(reg))
+
+        assert all(r.status_code == 200 for r in responses)
+        assert _total(accounts, shards) == pytest.approx(1.0)
+        assert sum(d["balance"] < 1.0 for d in _docs(accounts) + _docs(shards)) > 1
+        assert min(r.json()["remaining_balance"] for r in responses) == pytest.approx(1.0)
+
+    def test_usage_log_records_the_charged_shard_balance(self):
+        accounts, shards = _store(1.0, 2.0)
+
+        with _registry(accounts, shards, n=2) as reg:
+            with TestClient(reg.app) as tc:
+                totals = [tc.post("/handshake", json=BODY, headers={"x-api-key": VALID_KEY}).json()["remaining_balance"]
+                          for _ in range(4)]
+            events = _docs(reg.usage_collection)
+            cost = reg.HANDSHAKE_COST_USD
+
+        assert totals == pytest.approx([3.0 - cost * i for i in range(1, 5)])
+        for event in events:
+            assert event["balance_before"] == pytest.approx(event["balance_after"] + cost)
+            # Shard 0 started at 1.0, shard 1 at 2.0: a running total would start near 3.0.
+            assert 1.0 - 4 * cost <= event["balance_after"] < 1.0 or 2.0 - 4 * cost <= event["balance_after"] < 2.0
+
+    def test_handshake_unknown_key_and_empty_wallet(self):
+        accounts, shards = _store(0.05, 0.02)
+
+        with _registry(accounts, shards, n=2) as reg, TestClient(reg.app) as tc:
+            unknown = tc.post("/handshake", json=BODY, headers={"x-api-key": "aris_live_nobody"})
+            broke = tc.post("/handshake", json=BODY, headers={"x-api-key": VALID_KEY})
+
+        assert unknown.status_code == 403
+        assert broke.status_code == 402
+        assert _total(accounts, shards) == pytest.approx(0.07)
+
+    def test_lowering_the_shard_count_strands_no_funds(self):
+        accounts, shards = _store(0.0, 0.5, 0.5, 0.5)
+
+        with _registry(accounts, shards, n=1) as reg, TestClient(reg.app) as tc:
+            # Startup folded shards 1-3 into the account document.
+            assert [d["balance"] for d in _docs(accounts)] == [1.5]
+            assert tc.get("/balance", headers={"x-api-key": VALID_KEY}).json()["balance_usd"] == 1.5
+            # A worker still on the old shard count tops up shard 2 after that.
+            tc.portal.call(accounts.update_one, {"api_key": VALID_KEY}, {"$set": {"balance": 0.0}})
+            tc.portal.call(shards.update_one, {"api_key": VALID_KEY, "shard": 2}, {"$inc": {"balance": 0.25}})
+            reg.account_cache.clear()
+            paid = tc.post("/handshake", json=BODY, headers={"x-api-key": VALID_KEY})
+            left = round(0.25 - reg.HANDSHAKE_COST_USD, 6)
+
+        assert paid.status_code == 200 and paid.json()["remaining_balance"] == pytest.approx(left)
+        assert [d["balance"] for d in _docs(accounts)] == pytest.approx([left])
+        assert _total(shards) == 0
@@ -0,0 +1,266 @@
+"""
+Feature 19: pluggable registry storage (Mongo / in-memory / SQLite WAL)
+=======================================================================
+Test structure
+--------------
+BACKEND CONTRACT TESTS  (run against memory:// and a SQLite file)
+    test_queries_follow_mongo_semantics
+    test_upserts_and_conditional_updates
+    test_unique_index_rejects_duplicates
+    test_insert_many_reports_duplicates_like_mongo
+    test_delete_many_and_bulk_write_take_motor_arguments
+    test_streaming_cursor_reads_in_batches
+    test_concurrent_guarded_debits_never_overdraw
+
+SQLITE MULTI-WORKER TESTS  (two storages on one file)
+    test_array_fields_seen_by_other_workers
+
+REGISTRY TESTS  (the unpatched app on each backend)
+    test_registry_end_to_end
+
+URL TESTS
+    test_open_storage_picks_backend_from_url
+"""
+
+import asyncio
+import contextlib
+from unittest.mock import MagicMock, patch
+
+import pymongo
+import pytest
+from fastapi.testclient import TestClient
+from pymongo import DESCENDING, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from registry import balances
+from registry.storage import UpdateOne, open_storage
+from registry.storage.memory import MemoryStorage
+from registry.storage.sqlite import SQLiteStorage
+
+KEY = "aris_live_testkey123"
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def storage(request, tmp_path):
+    store = open_storage("memory://" if request.param == "memory" else f"sqlite:///{tmp_path / 'aris.db'}")
+    yield store
+    store.close()
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+class TestBackendContract:
+
+    def test_queries_follow_mongo_semantics(self, storage):
+        agents = storage.agents
+
+        async def scenario():
+            await agents.create_index("capabilities")
+            await agents.insert_many([
+                {"did": "did:aris:a", "capabilities": ["ai.generate", "ai.chat"], "last_seen": 100.0},
+                {"did": "did:aris:b", "capabilities": ["ai.chat"], "last_seen": 300.0},
+                {"did": "did:aris:c", "capabilities": ["math.add"]},
+            ])
+            chat = await agents.find({"capabilities": "ai.chat"}, {"_id": 0, "did": 1}) \
+                .sort([("last_seen", DESCENDING)]).to_list(length=None)
+            live = await agents.find({"last_seen": {"$not": {"$lt": 200}}}).to_list(length=None)
+            either = await agents.find({"$or": [{"did": "did:aris:c"}, {"last_seen": {"$gte": 300}}]}).to_list(None)
+            stale = await agents.find({"last_seen": {"$exists": False}}).to_list(None)
+            one = await agents.find_one({"did": "did:aris:a"}, {"_id": 0, "capabilities": 0})
+            return chat, live, either, stale, one
+
+        chat, live, either, stale, one = _run(scenario())
+        assert chat == [{"did": "did:aris:b"}, {"did": "did:aris:a"}]
+        assert sorted(d["did"] for d in live) == ["did:aris:b", "did:aris:c"]
+        assert sorted(d["did"] for d in either) == ["did:aris:b", "did:aris:c"]
+        assert [d["did"] for d in stale] == ["did:aris:c"]
+        assert one == {"did": "did:aris:a", "last_seen": 100.0}
+
+    def test_upserts_and_conditional_updates(self, storage):
+        accounts, shards = storage.accounts, storage.balance_shards
+
+        async def scenario():
+            created = await accounts.find_one_and_update(
+                {"email": "a@aris.ai"},
+                {"$setOnInsert": {"api_key": KEY}, "$inc": {"balance": 1.0}},
+                upsert=True, return_document=ReturnDocument.AFTER,
+            )
+            topped = await accounts.find_one_and_update(
+                {"email": "a@aris.ai"},
+                {"$setOnInsert": {"api_key": "aris_live_other"}, "$inc": {"balance": 0.5}},
+                upsert=True, return_document=ReturnDocument.AFTER,
+            )
+            refused = await accounts.update_one({"api_key": KEY, "balance": {"$gte": 2.0}}, {"$inc": {"balance": -2.0}})
+            debited = await accounts.update_one({"api_key": KEY, "balance": {"$gte": 1.0}}, {"$inc": {"balance": -1.0}})
+            await shards.bulk_write([
+                UpdateOne({"api_key": KEY, "shard": 1}, {"$inc": {"balance": 0.25}}, upsert=True),
+                UpdateOne({"api_key": KEY, "shard": 1}, {"$inc": {"balance": 0.25}}, upsert=True),
+            ], ordered=False)
+            return created, topped, refused, debited, await shards.find_one({"api_key": KEY, "shard": 1})
+
+        created, topped, refused, debited, shard = _run(scenario())
+        assert created["api_key"] == topped["api_key"] == KEY
+        assert topped["balance"] == 1.5
+        assert (refused.modified_count, debited.modified_count) == (0, 1)
+        assert shard["balance"] == 0.5
+
+    def test_unique_index_rejects_duplicates(self, storage):
+        async def scenario():
+            await storage.accounts.create_index("api_key", unique=True)
+            await storage.accounts.insert_one({"api_key": KEY})
+            await storage.accounts.insert_one({"api_key": KEY})
+
+        with pytest.raises(DuplicateKeyError):
+            _run(scenario())
+
+    def test_insert_many_reports_duplicates_like_mongo(self, storage):
+        usage = storage.usage_logs
+
+        async def scenario():
+            await usage.insert_many([{"_id": "a"}, {"_id": "b"}])
+            errors = []
+            for ordered in (True, False):
+                with pytest.raises(BulkWriteError) as exc:
+                    await usage.insert_many([{"_id": f"c{ordered}"}, {"_id": "a"}, {"_id": f"d{ordered}"}],
+                                            ordered=ordered)
+                errors.append(exc.value.details)
+            return errors, sorted(d["_id"] for d in await usage.find({}).to_list(None))
+
+        (stopped, unordered), ids = _run(scenario())
+        assert [(e["index"], e["code"]) for e in stopped["writeErrors"]] == [(1, 11000)]
+        assert (stopped["nInserted"], unordered["nInserted"]) == (1, 2)
+        # Ordered stops at the duplicate; unordered inserts around it. Both keep what went in.
+        assert ids == ["a", "b", "cFalse", "cTrue", "dFalse"]
+
+    def test_delete_many_and_bulk_write_take_motor_arguments(self, storage):
+        sessions = storage.sessions
+
+        async def scenario():
+            await sessions.insert_many([{"jti": str(i), "expires_at": float(i)} for i in range(5)])
+            deleted = await sessions.delete_many({"expires_at": {"$lt": 3}})
+            with pytest.raises(TypeError):
+                await sessions.bulk_write([pymongo.UpdateOne({"jti": "4"}, {"$set": {"expires_at": 9.0}})])
+            return deleted, await sessions.count_documents({})
+
+        deleted, left = _run(scenario())
+        assert deleted.deleted_count == 3
+        assert left == 2
+
+    def test_streaming_cursor_reads_in_batches(self, storage):
+        usage = storage.usage_logs
+
+        async def scenario():
+            await usage.insert_many([{"api_key": KEY, "timestamp": float(i), "cost_usd": 0.1} for i in range(25)])
+            cursor = usage.find({"api_key": KEY, "timestamp": {"$gte": 5}}, {"_id": 0, "api_key": 0}) \
+                .sort([("timestamp", 1), ("_id", 1)]).batch_size(7)
+            rows = [doc async for doc in cursor]
+            await cursor.close()
+            return rows
+
+        rows = _run(scenario())
+        assert [r["timestamp"] for r in rows] == [float(i) for i in range(5, 25)]
+        assert set(rows[0]) == {"timestamp", "cost_usd"}
+
+    def test_concurrent_guarded_debits_never_overdraw(self, storage):
+        accounts = storage.accounts
+
+        async def scenario():
+            await accounts.insert_one({"api_key": KEY, "balance": 1.0})
+            results = await asyncio.gather(*[
+                accounts.find_one_and_update({"api_key": KEY, "balance": {"$gte": 0.1}},
+                                             {"$inc": {"balance": -0.1}}, return_document=ReturnDocument.AFTER)
+                for _ in range(25)
+            ])
+            return results, await accounts.find_one({"api_key": KEY})
+
+        results, account = _run(scenario())
+        assert sum(r is not None for r in results) == 10
+        assert account["balance"] == pytest.approx(0.0)
+
+
+class TestSQLiteWorkers:
+
+    def test_array_fields_seen_by_other_workers(self, tmp_path):
+        path = str(tmp_path / "shared.db")
+        first, second = SQLiteStorage(path), SQLiteStorage(path)
+
+        async def scenario():
+            # Both workers have opened the file before either stores an array.
+            await first.agents.count_documents({})
+            await second.agents.count_documents({})
+            await first.agents.insert_one({"did": "did:aris:a", "capabilities": ["ai.generate", "ai.chat"]})
+            await first.accounts.insert_one({"api_key": KEY, "balance": 0.0})
+            applied = await balances.credit_once(first.accounts, first.balance_shards, KEY, [5.0], "evt1")
+            chat = await second.agents.find({"capabilities": "ai.chat"}).to_list(None)
+            replayed = await balances.credit_once(second.accounts, second.balance_shards, KEY, [5.0], "evt1")
+            return applied, chat, replayed, await second.accounts.find_one({"api_key": KEY})
+
+        try:
+            applied, chat, replayed, account = _run(scenario())
+        finally:
+            first.close()
+            second.close()
+        assert [a["did"] for a in chat] == ["did:aris:a"]
+        assert (applied, replayed) == (True, False)
+        assert account["balance"] == 5.0 and account["topup_events"] == ["evt1"]
+
+
+@contextlib.contextmanager
+def _registry(storage):
+    import registry.main as reg
+
+    with contextlib.ExitStack() as stack:
+        for attr, name in (("accounts_collection", "accounts"), ("agents_collection", "agents"),
+                           ("usage_collection", "usage_logs"), ("rollups_collection", "usage_rollups"),
+                           ("sessions_collection", "sessions"), ("balance_shards_collection", "balance_shards"),
+                           ("stripe_events_collection", "stripe_events")):
+            stack.enter_context(patch.object(reg, attr, getattr(storage, name)))
+        stack.enter_context(patch.object(reg, "HEARTBEAT_INTERVAL_S", 3600))
+        yield reg
+
+
+class TestRegistryOnBackends:
+
+    def test_registry_end_to_end(self, storage):
+        event = {"id": "evt_end_to_end", "type": "checkout.session.completed",
+                 "data": {"object": {"customer_details": {"email": "a@aris.ai"}, "amount_total": 500}}}
+
+        with _registry(storage) as reg, TestClient(reg.app) as tc:
+            with patch.object(reg.stripe.Webhook, "construct_event", return_value=event):
+                assert tc.post("/webhook", content=b"{}", headers={"stripe-signature": "sig"}).status_code == 200
+            tc.portal.call(reg.topup_worker.drain)
+            api_key = tc.portal.call(storage.accounts.find_one, {"email": "a@aris.ai"})["api_key"]
+            headers = {"x-api-key": api_key}
+
+            tc.post("/register", json={"did": "did:aris:n", "endpoint": "http://n", "capabilities": ["ai.generate"]})
+            for _ in range(3):
+                assert tc.post("/handshake", headers=headers, json={
+                    "payer_did": "did:aris:p", "target_did": "did:aris:n", "capability": "ai.generate",
+                }).status_code == 200
+            tc.portal.call(reg.usage_writer.flush)
+            reg.account_cache.clear()
+
+            balance = tc.get("/balance", headers=headers).json()
+            usage = tc.get("/usage", params={"limit": 2}, headers=headers).json()
+            summary = tc.get("/usage/summary", headers=headers).json()
+            agents = tc.get("/discover", params={"capability": "ai.generate"}).json()["agents"]
+
+        assert balance["balance_usd"] == pytest.approx(4.7)
+        assert usage["records_returned"] == 2 and usage["next_cursor"]
+        assert summary["total"]["events"] == 3
+        assert [a["did"] for a in agents] == ["did:aris:n"]
+
+
+class TestOpenStorage:
+
+    def test_open_storage_picks_backend_from_url(self, tmp_path):
+        assert isinstance(open_storage("memory://"), MemoryStorage)
+        sqlite = open_storage(f"sqlite:///{tmp_path / 'x.db'}")
+        assert isinstance(sqlite, SQLiteStorage) and sqlite.path == str(tmp_path / "x.db")
+        sqlite.close()
+        with patch.dict("sys.modules", {"motor.motor_asyncio": MagicMock(AsyncIOMotorClient=MagicMock())}):
+            assert open_storage("mongodb://db:27017").accounts is not None
+        with pytest.raises(ValueError):
+            open_storage("postgres://db")
@@ -31,10 +31,14 @@ E2E / FUNCTIONAL TESTS  (FastAPI TestClient, MongoDB fully mocked)
 
 import time
 import pytest
+import asyncio
 import contextlib
 from unittest.mock import AsyncMock, MagicMock, patch
 from fastapi.testclient import TestClient
 
+from registry.rollups import fold
+from registry.storage.memory import MemoryStorage
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Helpers
 # ──────────────────────────────────────────────────────────────────────────────
@@ -68,6 +72,17 @@ def _make_usage_record(n=1):
         for i in range(n)
     ]
 
+def _rollups(usage_docs=()):
+    """A fresh rollups collection holding the buckets *usage_docs* fold into."""
+    rollups = MemoryStorage().usage_rollups
+    docs = [
+        {"api_key": key, "capability": cap, "granularity": g, "bucket": bucket, **counters}
+        for (key, cap, g, bucket), counters in fold({"api_key": VALID_KEY, **d} for d in usage_docs).items()
+    ]
+    if docs:
+        asyncio.run(rollups.insert_many(docs))
+    return rollups
+
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Registry unit tests (FastAPI TestClient + mocked motor collections)
@@ -98,11 +113,12 @@ def _make_registry_client(account_doc, usage_docs=None):
 
     mock_usage = MagicMock()
     mock_usage.find = MagicMock(return_value=mock_cursor)
-    mock_usage.insert_one = AsyncMock(return_value=None)
+    mock_usage.insert_many = AsyncMock(return_value=None)
 
     with (
         patch.object(reg, "accounts_collection", mock_accounts),
         patch.object(reg, "usage_collection",    mock_usage),
+        patch.object(reg, "rollups_collection",  _rollups(usage_docs)),
     ):
         with TestClient(reg.app, raise_server_exceptions=True) as tc:
             yield tc, mock_accounts, mock_usage
@@ -189,16 +205,16 @@ class TestRegistryUsage:
 class TestHandshakeLogsUsage:
 
     def test_handshake_logs_usage(self):
-        """After a successful handshake, usage_collection.insert_one must be called."""
+        """After a successful handshake, the usage event must be written (batched via insert_many)."""
         import registry.main as reg
 
         account = _make_account(balance=5.0)
         mock_accounts = MagicMock()
         mock_accounts.find_one  = AsyncMock(return_value=account)
-        mock_accounts.update_one = AsyncMock(return_value=None)
+        mock_accounts.find_one_and_update = AsyncMock(return_value={**account, "balance": 4.9})
 
         mock_usage = MagicMock()
-        mock_usage.insert_one = AsyncMock(return_value=None)
+        mock_usage.insert_many = AsyncMock(return_value=None)
 
         mock_agents = MagicMock()
 
@@ -206,6 +222,7 @@ class TestHandshakeLogsUsage:
             patch.object(reg, "accounts_collection", mock_accounts),
             patch.object(reg, "usage_collection",    mock_usage),
             patch.object(reg, "agents_collection",   mock_agents),
+            patch.object(reg, "rollups_collection",  _rollups()),
         ):
             with TestClient(reg.app) as tc:
                 resp = tc.post(
@@ -219,9 +236,11 @@ class TestHandshakeLogsUsage:
                 )
 
         assert resp.status_code == 200
-        mock_usage.insert_one.assert_awaited_once()
+        mock_usage.insert_many.assert_awaited_once()
 
-        call_args = mock_usage.insert_one.call_args[0][0]
+        batch = mock_usage.insert_many.call_args[0][0]
+        assert len(batch) == 1
+        call_args = batch[0]
         assert call_args["api_key"]    == VALID_KEY
         assert call_args["capability"] == "ai.generate"
         assert call_args["cost_usd"]   == 0.10
@@ -234,10 +253,10 @@ class TestHandshakeLogsUsage:
         account = _make_account(balance=0.05)  # below $0.10 threshold
         mock_accounts = MagicMock()
         mock_accounts.find_one   = AsyncMock(return_value=account)
-        mock_accounts.update_one = AsyncMock(return_value=None)
+        mock_accounts.find_one_and_update = AsyncMock(return_value=None)  # guard rejects
 
         mock_usage = MagicMock()
-        mock_usage.insert_one = AsyncMock(return_value=None)
+        mock_usage.insert_many = AsyncMock(return_value=None)
 
         with (
             patch.object(reg, "accounts_collection", mock_accounts),
@@ -251,7 +270,7 @@ class TestHandshakeLogsUsage:
                 )
 
         assert resp.status_code == 402
-        mock_usage.insert_one.assert_not_awaited()
+        mock_usage.insert_many.assert_not_awaited()
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -273,7 +292,7 @@ class TestClientBalance:
 
     def test_client_balance_success(self):
         payload = {"email": TEST_EMAIL, "balance_usd": 9.50, "created_at": 1700000000.0}
-        with patch("requests.get", return_value=_mock_response(200, payload)) as mock_get:
+        with patch("requests.Session.get", return_value=_mock_response(200, payload)) as mock_get:
             client = Aris(api_key=VALID_KEY)
             result = client.balance()
 
@@ -284,26 +303,26 @@ class TestClientBalance:
         assert kwargs["headers"]["x-api-key"] == VALID_KEY
 
     def test_client_balance_missing_key_raises_auth_error(self):
-        with patch("requests.get", return_value=_mock_response(401, {"detail": "Missing API Key"})):
+        with patch("requests.Session.get", return_value=_mock_response(401, {"detail": "Missing API Key"})):
             client = Aris(api_key=VALID_KEY)
             with pytest.raises(ArisAuthError):
                 client.balance()
 
     def test_client_balance_invalid_key_raises_auth_error(self):
-        with patch("requests.get", return_value=_mock_response(403, {"detail": "Invalid API Key"})):
+        with patch("requests.Session.get", return_value=_mock_response(403, {"detail": "Invalid API Key"})):
             client = Aris(api_key=INVALID_KEY)
             with pytest.raises(ArisAuthError):
                 client.balance()
 
     def test_client_balance_network_error_raises_aris_error(self):
         import requests as req_lib
-        with patch("requests.get", side_effect=req_lib.RequestException("timeout")):
+        with patch("requests.Session.get", side_effect=req_lib.RequestException("timeout")):
             client = Aris(api_key=VALID_KEY)
             with pytest.raises(ArisError):
                 client.balance()
 
     def test_client_balance_unexpected_status_raises_aris_error(self):
-        with patch("requests.get", return_value=_mock_response(500, {"detail": "Internal server error"})):
+        with patch("requests.Session.get", return_value=_mock_response(500, {"detail": "Internal server error"})):
             client = Aris(api_key=VALID_KEY)
             with pytest.raises(ArisError):
                 client.balance()
@@ -330,7 +349,7 @@ class TestClientUsage:
 
     def test_client_usage_success(self):
         payload = self._usage_payload(3)
-        with patch("requests.get", return_value=_mock_response(200, payload)) as mock_get:
+        with patch("requests.Session.get", return_value=_mock_response(200, payload)) as mock_get:
             client = Aris(api_key=VALID_KEY)
             result = client.usage(limit=10)
 
@@ -341,7 +360,7 @@ class TestClientUsage:
 
     def test_client_usage_limit_capped_at_200(self):
         payload = self._usage_payload(1)
-        with patch("requests.get", return_value=_mock_response(200, payload)) as mock_get:
+        with patch("requests.Session.get", return_value=_mock_response(200, payload)) as mock_get:
             client = Aris(api_key=VALID_KEY)
             client.usage(limit=9999)
 
@@ -356,14 +375,14 @@ class TestClientUsage:
             client.usage(limit=-5)
 
     def test_client_usage_invalid_key_raises_auth_error(self):
-        with patch("requests.get", return_value=_mock_response(403, {"detail": "Invalid"})):
+        with patch("requests.Session.get", return_value=_mock_response(403, {"detail": "Invalid"})):
             client = Aris(api_key=INVALID_KEY)
             with pytest.raises(ArisAuthError):
                 client.usage()
 
     def test_client_usage_network_error_raises_aris_error(self):
         import requests as req_lib
-        with patch("requests.get", side_effect=req_lib.RequestException("connection refused")):
+        with patch("requests.Session.get", side_effect=req_lib.RequestException("connection refused")):
             client = Aris(api_key=VALID_KEY)
             with pytest.raises(ArisError):
                 client.usage()
@@ -373,13 +392,13 @@ class TestModuleLevelHelpers:
 
     def test_module_level_balance_helper(self):
         payload = {"email": TEST_EMAIL, "balance_usd": 5.0, "created_at": 1700000000.0}
-        with patch("requests.get", return_value=_mock_response(200, payload)):
+        with patch("requests.Session.get", return_value=_mock_response(200, payload)):
             result = sdk_balance(api_key=VALID_KEY)
         assert result["balance_usd"] == 5.0
 
     def test_module_level_usage_helper(self):
         payload = {"email": TEST_EMAIL, "records_returned": 0, "total_spent_usd": 0.0, "usage": []}
-        with patch("requests.get", return_value=_mock_response(200, payload)):
+        with patch("requests.Session.get", return_value=_mock_response(200, payload)):
             result = sdk_usage(api_key=VALID_KEY)
         assert result["records_returned"] == 0
 
@@ -392,7 +411,7 @@ class TestE2EBalanceUsageFlow:
     """
     Simulates a realistic developer journey:
       1. Check balance → see initial credits.
-      2. Call /handshake → balance decrements, usage logged.
+      2. Call /handshake → balance decrements, usage event queued and flushed.
       3. Call /usage → event appears in history.
       4. Call /balance again → matches post-deduct value.
     """
@@ -415,13 +434,17 @@ class TestE2EBalanceUsageFlow:
                 return dict(db_account)
             return None
 
-        async def fake_update_one(query, update, *a, **kw):
-            if "$inc" in update:
-                for field, delta in update["$inc"].items():
-                    db_account[field] = round(db_account.get(field, 0) + delta, 6)
+        async def fake_find_one_and_update(query, update, *a, **kw):
+            if query.get("api_key") != VALID_KEY:
+                return None
+            if db_account.get("balance", 0) < query["balance"]["$gte"]:
+                return None
+            for field, delta in update["$inc"].items():
+                db_account[field] = round(db_account.get(field, 0) + delta, 6)
+            return dict(db_account)
 
         mock_accounts.find_one  = AsyncMock(side_effect=fake_find_one)
-        mock_accounts.update_one = AsyncMock(side_effect=fake_update_one)
+        mock_accounts.find_one_and_update = AsyncMock(side_effect=fake_find_one_and_update)
 
         # --- Mock usage collection ---
         mock_cursor = MagicMock()
@@ -429,9 +452,13 @@ class TestE2EBalanceUsageFlow:
         mock_cursor.limit = MagicMock(return_value=mock_cursor)
         mock_cursor.to_list = AsyncMock(side_effect=lambda length: usage_log[:length])
 
+        async def fake_insert_many(docs, *a, **kw):
+            for doc in docs:
+                usage_log.insert(0, doc)
+
         mock_usage = MagicMock()
         mock_usage.find      = MagicMock(return_value=mock_cursor)
-        mock_usage.insert_one = AsyncMock(side_effect=lambda doc: usage_log.insert(0, doc))
+        mock_usage.insert_many = AsyncMock(side_effect=fake_insert_many)
 
         mock_agents = MagicMock()
 
@@ -439,6 +466,7 @@ class TestE2EBalanceUsageFlow:
             patch.object(reg, "accounts_collection", mock_accounts),
             patch.object(reg, "usage_collection",    mock_usage),
             patch.object(reg, "agents_collection",   mock_agents),
+            patch.object(reg, "rollups_collection",  _rollups()),
         ):
             with TestClient(reg.app) as tc:
 
@@ -462,7 +490,8 @@ class TestE2EBalanceUsageFlow:
                 expected_after = round(initial_balance - 0.10, 6)
                 assert handshake_data["remaining_balance"] == expected_after
 
-                # Step 3: Usage endpoint reflects the event
+                # Step 3: Usage endpoint reflects the event (once the batch writer flushes)
+                tc.portal.call(reg.usage_writer.flush)
                 r = tc.get("/usage", headers={"x-api-key": VALID_KEY})
                 assert r.status_code == 200
                 usage_data = r.json()
@@ -490,26 +519,35 @@ class TestE2EBalanceUsageFlow:
         async def fake_find_one(query, *a, **kw):
             return dict(db_account) if query.get("api_key") == VALID_KEY else None
 
-        async def fake_update_one(query, update, *a, **kw):
-            if "$inc" in update:
-                for field, delta in update["$inc"].items():
-                    db_account[field] = round(db_account.get(field, 0) + delta, 6)
+        async def fake_find_one_and_update(query, update, *a, **kw):
+            if query.get("api_key") != VALID_KEY:
+                return None
+            if db_account.get("balance", 0) < query["balance"]["$gte"]:
+                return None
+            for field, delta in update["$inc"].items():
+                db_account[field] = round(db_account.get(field, 0) + delta, 6)
+            return dict(db_account)
 
         mock_accounts.find_one   = AsyncMock(side_effect=fake_find_one)
-        mock_accounts.update_one = AsyncMock(side_effect=fake_update_one)
+        mock_accounts.find_one_and_update = AsyncMock(side_effect=fake_find_one_and_update)
 
         mock_cursor = MagicMock()
         mock_cursor.sort  = MagicMock(return_value=mock_cursor)
         mock_cursor.limit = MagicMock(return_value=mock_cursor)
         mock_cursor.to_list = AsyncMock(side_effect=lambda length: usage_log[:length])
 
+        async def fake_insert_many(docs, *a, **kw):
+            for doc in docs:
+                usage_log.insert(0, doc)
+
         mock_usage = MagicMock()
-        mock_usage.find       = MagicMock(return_value=mock_cursor)
-        mock_usage.insert_one = AsyncMock(side_effect=lambda doc: usage_log.insert(0, doc))
+        mock_usage.find        = MagicMock(return_value=mock_cursor)
+        mock_usage.insert_many = AsyncMock(side_effect=fake_insert_many)
 
         with (
             patch.object(reg, "accounts_collection", mock_accounts),
             patch.object(reg, "usage_collection",    mock_usage),
+            patch.object(reg, "rollups_collection",  _rollups()),
         ):
             with TestClient(reg.app) as tc:
                 for i in range(3):
@@ -520,6 +558,7 @@ class TestE2EBalanceUsageFlow:
                     )
                     assert r.status_code == 200
 
+                tc.portal.call(reg.usage_writer.flush)
                 r = tc.get("/usage", headers={"x-api-key": VALID_KEY})
                 body = r.json()
                 assert body["records_returned"]  == 3
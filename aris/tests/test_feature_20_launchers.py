@@ -0,0 +1,148 @@
+"""
+Feature 20: production launchers for aris-registry and aris-node
+================================================================
+Test structure
+--------------
+OPTION TESTS
+    test_auto_picks_uvloop_and_httptools_when_installed
+    test_auto_falls_back_to_asyncio_and_h11
+    test_reload_runs_a_single_worker
+
+REGISTRY ENTRY POINT TESTS
+    test_registry_serves_import_string_with_flags
+    test_registry_defaults_to_one_worker
+    test_registry_refuses_memory_storage_with_workers
+
+NODE ENTRY POINT TESTS
+    test_node_exports_flags_before_importing_app
+    test_node_runs_workers_under_python_m
+"""
+
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from aris_server import launcher
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+
+
+def _parse(*argv, workers=1):
+    parser = argparse.ArgumentParser()
+    launcher.add_server_arguments(parser, port=8000, workers=workers)
+    return parser.parse_args(list(argv))
+
+
+class TestServerOptions:
+
+    def test_auto_picks_uvloop_and_httptools_when_installed(self):
+        with patch.object(launcher, "_installed", return_value=True):
+            options = launcher.server_options(_parse("--workers", "4"))
+        assert (options["loop"], options["http"], options["workers"]) == ("uvloop", "httptools", 4)
+        assert options["backlog"] == launcher.DEFAULT_BACKLOG
+        assert options["timeout_keep_alive"] == launcher.DEFAULT_KEEPALIVE_S
+
+    def test_auto_falls_back_to_asyncio_and_h11(self):
+        with patch.object(launcher, "_installed", return_value=False):
+            options = launcher.server_options(_parse("--keep-alive", "5", "--backlog", "128"))
+        assert (options["loop"], options["http"]) == ("asyncio", "h11")
+        assert (options["timeout_keep_alive"], options["backlog"]) == (5, 128)
+
+    def test_reload_runs_a_single_worker(self):
+        options = launcher.server_options(_parse("--reload", "--workers", "8"))
+        assert options["reload"] is True and options["workers"] == 1
+
+
+class TestRegistryEntryPoint:
+
+    def test_registry_serves_import_string_with_flags(self):
+        import registry.main as reg
+
+        with patch.object(reg, "STORAGE_URL", "sqlite:///aris.db"), \
+             patch.object(reg, "serve") as serve, \
+             patch.object(sys, "argv", ["aris-registry", "--port", "8100", "--workers", "3"]):
+            reg.start()
+
+        app, args = serve.call_args.args
+        assert app == "registry.main:app"
+        assert (args.port, args.workers) == (8100, 3)
+
+    def test_registry_defaults_to_one_worker(self):
+        import registry.main as reg
+
+        with patch.dict(os.environ), patch.object(reg, "STORAGE_URL", "sqlite:///aris.db"), \
+             patch.object(reg, "serve") as serve, patch.object(sys, "argv", ["aris-registry"]):
+            os.environ.pop("ARIS_WORKERS", None)
+            reg.start()
+
+        assert serve.call_args.args[1].workers == 1
+
+    def test_registry_refuses_memory_storage_with_workers(self):
+        import registry.main as reg
+
+        with patch.object(reg, "STORAGE_URL", "memory://"), \
+             patch.object(reg, "serve") as serve, \
+             patch.object(sys, "argv", ["aris-registry", "--workers", "2"]):
+            with pytest.raises(SystemExit):
+                reg.start()
+        serve.assert_not_called()
+
+
+class TestNodeEntryPoint:
+
+    def test_node_exports_flags_before_importing_app(self):
+        from agent_node import launcher
+
+        argv = ["aris-node", "--port", "9100", "--registry", "http://reg:8000/register"]
+        with patch.dict(os.environ), patch.object(launcher, "serve") as serve, patch.object(sys, "argv", argv):
+            launcher.start()
+            assert os.environ["ARIS_NODE_PORT"] == "9100"
+            assert os.environ["ARIS_REGISTRY"] == "http://reg:8000/register"
+
+        app, args = serve.call_args.args
+        assert app == "agent_node.llm_agent:app"
+        assert args.workers == 1
+        # The launcher itself must not import the app, or the flags would come too late.
+        probe = subprocess.run([sys.executable, "-c", "import sys, agent_node.launcher; "
+                                "print('agent_node.llm_agent' in sys.modules)"],
+                               cwd=ROOT, capture_output=True, text=True, check=True)
+        assert probe.stdout.strip() == "False"
+
+    def test_node_runs_workers_under_python_m(self, tmp_path):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        log = tmp_path / "node.log"
+        with open(log, "wb") as out:
+            proc = subprocess.Popen(
+                [sys.executable, "-m", "agent_node.llm_agent", "--workers", "2", "--host", "127.0.0.1",
+                 "--port", str(port), "--registry", "http://127.0.0.1:1/register"],
+                cwd=ROOT, stdout=out, stderr=subprocess.STDOUT, start_new_session=True,
+            )
+        try:
+            # /status answers once the first worker is up; wait for the second one too.
+            status = None
+            deadline = time.monotonic() + 60
+            while proc.poll() is None and time.monotonic() < deadline:
+                try:
+                    status = httpx.get(f"http://127.0.0.1:{port}/status", timeout=1).status_code
+                except httpx.TransportError:
+                    status = None
+                if status == 200 and log.read_text().count("Started server process") == 2:
+                    break
+                time.sleep(0.5)
+        finally:
+            os.killpg(proc.pid, signal.SIGTERM)
+            proc.wait(timeout=30)
+        output = log.read_text()
+        assert status == 200, output
+        assert output.count("Started server process") == 2
@@ -0,0 +1,155 @@
+"""
+Feature 21: Stripe SDK calls off the registry event loop
+========================================================
+Test structure
+--------------
+POOL UNIT TESTS
+    test_session_lookups_are_cached_until_ttl
+    test_concurrent_lookups_share_one_call
+    test_failed_lookup_is_not_cached
+
+REGISTRY TESTS  (fake Stripe that blocks for 0.5 s per call)
+    test_handshakes_unaffected_by_slow_checkouts
+    test_webhook_verification_runs_on_pool
+"""
+
+import asyncio
+import contextlib
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+
+from registry.storage.memory import MemoryStorage
+from registry.stripe_pool import StripePool
+
+VALID_KEY = "aris_live_testkey123"
+BODY = {"payer_did": "did:aris:p", "target_did": "did:aris:n", "capability": "ai.generate"}
+STRIPE_DELAY_S = 0.5
+
+
+def _slow(result):
+    """A blocking Stripe call: sleeps like a network round trip, then returns *result*."""
+    def call(*args, **kwargs):
+        time.sleep(STRIPE_DELAY_S)
+        return result
+    return MagicMock(side_effect=call)
+
+
+class TestStripePool:
+
+    def test_session_lookups_are_cached_until_ttl(self, clock):
+        pool = StripePool(session_ttl=60, clock=clock)
+        retrieve = MagicMock(return_value={"id": "cs_1"})
+
+        async def scenario():
+            await pool.retrieve_session(retrieve, "cs_1")
+            await pool.retrieve_session(retrieve, "cs_1")
+            clock.now += 61
+            await pool.retrieve_session(retrieve, "cs_1")
+
+        asyncio.run(scenario())
+        pool.shutdown()
+        assert retrieve.call_count == 2
+        assert pool.session_hits == 1
+
+    def test_concurrent_lookups_share_one_call(self):
+        pool = StripePool()
+        retrieve = MagicMock(side_effect=lambda sid: time.sleep(0.05) or {"id": sid})
+
+        async def scenario():
+            return await asyncio.gather(*[pool.retrieve_session(retrieve, "cs_1") for _ in range(5)])
+
+        sessions = asyncio.run(scenario())
+        pool.shutdown()
+        assert retrieve.call_count == 1
+        assert sessions == [{"id": "cs_1"}] * 5
+
+    def test_failed_lookup_is_not_cached(self):
+        pool = StripePool()
+        retrieve = MagicMock(side_effect=[RuntimeError("stripe down"), {"id": "cs_1"}])
+
+        async def scenario():
+            with pytest.raises(RuntimeError):
+                await pool.retrieve_session(retrieve, "cs_1")
+            return await pool.retrieve_session(retrieve, "cs_1")
+
+        assert asyncio.run(scenario()) == {"id": "cs_1"}
+        pool.shutdown()
+
+
+@contextlib.contextmanager
+def _registry():
+    import registry.main as reg
+
+    storage = MemoryStorage()
+    with patch.object(reg, "accounts_collection", storage.accounts), \
+         patch.object(reg, "agents_collection", storage.agents), \
+         patch.object(reg, "usage_collection", storage.usage_logs), \
+         patch.object(reg, "rollups_collection", storage.usage_rollups), \
+         patch.object(reg, "stripe_pool", StripePool(max_workers=4)):
+        reg.account_cache.clear()
+        yield reg, storage
+        reg.stripe_pool.shutdown()
+
+
+class TestRegistryStripeCalls:
+
+    def test_handshakes_unaffected_by_slow_checkouts(self):
+        checkout = _slow(MagicMock(url="https://checkout.stripe.com/c/pay/cs_1"))
+        retrieve = _slow({"customer_details": {"email": "a@aris.ai"}})
+
+        async def scenario(reg, storage):
+            await storage.accounts.insert_one({"api_key": VALID_KEY, "email": "a@aris.ai", "balance": 10.0})
+            reg.usage_writer.start()
+            transport = httpx.ASGITransport(app=reg.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://registry") as http:
+                stripe_calls = [
+                    asyncio.create_task(http.get("/buy-credits", params={"price_id": "price_1"})) for _ in range(4)
+                ] + [asyncio.create_task(http.get("/success", params={"session_id": "cs_1"})) for _ in range(4)]
+                await asyncio.sleep(0.05)            # Stripe calls are now blocked in their threads
+
+                latencies = []
+                for _ in range(10):
+                    t0 = time.perf_counter()
+                    r = await http.post("/handshake", json=BODY, headers={"x-api-key": VALID_KEY})
+                    latencies.append(time.perf_counter() - t0)
+                    assert r.status_code == 200, r.text
+                in_flight = sum(not t.done() for t in stripe_calls)
+                responses = await asyncio.gather(*stripe_calls)
+            await reg.usage_writer.stop()
+            return latencies, in_flight, responses
+
+        with _registry() as (reg, storage), \
+             patch.object(reg.stripe.checkout.Session, "create", checkout), \
+             patch.object(reg.stripe.checkout.Session, "retrieve", retrieve):
+            latencies, in_flight, responses = asyncio.run(scenario(reg, storage))
+
+        assert in_flight == 8
+        assert max(latencies) < STRIPE_DELAY_S / 2
+        assert all(r.status_code == 303 for r in responses[:4])
+        assert all(VALID_KEY in r.text for r in responses[4:])
+        assert checkout.call_count == 4
+        assert retrieve.call_count == 1              # four reloads, one Stripe lookup
+
+    def test_webhook_verification_runs_on_pool(self):
+        threads = []
+        event = {"type": "payment_intent.created", "data": {"object": {}}}
+
+        def construct_event(payload, sig, secret):
+            threads.append(threading.current_thread().name)
+            return event
+
+        async def scenario(reg):
+            transport = httpx.ASGITransport(app=reg.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://registry") as http:
+                return await http.post("/webhook", content=b"{}", headers={"stripe-signature": "sig"})
+
+        with _registry() as (reg, _), \
+             patch.object(reg.stripe.Webhook, "construct_event", side_effect=construct_event):
+            response = asyncio.run(scenario(reg))
+
+        assert response.status_code == 200
+        assert threads and threads[0].startswith("stripe")
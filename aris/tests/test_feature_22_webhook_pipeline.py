@@ -0,0 +1,288 @@
+"""
+Feature 22: asynchronous, idempotent Stripe webhook ingestion
+=============================================================
+Test structure
+--------------
+IDEMPOTENCY TESTS  (memory:// and SQLite storage)
+    test_guarded_push_applies_each_event_once
+    test_credit_once_replay_only_fills_missed_shards
+
+PIPELINE TESTS  (registry on memory:// storage)
+    test_redelivered_event_credits_once
+    test_reprocessing_an_applied_event_is_a_no_op
+    test_failing_event_is_retried_then_marked_failed
+    test_webhook_acks_before_top_ups_are_applied
+    test_notify_wakes_worker_before_poll
+
+MULTI-WORKER TESTS  (several workers on one store)
+    test_racing_workers_claim_each_event_once
+    test_expired_claim_is_taken_over
+    test_first_payment_race_creates_one_account
+"""
+
+import asyncio
+import contextlib
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from registry import balances
+from registry.storage import open_storage
+from registry.storage.memory import MemoryStorage
+from registry.topups import TopUpWorker
+
+EMAIL = "buyer@aris.ai"
+
+
+def _event(event_id, amount_total=1000, email=EMAIL):
+    return {"id": event_id, "type": "checkout.session.completed",
+            "data": {"object": {"customer_details": {"email": email}, "amount_total": amount_total}}}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def storage(request, tmp_path):
+    store = open_storage("memory://" if request.param == "memory" else f"sqlite:///{tmp_path / 'aris.db'}")
+    yield store
+    store.close()
+
+
+class TestIdempotentCredits:
+
+    def test_guarded_push_applies_each_event_once(self, storage):
+        accounts = storage.accounts
+
+        async def credit(event_id):
+            return await accounts.update_one(
+                {"api_key": "k", "topup_events": {"$ne": event_id}},
+                {"$inc": {"balance": 1.0}, "$push": {"topup_events": {"$each": [event_id], "$slice": -2}}},
+            )
+
+        async def scenario():
+            await accounts.insert_one({"api_key": "k", "balance": 0.0})
+            results = [await credit(e) for e in ("evt_1", "evt_1", "evt_2", "evt_3", "evt_3")]
+            return [r.modified_count for r in results], await accounts.find_one({"api_key": "k"})
+
+        modified, account = asyncio.run(scenario())
+        assert modified == [1, 0, 1, 1, 0]
+        assert account["balance"] == 3.0
+        assert account["topup_events"] == ["evt_2", "evt_3"]
+
+    def test_credit_once_replay_only_fills_missed_shards(self, storage):
+        accounts, shards = storage.accounts, storage.balance_shards
+
+        async def scenario():
+            await accounts.insert_one({"api_key": "k", "balance": 0.0})
+            # A crash after shard 0 and shard 1 were credited, before shards 2 and 3.
+            await balances.credit_once(accounts, shards, "k", [2.5, 2.5], "evt_1")
+            first = await balances.credit_once(accounts, shards, "k", [2.5] * 4, "evt_1")
+            again = await balances.credit_once(accounts, shards, "k", [2.5] * 4, "evt_1")
+            return first, again, await balances.load_account(accounts, shards, "k")
+
+        first, again, account = asyncio.run(scenario())
+        assert (first, again) == (False, False)
+        assert account["balance"] == 10.0
+
+
+@contextlib.contextmanager
+def _registry():
+    import registry.main as reg
+
+    storage = MemoryStorage()
+    with contextlib.ExitStack() as stack:
+        for attr, name in (("accounts_collection", "accounts"), ("balance_shards_collection", "balance_shards"),
+                           ("stripe_events_collection", "stripe_events"), ("usage_collection", "usage_logs")):
+            stack.enter_context(patch.object(reg, attr, getattr(storage, name)))
+        reg.account_cache.clear()
+        yield reg, storage
+
+
+async def _post_webhooks(reg, events):
+    """POST each event to /webhook concurrently; returns (status codes, per-request latencies)."""
+    transport = httpx.ASGITransport(app=reg.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://registry") as http:
+        async def post(event):
+            with patch.object(reg.stripe.Webhook, "construct_event", return_value=event):
+                t0 = time.perf_counter()
+                r = await http.post("/webhook", content=b"{}", headers={"stripe-signature": "sig"})
+                return r.status_code, time.perf_counter() - t0
+        results = await asyncio.gather(*[post(e) for e in events])
+    return [code for code, _ in results], [latency for _, latency in results]
+
+
+class TestWebhookPipeline:
+
+    def test_redelivered_event_credits_once(self):
+        async def scenario(reg, storage):
+            codes, _ = await _post_webhooks(reg, [_event("evt_1")] * 3 + [_event("evt_2", 500)])
+            await reg.topup_worker.drain()
+            account = await storage.accounts.find_one({"email": EMAIL})
+            events = await storage.stripe_events.find({}).to_list(None)
+            return codes, account, events
+
+        with _registry() as (reg, storage):
+            codes, account, events = asyncio.run(scenario(reg, storage))
+
+        assert codes == [200] * 4
+        assert account["balance"] == 15.0 and account["api_key"].startswith("aris_live_")
+        assert sorted(e["_id"] for e in events) == ["evt_1", "evt_2"]
+        assert all(e["status"] == "applied" and e["api_key"] == account["api_key"] for e in events)
+
+    def test_reprocessing_an_applied_event_is_a_no_op(self):
+        async def scenario(reg, storage):
+            await _post_webhooks(reg, [_event("evt_1")])
+            await reg.topup_worker.drain()
+            # e.g. a worker crashed after crediting, before marking the event applied
+            await storage.stripe_events.update_one({"_id": "evt_1"}, {"$set": {"status": "pending"}})
+            await reg.topup_worker.drain()
+            return await balances.load_account(storage.accounts, storage.balance_shards,
+                                               (await storage.accounts.find_one({"email": EMAIL}))["api_key"])
+
+        with _registry() as (reg, storage), patch.object(reg, "BALANCE_SHARDS", 4):
+            account = asyncio.run(scenario(reg, storage))
+
+        assert account["balance"] == 10.0
+        assert account["topup_events"] == ["evt_1"]
+
+    def test_failing_event_is_retried_then_marked_failed(self):
+        async def scenario(reg, storage):
+            await _post_webhooks(reg, [_event("evt_bad")])
+            for _ in range(reg.TOPUP_MAX_ATTEMPTS + 2):
+                await reg.topup_worker.drain()
+            return await storage.stripe_events.find_one({"_id": "evt_bad"})
+
+        with _registry() as (reg, storage), \
+             patch.object(reg, "_apply_topup", side_effect=RuntimeError("accounts unavailable")) as apply:
+            event = asyncio.run(scenario(reg, storage))
+
+        assert event["status"] == "failed" and event["attempts"] == reg.TOPUP_MAX_ATTEMPTS
+        assert event["last_error"] == "accounts unavailable"
+        assert apply.call_count == reg.TOPUP_MAX_ATTEMPTS
+
+    def test_webhook_acks_before_top_ups_are_applied(self):
+        slow_s = 0.05
+        emails = [f"buyer{i}@aris.ai" for i in range(40)]
+
+        async def scenario(reg, storage):
+            upsert = storage.accounts.find_one_and_update
+
+            async def slow_upsert(*args, **kwargs):
+                await asyncio.sleep(slow_s)
+                return await upsert(*args, **kwargs)
+
+            with patch.object(storage.accounts, "find_one_and_update", slow_upsert):
+                reg.topup_worker.start()
+                codes, latencies = await _post_webhooks(
+                    reg, [_event(f"evt_{i}", 100, email) for i, email in enumerate(emails)])
+                pending = await storage.stripe_events.count_documents({"status": "pending"})
+                await reg.topup_worker.stop()
+                await reg.topup_worker.drain()
+            balances_ = [(await storage.accounts.find_one({"email": e}))["balance"] for e in emails]
+            return codes, latencies, pending, balances_
+
+        with _registry() as (reg, storage):
+            codes, latencies, pending, balances_ = asyncio.run(scenario(reg, storage))
+
+        assert codes == [200] * len(emails)
+        # Applying the burst takes len(emails) * slow_s; acking does not wait for it.
+        assert max(latencies) < len(emails) * slow_s / 2
+        assert pending > 0
+        assert balances_ == [1.0] * len(emails)
+
+    def test_notify_wakes_worker_before_poll(self):
+        calls = []
+
+        async def process(batch_size):
+            calls.append(time.monotonic())
+            return 0
+
+        async def scenario():
+            worker = TopUpWorker(process, poll_interval=60)
+            worker.start()
+            await asyncio.sleep(0)
+            t0 = time.monotonic()
+            worker.notify()
+            for _ in range(100):
+                if calls:
+                    break
+                await asyncio.sleep(0.01)
+            await worker.stop()
+            return t0
+
+        t0 = asyncio.run(scenario())
+        assert len(calls) == 1 and calls[0] - t0 < 1
+
+
+class TestMultipleWorkers:
+
+    def test_racing_workers_claim_each_event_once(self):
+        async def scenario(reg, storage):
+            await _post_webhooks(reg, [_event(f"evt_{i}", 100) for i in range(5)])
+            apply = reg._apply_topup
+            applied = []
+
+            async def slow_apply(event):
+                applied.append(event["_id"])
+                await asyncio.sleep(0.01)
+                return await apply(event)
+
+            # Three workers polling the same store at once.
+            with patch.object(reg, "_apply_topup", slow_apply):
+                await asyncio.gather(*[reg._process_topups(10) for _ in range(3)])
+            return applied, await storage.accounts.find({"email": EMAIL}).to_list(None)
+
+        with _registry() as (reg, storage):
+            applied, accounts = asyncio.run(scenario(reg, storage))
+
+        assert sorted(applied) == [f"evt_{i}" for i in range(5)]
+        assert len(accounts) == 1 and accounts[0]["balance"] == 5.0
+
+    def test_expired_claim_is_taken_over(self):
+        async def scenario(reg, storage):
+            await _post_webhooks(reg, [_event("evt_live"), _event("evt_dead", 500)])
+            now = time.time()
+            # One claim is held by a live worker, the other by one that died a while ago.
+            await storage.stripe_events.update_one(
+                {"_id": "evt_live"}, {"$set": {"status": "processing", "lease_until": now + 60}})
+            await storage.stripe_events.update_one(
+                {"_id": "evt_dead"}, {"$set": {"status": "processing", "lease_until": now - 1}})
+            await reg.topup_worker.drain()
+            events = {e["_id"]: e["status"] for e in await storage.stripe_events.find({}).to_list(None)}
+            return events, await storage.accounts.find_one({"email": EMAIL})
+
+        with _registry() as (reg, storage):
+            events, account = asyncio.run(scenario(reg, storage))
+
+        assert events == {"evt_live": "processing", "evt_dead": "applied"}
+        assert account["balance"] == 5.0
+
+    def test_first_payment_race_creates_one_account(self):
+        async def scenario(reg, storage):
+            await reg._ensure_indexes()
+            # Accounts without an email don't collide on the partial unique index.
+            await storage.accounts.insert_many([{"api_key": "k1"}, {"api_key": "k2"}])
+            upsert = storage.accounts.find_one_and_update
+            calls = []
+
+            async def racing_upsert(query, *args, **kwargs):
+                calls.append(query)
+                if len(calls) == 1:
+                    # Another worker creates the account between our lookup and insert.
+                    await storage.accounts.insert_one({"email": EMAIL, "api_key": "aris_live_winner", "balance": 0.0})
+                    raise DuplicateKeyError("E11000 duplicate key error index: email_1")
+                return await upsert(query, *args, **kwargs)
+
+            await _post_webhooks(reg, [_event("evt_1")])
+            with patch.object(storage.accounts, "find_one_and_update", racing_upsert):
+                await reg.topup_worker.drain()
+            with pytest.raises(DuplicateKeyError):
+                await storage.accounts.insert_one({"email": EMAIL, "api_key": "aris_live_other"})
+            return calls, await storage.accounts.find({"email": EMAIL}).to_list(None)
+
+        with _registry() as (reg, storage):
+            calls, accounts = asyncio.run(scenario(reg, storage))
+
+        assert len(calls) == 2
+        assert [(a["api_key"], a["balance"]) for a in accounts] == [("aris_live_winner", 10.0)]
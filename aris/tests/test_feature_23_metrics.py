@@ -0,0 +1,179 @@
+"""
+Feature 23: Prometheus-style /metrics for the registry and nodes
+================================================================
+Test structure
+--------------
+METRIC UNIT TESTS
+    test_histogram_renders_cumulative_buckets
+    test_counter_labels_are_escaped_and_checked
+    test_callback_metrics_read_state_at_scrape
+
+MIDDLEWARE TESTS  (small FastAPI app)
+    test_routes_timed_by_template_and_status
+    test_streaming_response_timed_until_last_chunk
+
+SERVICE TESTS
+    test_registry_metrics_cover_routes_storage_and_discover
+    test_node_metrics_split_ollama_time_from_request_time
+"""
+
+import asyncio
+import time
+from unittest.mock import patch
+
+import httpx
+import jwt
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from aris_server.metrics import CONTENT_TYPE, Registry, install
+
+VALID_KEY = "aris_live_testkey123"
+
+
+def _sample(text, line_prefix):
+    """The value of the exposition line starting with *line_prefix*."""
+    for line in text.splitlines():
+        if line.startswith(line_prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{line_prefix!r} not in metrics output")
+
+
+class TestMetricTypes:
+
+    def test_histogram_renders_cumulative_buckets(self):
+        metrics = Registry()
+        latency = metrics.histogram("op_seconds", "Op latency.", ("op",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            latency.observe(value, "read")
+
+        assert metrics.render().splitlines() == [
+            "# HELP op_seconds Op latency.",
+            "# TYPE op_seconds histogram",
+            'op_seconds_bucket{op="read",le="0.1"} 2',
+            'op_seconds_bucket{op="read",le="1.0"} 3',
+            'op_seconds_bucket{op="read",le="+Inf"} 4',
+            'op_seconds_sum{op="read"} 3.65',
+            'op_seconds_count{op="read"} 4',
+        ]
+
+    def test_counter_labels_are_escaped_and_checked(self):
+        metrics = Registry()
+        errors = metrics.counter("errors_total", "Errors.", ("reason",))
+        errors.inc('bad "quote"\\n')
+        errors.inc('bad "quote"\\n', amount=2)
+
+        assert 'errors_total{reason="bad \\"quote\\"\\\\n"} 3.0' in metrics.render()
+        with pytest.raises(ValueError):
+            errors.inc()
+        with pytest.raises(ValueError):
+            metrics.counter("errors_total", "Again.")
+
+    def test_callback_metrics_read_state_at_scrape(self):
+        metrics = Registry()
+        state = {"depth": 1, "hits": 2, "misses": 5}
+        metrics.callback("queue_depth", "Queued.", lambda: state["depth"])
+        metrics.callback("cache_total", "Lookups.", lambda: {("hit",): state["hits"], ("miss",): state["misses"]},
+                         kind="counter", labelnames=("result",))
+        state["depth"] = 7
+
+        text = metrics.render()
+        assert "# TYPE cache_total counter" in text
+        assert _sample(text, "queue_depth") == 7
+        assert _sample(text, 'cache_total{result="miss"}') == 5
+
+
+class TestMiddleware:
+
+    def _app(self):
+        app, metrics = FastAPI(), Registry()
+        install(app, metrics)
+
+        @app.get("/items/{item_id}")
+        async def item(item_id: int):
+            return {"id": item_id}
+
+        @app.get("/stream")
+        async def stream():
+            async def chunks():
+                for _ in range(3):
+                    await asyncio.sleep(0.05)
+                    yield b"x"
+            return StreamingResponse(chunks())
+
+        return app
+
+    def test_routes_timed_by_template_and_status(self):
+        with TestClient(self._app()) as tc:
+            for i in range(3):
+                tc.get(f"/items/{i}")
+            tc.get("/items/oops")
+            tc.get("/nowhere")
+            tc.get("/metrics")
+            resp = tc.get("/metrics")
+
+        assert resp.headers["content-type"] == CONTENT_TYPE
+        text = resp.text
+        assert _sample(text, 'aris_http_requests_total{method="GET",route="/items/{item_id}",status="200"}') == 3
+        assert _sample(text, 'aris_http_requests_total{method="GET",route="/items/{item_id}",status="422"}') == 1
+        assert _sample(text, 'aris_http_requests_total{method="GET",route="<unmatched>",status="404"}') == 1
+        assert _sample(text, 'aris_http_requests_total{method="GET",route="/metrics",status="200"}') == 1
+        assert _sample(text, 'aris_http_request_duration_seconds_count{method="GET",route="/items/{item_id}"}') == 4
+        assert _sample(text, "aris_http_requests_in_flight") == 1        # the scrape itself
+
+    def test_streaming_response_timed_until_last_chunk(self):
+        with TestClient(self._app()) as tc:
+            assert tc.get("/stream").content == b"xxx"
+            text = tc.get("/metrics").text
+
+        assert _sample(text, 'aris_http_request_duration_seconds_sum{method="GET",route="/stream"}') >= 0.15
+
+
+class TestServiceMetrics:
+
+    def test_registry_metrics_cover_routes_storage_and_discover(self):
+        import registry.main as reg
+
+        with patch.object(reg, "HEARTBEAT_INTERVAL_S", 3600), TestClient(reg.app) as tc:
+            tc.portal.call(reg.accounts_collection.insert_one, {"api_key": VALID_KEY, "balance": 5.0})
+            tc.post("/register", json={"did": "did:aris:m", "endpoint": "http://m", "capabilities": ["ai.generate"]})
+            assert tc.post("/handshake", headers={"x-api-key": VALID_KEY}, json={
+                "payer_did": "did:aris:p", "target_did": "did:aris:m", "capability": "ai.generate",
+            }).status_code == 200
+            tc.get("/discover", params={"capability": "ai.generate"})
+            text = tc.get("/metrics").text
+            tc.portal.call(reg.accounts_collection.delete_many, {"api_key": VALID_KEY})
+
+        assert _sample(text, 'aris_http_requests_total{method="POST",route="/handshake",status="200"}') >= 1
+        assert _sample(text, 'aris_http_request_duration_seconds_count{method="POST",route="/handshake"}') >= 1
+        assert _sample(text, 'aris_dependency_duration_seconds_count'
+                             '{dependency="storage",operation="accounts.find_one_and_update"}') >= 1
+        assert _sample(text, 'aris_discover_lookups_total{source="index"}') >= 1
+        assert "aris_account_cache_lookups_total{result=\"hit\"}" in text
+
+    def test_node_metrics_split_ollama_time_from_request_time(self):
+        import agent_node.llm_agent as node
+
+        async def ollama(request: httpx.Request) -> httpx.Response:
+            if request.url.path == "/api/generate":
+                await asyncio.sleep(0.1)
+                return httpx.Response(200, json={"response": "hi", "done": True})
+            return httpx.Response(200, json={"status": "registered"})
+
+        backend = httpx.AsyncClient(transport=httpx.MockTransport(ollama))
+        token = jwt.encode({"sub": "did:aris:t", "aud": node.MY_DID, "exp": time.time() + 300},
+                           node.ARIS_PUBLIC_KEY, algorithm="HS256")
+        with patch("agent_node.llm_agent.httpx.AsyncClient", return_value=backend), TestClient(node.app) as tc:
+            before = tc.get("/metrics").text
+            resp = tc.post("/generate", json={"prompt": "x"}, headers={"x-aris-token": token})
+            text = tc.get("/metrics").text
+
+        assert resp.json()["status"] == "success"
+        ollama_key = 'aris_dependency_duration_seconds_sum{dependency="ollama",operation="generate"}'
+        route_key = 'aris_http_request_duration_seconds_sum{method="POST",route="/generate"}'
+        ollama_s = _sample(text, ollama_key) - (_sample(before, ollama_key) if ollama_key in before else 0)
+        route_s = _sample(text, route_key) - (_sample(before, route_key) if route_key in before else 0)
+        assert 0.1 <= ollama_s <= route_s
+        assert _sample(text, "aris_node_jobs_in_flight") == 0
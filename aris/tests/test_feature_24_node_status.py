@@ -0,0 +1,158 @@
+"""
+Feature 24: node /status with rolling stats, reported in the heartbeat
+=====================================================================
+Test structure
+--------------
+NODESTATS UNIT TESTS
+    test_outcomes_and_per_model_counts
+    test_latency_splits_backend_from_overhead
+    test_qps_counts_only_the_recent_window
+
+NODE TESTS  (llm node with a mocked Ollama, math node)
+    test_llm_node_status_reflects_jobs
+    test_heartbeat_load_reaches_discover
+    test_math_node_status
+"""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+
+from agent_node.stats import NodeStats
+
+
+class TestNodeStats:
+
+    def test_outcomes_and_per_model_counts(self):
+        stats = NodeStats()
+        with stats.track("tinyllama"):
+            pass
+        with stats.track("tinyllama") as job:
+            job.fail()
+        with pytest.raises(RuntimeError), stats.track("llama3"):
+            raise RuntimeError("backend down")
+        with stats.track():
+            pass
+
+        status = stats.status()
+        assert (status["jobs_completed"], status["jobs_failed"], status["in_flight"]) == (2, 2, 0)
+        assert status["models"] == {"tinyllama": {"completed": 1, "failed": 1},
+                                    "llama3": {"completed": 0, "failed": 1}}
+        assert status["last_job_at"].endswith("Z")
+
+    def test_latency_splits_backend_from_overhead(self):
+        stats = NodeStats()
+        with stats.track("m") as job:
+            with job.backend():
+                time.sleep(0.05)
+            time.sleep(0.01)
+
+        latency = stats.status()["latency"]
+        assert latency["backend"]["p50_ms"] >= 50
+        assert 10 <= latency["overhead"]["p50_ms"] < latency["backend"]["p50_ms"]
+        assert latency["total"]["p99_ms"] >= 60
+        assert stats.load()["p99_ms"] == latency["total"]["p99_ms"]
+
+    def test_qps_counts_only_the_recent_window(self, clock):
+        stats = NodeStats(qps_window=10, clock=clock)
+        for _ in range(20):
+            with stats.track():
+                pass
+        clock.now += 5                      # up 5 s: averaged over uptime
+        assert stats.qps() == 4.0
+        clock.now += 3
+        for _ in range(10):
+            with stats.track():
+                pass
+        clock.now += 5                      # the first 20 jobs are now older than the window
+        assert stats.qps() == 1.0
+        assert stats.status()["uptime_seconds"] == 13
+
+
+def _token(node):
+    return jwt.encode({"sub": "did:aris:t", "aud": node.MY_DID, "exp": time.time() + 300},
+                      node.ARIS_PUBLIC_KEY, algorithm="HS256")
+
+
+class TestNodeStatusEndpoint:
+
+    def test_llm_node_status_reflects_jobs(self):
+        import agent_node.llm_agent as node
+
+        async def ollama(request: httpx.Request) -> httpx.Response:
+            if request.url.path == "/api/generate":
+                await asyncio.sleep(0.05)
+                return httpx.Response(200, json={"response": "hi", "done": True})
+            if request.url.path == "/api/chat":
+                return httpx.Response(500, json={"error": "model not loaded"})
+            return httpx.Response(200, json={"status": "registered"})
+
+        backend = httpx.AsyncClient(transport=httpx.MockTransport(ollama))
+        headers = {"x-aris-token": _token(node)}
+        with patch.object(node, "node_stats", NodeStats()), \
+             patch("agent_node.llm_agent.httpx.AsyncClient", return_value=backend), TestClient(node.app) as tc:
+            for _ in range(3):
+                tc.post("/generate", json={"prompt": "x", "model": "tinyllama"}, headers=headers)
+            tc.post("/chat", json={"model": "llama3", "messages": [{"role": "user", "content": "x"}]},
+                    headers=headers)
+            status = tc.get("/status").json()
+
+        assert status["status"] == "active" and status["did"] == node.MY_DID
+        assert (status["jobs_completed"], status["jobs_failed"]) == (3, 1)
+        assert status["models"] == {"tinyllama": {"completed": 3, "failed": 0},
+                                    "llama3": {"completed": 0, "failed": 1}}
+        assert status["latency"]["backend"]["p95_ms"] >= 50
+        assert status["qps"] > 0
+
+    def test_heartbeat_load_reaches_discover(self, clock):
+        import agent_node.llm_agent as node
+        import registry.main as reg
+
+        stats = NodeStats(clock=clock)
+        with stats.track("tinyllama") as job:
+            with job.backend():
+                time.sleep(0.01)
+
+        registered = []
+
+        async def registry(request: httpx.Request) -> httpx.Response:
+            registered.append(request)
+            return httpx.Response(200, json={"status": "registered"})
+
+        backend = httpx.AsyncClient(transport=httpx.MockTransport(registry))
+        with patch.object(node, "node_stats", stats), \
+             patch("agent_node.llm_agent.httpx.AsyncClient", return_value=backend), TestClient(node.app):
+            for _ in range(100):
+                if registered:
+                    break
+                time.sleep(0.01)
+        heartbeat = registered[0].read()
+
+        agents = AsyncMock()
+        with patch.object(reg, "agents_collection", agents), patch.object(reg, "_sync_discovery", AsyncMock()), \
+             TestClient(reg.app) as tc:
+            reg.discovery.hydrated = True
+            tc.post("/register", content=heartbeat, headers={"content-type": "application/json"})
+            load = tc.get("/discover", params={"capability": "ai.generate"}).json()["agents"][0]["load"]
+
+        assert load == stats.load()
+        assert load["jobs_completed"] == 1 and load["p99_ms"] >= 10
+
+    def test_math_node_status(self):
+        import agent_node.math_agent as node
+
+        headers = {"x-aris-token": jwt.encode(
+            {"sub": "did:aris:t", "aud": node.MY_DID, "scope": "math.add", "exp": time.time() + 300},
+            node.ARIS_PUBLIC_KEY, algorithm="HS256")}
+        with patch.object(node, "node_stats", NodeStats()), TestClient(node.app) as tc:
+            assert tc.post("/execute", json={"a": 1, "b": 2, "operation": "add"}, headers=headers).json()["result"] == 3
+            tc.post("/execute", json={"a": 1, "b": 2, "operation": "mul"}, headers=headers)
+            status = tc.get("/status").json()
+
+        assert status["did"] == node.MY_DID
+        assert status["models"] == {"add": {"completed": 1, "failed": 0}, "mul": {"completed": 0, "failed": 1}}
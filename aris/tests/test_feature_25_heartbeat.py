@@ -0,0 +1,144 @@
+"""
+Feature 25: lightweight heartbeats with coalesced registry writes
+=================================================================
+Test structure
+--------------
+INDEX UNIT TESTS  (fake clock)
+    test_beat_requires_known_current_registration
+    test_beat_refreshes_liveness_and_load_in_memory
+    test_checkpoint_due_once_per_interval
+
+REGISTRY TESTS  (FastAPI TestClient, fake agents collection)
+    test_beats_between_checkpoints_do_not_write
+    test_unknown_node_is_asked_to_register
+
+END-TO-END  (node heartbeat loop against the registry app)
+    test_node_registers_once_then_beats_and_recovers_from_restart
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import httpx
+from fastapi.testclient import TestClient
+
+from registry.discovery import DiscoveryIndex, registration_version
+
+
+class TestBeat:
+
+    def test_beat_requires_known_current_registration(self, clock, make_agent):
+        index = DiscoveryIndex(clock=clock)
+        version = registration_version(make_agent("n1"))
+        assert index.beat("n1", version) is None
+
+        index.upsert(make_agent("n1"))
+        assert index.beat("n1", version) is False
+        index.upsert(make_agent("n1", ("ai.generate", "ai.chat")))
+        assert index.beat("n1", version) is None
+        assert index.beat("n1", registration_version(make_agent("n1", ("ai.generate", "ai.chat")))) is False
+
+    def test_beat_refreshes_liveness_and_load_in_memory(self, clock, make_agent):
+        index = DiscoveryIndex(heartbeat_interval=30, max_missed=3, checkpoint_interval=1000, clock=clock)
+        index.upsert(make_agent("n1"))
+        registered_at = clock.now
+        version = registration_version(make_agent("n1"))
+        for in_flight in range(5):
+            clock.now += 30
+            assert index.beat("n1", version, {"in_flight": in_flight}) is False
+
+        assert clock.now - registered_at > index.ttl
+        assert index.expire() == 0
+        assert index.lookup("ai.generate")[0]["load"] == {"in_flight": 4}
+
+    def test_checkpoint_due_once_per_interval(self, clock, make_agent):
+        index = DiscoveryIndex(heartbeat_interval=30, max_missed=3, clock=clock)
+        assert index.checkpoint_interval == 45
+        index.upsert(make_agent("n1"))
+        version = registration_version(make_agent("n1"))
+
+        due = []
+        for _ in range(6):
+            clock.now += 15
+            due.append(index.beat("n1", version))
+        assert due == [False, False, True, False, False, True]
+
+
+class TestHeartbeatEndpoint:
+
+    def _client(self, reg, agents):
+        return (patch.object(reg, "agents_collection", agents), patch.object(reg, "_sync_discovery", AsyncMock()))
+
+    def test_beats_between_checkpoints_do_not_write(self, make_agent):
+        import registry.main as reg
+
+        agents = AsyncMock()
+        registration = {**make_agent("did:aris:n1"), "load": None}
+        first, second = self._client(reg, agents)
+        with first, second, TestClient(reg.app) as tc:
+            reg.discovery.hydrated = True
+            version = tc.post("/register", json=registration).json()["version"]
+            for in_flight in range(10):
+                assert tc.post("/heartbeat", json={"did": "did:aris:n1", "version": version,
+                                                   "load": {"in_flight": in_flight}}).json() == {"status": "ok"}
+            load = tc.get("/discover", params={"capability": "ai.generate"}).json()["agents"][0]["load"]
+            writes_before_checkpoint = agents.update_one.await_count
+
+            with patch.object(reg.discovery, "checkpoint_interval", 0):
+                tc.post("/heartbeat", json={"did": "did:aris:n1", "version": version, "load": {"in_flight": 3}})
+
+        assert version == registration_version(registration)
+        assert load["in_flight"] == 9
+        assert writes_before_checkpoint == 1                      # the registration only
+        query, update = agents.update_one.await_args.args
+        assert query == {"did": "did:aris:n1"} and update["$set"]["load"]["in_flight"] == 3
+        assert "upsert" not in agents.update_one.await_args.kwargs
+
+    def test_unknown_node_is_asked_to_register(self):
+        import registry.main as reg
+
+        agents = AsyncMock()
+        first, second = self._client(reg, agents)
+        with first, second, TestClient(reg.app) as tc:
+            resp = tc.post("/heartbeat", json={"did": "did:aris:ghost", "version": "0" * 16})
+
+        assert resp.status_code == 409
+        agents.update_one.assert_not_awaited()
+
+
+class TestNodeHeartbeatLoop:
+
+    def test_node_registers_once_then_beats_and_recovers_from_restart(self):
+        import agent_node.llm_agent as node
+        import registry.main as reg
+
+        agents = AsyncMock()
+        seen = []
+
+        async def record(request):
+            seen.append(request.url.path)
+
+        registry_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=reg.app),
+                                            event_hooks={"request": [record]})
+
+        async def wait_for(n):
+            for _ in range(200):
+                if len(seen) >= n:
+                    return
+                await asyncio.sleep(0.01)
+
+        reg.discovery.clear()
+        with patch.object(reg, "agents_collection", agents), \
+             patch.object(node, "HEARTBEAT_INTERVAL_S", 0.01), \
+             patch("agent_node.llm_agent.httpx.AsyncClient", return_value=registry_client), \
+             TestClient(node.app) as tc:
+            tc.portal.call(wait_for, 10)
+            reg.discovery.clear()                                # registry restarted: node is unknown
+            tc.portal.call(wait_for, len(seen) + 10)
+        reg.discovery.clear()
+
+        assert seen[:3] == ["/register", "/heartbeat", "/heartbeat"]
+        restart = seen.index("/register", 1)
+        assert seen[restart - 1] == "/heartbeat" and seen[restart + 1] == "/heartbeat"
+        assert seen.count("/register") == 2
+        assert agents.update_one.await_count == 2
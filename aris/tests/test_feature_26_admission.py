@@ -0,0 +1,331 @@
+"""
+Feature 26: admission control on worker nodes, 429 failover in the SDK
+======================================================================
+Test structure
+--------------
+ADMISSION UNIT TESTS
+    test_slots_granted_in_fifo_order_within_limit
+    test_full_queue_rejects_with_retry_after
+    test_queue_timeout_and_cancelled_waiters_leave_no_trace
+    test_slot_granted_as_wait_times_out_is_not_leaked
+    test_per_model_limits
+
+NODE TESTS  (llm node over ASGI, mocked Ollama)
+    test_burst_beyond_capacity_is_shed_with_429
+    test_stream_holds_its_slot_until_finished
+
+SDK TESTS
+    test_sync_client_fails_over_on_429
+    test_async_client_fails_over_then_gives_up
+    test_async_client_keeps_busy_nodes_session
+"""
+
+import asyncio
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+import httpx
+import jwt
+import pytest
+
+from agent_node.admission import AdmissionController, Overloaded, parse_limits
+from agent_node.stats import NodeStats
+from aris import AsyncAris
+from aris.client import Aris, ArisOverloadedError, _BusyNodes
+
+VALID_KEY = "aris_live_testkey123"
+
+
+class TestAdmissionController:
+
+    def test_slots_granted_in_fifo_order_within_limit(self):
+        order, running, peak = [], [0], [0]
+
+        async def job(admission, i):
+            with await admission.acquire("m"):
+                order.append(i)
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+                await asyncio.sleep(0.01)
+                running[0] -= 1
+
+        async def scenario():
+            admission = AdmissionController(concurrency=2, max_queue=10)
+            tasks = []
+            for i in range(8):
+                tasks.append(asyncio.create_task(job(admission, i)))
+                await asyncio.sleep(0)
+            await asyncio.gather(*tasks)
+            return admission
+
+        admission = asyncio.run(scenario())
+        assert order == list(range(8))
+        assert peak[0] == 2
+        assert admission.snapshot() == {} and admission.queued == 0
+
+    def test_full_queue_rejects_with_retry_after(self):
+        stats = NodeStats()
+
+        async def scenario():
+            admission = AdmissionController(concurrency=1, max_queue=1, stats=stats)
+            slot = await admission.acquire("m")
+            waiter = asyncio.create_task(admission.acquire("m"))
+            await asyncio.sleep(0)
+            depth = stats.queue_depth
+            with pytest.raises(Overloaded) as exc:
+                await admission.acquire("m")
+            slot.release()
+            (await waiter).release()
+            return exc.value, depth, admission
+
+        error, depth, admission = asyncio.run(scenario())
+        assert error.retry_after >= 1 and "at capacity" in str(error)
+        assert depth == 1 and stats.queue_depth == 0
+        assert admission.rejected == 1
+
+    def test_queue_timeout_and_cancelled_waiters_leave_no_trace(self):
+        async def scenario():
+            admission = AdmissionController(concurrency=1, max_queue=5, queue_timeout=0.05)
+            slot = await admission.acquire("m")
+            with pytest.raises(Overloaded):
+                await admission.acquire("m")
+            cancelled = asyncio.create_task(admission.acquire("m"))
+            await asyncio.sleep(0)
+            cancelled.cancel()
+            await asyncio.gather(cancelled, return_exceptions=True)
+            assert admission.queued == 0
+            slot.release()
+            slot.release()                                   # idempotent
+            return admission
+
+        admission = asyncio.run(scenario())
+        assert admission.timed_out == 1
+        assert admission.snapshot() == {} and admission.queued == 0
+
+    def test_slot_granted_as_wait_times_out_is_not_leaked(self):
+        import agent_node.admission as admission_module
+
+        async def grant_then_time_out(waiter, timeout):
+            # The holder releases in the same tick as the timeout fires (asyncio.timeout on 3.12+).
+            holder.release()
+            assert waiter.done()
+            raise asyncio.TimeoutError
+
+        async def scenario():
+            nonlocal holder
+            admission = AdmissionController(concurrency=1, max_queue=5)
+            holder = await admission.acquire("m")
+            with patch.object(admission_module.asyncio, "wait_for", grant_then_time_out):
+                with pytest.raises(Overloaded):
+                    await admission.acquire("m")
+            return admission, admission.snapshot()
+
+        holder = None
+        admission, snapshot = asyncio.run(scenario())
+        assert admission.timed_out == 1
+        assert snapshot == {} and admission.queued == 0
+
+    def test_per_model_limits(self):
+        async def scenario():
+            admission = AdmissionController(concurrency=3, max_queue=0, limits=parse_limits("big=1, llama3:8b=2"))
+            slots = [await admission.acquire("small") for _ in range(3)]
+            slots.append(await admission.acquire("big"))
+            slots += [await admission.acquire("llama3:8b") for _ in range(2)]
+            for model in ("small", "big", "llama3:8b"):
+                with pytest.raises(Overloaded):
+                    await admission.acquire(model)
+            snapshot = admission.snapshot()
+            for slot in slots:
+                slot.release()
+            return snapshot
+
+        snapshot = asyncio.run(scenario())
+        assert {m: lane["limit"] for m, lane in snapshot.items()} == {"small": 3, "big": 1, "llama3:8b": 2}
+
+
+def _node_token(node):
+    return jwt.encode({"sub": "did:aris:t", "aud": node.MY_DID, "exp": time.time() + 300},
+                      node.ARIS_PUBLIC_KEY, algorithm="HS256")
+
+
+async def _ollama(request: httpx.Request) -> httpx.Response:
+    await asyncio.sleep(0.2)
+    if request.url.path == "/api/generate" and b'"stream": true' in request.content:
+        return httpx.Response(200, content=b'{"response": "hi", "done": true}\n')
+    return httpx.Response(200, json={"response": "hi", "done": True})
+
+
+class TestNodeAdmission:
+
+    def _patches(self, node, admission):
+        backend = httpx.AsyncClient(transport=httpx.MockTransport(_ollama))
+        return patch.object(node, "http_client", backend), patch.object(node, "admission", admission)
+
+    def test_burst_beyond_capacity_is_shed_with_429(self):
+        import agent_node.llm_agent as node
+
+        admission = AdmissionController(concurrency=1, max_queue=1, queue_timeout=5)
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=node.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://node") as http:
+                headers = {"x-aris-token": _node_token(node)}
+                responses = await asyncio.gather(*[
+                    http.post("/generate", json={"prompt": "x"}, headers=headers) for _ in range(4)])
+                status = (await http.get("/status")).json()
+            return responses, status
+
+        first, second = self._patches(node, admission)
+        with first, second:
+            t0 = time.perf_counter()
+            responses, status = asyncio.run(scenario())
+            elapsed = time.perf_counter() - t0
+
+        codes = sorted(r.status_code for r in responses)
+        assert codes == [200, 200, 429, 429]
+        shed = [r for r in responses if r.status_code == 429]
+        assert all(int(r.headers["Retry-After"]) >= 1 for r in shed)
+        assert elapsed < 0.6                                 # two served back to back; the rest not queued
+        assert admission.rejected == 2
+        assert status["admission"] == {} and status["queue_depth"] == 0
+
+    def test_stream_holds_its_slot_until_finished(self):
+        import agent_node.llm_agent as node
+
+        admission = AdmissionController(concurrency=1, max_queue=0)
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=node.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://node") as http:
+                headers = {"x-aris-token": _node_token(node)}
+                stream = asyncio.create_task(http.post("/generate", json={"prompt": "x", "stream": True},
+                                                       headers=headers))
+                await asyncio.sleep(0.05)
+                busy = await http.post("/generate", json={"prompt": "x"}, headers=headers)
+                streamed = await stream
+                after = await http.post("/generate", json={"prompt": "x"}, headers=headers)
+            return busy, streamed, after
+
+        first, second = self._patches(node, admission)
+        with first, second:
+            busy, streamed, after = asyncio.run(scenario())
+
+        assert busy.status_code == 429
+        assert streamed.text.splitlines()[-1].endswith('"status": "success", "model": "tinyllama"}')
+        assert after.status_code == 200
+        assert admission.snapshot() == {}
+
+
+def _agents(n):
+    return {"agents": [{"did": f"did:aris:n{i}", "endpoint": f"http://node-{i}:9006",
+                        "capabilities": ["ai.generate"]} for i in range(n)]}
+
+
+def _http(status, body, headers=None):
+    m = MagicMock()
+    m.status_code = status
+    m.json.return_value = body
+    m.text = str(body)
+    m.headers = headers or {}
+    return m
+
+
+class TestClientFailover:
+
+    def test_sync_client_fails_over_on_429(self):
+        handshakes, calls = [], []
+
+        def route_post(url, json=None, headers=None, timeout=None):
+            if url.endswith("/handshake"):
+                handshakes.append(json["target_did"])
+                return _http(200, {"session_token": f"tok-{json['target_did']}", "remaining_balance": 1.0})
+            calls.append(url)
+            if url.startswith("http://node-0"):
+                return _http(429, {"detail": "at capacity"}, {"Retry-After": "30"})
+            return _http(200, {"result": "ok", "status": "success"})
+
+        class FirstListed:
+            def select(self, agents):
+                return agents[0]
+
+            def observe(self, *args, **kwargs):
+                pass
+
+        with patch("requests.Session.get", return_value=_http(200, _agents(2))), \
+             patch("requests.Session.post", side_effect=route_post):
+            client = Aris(api_key=VALID_KEY, node_selector=FirstListed())
+            assert client.generate("hi") == "ok"
+            assert client.generate("again") == "ok"
+
+        assert handshakes == ["did:aris:n0", "did:aris:n1"]
+        assert calls == ["http://node-0:9006/generate", "http://node-1:9006/generate", "http://node-1:9006/generate"]
+        assert ("ai.generate", "did:aris:n0") in client._sessions      # kept for when node-0 frees up
+
+    def test_async_client_fails_over_then_gives_up(self):
+        node_calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path == "/discover":
+                return httpx.Response(200, json=_agents(3))
+            if request.url.path == "/handshake":
+                return httpx.Response(200, json={"session_token": "tok", "remaining_balance": 1.0})
+            node_calls.append(request.url.host)
+            return httpx.Response(429, json={"detail": "at capacity"}, headers={"Retry-After": "7"})
+
+        async def scenario():
+            http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            async with AsyncAris(api_key=VALID_KEY, http_client=http, max_failovers=1) as client:
+                with pytest.raises(ArisOverloadedError) as first:
+                    await client.generate("hi")
+                with pytest.raises(ArisOverloadedError) as second:
+                    await client.generate("hi")
+            return first.value, second.value
+
+        first, second = asyncio.run(scenario())
+        assert len(node_calls) == 3 and len(set(node_calls[:2])) == 2
+        assert first.retry_after == 7
+        # Two nodes are marked busy; the third is tried, then none is left to fail over to.
+        assert "at capacity" in str(second) and 0 < second.retry_after <= 7
+
+    def test_async_client_keeps_busy_nodes_session(self):
+        handshakes, calls = [], []
+        node0_busy = [True]
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path == "/discover":
+                return httpx.Response(200, json=_agents(2))
+            if request.url.path == "/handshake":
+                did = json.loads(request.content)["target_did"]
+                handshakes.append(did)
+                return httpx.Response(200, json={"session_token": f"tok-{did}", "remaining_balance": 1.0})
+            calls.append((request.url.host, request.headers["x-aris-token"]))
+            if request.url.host == "node-0" and node0_busy[0]:
+                return httpx.Response(429, json={"detail": "at capacity"}, headers={"Retry-After": "30"})
+            return httpx.Response(200, json={"result": "ok", "status": "success"})
+
+        class FirstListed:
+            def select(self, agents):
+                return agents[0]
+
+            def observe(self, *args, **kwargs):
+                pass
+
+        async def scenario():
+            http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            async with AsyncAris(api_key=VALID_KEY, http_client=http, node_selector=FirstListed()) as client:
+                assert await client.generate("hi") == "ok"
+                assert await client.generate("again") == "ok"
+                kept = ("ai.generate", "did:aris:n0") in client._sessions
+                # node-0 frees up and is picked again: its paid token is reused.
+                node0_busy[0] = False
+                client._busy = _BusyNodes()
+                client._active.clear()
+                assert await client.generate("back") == "ok"
+            return kept
+
+        kept = asyncio.run(scenario())
+        assert kept
+        assert handshakes == ["did:aris:n0", "did:aris:n1"]
+        assert calls == [("node-0", "tok-did:aris:n0"), ("node-1", "tok-did:aris:n1"),
+                         ("node-1", "tok-did:aris:n1"), ("node-0", "tok-did:aris:n0")]
@@ -0,0 +1,173 @@
+"""
+Feature 27: micro-batching of /generate for batch-capable backends
+==================================================================
+Test structure
+--------------
+BATCHER UNIT TESTS
+    test_concurrent_prompts_share_one_dispatch_in_order
+    test_keys_are_batched_separately
+    test_full_batch_dispatched_without_waiting_for_window
+    test_failed_dispatch_fails_every_prompt
+    test_cancelled_submitter_left_out_of_batch
+
+NODE TESTS  (llm node over ASGI, mocked completions backend)
+    test_concurrent_generates_become_one_completions_call
+    test_sampling_parameters_split_batches
+"""
+
+import asyncio
+import json
+import time
+from unittest.mock import patch
+
+import httpx
+import jwt
+import pytest
+
+from agent_node.admission import AdmissionController
+from agent_node.batching import MicroBatcher
+from agent_node.stats import NodeStats
+
+
+class _Recorder:
+    """Dispatch that records each batch and echoes its prompts."""
+
+    def __init__(self, delay=0.0, error=None):
+        self.calls = []
+        self.delay = delay
+        self.error = error
+
+    async def __call__(self, key, prompts):
+        self.calls.append((key, list(prompts)))
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return [f"{key}:{p}" for p in prompts]
+
+
+class TestMicroBatcher:
+
+    def test_concurrent_prompts_share_one_dispatch_in_order(self):
+        dispatch = _Recorder()
+
+        async def scenario():
+            batcher = MicroBatcher(dispatch, max_batch=16, window=0.02)
+            results = await asyncio.gather(*(batcher.submit("m", f"p{i}") for i in range(5)))
+            return results, batcher
+
+        results, batcher = asyncio.run(scenario())
+        assert results == [f"m:p{i}" for i in range(5)]
+        assert dispatch.calls == [("m", [f"p{i}" for i in range(5)])]
+        assert (batcher.batches, batcher.prompts) == (1, 5)
+
+    def test_keys_are_batched_separately(self):
+        dispatch = _Recorder()
+
+        async def scenario():
+            batcher = MicroBatcher(dispatch, window=0.02)
+            return await asyncio.gather(batcher.submit("a", "1"), batcher.submit("b", "2"), batcher.submit("a", "3"))
+
+        assert asyncio.run(scenario()) == ["a:1", "b:2", "a:3"]
+        assert sorted(dispatch.calls) == [("a", ["1", "3"]), ("b", ["2"])]
+
+    def test_full_batch_dispatched_without_waiting_for_window(self):
+        dispatch = _Recorder()
+
+        async def scenario():
+            batcher = MicroBatcher(dispatch, max_batch=3, window=10)
+            t0 = time.perf_counter()
+            results = await asyncio.wait_for(asyncio.gather(*(batcher.submit("m", str(i)) for i in range(6))), 1)
+            return results, time.perf_counter() - t0
+
+        results, elapsed = asyncio.run(scenario())
+        assert results == [f"m:{i}" for i in range(6)]
+        assert [prompts for _, prompts in dispatch.calls] == [["0", "1", "2"], ["3", "4", "5"]]
+        assert elapsed < 0.5
+
+    def test_failed_dispatch_fails_every_prompt(self):
+        async def short(key, prompts):
+            return ["only one"]
+
+        async def scenario(dispatch):
+            batcher = MicroBatcher(dispatch, window=0.01)
+            return await asyncio.gather(*(batcher.submit("m", str(i)) for i in range(3)), return_exceptions=True)
+
+        errors = asyncio.run(scenario(_Recorder(error=ValueError("backend down"))))
+        assert [str(e) for e in errors] == ["backend down"] * 3
+        errors = asyncio.run(scenario(short))
+        assert all(isinstance(e, RuntimeError) and "1 completions for 3 prompts" in str(e) for e in errors)
+
+    def test_cancelled_submitter_left_out_of_batch(self):
+        dispatch = _Recorder()
+
+        async def scenario():
+            batcher = MicroBatcher(dispatch, window=0.05)
+            gone = asyncio.create_task(batcher.submit("m", "gone"))
+            kept = asyncio.create_task(batcher.submit("m", "kept"))
+            await asyncio.sleep(0)
+            gone.cancel()
+            result = await kept
+            with pytest.raises(asyncio.CancelledError):
+                await gone
+            return result, batcher
+
+        result, batcher = asyncio.run(scenario())
+        assert result == "m:kept"
+        assert dispatch.calls == [("m", ["kept"])]
+        assert batcher.prompts == 1
+
+
+def _node_token(node):
+    return jwt.encode({"sub": "did:aris:t", "aud": node.MY_DID, "exp": time.time() + 300},
+                      node.ARIS_PUBLIC_KEY, algorithm="HS256")
+
+
+class TestNodeBatching:
+
+    def _run(self, bodies):
+        import agent_node.llm_agent as node
+
+        upstream = []
+
+        async def completions(request: httpx.Request) -> httpx.Response:
+            body = json.loads(request.content)
+            upstream.append(body)
+            await asyncio.sleep(0.05)
+            # Out of order on purpose: the node sorts choices by index.
+            choices = [{"index": i, "text": f"re:{p}"} for i, p in enumerate(body["prompt"])]
+            return httpx.Response(200, json={"choices": choices[::-1]})
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=node.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://node") as http:
+                headers = {"x-aris-token": _node_token(node)}
+                responses = await asyncio.gather(*(http.post("/generate", json=b, headers=headers) for b in bodies))
+                status = (await http.get("/status")).json()
+            return [r.json() for r in responses], status
+
+        backend = httpx.AsyncClient(transport=httpx.MockTransport(completions))
+        batcher = MicroBatcher(node._complete_batch, max_batch=16, window=0.02)
+        with patch.object(node, "http_client", backend), patch.object(node, "batcher", batcher), \
+             patch.object(node, "BATCH_URL", "http://vllm:8000/v1/completions"), \
+             patch.object(node, "admission", AdmissionController(concurrency=32, max_queue=0)), \
+             patch.object(node, "node_stats", NodeStats()):
+            responses, status = asyncio.run(scenario())
+        return responses, status, upstream
+
+    def test_concurrent_generates_become_one_completions_call(self):
+        responses, status, upstream = self._run([{"prompt": f"q{i}", "max_tokens": 32} for i in range(5)])
+
+        assert responses == [{"result": f"re:q{i}", "status": "success"} for i in range(5)]
+        assert upstream == [{"model": "tinyllama", "prompt": [f"q{i}" for i in range(5)], "max_tokens": 32}]
+        assert status["batching"] == {"batches": 1, "prompts": 5}
+        assert status["jobs_completed"] == 5
+
+    def test_sampling_parameters_split_batches(self):
+        bodies = [{"prompt": "a"}, {"prompt": "b", "temperature": 0.2}, {"prompt": "c"},
+                  {"prompt": "d", "model": "llama3"}]
+        responses, _, upstream = self._run(bodies)
+
+        assert [r["result"] for r in responses] == ["re:a", "re:b", "re:c", "re:d"]
+        assert sorted((u["prompt"], u["model"], u.get("temperature")) for u in upstream) == [
+            (["a", "c"], "tinyllama", None), (["b"], "tinyllama", 0.2), (["d"], "llama3", None),
+        ]
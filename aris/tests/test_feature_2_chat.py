@@ -250,7 +250,7 @@ class TestNodeChat:
 # SDK client unit tests
 # ──────────────────────────────────────────────────────────────────────────────
 
-from aris.client import Aris, ArisAuthError, ArisError, ArisNodeError, Conversation
+from aris.client import Aris, ArisAuthError, ArisError, ArisNodeError, Conversation, _Session
 from aris.client import chat as sdk_chat
 
 
@@ -265,9 +265,7 @@ def _mock_http(status: int, body: dict) -> MagicMock:
 def _connected_client(capability: str = "ai.chat") -> Aris:
     """Return an Aris client that's already 'connected' (skip _connect_to_swarm)."""
     client = Aris(api_key=VALID_KEY)
-    client.session_token = "fake-session-token"
-    client.target_endpoint = "http://localhost:9006"
-    client._session_capability = capability
+    client._active[capability] = _Session(token="fake-session-token", endpoint="http://localhost:9006")
     return client
 
 
@@ -275,7 +273,7 @@ class TestClientChat:
 
     def test_client_chat_success(self):
         payload = {"role": "assistant", "content": "Paris.", "model": "tinyllama", "status": "success"}
-        with patch("requests.post", return_value=_mock_http(200, payload)) as mock_post:
+        with patch("requests.Session.post", return_value=_mock_http(200, payload)) as mock_post:
             client = _connected_client()
             result = client.chat([{"role": "user", "content": "Capital of France?"}])
 
@@ -302,12 +300,10 @@ class TestClientChat:
         success_payload = {"role": "assistant", "content": "ok", "model": "tinyllama", "status": "success"}
 
         def fake_connect(self_inner, capability="ai.chat"):
-            self_inner.session_token = "new-session-token"
-            self_inner.target_endpoint = "http://localhost:9006"
-            self_inner._session_capability = capability
+            return _Session(token="new-session-token", endpoint="http://localhost:9006")
 
         with patch.object(Aris, "_connect_to_swarm", fake_connect):
-            with patch("requests.post", side_effect=[
+            with patch("requests.Session.post", side_effect=[
                 _mock_http(401, {"detail": "expired"}),   # first call → _TokenExpiredError
                 _mock_http(200, success_payload),          # retry succeeds
             ]) as mock_post:
@@ -320,12 +316,10 @@ class TestClientChat:
     def test_client_chat_500_does_not_retry(self):
         """A 500 from the node should raise ArisNodeError immediately, not retry."""
         def fake_connect(self_inner, capability="ai.chat"):
-            self_inner.session_token = "tok"
-            self_inner.target_endpoint = "http://localhost:9006"
-            self_inner._session_capability = capability
+            return _Session(token="tok", endpoint="http://localhost:9006")
 
         with patch.object(Aris, "_connect_to_swarm", fake_connect):
-            with patch("requests.post", return_value=_mock_http(500, {"detail": "server error"})) as mock_post:
+            with patch("requests.Session.post", return_value=_mock_http(500, {"detail": "server error"})) as mock_post:
                 client = _connected_client()
                 with pytest.raises(ArisNodeError):
                     client.chat([{"role": "user", "content": "hi"}])
@@ -334,14 +328,14 @@ class TestClientChat:
         assert mock_post.call_count == 1
 
     def test_client_chat_node_error_raises_node_error(self):
-        with patch("requests.post", return_value=_mock_http(500, {"detail": "kaboom"})):
+        with patch("requests.Session.post", return_value=_mock_http(500, {"detail": "kaboom"})):
             client = _connected_client()
             with pytest.raises(ArisNodeError):
                 client.chat([{"role": "user", "content": "hi"}])
 
     def test_client_chat_network_error_raises_node_error(self):
         import requests as req_lib
-        with patch("requests.post", side_effect=req_lib.RequestException("refused")):
+        with patch("requests.Session.post", side_effect=req_lib.RequestException("refused")):
             client = _connected_client()
             with pytest.raises(ArisNodeError):
                 client.chat([{"role": "user", "content": "hi"}])
@@ -350,11 +344,9 @@ class TestClientChat:
         payload = {"role": "assistant", "content": "4", "model": "tinyllama", "status": "success"}
 
         def _stub_connect(self, capability):
-            self.session_token = "tok"
-            self.target_endpoint = "http://localhost:9006"
-            self._session_capability = capability
+            return _Session(token="tok", endpoint="http://localhost:9006")
 
-        with patch("requests.post", return_value=_mock_http(200, payload)):
+        with patch("requests.Session.post", return_value=_mock_http(200, payload)):
             with patch.object(Aris, "_connect_to_swarm", _stub_connect):
                 result = sdk_chat([{"role": "user", "content": "2+2?"}], api_key=VALID_KEY)
 
@@ -391,8 +383,8 @@ class TestHandshakeCapabilityRouting:
                 return _mock_http(200, node_payload)
             raise AssertionError(f"unexpected POST {url}")
 
-        with patch("requests.get", return_value=self._discover_ok()) as mock_get:
-            with patch("requests.post", side_effect=route_post):
+        with patch("requests.Session.get", return_value=self._discover_ok()) as mock_get:
+            with patch("requests.Session.post", side_effect=route_post):
                 client = Aris(api_key=VALID_KEY)
                 client.chat([{"role": "user", "content": "hello"}])
 
@@ -410,8 +402,8 @@ class TestHandshakeCapabilityRouting:
                 return _mock_http(200, {"result": "OK", "status": "success"})
             raise AssertionError(f"unexpected POST {url}")
 
-        with patch("requests.get", return_value=self._discover_ok()):
-            with patch("requests.post", side_effect=route_post):
+        with patch("requests.Session.get", return_value=self._discover_ok()):
+            with patch("requests.Session.post", side_effect=route_post):
                 client = Aris(api_key=VALID_KEY)
                 assert client.generate("ping") == "OK"
 
@@ -585,7 +577,7 @@ class TestE2EChatFlow:
 
         sdk_client = _connected_client()
         token = _make_node_token()
-        sdk_client.session_token = token
+        sdk_client._active["ai.chat"] = _Session(token=token, endpoint="http://localhost:9006")
 
         with patch("agent_node.llm_agent.httpx.AsyncClient", return_value=mock_http):
             with TestClient(node.app) as node_tc:
@@ -606,7 +598,7 @@ class TestE2EChatFlow:
 
     def test_e2e_single_turn_chat_flow(self):
         with self._make_e2e_setup(["4"]) as (client, sdk_post):
-            with patch("requests.post", side_effect=sdk_post):
+            with patch("requests.Session.post", side_effect=sdk_post):
                 result = client.chat([{"role": "user", "content": "What is 2+2?"}])
 
         assert result["role"]    == "assistant"
@@ -616,7 +608,7 @@ class TestE2EChatFlow:
     def test_e2e_multi_turn_conversation_flow(self):
         replies = ["Nice to meet you, Sid!", "Your name is Sid."]
         with self._make_e2e_setup(replies) as (client, sdk_post):
-            with patch("requests.post", side_effect=sdk_post):
+            with patch("requests.Session.post", side_effect=sdk_post):
                 conv = client.conversation()
                 r1 = conv.say("My name is Sid.")
                 r2 = conv.say("What is my name?")
@@ -630,7 +622,7 @@ class TestE2EChatFlow:
     def test_e2e_system_prompt_preserved_across_turns(self):
         replies = ["Arrr, ahoy!", "Arrr, your name be Sid, matey!"]
         with self._make_e2e_setup(replies) as (client, sdk_post):
-            with patch("requests.post", side_effect=sdk_post):
+            with patch("requests.Session.post", side_effect=sdk_post):
                 conv = client.conversation(system_prompt="You are a pirate.")
                 conv.say("Greet me.")
                 conv.say("What is my name? My name is Sid.")
@@ -0,0 +1,172 @@
+"""
+Feature 3: single-round-trip, overdraft-proof /handshake billing
+================================================================
+Test structure
+--------------
+REGISTRY UNIT TESTS  (mocked motor collections)
+    test_handshake_debits_with_one_conditional_update
+    test_handshake_invalid_key_returns_403
+    test_handshake_usage_write_is_off_the_critical_path
+
+CONCURRENCY TESTS  (in-memory atomic collection, many handshakes in flight)
+    test_concurrent_handshakes_never_overdraw
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+from fastapi.testclient import TestClient
+
+VALID_KEY   = "aris_live_testkey123"
+INVALID_KEY = "aris_live_badkey999"
+HANDSHAKE_BODY = {
+    "payer_did":  "did:aris:test-payer",
+    "target_did": "did:aris:test-node",
+    "capability": "ai.generate",
+}
+
+
+class _AtomicAccounts:
+    """Minimal stand-in for a Mongo collection: each operation is atomic, with a yield before it."""
+
+    def __init__(self, balance: float):
+        self.doc = {"api_key": VALID_KEY, "email": "test@aris.ai", "balance": balance}
+        self.debits = 0
+
+    async def find_one_and_update(self, query, update, **kw):
+        await asyncio.sleep(0)  # simulated network round trip
+        if query.get("api_key") != self.doc["api_key"]:
+            return None
+        if self.doc["balance"] < query["balance"]["$gte"]:
+            return None
+        self.doc["balance"] = round(self.doc["balance"] + update["$inc"]["balance"], 6)
+        self.debits += 1
+        return dict(self.doc)
+
+    async def find_one(self, query, *a, **kw):
+        await asyncio.sleep(0)
+        return dict(self.doc) if query.get("api_key") == self.doc["api_key"] else None
+
+
+class TestAtomicHandshake:
+
+    def test_handshake_debits_with_one_conditional_update(self):
+        import registry.main as reg
+
+        mock_accounts = MagicMock()
+        mock_accounts.find_one_and_update = AsyncMock(
+            return_value={"api_key": VALID_KEY, "email": "test@aris.ai", "balance": 4.9}
+        )
+        mock_accounts.find_one   = AsyncMock()
+        mock_accounts.update_one = AsyncMock()
+        mock_usage = MagicMock()
+        mock_usage.insert_many = AsyncMock(return_value=None)
+
+        with (
+            patch.object(reg, "accounts_collection", mock_accounts),
+            patch.object(reg, "usage_collection",    mock_usage),
+        ):
+            with TestClient(reg.app) as tc:
+                resp = tc.post("/handshake", json=HANDSHAKE_BODY, headers={"x-api-key": VALID_KEY})
+
+        assert resp.status_code == 200
+        assert resp.json()["remaining_balance"] == 4.9
+
+        mock_accounts.find_one_and_update.assert_awaited_once()
+        query, update = mock_accounts.find_one_and_update.call_args[0]
+        assert query == {"api_key": VALID_KEY, "balance": {"$gte": reg.HANDSHAKE_COST_USD}}
+        assert update == {"$inc": {"balance": -reg.HANDSHAKE_COST_USD}}
+        # Hot path: no separate read or second write against accounts.
+        mock_accounts.find_one.assert_not_awaited()
+        mock_accounts.update_one.assert_not_awaited()
+
+        logged = mock_usage.insert_many.call_args[0][0][0]
+        assert logged["balance_before"] == 5.0
+        assert logged["balance_after"]  == 4.9
+
+    def test_handshake_invalid_key_returns_403(self):
+        import registry.main as reg
+
+        accounts = _AtomicAccounts(balance=5.0)
+        mock_usage = MagicMock()
+        mock_usage.insert_many = AsyncMock(return_value=None)
+
+        with (
+            patch.object(reg, "accounts_collection", accounts),
+            patch.object(reg, "usage_collection",    mock_usage),
+        ):
+            with TestClient(reg.app) as tc:
+                resp = tc.post("/handshake", json=HANDSHAKE_BODY, headers={"x-api-key": INVALID_KEY})
+
+        assert resp.status_code == 403
+        assert accounts.doc["balance"] == 5.0
+        mock_usage.insert_many.assert_not_awaited()
+
+    def test_handshake_usage_write_is_off_the_critical_path(self):
+        """The response must not wait for the usage write; stopping the writer drains it."""
+        import registry.main as reg
+
+        accounts = _AtomicAccounts(balance=5.0)
+        release = None
+        written = []
+
+        async def slow_insert_many(docs, **kw):
+            await release.wait()
+            written.extend(docs)
+
+        mock_usage = MagicMock()
+        mock_usage.insert_many = slow_insert_many
+
+        async def scenario():
+            nonlocal release
+            release = asyncio.Event()
+            transport = httpx.ASGITransport(app=reg.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://registry") as http:
+                resp = await http.post("/handshake", json=HANDSHAKE_BODY, headers={"x-api-key": VALID_KEY})
+            assert resp.status_code == 200
+            assert written == []  # answered before the log write completed
+            release.set()
+            await reg.usage_writer.stop()
+
+        with (
+            patch.object(reg, "accounts_collection", accounts),
+            patch.object(reg, "usage_collection",    mock_usage),
+        ):
+            asyncio.run(scenario())
+
+        assert len(written) == 1
+
+
+class TestHandshakeConcurrency:
+
+    def test_concurrent_handshakes_never_overdraw(self):
+        """50 simultaneous handshakes against $1.00 → exactly 10 succeed, balance ends at 0."""
+        import registry.main as reg
+
+        accounts = _AtomicAccounts(balance=1.0)
+        mock_usage = MagicMock()
+        mock_usage.insert_many = AsyncMock(return_value=None)
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=reg.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://registry") as http:
+                responses = await asyncio.gather(*[
+                    http.post("/handshake", json=HANDSHAKE_BODY, headers={"x-api-key": VALID_KEY})
+                    for _ in range(50)
+                ])
+            await reg.usage_writer.stop()
+            return [r.status_code for r in responses]
+
+        with (
+            patch.object(reg, "accounts_collection", accounts),
+            patch.object(reg, "usage_collection",    mock_usage),
+        ):
+            statuses = asyncio.run(scenario())
+
+        assert statuses.count(200) == 10
+        assert statuses.count(402) == 40
+        assert accounts.debits == 10
+        assert accounts.doc["balance"] >= 0
+        logged = [doc for call in mock_usage.insert_many.call_args_list for doc in call[0][0]]
+        assert len(logged) == 10
@@ -0,0 +1,191 @@
+"""
+Feature 4: in-process API-key → account cache in the registry
+=============================================================
+Test structure
+--------------
+CACHE UNIT TESTS  (fake clock)
+    test_hit_and_miss_counters
+    test_entries_expire_after_ttl
+    test_lru_evicts_least_recently_used
+    test_invalid_keys_cached_separately
+    test_invalidate_drops_both_tables
+
+REGISTRY TESTS  (FastAPI TestClient, mocked motor collections)
+    test_repeat_balance_calls_hit_mongo_once
+    test_repeat_invalid_key_hits_mongo_once
+    test_handshake_rejects_cached_invalid_key_without_mongo
+    test_handshake_writes_through_post_debit_balance
+    test_webhook_top_up_invalidates_cached_account
+"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi.testclient import TestClient
+
+from registry.account_cache import AccountCache, MISSING
+
+VALID_KEY   = "aris_live_testkey123"
+INVALID_KEY = "aris_live_badkey999"
+ACCOUNT     = {"api_key": VALID_KEY, "email": "test@aris.ai", "balance": 5.0, "created_at": 1700000000.0}
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# AccountCache unit tests
+# ──────────────────────────────────────────────────────────────────────────────
+
+class TestAccountCache:
+
+    def test_hit_and_miss_counters(self, clock):
+        cache = AccountCache(clock=clock)
+        assert cache.get(VALID_KEY) is MISSING
+        cache.put(VALID_KEY, ACCOUNT)
+        assert cache.get(VALID_KEY) == ACCOUNT
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_entries_expire_after_ttl(self, clock):
+        cache = AccountCache(ttl=5, clock=clock)
+        cache.put(VALID_KEY, ACCOUNT)
+        clock.now += 4.9
+        assert cache.get(VALID_KEY) == ACCOUNT
+        clock.now += 0.2
+        assert cache.get(VALID_KEY) is MISSING
+        assert len(cache) == 0
+
+    def test_lru_evicts_least_recently_used(self, clock):
+        cache = AccountCache(max_entries=2, clock=clock)
+        cache.put("a", {"api_key": "a"})
+        cache.put("b", {"api_key": "b"})
+        cache.get("a")                      # "b" is now least recently used
+        cache.put("c", {"api_key": "c"})
+        assert cache.get("b") is MISSING
+        assert cache.get("a") is not MISSING
+        assert cache.stats()["evictions"] == 1
+
+    def test_invalid_keys_cached_separately(self, clock):
+        cache = AccountCache(negative_ttl=2, max_entries=1, max_negative_entries=2, clock=clock)
+        cache.put(VALID_KEY, ACCOUNT)
+        for i in range(10):                 # brute-force misses must not evict real accounts
+            cache.put(f"guess-{i}", None)
+        assert cache.get(VALID_KEY) == ACCOUNT
+        assert cache.get("guess-9") is None
+        assert cache.stats()["negative_hits"] == 1
+        clock.now += 2.1
+        assert cache.get("guess-9") is MISSING
+
+    def test_invalidate_drops_both_tables(self, clock):
+        cache = AccountCache(clock=clock)
+        cache.put(VALID_KEY, ACCOUNT)
+        cache.put(INVALID_KEY, None)
+        cache.invalidate(VALID_KEY)
+        cache.invalidate(INVALID_KEY)
+        assert cache.get(VALID_KEY) is MISSING
+        assert cache.get(INVALID_KEY) is MISSING
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Registry integration
+# ──────────────────────────────────────────────────────────────────────────────
+
+def _mock_accounts(account=ACCOUNT):
+    mock = MagicMock()
+    mock.find_one = AsyncMock(
+        side_effect=lambda q, *a, **kw: dict(account) if q.get("api_key") == account["api_key"] else None
+    )
+    mock.find_one_and_update = AsyncMock(return_value={**account, "balance": account["balance"] - 0.10})
+    return mock
+
+
+class TestRegistryAccountCache:
+
+    def test_repeat_balance_calls_hit_mongo_once(self):
+        import registry.main as reg
+
+        mock_accounts = _mock_accounts()
+        with patch.object(reg, "accounts_collection", mock_accounts):
+            with TestClient(reg.app) as tc:
+                before = reg.account_cache.stats()
+                for _ in range(5):
+                    resp = tc.get("/balance", headers={"x-api-key": VALID_KEY})
+                    assert resp.status_code == 200
+                after = reg.account_cache.stats()
+
+        assert mock_accounts.find_one.await_count == 1
+        assert after["hits"] - before["hits"] == 4
+        assert after["misses"] - before["misses"] == 1
+
+    def test_repeat_invalid_key_hits_mongo_once(self):
+        import registry.main as reg
+
+        mock_accounts = _mock_accounts()
+        with patch.object(reg, "accounts_collection", mock_accounts):
+            with TestClient(reg.app) as tc:
+                for _ in range(5):
+                    assert tc.get("/usage", headers={"x-api-key": INVALID_KEY}).status_code == 403
+
+        assert mock_accounts.find_one.await_count == 1
+
+    def test_handshake_rejects_cached_invalid_key_without_mongo(self):
+        import registry.main as reg
+
+        mock_accounts = _mock_accounts()
+        body = {"payer_did": "x", "target_did": "y", "capability": "ai.generate"}
+        with patch.object(reg, "accounts_collection", mock_accounts):
+            with TestClient(reg.app) as tc:
+                assert tc.get("/balance", headers={"x-api-key": INVALID_KEY}).status_code == 403
+                resp = tc.post("/handshake", json=body, headers={"x-api-key": INVALID_KEY})
+
+        assert resp.status_code == 403
+        mock_accounts.find_one_and_update.assert_not_awaited()
+
+    def test_handshake_writes_through_post_debit_balance(self):
+        import registry.main as reg
+
+        mock_accounts = _mock_accounts()
+        mock_usage = MagicMock()
+        mock_usage.insert_one = AsyncMock(return_value=None)
+        body = {"payer_did": "x", "target_did": "y", "capability": "ai.generate"}
+        with (
+            patch.object(reg, "accounts_collection", mock_accounts),
+            patch.object(reg, "usage_collection",    mock_usage),
+        ):
+            with TestClient(reg.app) as tc:
+                assert tc.post("/handshake", json=body, headers={"x-api-key": VALID_KEY}).status_code == 200
+                resp = tc.get("/balance", headers={"x-api-key": VALID_KEY})
+
+        assert resp.json()["balance_usd"] == 4.9
+        mock_accounts.find_one.assert_not_awaited()
+
+    def test_webhook_top_up_invalidates_cached_account(self):
+        import registry.main as reg
+
+        db_account = dict(ACCOUNT)
+        mock_accounts = MagicMock()
+        mock_accounts.find_one = AsyncMock(side_effect=lambda q, *a, **kw: dict(db_account))
+
+        async def top_up(query, update, **kw):
+            if query["topup_events"]["$ne"] in db_account.setdefault("topup_events", []):
+                return MagicMock(modified_count=0)
+            db_account["topup_events"].append(query["topup_events"]["$ne"])
+            db_account["balance"] += update["$inc"]["balance"]
+            return MagicMock(modified_count=1)
+
+        mock_accounts.find_one_and_update = AsyncMock(return_value=dict(db_account))
+        mock_accounts.update_one = AsyncMock(side_effect=top_up)
+        event = {
+            "id": "evt_cache_invalidation",
+            "type": "checkout.session.completed",
+            "data": {"object": {"customer_details": {"email": ACCOUNT["email"]}, "amount_total": 2000}},
+        }
+
+        with (
+            patch.object(reg, "accounts_collection", mock_accounts),
+            patch.object(reg.stripe.Webhook, "construct_event", return_value=event),
+        ):
+            with TestClient(reg.app) as tc:
+                assert tc.get("/balance", headers={"x-api-key": VALID_KEY}).json()["balance_usd"] == 5.0
+                assert tc.post("/webhook", content=b"{}", headers={"stripe-signature": "sig"}).status_code == 200
+                tc.portal.call(reg.topup_worker.drain)
+                resp = tc.get("/balance", headers={"x-api-key": VALID_KEY})
+
+        assert resp.json()["balance_usd"] == 25.0
@@ -0,0 +1,201 @@
+"""
+Feature 5: batched asynchronous usage-log writer
+================================================
+Test structure
+--------------
+WRITER UNIT TESTS  (fake async sink, real event loop)
+    test_flushes_when_batch_size_reached
+    test_flushes_after_interval_when_batch_not_full
+    test_full_queue_applies_backpressure
+    test_stop_drains_queued_events
+    test_failed_write_is_retried
+    test_flush_waits_for_prior_events_only
+
+REGISTRY TESTS
+    test_lifespan_starts_and_drains_writer
+    test_retry_after_partial_insert_writes_each_event_once
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi.testclient import TestClient
+
+from registry.storage.memory import MemoryStorage
+from registry.usage_writer import UsageWriter
+
+
+class _Sink:
+    def __init__(self, fail_times: int = 0, gate: asyncio.Event = None):
+        self.batches = []
+        self.fail_times = fail_times
+        self.gate = gate
+
+    async def __call__(self, batch):
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.fail_times:
+            self.fail_times -= 1
+            raise ConnectionError("mongo unavailable")
+        self.batches.append(list(batch))
+
+
+class TestUsageWriter:
+
+    def test_flushes_when_batch_size_reached(self):
+        sink = _Sink()
+
+        async def scenario():
+            writer = UsageWriter(sink, max_batch=10, flush_interval=60)
+            for i in range(25):
+                await writer.submit({"n": i})
+            await asyncio.sleep(0.05)
+            full_batches = [len(b) for b in sink.batches]
+            await writer.stop()
+            return full_batches
+
+        full_batches = asyncio.run(scenario())
+        assert full_batches == [10, 10]          # size threshold, no waiting for the interval
+        assert [len(b) for b in sink.batches] == [10, 10, 5]
+
+    def test_flushes_after_interval_when_batch_not_full(self):
+        sink = _Sink()
+
+        async def scenario():
+            writer = UsageWriter(sink, max_batch=100, flush_interval=0.05)
+            await writer.submit({"n": 1})
+            await writer.submit({"n": 2})
+            await asyncio.sleep(0.2)
+            written = list(sink.batches)
+            await writer.stop()
+            return written
+
+        assert asyncio.run(scenario()) == [[{"n": 1}, {"n": 2}]]
+
+    def test_full_queue_applies_backpressure(self):
+        async def scenario():
+            gate = asyncio.Event()
+            sink = _Sink(gate=gate)
+            writer = UsageWriter(sink, max_batch=2, flush_interval=0, max_queue=2)
+            # Flusher takes the first batch and blocks in the sink; the queue then fills.
+            for i in range(4):
+                await writer.submit({"n": i})
+            blocked = asyncio.create_task(writer.submit({"n": 4}))
+            await asyncio.sleep(0.05)
+            was_blocked = not blocked.done()
+            gate.set()
+            await blocked
+            await writer.stop()
+            return was_blocked, sink
+
+        was_blocked, sink = asyncio.run(scenario())
+        assert was_blocked
+        assert sorted(e["n"] for b in sink.batches for e in b) == [0, 1, 2, 3, 4]
+
+    def test_stop_drains_queued_events(self):
+        sink = _Sink()
+
+        async def scenario():
+            writer = UsageWriter(sink, max_batch=1000, flush_interval=60)
+            for i in range(50):
+                await writer.submit({"n": i})
+            await writer.stop()
+            return writer.stats()
+
+        stats = asyncio.run(scenario())
+        assert sum(len(b) for b in sink.batches) == 50
+        assert stats["events_written"] == 50
+        assert stats["events_dropped"] == 0
+
+    def test_failed_write_is_retried(self):
+        sink = _Sink(fail_times=2)
+
+        async def scenario():
+            writer = UsageWriter(sink, max_batch=10, flush_interval=0, max_retries=5)
+            await writer.submit({"n": 1})
+            await writer.stop()
+            return writer.stats()
+
+        stats = asyncio.run(scenario())
+        assert sink.batches == [[{"n": 1}]]
+        assert stats["events_written"] == 1
+
+    def test_flush_waits_for_prior_events_only(self):
+        sink = _Sink()
+
+        async def scenario():
+            writer = UsageWriter(sink, max_batch=100, flush_interval=0.02)
+            await writer.submit({"n": 1})
+            await writer.flush()
+            written = sum(len(b) for b in sink.batches)
+            await writer.stop()
+            return written
+
+        assert asyncio.run(scenario()) == 1
+
+
+class TestRegistryUsageWriter:
+
+    def test_lifespan_starts_and_drains_writer(self):
+        """Handshakes queue events; TestClient shutdown must write them with insert_many."""
+        import registry.main as reg
+
+        account = {"api_key": "aris_live_k", "email": "a@aris.ai", "balance": 100.0}
+        mock_accounts = MagicMock()
+        mock_accounts.find_one_and_update = AsyncMock(return_value=account)
+        mock_usage = MagicMock()
+        mock_usage.insert_many = AsyncMock(return_value=None)
+        body = {"payer_did": "x", "target_did": "y", "capability": "ai.generate"}
+
+        with (
+            patch.object(reg, "accounts_collection", mock_accounts),
+            patch.object(reg, "usage_collection",    mock_usage),
+            patch.object(reg.usage_writer, "flush_interval", 60),
+        ):
+            with TestClient(reg.app) as tc:
+                written_before = reg.usage_writer.stats()["events_written"]
+                for _ in range(5):
+                    assert tc.post("/handshake", json=body, headers={"x-api-key": "aris_live_k"}).status_code == 200
+                assert reg.usage_writer.stats()["events_written"] == written_before  # still queued
+
+        logged = [doc for call in mock_usage.insert_many.call_args_list for doc in call[0][0]]
+        assert len(logged) == 5
+        assert mock_usage.insert_many.await_count == 1
+
+    def test_retry_after_partial_insert_writes_each_event_once(self):
+        """A batch half-stored before a connection drop is retried without failing on, or rolling up, twice."""
+        import registry.main as reg
+
+        storage = MemoryStorage()
+        insert_many = storage.usage_logs.insert_many
+        drops = [1]
+
+        async def flaky_insert_many(docs, **kwargs):
+            if drops[0]:
+                drops[0] -= 1
+                await insert_many(docs[:2], **kwargs)
+                raise ConnectionError("connection reset mid-batch")
+            return await insert_many(docs, **kwargs)
+
+        events = [{"api_key": "aris_live_k", "capability": "ai.generate", "timestamp": 1_700_000_000.0 + i,
+                   "cost_usd": 0.01} for i in range(5)]
+
+        async def scenario():
+            writer = UsageWriter(reg._write_usage_batch, max_batch=10, flush_interval=0, max_retries=3)
+            for event in events:
+                await writer.submit(event)
+            await writer.stop()
+            logs = await storage.usage_logs.find({}).to_list(None)
+            rollups = await storage.usage_rollups.find({"granularity": "day"}).to_list(None)
+            return writer.stats(), logs, rollups
+
+        with (
+            patch.object(storage.usage_logs, "insert_many", flaky_insert_many),
+            patch.object(reg, "usage_collection", storage.usage_logs),
+            patch.object(reg, "rollups_collection", storage.usage_rollups),
+        ):
+            stats, logs, rollups = asyncio.run(scenario())
+
+        assert (stats["events_written"], stats["events_dropped"]) == (5, 0)
+        assert len(logs) == 5
+        assert [r["events"] for r in rollups] == [5]
@@ -0,0 +1,213 @@
+"""
+Feature 6: in-memory discovery index with heartbeat expiry
+==========================================================
+Test structure
+--------------
+INDEX UNIT TESTS  (fake clock)
+    test_lookup_returns_registered_agents
+    test_agent_expires_after_missed_heartbeats
+    test_heartbeat_keeps_agent_alive
+    test_capability_change_relinks_agent
+    test_merge_skips_stale_and_grants_legacy_grace
+    test_lookup_respects_limit
+
+REGISTRY TESTS  (FastAPI TestClient, fake agents collection)
+    test_startup_creates_indexes_and_hydrates
+    test_register_then_discover_served_from_memory
+    test_discover_cold_start_falls_back_to_mongo
+
+STARTUP INDEX TESTS
+    test_failed_index_is_logged_and_the_rest_still_created
+    test_missing_required_index_fails_startup
+    test_accounts_without_email_do_not_collide
+"""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+from pymongo.errors import DuplicateKeyError
+
+from registry.discovery import DiscoveryIndex
+from registry.storage.memory import MemoryStorage
+
+
+class TestDiscoveryIndex:
+
+    def test_lookup_returns_registered_agents(self, clock, make_agent):
+        index = DiscoveryIndex(clock=clock)
+        index.upsert(make_agent("n1"))
+        index.upsert(make_agent("n2", ("ai.chat",)))
+        assert [a["did"] for a in index.lookup("ai.generate")] == ["n1"]
+        assert [a["did"] for a in index.lookup("ai.chat")] == ["n2"]
+        assert index.lookup("math.add") == []
+
+    def test_agent_expires_after_missed_heartbeats(self, clock, make_agent):
+        index = DiscoveryIndex(heartbeat_interval=30, max_missed=3, clock=clock)
+        index.upsert(make_agent("n1"))
+        clock.now += 89
+        assert len(index.lookup("ai.generate")) == 1
+        clock.now += 2                                   # 3 beats missed
+        assert index.lookup("ai.generate") == []
+        assert index.expire() == 1
+        assert len(index) == 0
+
+    def test_heartbeat_keeps_agent_alive(self, clock, make_agent):
+        index = DiscoveryIndex(heartbeat_interval=30, max_missed=3, clock=clock)
+        for _ in range(10):
+            index.upsert(make_agent("n1"))
+            clock.now += 30
+        assert len(index.lookup("ai.generate")) == 1
+
+    def test_capability_change_relinks_agent(self, clock, make_agent):
+        index = DiscoveryIndex(clock=clock)
+        index.upsert(make_agent("n1", ("ai.generate", "ai.chat")))
+        index.upsert(make_agent("n1", ("ai.chat",)))
+        assert index.lookup("ai.generate") == []
+        assert [a["did"] for a in index.lookup("ai.chat")] == ["n1"]
+
+    def test_merge_skips_stale_and_grants_legacy_grace(self, clock, make_agent):
+        index = DiscoveryIndex(heartbeat_interval=30, max_missed=3, clock=clock)
+        index.merge([
+            {**make_agent("fresh"),  "_id": 1, "last_seen": clock.now - 10},
+            {**make_agent("stale"),  "_id": 2, "last_seen": clock.now - 500},
+            {**make_agent("legacy"), "_id": 3},
+        ])
+        dids = [a["did"] for a in index.lookup("ai.generate")]
+        assert dids == ["fresh", "legacy"]
+        assert "_id" not in index.lookup("ai.generate")[0]
+        assert index.hydrated
+
+    def test_lookup_respects_limit(self, clock, make_agent):
+        index = DiscoveryIndex(clock=clock)
+        for i in range(150):
+            index.upsert(make_agent(f"n{i}"))
+        assert len(index.lookup("ai.generate")) == 100
+        assert len(index.lookup("ai.generate", limit=5)) == 5
+
+
+class _FakeAgents:
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+        self.find_calls = 0
+        self.create_index = AsyncMock()
+        self.update_one = AsyncMock()
+
+    def find(self, query, *a, **kw):
+        self.find_calls += 1
+        cursor = MagicMock()
+        if "last_seen" in query and "$exists" in query["last_seen"]:
+            matched = [d for d in self.docs if "last_seen" not in d]
+        else:
+            matched = [d for d in self.docs if "last_seen" in d]
+        cursor.to_list = AsyncMock(return_value=[dict(d) for d in matched])
+        return cursor
+
+
+class TestRegistryDiscovery:
+
+    def test_startup_creates_indexes_and_hydrates(self, make_agent):
+        import registry.main as reg
+
+        agents = _FakeAgents([{**make_agent("did:aris:n1"), "last_seen": time.time()}])
+        accounts, usage = MagicMock(), MagicMock()
+        accounts.create_index = AsyncMock()
+        usage.create_index = AsyncMock()
+
+        with (
+            patch.object(reg, "agents_collection",   agents),
+            patch.object(reg, "accounts_collection", accounts),
+            patch.object(reg, "usage_collection",    usage),
+        ):
+            with TestClient(reg.app) as tc:
+                tc.portal.call(_wait_hydrated, reg)
+                resp = tc.get("/discover", params={"capability": "ai.generate"})
+
+        assert [a["did"] for a in resp.json()["agents"]] == ["did:aris:n1"]
+        agent_indexes = [c[0][0] for c in agents.create_index.call_args_list]
+        assert "did" in agent_indexes and "capabilities" in agent_indexes
+        accounts.create_index.assert_any_await("api_key", unique=True)
+        usage.create_index.assert_awaited_once_with(
+            [("api_key", reg.ASCENDING), ("timestamp", reg.DESCENDING), ("_id", reg.DESCENDING)]
+        )
+
+    def test_register_then_discover_served_from_memory(self, make_agent):
+        import registry.main as reg
+
+        agents = _FakeAgents()
+        with patch.object(reg, "agents_collection", agents):
+            with TestClient(reg.app) as tc:
+                tc.portal.call(_wait_hydrated, reg)
+                finds_after_startup = agents.find_calls
+                tc.post("/register", json=make_agent("did:aris:n2", ("ai.chat",)))
+                resp = tc.get("/discover", params={"capability": "ai.chat"})
+
+        assert resp.json()["agents"] == [{**make_agent("did:aris:n2", ("ai.chat",)), "load": None}]
+        assert agents.find_calls == finds_after_startup      # no Mongo query for /discover
+        written = agents.update_one.call_args[0][1]["$set"]
+        assert "last_seen" in written
+
+    def test_discover_cold_start_falls_back_to_mongo(self, make_agent):
+        import registry.main as reg
+
+        agents = _FakeAgents([{**make_agent("did:aris:n3"), "last_seen": time.time()}])
+        with (
+            patch.object(reg, "agents_collection", agents),
+            patch.object(reg, "_sync_discovery", AsyncMock()),   # first sync not done yet
+        ):
+            with TestClient(reg.app) as tc:
+                assert not reg.discovery.hydrated
+                resp = tc.get("/discover", params={"capability": "ai.generate"})
+
+        assert [a["did"] for a in resp.json()["agents"]] == ["did:aris:n3"]
+
+
+class TestStartupIndexes:
+
+    def test_failed_index_is_logged_and_the_rest_still_created(self, caplog):
+        import registry.main as reg
+
+        agents = _FakeAgents()
+        agents.create_index = AsyncMock(side_effect=[DuplicateKeyError("E11000 duplicate key: did"), None, None])
+        with patch.object(reg, "agents_collection", agents), patch.object(reg, "_sync_discovery", AsyncMock()):
+            with caplog.at_level("ERROR", logger="registry.main"), TestClient(reg.app):
+                pass
+
+        assert agents.create_index.await_count == 3
+        assert "Could not create index did on agents" in caplog.text
+
+    def test_missing_required_index_fails_startup(self):
+        import registry.main as reg
+
+        sessions = MagicMock()
+        sessions.create_index = AsyncMock(side_effect=DuplicateKeyError("E11000 duplicate key: jti"))
+        with patch.object(reg, "sessions_collection", sessions), patch.object(reg, "_sync_discovery", AsyncMock()):
+            with pytest.raises(RuntimeError, match="sessions jti"):
+                with TestClient(reg.app):
+                    pass
+
+    def test_accounts_without_email_do_not_collide(self):
+        import registry.main as reg
+
+        accounts = MemoryStorage().accounts
+
+        async def scenario():
+            await reg._ensure_indexes()
+            await accounts.insert_many([{"api_key": "k1", "email": None}, {"api_key": "k2", "email": None},
+                                        {"api_key": "k3"}, {"api_key": "k4", "email": "a@aris.ai"}])
+            with pytest.raises(DuplicateKeyError):
+                await accounts.insert_one({"api_key": "k5", "email": "a@aris.ai"})
+            return await accounts.count_documents({})
+
+        with patch.object(reg, "accounts_collection", accounts):
+            assert asyncio.run(scenario()) == 4
+
+
+async def _wait_hydrated(reg):
+    for _ in range(100):
+        if reg.discovery.hydrated:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("discovery index never hydrated")
@@ -0,0 +1,162 @@
+"""
+Feature 7: load- and latency-aware node selection
+=================================================
+Test structure
+--------------
+SELECTOR UNIT TESTS
+    test_first_node_is_legacy_behaviour
+    test_least_loaded_picks_lowest_outstanding_work
+    test_power_of_two_choices_never_picks_the_worst_of_two
+    test_power_of_two_choices_spreads_across_idle_nodes
+    test_ewma_prefers_observed_fast_node
+    test_ewma_tries_unknown_nodes_first
+    test_ewma_penalises_failures
+
+SDK TESTS  (HTTP mocked)
+    test_client_uses_configured_selector
+    test_client_reports_latency_to_selector
+
+NODE / REGISTRY TESTS
+    test_node_stats_tracks_in_flight_and_latency
+    test_register_load_returned_by_discover
+"""
+
+from collections import Counter
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi.testclient import TestClient
+
+from agent_node.stats import NodeStats
+from aris.client import Aris
+from aris.routing import EwmaLatency, FirstNode, LeastLoaded, NodeSelector, PowerOfTwoChoices
+
+VALID_KEY = "aris_live_testkey123"
+
+
+def _node(i, in_flight=0, queue_depth=0, p50_ms=None):
+    return {
+        "did": f"did:aris:n{i}",
+        "endpoint": f"http://node-{i}:9006",
+        "capabilities": ["ai.generate"],
+        "load": {"in_flight": in_flight, "queue_depth": queue_depth, "p50_ms": p50_ms, "p95_ms": None,
+                 "p99_ms": None, "qps": None, "jobs_completed": None, "jobs_failed": None},
+    }
+
+
+class TestSelectors:
+
+    def test_first_node_is_legacy_behaviour(self):
+        nodes = [_node(0, in_flight=50), _node(1)]
+        assert FirstNode().select(nodes)["did"] == "did:aris:n0"
+
+    def test_least_loaded_picks_lowest_outstanding_work(self):
+        nodes = [_node(0, in_flight=5), _node(1, in_flight=1, queue_depth=3), _node(2, in_flight=2)]
+        assert LeastLoaded().select(nodes)["did"] == "did:aris:n2"
+
+    def test_power_of_two_choices_never_picks_the_worst_of_two(self):
+        nodes = [_node(0, in_flight=10), _node(1, in_flight=0)]
+        selector = PowerOfTwoChoices()
+        assert all(selector.select(nodes)["did"] == "did:aris:n1" for _ in range(50))
+
+    def test_power_of_two_choices_spreads_across_idle_nodes(self):
+        nodes = [_node(i) for i in range(4)]
+        picks = Counter(PowerOfTwoChoices().select(nodes)["did"] for _ in range(2000))
+        assert len(picks) == 4
+        assert min(picks.values()) > 300
+
+    def test_ewma_prefers_observed_fast_node(self):
+        nodes = [_node(0), _node(1)]
+        selector = EwmaLatency()
+        selector.observe("http://node-0:9006", 2.0)
+        selector.observe("http://node-1:9006", 0.2)
+        assert selector.select(nodes)["did"] == "did:aris:n1"
+
+    def test_ewma_tries_unknown_nodes_first(self):
+        nodes = [_node(0), _node(1)]
+        selector = EwmaLatency()
+        selector.observe("http://node-0:9006", 0.01)
+        assert selector.select(nodes)["did"] == "did:aris:n1"
+
+    def test_ewma_penalises_failures(self):
+        nodes = [_node(0), _node(1)]
+        selector = EwmaLatency()
+        selector.observe("http://node-0:9006", 0.1, ok=False)
+        selector.observe("http://node-1:9006", 3.0)
+        assert selector.select(nodes)["did"] == "did:aris:n1"
+
+
+def _http(status, body):
+    m = MagicMock()
+    m.status_code = status
+    m.json.return_value = body
+    m.text = str(body)
+    m.raise_for_status = MagicMock()
+    return m
+
+
+class TestClientSelection:
+
+    def _run_generate(self, selector):
+        discover = _http(200, {"agents": [_node(0, in_flight=9), _node(1), _node(2, in_flight=4)]})
+        targets = []
+
+        def route_post(url, json=None, headers=None, timeout=None):
+            if url.endswith("/handshake"):
+                targets.append(json["target_did"])
+                return _http(200, {"session_token": "tok", "remaining_balance": 1.0})
+            return _http(200, {"result": "ok", "status": "success"})
+
+        with patch("requests.Session.get", return_value=discover), patch("requests.Session.post", side_effect=route_post):
+            client = Aris(api_key=VALID_KEY, node_selector=selector)
+            client.generate("hi")
+        return client, targets
+
+    def test_client_uses_configured_selector(self):
+        client, targets = self._run_generate(LeastLoaded())
+        assert targets == ["did:aris:n1"]
+        assert client._active["ai.generate"].endpoint == "http://node-1:9006"
+
+    def test_client_reports_latency_to_selector(self):
+        class Recorder(NodeSelector):
+            def __init__(self):
+                self.seen = []
+
+            def select(self, agents):
+                return agents[0]
+
+            def observe(self, endpoint, latency_s, ok=True):
+                self.seen.append((endpoint, ok))
+
+        recorder = Recorder()
+        self._run_generate(recorder)
+        assert recorder.seen == [("http://node-0:9006", True)]
+
+
+class TestLoadReporting:
+
+    def test_node_stats_tracks_in_flight_and_latency(self):
+        stats = NodeStats()
+        assert stats.load() == {"in_flight": 0, "queue_depth": 0, "qps": 0.0, "p50_ms": None, "p95_ms": None,
+                                "p99_ms": None, "jobs_completed": 0, "jobs_failed": 0}
+        with stats.track():
+            assert stats.load()["in_flight"] == 1
+        load = stats.load()
+        assert load["in_flight"] == 0
+        assert load["p50_ms"] is not None
+
+    def test_register_load_returned_by_discover(self):
+        import registry.main as reg
+
+        agents = MagicMock()
+        agents.update_one = AsyncMock()
+        node = _node(7, in_flight=3, queue_depth=1, p50_ms=420.0)
+        with (
+            patch.object(reg, "agents_collection", agents),
+            patch.object(reg, "_sync_discovery", AsyncMock()),
+        ):
+            with TestClient(reg.app) as tc:
+                reg.discovery.hydrated = True
+                assert tc.post("/register", json=node).status_code == 200
+                resp = tc.get("/discover", params={"capability": "ai.generate"})
+
+        assert resp.json()["agents"][0]["load"] == node["load"]
@@ -0,0 +1,123 @@
+"""
+Feature 8: connection pooling and keep-alive in the SDK
+=======================================================
+Test structure
+--------------
+LIVE HTTP TESTS  (local stub server on 127.0.0.1)
+    test_calls_reuse_one_connection
+    test_get_retries_on_503
+    test_handshake_post_is_not_retried
+
+SDK TESTS
+    test_helpers_share_one_client_per_key
+    test_context_manager_closes_session
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+
+import aris.client as client_mod
+from aris.client import Aris, ArisError
+
+VALID_KEY = "aris_live_testkey123"
+
+
+class _Stub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"           # keep-alive
+    disable_nagle_algorithm = True
+    fail_next = 0
+    fail_posts = False
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _record(self):
+        self.server.peers.append(self.client_address[1])
+        self.server.paths.append((self.command, self.path))
+        if type(self).fail_next:
+            type(self).fail_next -= 1
+            self._reply(503, {"detail": "busy"})
+            return False
+        return True
+
+    def do_GET(self):
+        if self._record():
+            agent = {"did": "did:aris:n1", "endpoint": "http://node-1:9006", "capabilities": ["ai.generate"]}
+            self._reply(200, {"email": "a@b.c", "balance_usd": 1.0, "created_at": 0, "agents": [agent]})
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if type(self).fail_posts:
+            type(self).fail_next = 1
+        if self._record():
+            self._reply(200, {"session_token": "tok", "remaining_balance": 1.0})
+
+
+@pytest.fixture
+def stub():
+    _Stub.fail_next, _Stub.fail_posts = 0, False
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    server.peers, server.paths = [], []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+class TestLiveHttp:
+
+    def test_calls_reuse_one_connection(self, stub):
+        with Aris(api_key=VALID_KEY, registry_url=_url(stub)) as client:
+            for _ in range(5):
+                assert client.balance()["balance_usd"] == 1.0
+        assert len(stub.peers) == 5
+        assert len(set(stub.peers)) == 1                     # one TCP connection
+
+    def test_get_retries_on_503(self, stub):
+        _Stub.fail_next = 1
+        with Aris(api_key=VALID_KEY, registry_url=_url(stub), retries=2) as client:
+            assert client.balance()["balance_usd"] == 1.0
+        assert [m for m, _ in stub.paths] == ["GET", "GET"]
+
+    def test_handshake_post_is_not_retried(self, stub):
+        _Stub.fail_posts = True
+        with Aris(api_key=VALID_KEY, registry_url=_url(stub), retries=2) as client:
+            with pytest.raises(ArisError, match="Handshake failed"):
+                client._connect_to_swarm("ai.generate")
+        assert stub.paths == [("GET", "/discover?capability=ai.generate"), ("POST", "/handshake")]
+
+
+class TestSharedClients:
+
+    def test_helpers_share_one_client_per_key(self):
+        client_mod._close_shared_clients()
+        with patch.object(Aris, "balance", return_value={"balance_usd": 1.0}):
+            client_mod.balance(api_key=VALID_KEY)
+            client_mod.balance(api_key=VALID_KEY)
+            client_mod.balance(api_key="aris_live_other")
+        assert len(client_mod._shared_clients) == 2
+        client_mod._close_shared_clients()
+        assert client_mod._shared_clients == {}
+
+    def test_context_manager_closes_session(self):
+        with patch("requests.Session.close") as close:
+            with Aris(api_key=VALID_KEY):
+                pass
+        close.assert_called_once()
@@ -0,0 +1,198 @@
+"""
+Feature 9: asyncio SDK client (AsyncAris / AsyncConversation)
+=============================================================
+Test structure
+--------------
+ACCOUNT APIS  (httpx.MockTransport)
+    test_balance_returns_payload
+    test_balance_invalid_key_raises_auth_error
+    test_registry_get_retries_on_503
+
+INFERENCE APIS
+    test_generate_handshakes_then_calls_node
+    test_insufficient_balance_raises_payment_error
+    test_concurrent_chats_share_one_handshake
+    test_expired_token_rehandshakes_once_under_concurrency
+    test_sessions_are_kept_per_capability
+
+CONVERSATION
+    test_conversation_tracks_history
+    test_conversation_drops_turn_on_failure
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from aris import AsyncAris, AsyncConversation
+from aris.client import ArisAuthError, ArisNodeError, ArisPaymentError
+
+VALID_KEY = "aris_live_testkey123"
+REGISTRY = "http://registry.test"
+
+
+class _FakeNetwork:
+    """Registry + one worker node behind a MockTransport, with call counters."""
+
+    def __init__(self, balance_status=200, handshake_status=200, node_delay=0.0):
+        self.balance_status = balance_status
+        self.handshake_status = handshake_status
+        self.node_delay = node_delay
+        self.fail_gets = 0
+        self.handshakes = 0
+        self.node_calls = 0
+        self.valid_tokens = set()
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if request.method == "GET" and self.fail_gets:
+            self.fail_gets -= 1
+            return httpx.Response(503, json={"detail": "busy"})
+        if path == "/balance":
+            return httpx.Response(self.balance_status, json={"email": "a@b.c", "balance_usd": 4.2, "created_at": 0})
+        if path == "/discover":
+            cap = request.url.params["capability"]
+            return httpx.Response(200, json={"agents": [
+                {"did": f"did:aris:{cap}", "endpoint": "http://node.test", "capabilities": [cap]},
+            ]})
+        if path == "/handshake":
+            self.handshakes += 1
+            await asyncio.sleep(0.01)
+            if self.handshake_status != 200:
+                return httpx.Response(self.handshake_status, json={"detail": "nope"})
+            token = f"tok-{self.handshakes}"
+            self.valid_tokens.add(token)
+            return httpx.Response(200, json={"session_token": token, "remaining_balance": 1.0})
+
+        # worker node
+        self.node_calls += 1
+        await asyncio.sleep(self.node_delay)
+        if request.headers.get("x-aris-token") not in self.valid_tokens:
+            return httpx.Response(401, json={"detail": "expired"})
+        if path == "/generate":
+            return httpx.Response(200, json={"result": "generated", "status": "success"})
+        body = json.loads(request.content)
+        return httpx.Response(200, json={
+            "role": "assistant", "content": f"echo:{body['messages'][-1]['content']}",
+            "model": body["model"], "status": "success",
+        })
+
+
+def _client(net, **kw):
+    return AsyncAris(
+        api_key=VALID_KEY,
+        registry_url=REGISTRY,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(net)),
+        **kw,
+    )
+
+
+def _msgs(text="hi"):
+    return [{"role": "user", "content": text}]
+
+
+class TestAccountApis:
+
+    def test_balance_returns_payload(self):
+        net = _FakeNetwork()
+        assert asyncio.run(_client(net).balance())["balance_usd"] == 4.2
+
+    def test_balance_invalid_key_raises_auth_error(self):
+        net = _FakeNetwork(balance_status=403)
+        with pytest.raises(ArisAuthError):
+            asyncio.run(_client(net).balance())
+
+    def test_registry_get_retries_on_503(self, monkeypatch):
+        monkeypatch.setattr(asyncio, "sleep", _no_sleep)
+        net = _FakeNetwork()
+        net.fail_gets = 2
+        assert asyncio.run(_client(net, retries=2).balance())["balance_usd"] == 4.2
+
+
+class TestInference:
+
+    def test_generate_handshakes_then_calls_node(self):
+        net = _FakeNetwork()
+        assert asyncio.run(_client(net).generate("hi")) == "generated"
+        assert net.handshakes == 1 and net.node_calls == 1
+
+    def test_insufficient_balance_raises_payment_error(self):
+        net = _FakeNetwork(handshake_status=402)
+        with pytest.raises(ArisPaymentError):
+            asyncio.run(_client(net).chat(_msgs()))
+
+    def test_concurrent_chats_share_one_handshake(self):
+        net = _FakeNetwork(node_delay=0.01)
+
+        async def run():
+            client = _client(net)
+            return await asyncio.gather(*(client.chat(_msgs(str(i))) for i in range(500)))
+
+        replies = asyncio.run(run())
+        assert [r["content"] for r in replies] == [f"echo:{i}" for i in range(500)]
+        assert net.handshakes == 1
+
+    def test_expired_token_rehandshakes_once_under_concurrency(self):
+        net = _FakeNetwork(node_delay=0.01)
+
+        async def run():
+            client = _client(net)
+            await client.chat(_msgs())
+            net.valid_tokens.clear()                         # every live token expires
+            return await asyncio.gather(*(client.chat(_msgs()) for _ in range(50)))
+
+        replies = asyncio.run(run())
+        assert all(r["content"] == "echo:hi" for r in replies)
+        assert net.handshakes == 2
+
+    def test_sessions_are_kept_per_capability(self):
+        net = _FakeNetwork()
+
+        async def run():
+            client = _client(net)
+            await asyncio.gather(client.generate("a"), client.chat(_msgs()), client.generate("b"))
+            await client.chat(_msgs())
+
+        asyncio.run(run())
+        assert net.handshakes == 2
+
+
+class TestAsyncConversation:
+
+    def test_conversation_tracks_history(self):
+        net = _FakeNetwork()
+
+        async def run():
+            conv = _client(net).conversation(system_prompt="be brief")
+            assert isinstance(conv, AsyncConversation)
+            assert await conv.say("one") == "echo:one"
+            assert await conv.say("two") == "echo:two"
+            return conv
+
+        conv = asyncio.run(run())
+        assert [m["role"] for m in conv.history] == ["system", "user", "assistant", "user", "assistant"]
+        conv.reset()
+        assert len(conv) == 1
+
+    def test_conversation_drops_turn_on_failure(self):
+        async def down(request):
+            if request.url.path == "/discover":
+                return httpx.Response(200, json={"agents": []})
+            return httpx.Response(500)
+
+        async def run():
+            conv = _client(down).conversation()
+            with pytest.raises(ArisNodeError):
+                await conv.say("hello")
+            return conv
+
+        assert asyncio.run(run()).history == []
+
+
+_real_sleep = asyncio.sleep
+
+
+async def _no_sleep(delay, *args, **kwargs):
+    await _real_sleep(0)
@@ -0,0 +1,5 @@
+"""
+Server-side plumbing shared by the registry and the worker nodes: the uvicorn
+launcher and the Prometheus metrics. Kept out of the ``aris`` client SDK so
+importing the SDK never pulls in server code.
+"""
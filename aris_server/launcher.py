@@ -0,0 +1,84 @@
+"""
+Production launcher shared by the ``aris-registry`` and ``aris-node`` entry points.
+
+Runs an ASGI app under uvicorn with:
+
+* ``--workers N`` processes sharing one listening socket. The app is passed as
+  an import string, so every worker imports it fresh and its lifespan builds
+  that worker's own caches, pools and background tasks.
+* uvloop and httptools when they are installed (``pip install uvloop
+  httptools``), otherwise asyncio and h11.
+* a deeper accept backlog and a keep-alive longer than the usual 60 s load
+  balancer idle timeout, so pooled SDK connections are reused, not reset.
+* graceful reload: with ``--workers`` >= 2, ``kill -HUP <parent pid>`` restarts
+  the workers one at a time. Each finishes its in-flight requests (up to
+  ``--graceful-timeout``) while the others keep serving. ``--reload`` is the
+  file-watching development mode and runs a single worker.
+"""
+
+import argparse
+import importlib.util
+import logging
+import os
+from typing import Any, Dict
+
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKLOG          = int(os.getenv("ARIS_BACKLOG", 4096))
+DEFAULT_KEEPALIVE_S      = int(os.getenv("ARIS_KEEPALIVE", 75))
+DEFAULT_GRACEFUL_TIMEOUT = int(os.getenv("ARIS_GRACEFUL_TIMEOUT", 30))
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def add_server_arguments(parser: argparse.ArgumentParser, port: int, workers: int) -> None:
+    """Add the launcher's options to an entry point's argument parser."""
+    parser.add_argument("--host",    default=os.getenv("ARIS_HOST", "0.0.0.0"))
+    parser.add_argument("--port",    type=int, default=port)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("ARIS_WORKERS", workers)),
+                        help="Worker processes (default: %(default)s)")
+    parser.add_argument("--loop",    choices=("auto", "uvloop", "asyncio"), default="auto",
+                        help="Event loop; auto uses uvloop when installed")
+    parser.add_argument("--http",    choices=("auto", "httptools", "h11"), default="auto",
+                        help="HTTP parser; auto uses httptools when installed")
+    parser.add_argument("--backlog", type=int, default=DEFAULT_BACKLOG, help="Listen backlog")
+    parser.add_argument("--keep-alive", type=int, default=DEFAULT_KEEPALIVE_S, dest="keep_alive",
+                        help="Seconds an idle keep-alive connection is held open")
+    parser.add_argument("--graceful-timeout", type=int, default=DEFAULT_GRACEFUL_TIMEOUT, dest="graceful_timeout",
+                        help="Seconds a stopping worker waits for in-flight requests")
+    parser.add_argument("--reload", action="store_true", help="Restart on code changes (development)")
+    parser.add_argument("--log-level", default=os.getenv("ARIS_LOG_LEVEL", "info"), dest="log_level")
+
+
+def server_options(args: argparse.Namespace) -> Dict[str, Any]:
+    """uvicorn.run() keyword arguments for parsed launcher options."""
+    loop = args.loop if args.loop != "auto" else ("uvloop" if _installed("uvloop") else "asyncio")
+    http = args.http if args.http != "auto" else ("httptools" if _installed("httptools") else "h11")
+    return {
+        "host": args.host,
+        "port": args.port,
+        "workers": 1 if args.reload else max(1, args.workers),
+        "loop": loop,
+        "http": http,
+        "backlog": args.backlog,
+        "timeout_keep_alive": args.keep_alive,
+        "timeout_graceful_shutdown": args.graceful_timeout,
+        "reload": args.reload,
+        "log_level": args.log_level,
+        # Behind a proxy / load balancer: trust X-Forwarded-* from it.
+        "proxy_headers": True,
+    }
+
+
+def serve(app: str, args: argparse.Namespace) -> None:
+    """Run *app* (an ``"module:attribute"`` import string) with the parsed launcher options."""
+    options = server_options(args)
+    logger.info(
+        "Serving %s on %s:%d with %d worker(s), loop=%s, http=%s",
+        app, options["host"], options["port"], options["workers"], options["loop"], options["http"],
+    )
+    uvicorn.run(app, **options)
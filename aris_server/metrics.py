@@ -0,0 +1,300 @@
+"""
+Prometheus-style metrics shared by the registry and worker nodes.
+
+Each service builds one :class:`Registry` and installs it on its app with
+:func:`install`, which adds per-route timing middleware and serves
+``GET /metrics`` in the Prometheus text exposition format (0.0.4)::
+
+    metrics = Registry()
+    DEPENDENCY_SECONDS = metrics.histogram(
+        "aris_dependency_duration_seconds", "Time spent in calls to backing services.",
+        ("dependency", "operation"),
+    )
+    install(app, metrics)
+
+    with DEPENDENCY_SECONDS.time("ollama", "generate"):
+        ...
+
+Recording is cheap and lock-free. Every metric child is a few plain floats
+updated from the worker's event-loop thread, and histogram buckets are fixed,
+so an observation is one ``bisect`` plus two additions. Do not record from
+other threads. The cost per request is measured by ``scripts/bench_metrics.py``.
+
+Values are per process. With ``--workers`` > 1, each scrape sees whichever
+worker accepted it, so scrape each worker's port or run one worker per
+container.
+"""
+
+from bisect import bisect_left
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Seconds; spans sub-millisecond cache hits to minute-long LLM generations.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class Counter:
+    """A monotonically increasing count, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], _CounterChild] = {}
+
+    def labels(self, *values: str) -> _CounterChild:
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            child = self._children[values] = _CounterChild()
+        return child
+
+    def inc(self, *values: str, amount: float = 1.0) -> None:
+        self.labels(*values).value += amount
+
+    def collect(self) -> Iterable[str]:
+        for values, child in self._children.items():
+            yield f"{self.name}{_labels(self.labelnames, values)} {_number(child.value)}"
+
+
+class Gauge(Counter):
+    """A value that goes up and down (``labels(...).value`` is set directly)."""
+
+    kind = "gauge"
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)       # last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+
+class _Timer:
+    """Context manager observing the elapsed seconds of its block."""
+
+    __slots__ = ("_child", "_t0")
+
+    def __init__(self, child: _HistogramChild):
+        self._child = child
+
+    def __enter__(self) -> "_Timer":
+        self._t0 = perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        elapsed = perf_counter() - self._t0
+        child = self._child
+        child.counts[bisect_left(child.bounds, elapsed)] += 1
+        child.sum += elapsed
+
+
+class Histogram:
+    """Observations counted into fixed, cumulative ``le`` buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._children: Dict[Tuple[str, ...], _HistogramChild] = {}
+
+    def labels(self, *values: str) -> _HistogramChild:
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            child = self._children[values] = _HistogramChild(self.buckets)
+        return child
+
+    def observe(self, value: float, *values: str) -> None:
+        self.labels(*values).observe(value)
+
+    def time(self, *values: str) -> _Timer:
+        return _Timer(self.labels(*values))
+
+    def collect(self) -> Iterable[str]:
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, values, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, values)} {_number(child.sum)}"
+            yield f"{self.name}_count{_labels(self.labelnames, values)} {cumulative}"
+
+
+class Callback:
+    """
+    A gauge or counter read from existing state at scrape time (cache hit
+    counts, queue depths). *fn* returns a number or, with labels, a mapping of
+    label-value tuples to numbers.
+    """
+
+    def __init__(self, name: str, help: str, fn: Callable[[], Any], kind: str = "gauge",
+                 labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self._fn = fn
+
+    def collect(self) -> Iterable[str]:
+        value = self._fn()
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        for values, v in items:
+            yield f"{self.name}{_labels(self.labelnames, values)} {_number(v)}"
+
+
+class Registry:
+    """The metrics of one service, rendered together at ``/metrics``."""
+
+    def __init__(self):
+        self._metrics: List[Any] = []
+
+    def _add(self, metric):
+        if any(m.name == metric.name for m in self._metrics):
+            raise ValueError(f"Duplicate metric {metric.name}")
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def callback(self, name: str, help: str, fn: Callable[[], Any], kind: str = "gauge",
+                 labelnames: Sequence[str] = ()) -> Callback:
+        return self._add(Callback(name, help, fn, kind, labelnames))
+
+    def get(self, name: str) -> Optional[Any]:
+        return next((m for m in self._metrics if m.name == name), None)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware timing every HTTP request by method and route
+    template (``/usage/{...}`` style paths never explode the label set).
+    Streaming responses are timed until their last chunk is sent.
+    """
+
+    def __init__(self, app, registry: Registry):
+        self.app = app
+        self.requests = registry.get("aris_http_requests_total")
+        self.duration = registry.get("aris_http_request_duration_seconds")
+        self.in_flight = registry.get("aris_http_requests_in_flight").labels()
+        # (method, route, status) → (duration child, requests child); routes are a small, fixed set.
+        self._children: Dict[Tuple[str, str, int], Tuple[_HistogramChild, _CounterChild]] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight = self.in_flight
+        in_flight.value += 1
+        t0 = perf_counter()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            elapsed = perf_counter() - t0
+            in_flight.value -= 1
+            # FastAPI records the matched route in the scope while routing.
+            route = scope.get("route")
+            key = (scope["method"], route.path if route is not None else "<unmatched>", status)
+            children = self._children.get(key)
+            if children is None:
+                children = self._children[key] = (
+                    self.duration.labels(key[0], key[1]), self.requests.labels(key[0], key[1], str(status)),
+                )
+            duration, requests = children
+            duration.counts[bisect_left(duration.bounds, elapsed)] += 1
+            duration.sum += elapsed
+            requests.value += 1
+
+
+def install(app, registry: Registry) -> None:
+    """Time every request to FastAPI *app* and serve *registry* at ``GET /metrics``."""
+    registry.counter(
+        "aris_http_requests_total", "HTTP requests served, by method, route and status.",
+        ("method", "route", "status"),
+    )
+    registry.histogram(
+        "aris_http_request_duration_seconds", "HTTP request latency, by method and route.",
+        ("method", "route"),
+    )
+    registry.gauge("aris_http_requests_in_flight", "HTTP requests being served.").labels()
+    app.add_middleware(MetricsMiddleware, registry=registry)
+
+    async def metrics_endpoint(request: Request) -> Response:
+        return Response(registry.render(), media_type=CONTENT_TYPE)
+
+    # An API route, not a bare Starlette one: only API routes record themselves
+    # in the scope, so scrapes are labelled /metrics rather than <unmatched>.
+    app.add_api_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
@@ -0,0 +1,108 @@
+"""
+In-process API-key → account cache for the registry.
+
+Keeps hot account documents in memory so authenticated endpoints skip the
+``accounts`` lookup on repeat calls. Entries expire after a TTL and the least
+recently used key is evicted once the cache is full. Unknown keys are cached
+separately (shorter TTL, own LRU) so brute-force misses never push real
+accounts out and never reach Mongo twice in a row.
+
+The cache is per-process and not locked: every access happens on the event
+loop thread of the worker that owns it.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+# Returned by :meth:`AccountCache.get` when the key has no live entry.
+MISSING = object()
+
+
+class AccountCache:
+    def __init__(
+        self,
+        ttl: float = 5.0,
+        negative_ttl: float = 10.0,
+        max_entries: int = 10_000,
+        max_negative_entries: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.max_negative_entries = max_negative_entries
+        self._clock = clock
+        # api_key → (expires_at, account)
+        self._accounts: "OrderedDict[str, tuple]" = OrderedDict()
+        # api_key → expires_at
+        self._invalid: "OrderedDict[str, float]" = OrderedDict()
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, api_key: str) -> Any:
+        """Return the cached account, ``None`` for a known-invalid key, or :data:`MISSING`."""
+        now = self._clock()
+
+        entry = self._accounts.get(api_key)
+        if entry is not None:
+            if entry[0] > now:
+                self._accounts.move_to_end(api_key)
+                self.hits += 1
+                return entry[1]
+            del self._accounts[api_key]
+
+        expires_at = self._invalid.get(api_key)
+        if expires_at is not None:
+            if expires_at > now:
+                self._invalid.move_to_end(api_key)
+                self.negative_hits += 1
+                return None
+            del self._invalid[api_key]
+
+        self.misses += 1
+        return MISSING
+
+    def put(self, api_key: str, account: Optional[Dict[str, Any]]) -> None:
+        """Cache *account* for *api_key*; ``None`` records the key as invalid."""
+        now = self._clock()
+        if account is None:
+            self._accounts.pop(api_key, None)
+            self._invalid[api_key] = now + self.negative_ttl
+            self._invalid.move_to_end(api_key)
+            self._evict(self._invalid, self.max_negative_entries)
+        else:
+            self._invalid.pop(api_key, None)
+            self._accounts[api_key] = (now + self.ttl, account)
+            self._accounts.move_to_end(api_key)
+            self._evict(self._accounts, self.max_entries)
+
+    def invalidate(self, api_key: str) -> None:
+        """Drop any cached state (positive or negative) for *api_key*."""
+        self._accounts.pop(api_key, None)
+        self._invalid.pop(api_key, None)
+
+    def clear(self) -> None:
+        self._accounts.clear()
+        self._invalid.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits":          self.hits,
+            "negative_hits": self.negative_hits,
+            "misses":        self.misses,
+            "evictions":     self.evictions,
+            "size":          len(self._accounts),
+            "negative_size": len(self._invalid),
+        }
+
+    def _evict(self, table: OrderedDict, limit: int) -> None:
+        while len(table) > limit:
+            table.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._accounts)
@@ -0,0 +1,179 @@
+"""
+Sharded account balances.
+
+With one counter per account, every handshake for an API key does its ``$inc``
+on the same ``accounts`` document, so a single heavy tenant serializes on that
+document's write lock. In sharded mode the balance is split across *n*
+sub-counters:
+
+* shard 0 is the ``balance`` field of the account document itself, so an
+  account created before sharding was enabled is simply a one-shard account;
+* shards 1..n-1 live in ``balance_shards`` as ``{api_key, shard, balance}``.
+
+A debit picks a random shard and applies the same conditional ``$inc`` as the
+unsharded path, with the ``balance >= cost`` guard in the filter, so no shard can
+go negative and the account can never be overdrawn. When the chosen shard is
+short it walks the others. Only when every shard is short does it consolidate:
+each shard is drained atomically, the cost is taken from the pooled total if
+it suffices, and the rest is spread back across the shards. Top-ups are split
+evenly across the shards and reads sum them.
+
+Lowering the shard count leaves credit in shards past the new *n*. The
+registry folds those back into the first *n* shards at startup, and
+consolidation drains them too, in case a worker still running with the old
+count tops them up afterwards.
+
+The functions take the collections as arguments so callers (and tests) decide
+which collections back them.
+"""
+
+import asyncio
+import random
+from typing import Any, Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+from registry.storage import UpdateOne
+
+
+def split(amount: float, n: int) -> List[float]:
+    """Split *amount* into *n* parts, evenly to the micro-dollar. The first parts take the remainder."""
+    micros = round(amount * 1_000_000)
+    base, extra = divmod(micros, n)
+    return [(base + (i < extra)) / 1_000_000 for i in range(n)]
+
+
+def _shard_filter(api_key: str, shard: int) -> Dict[str, Any]:
+    return {"api_key": api_key} if shard == 0 else {"api_key": api_key, "shard": shard}
+
+
+async def _debit_shard(accounts, shards, api_key: str, shard: int, cost: float) -> Optional[float]:
+    collection = accounts if shard == 0 else shards
+    doc = await collection.find_one_and_update(
+        {**_shard_filter(api_key, shard), "balance": {"$gte": cost}},
+        {"$inc": {"balance": -cost}},
+        projection={"balance": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    return None if doc is None else round(doc["balance"], 6)
+
+
+async def debit(accounts, shards, api_key: str, cost: float, n: int, rng: random.Random = random) -> Optional[float]:
+    """
+    Take *cost* from one of the account's *n* shards and return what that
+    shard holds afterwards (after a consolidation: what the whole account
+    holds). Returns None when the account as a whole cannot cover it.
+    """
+    order = list(range(n))
+    rng.shuffle(order)
+    for shard in order:
+        left = await _debit_shard(accounts, shards, api_key, shard, cost)
+        if left is not None:
+            return left
+    return await _consolidate(accounts, shards, api_key, cost, n)
+
+
+async def _consolidate(accounts, shards, api_key: str, cost: float, n: int) -> Optional[float]:
+    """
+    Every shard is short: pool them, pay *cost* from the pool if it covers it,
+    and spread what is left back over the shards. Returns what is left, or
+    None when the pool was short too.
+
+    While the pool is in flight, concurrent debits for the same key see empty
+    shards and may fail with insufficient funds. That only happens when the
+    whole account holds less than about *n* handshakes' worth of credit.
+    """
+    # Also drains shards beyond n, left behind if the shard count was lowered.
+    held = await shards.find({"api_key": api_key, "balance": {"$gt": 0}}, {"shard": 1}).to_list(length=None)
+    drains = [accounts.find_one_and_update(
+        {"api_key": api_key, "balance": {"$gt": 0}},
+        {"$set": {"balance": 0}},
+        return_document=ReturnDocument.BEFORE,
+    )] + [shards.find_one_and_update(
+        {"api_key": api_key, "shard": doc["shard"], "balance": {"$gt": 0}},
+        {"$set": {"balance": 0}},
+        return_document=ReturnDocument.BEFORE,
+    ) for doc in held]
+    pooled = round(sum(doc["balance"] for doc in await asyncio.gather(*drains) if doc), 6)
+    left = round(pooled - cost, 6) if pooled >= cost else None
+    if pooled > 0:
+        await credit(accounts, shards, api_key, pooled if left is None else left, n)
+    return left
+
+
+async def fold(accounts, shards, n: int) -> int:
+    """
+    Move the credit held in shards numbered *n* and up into each account's
+    first *n* shards. Returns how many shards were drained.
+    """
+    stranded = await shards.find({"shard": {"$gte": n}, "balance": {"$gt": 0}},
+                                 {"api_key": 1, "shard": 1}).to_list(length=None)
+    folded = 0
+    for doc in stranded:
+        drained = await shards.find_one_and_update(
+            {"api_key": doc["api_key"], "shard": doc["shard"], "balance": {"$gt": 0}},
+            {"$set": {"balance": 0}},
+            return_document=ReturnDocument.BEFORE,
+        )
+        if drained:
+            await credit(accounts, shards, doc["api_key"], round(drained["balance"], 6), n)
+            folded += 1
+    return folded
+
+
+async def credit_shards(shards, api_key: str, parts: List[float]) -> None:
+    """Add ``parts[i]`` to shard ``i + 1`` (shard 0, on the account document, is the caller's)."""
+    ops = [
+        UpdateOne({"api_key": api_key, "shard": shard}, {"$inc": {"balance": part}}, upsert=True)
+        for shard, part in enumerate(parts, start=1)
+        if part
+    ]
+    if ops:
+        await shards.bulk_write(ops, ordered=False)
+
+
+async def credit(accounts, shards, api_key: str, amount: float, n: int) -> None:
+    """Spread *amount* evenly over the account's *n* shards."""
+    parts = split(amount, n)
+    if parts[0]:
+        await accounts.update_one({"api_key": api_key}, {"$inc": {"balance": parts[0]}})
+    await credit_shards(shards, api_key, parts[1:])
+
+
+async def credit_once(accounts, shards, api_key: str, parts: List[float], event_id: str, history: int = 100) -> bool:
+    """
+    Add ``parts[i]`` to shard ``i`` unless this top-up event was already
+    applied there. Each shard document remembers the last *history* event ids
+    it was credited for, and the ``$ne`` guard and the ``$inc`` land in one
+    atomic update, so replaying an event (a retry, or a crash half-way through
+    the shards) only credits the shards it missed. Returns whether shard 0
+    took the credit, i.e. False for a replay of an applied event.
+    """
+    guard = {"topup_events": {"$ne": event_id}}
+    mark = {"topup_events": {"$each": [event_id], "$slice": -history}}
+    result = await accounts.update_one(
+        {"api_key": api_key, **guard},
+        {"$inc": {"balance": parts[0]}, "$push": mark},
+    )
+    if len(parts) > 1:
+        # Shard documents must exist first: an upsert can't carry the guard.
+        await shards.bulk_write([
+            UpdateOne({"api_key": api_key, "shard": shard}, {"$setOnInsert": {"balance": 0.0}}, upsert=True)
+            for shard in range(1, len(parts))
+        ], ordered=False)
+        await shards.bulk_write([
+            UpdateOne({"api_key": api_key, "shard": shard, **guard}, {"$inc": {"balance": part}, "$push": mark},
+                      upsert=False)
+            for shard, part in enumerate(parts[1:], start=1)
+        ], ordered=False)
+    return result.modified_count == 1
+
+
+async def load_account(accounts, shards, api_key: str) -> Optional[Dict[str, Any]]:
+    """The account document with ``balance`` set to the sum of all its shards."""
+    account = await accounts.find_one({"api_key": api_key})
+    if account is None:
+        return None
+    docs = await shards.find({"api_key": api_key}, {"balance": 1}).to_list(length=None)
+    account["balance"] = round(account.get("balance", 0) + sum(d.get("balance", 0) for d in docs), 6)
+    return account
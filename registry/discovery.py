@@ -0,0 +1,142 @@
+"""
+In-memory capability → live-agent index backing ``/discover``.
+
+Every ``/register`` heartbeat refreshes the agent's ``last_seen`` time. An agent
+stops being discoverable once it has missed ``max_missed`` heartbeats
+(``heartbeat_interval * max_missed`` seconds without one) and is swept from the
+index on the next :meth:`DiscoveryIndex.expire` pass.
+
+Nodes register once with their full registration and then send lightweight
+``/heartbeat`` beats carrying only the :func:`registration_version` they were
+given and their load. :meth:`DiscoveryIndex.beat` refreshes liveness in memory
+and says when a storage checkpoint is due (every ``checkpoint_interval``
+seconds per agent), so an unchanged node costs one write per checkpoint
+instead of one per beat.
+
+The index is per process. Each worker hydrates it from Mongo at startup and
+then merges recently-seen agents periodically, so registrations and
+checkpoints written by another worker become visible within one heartbeat
+interval. Keep ``checkpoint_interval`` well under the TTL so that agents
+stay live on workers that don't receive their beats.
+"""
+
+import hashlib
+import json
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+def registration_version(agent: Dict[str, Any]) -> str:
+    """A short hash of the fields a heartbeat does not carry; changes when they do."""
+    fields = {"did": agent["did"], "endpoint": agent.get("endpoint"), "capabilities": agent.get("capabilities", [])}
+    return hashlib.sha1(json.dumps(fields, sort_keys=True).encode()).hexdigest()[:16]
+
+
+class DiscoveryIndex:
+    def __init__(
+        self,
+        heartbeat_interval: float = 30.0,
+        max_missed: int = 3,
+        checkpoint_interval: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.heartbeat_interval = heartbeat_interval
+        self.max_missed = max_missed
+        self.checkpoint_interval = self.ttl / 2 if checkpoint_interval is None else checkpoint_interval
+        self._clock = clock
+        # did → {"agent": registration dict, "version": registration_version(agent),
+        #        "last_seen": wall-clock seconds, "persisted_at": last time storage saw it}
+        self._agents: Dict[str, Dict[str, Any]] = {}
+        # capability → {did: None}; dicts keep registration order for stable results.
+        self._by_capability: Dict[str, Dict[str, None]] = {}
+        self.hydrated = False
+
+    @property
+    def ttl(self) -> float:
+        return self.heartbeat_interval * self.max_missed
+
+    def upsert(self, agent: Dict[str, Any], last_seen: Optional[float] = None) -> None:
+        """Record a heartbeat (or a hydrated registration) for ``agent["did"]``."""
+        did = agent["did"]
+        seen = self._clock() if last_seen is None else last_seen
+        previous = self._agents.get(did)
+        if previous is not None:
+            if seen < previous["last_seen"]:
+                return  # older than what we already know
+            old_caps = previous["agent"].get("capabilities", [])
+            if old_caps != agent.get("capabilities", []):
+                self._unlink(did, old_caps)
+        # Both callers are in step with storage: /register writes, merge reads.
+        self._agents[did] = {"agent": agent, "version": registration_version(agent),
+                             "last_seen": seen, "persisted_at": seen}
+        for cap in agent.get("capabilities", []):
+            self._by_capability.setdefault(cap, {})[did] = None
+
+    def beat(self, did: str, version: str, load: Optional[Dict[str, Any]] = None) -> Optional[bool]:
+        """
+        Record a lightweight heartbeat. Returns ``None`` if *did* is unknown here
+        or its registration changed (the node must ``/register`` again),
+        otherwise whether a storage checkpoint is due.
+        """
+        entry = self._agents.get(did)
+        if entry is None or entry["version"] != version:
+            return None
+        now = self._clock()
+        entry["last_seen"] = now
+        if load is not None:
+            entry["agent"]["load"] = load
+        if now - entry["persisted_at"] >= self.checkpoint_interval:
+            entry["persisted_at"] = now
+            return True
+        return False
+
+    def merge(self, docs: Iterable[Dict[str, Any]]) -> None:
+        """Fold registrations loaded from Mongo into the index (hydration / periodic sync)."""
+        now = self._clock()
+        for doc in docs:
+            agent = {k: v for k, v in doc.items() if k not in ("_id", "last_seen")}
+            # Registrations written before last_seen existed get one TTL of grace.
+            seen = doc.get("last_seen") or now
+            if now - seen < self.ttl:
+                self.upsert(agent, last_seen=seen)
+        self.hydrated = True
+
+    def lookup(self, capability: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Live agents advertising *capability*, at most *limit* of them."""
+        dids = self._by_capability.get(capability)
+        if not dids:
+            return []
+        cutoff = self._clock() - self.ttl
+        live = []
+        for did in dids:
+            entry = self._agents[did]
+            if entry["last_seen"] >= cutoff:
+                live.append(entry["agent"])
+                if len(live) >= limit:
+                    break
+        return live
+
+    def expire(self) -> int:
+        """Drop agents that have missed too many heartbeats. Returns how many were removed."""
+        cutoff = self._clock() - self.ttl
+        stale = [did for did, e in self._agents.items() if e["last_seen"] < cutoff]
+        for did in stale:
+            entry = self._agents.pop(did)
+            self._unlink(did, entry["agent"].get("capabilities", []))
+        return len(stale)
+
+    def clear(self) -> None:
+        self._agents.clear()
+        self._by_capability.clear()
+        self.hydrated = False
+
+    def _unlink(self, did: str, capabilities: Iterable[str]) -> None:
+        for cap in capabilities:
+            dids = self._by_capability.get(cap)
+            if dids is not None:
+                dids.pop(did, None)
+                if not dids:
+                    del self._by_capability[cap]
+
+    def __len__(self) -> int:
+        return len(self._agents)
@@ -1,17 +1,39 @@
 import os
+import io
+import argparse
+import csv
+import json
 import time
+import base64
+import asyncio
+import contextlib
 import jwt
 import stripe
 import secrets
 import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
-from fastapi import FastAPI, HTTPException, Header, Request
-from fastapi.responses import RedirectResponse, FileResponse, HTMLResponse
+from fastapi import FastAPI, HTTPException, Header, Query, Request
+from fastapi.responses import RedirectResponse, FileResponse, HTMLResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
-from motor.motor_asyncio import AsyncIOMotorClient
+from typing import Any, Dict, List, Literal, Optional, Tuple
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
+from aris_server.metrics import Registry, install as install_metrics
+from aris_server.launcher import add_server_arguments, serve
 from aris.session_defaults import DEFAULT_SESSION_HS256_SECRET
+from registry import balances
+from registry.account_cache import AccountCache, MISSING
+from registry.discovery import DiscoveryIndex, registration_version
+from registry.rollups import GRANULARITIES, RollupKey, bucket_start, fold, summarize
+from registry.storage import UpdateOne, open_storage
+from registry.storage.timed import TimedCollection
+from registry.stripe_pool import StripePool
+from registry.topups import TopUpWorker
+from registry.usage_writer import UsageWriter
 
 logger = logging.getLogger(__name__)
 
@@ -19,33 +41,418 @@ logger = logging.getLogger(__name__)
 STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY")
 STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
 MONGO_URI = os.getenv("MONGO_URI")
+# mongodb://… (default, from MONGO_URI), sqlite:///path/to/aris.db or memory://
+STORAGE_URL = os.getenv("ARIS_STORAGE_URL") or MONGO_URI or "mongodb://localhost:27017"
 ARIS_PRIVATE_KEY = os.getenv("ARIS_PRIVATE_KEY", DEFAULT_SESSION_HS256_SECRET)
 BASE_DIR = Path(__file__).resolve().parent
 
 # Logic: $0.10 cost per agent-to-agent handshake
 HANDSHAKE_COST_USD = 0.10
+SESSION_TOKEN_TTL_S = 300
+
+# Budget sessions: a handshake with "calls": N prepays N calls at CALL_COST_USD
+# each. The node meters the budget itself and reports usage in bulk, so the
+# token can live much longer than a plain session.
+CALL_COST_USD      = float(os.getenv("ARIS_CALL_COST_USD", 0.01))
+BUDGET_TOKEN_TTL_S = float(os.getenv("ARIS_BUDGET_TOKEN_TTL", 3600))
+MAX_BUDGET_CALLS   = int(os.getenv("ARIS_MAX_BUDGET_CALLS", 100_000))
+
+# API-key → account cache (per process). Balances served from the cache may lag
+# debits made by other workers by at most ACCOUNT_CACHE_TTL_S.
+ACCOUNT_CACHE_TTL_S          = float(os.getenv("ARIS_ACCOUNT_CACHE_TTL", 5))
+ACCOUNT_CACHE_NEGATIVE_TTL_S = float(os.getenv("ARIS_ACCOUNT_CACHE_NEGATIVE_TTL", 10))
+ACCOUNT_CACHE_MAX_ENTRIES    = int(os.getenv("ARIS_ACCOUNT_CACHE_SIZE", 10_000))
+
+# Sharded balances: with ARIS_BALANCE_SHARDS > 1 each account's balance is split
+# across that many counters so debits for one hot key stop contending on a single
+# document. 1 keeps the whole balance on the account document.
+BALANCE_SHARDS = int(os.getenv("ARIS_BALANCE_SHARDS", 1))
+
+# Usage events are written in batches: whichever threshold is hit first.
+USAGE_BATCH_SIZE       = int(os.getenv("ARIS_USAGE_BATCH_SIZE", 500))
+USAGE_FLUSH_INTERVAL_S = float(os.getenv("ARIS_USAGE_FLUSH_INTERVAL", 0.2))
+USAGE_QUEUE_SIZE       = int(os.getenv("ARIS_USAGE_QUEUE_SIZE", 10_000))
+
+# /usage pages are keyset-paginated on (timestamp, _id); /usage/export streams
+# the whole history through one server-side cursor, USAGE_EXPORT_BATCH at a time.
+USAGE_PAGE_MAX      = 200
+USAGE_EXPORT_BATCH  = int(os.getenv("ARIS_USAGE_EXPORT_BATCH", 1000))
+USAGE_EXPORT_FIELDS = (
+    "timestamp", "capability", "payer_did", "target_did",
+    "cost_usd", "calls", "balance_before", "balance_after",
+)
+
+# /usage/summary reads hourly/daily rollups; the window defaults to 30 days and
+# may span at most USAGE_SUMMARY_MAX_BUCKETS buckets.
+USAGE_SUMMARY_WINDOW_S    = 30 * 86400
+USAGE_SUMMARY_MAX_BUCKETS = int(os.getenv("ARIS_USAGE_SUMMARY_MAX_BUCKETS", 2000))
+
+# Nodes /register once, then beat /heartbeat; they drop out of /discover after
+# missing HEARTBEAT_MAX_MISSED consecutive beats. Beats are tracked in memory
+# and written to storage at most once per HEARTBEAT_CHECKPOINT_S per node.
+HEARTBEAT_INTERVAL_S   = float(os.getenv("ARIS_HEARTBEAT_INTERVAL", 30))
+HEARTBEAT_MAX_MISSED   = int(os.getenv("ARIS_HEARTBEAT_MAX_MISSED", 3))
+HEARTBEAT_CHECKPOINT_S = float(os.getenv("ARIS_HEARTBEAT_CHECKPOINT",
+                                         HEARTBEAT_INTERVAL_S * HEARTBEAT_MAX_MISSED / 2))
+
+# The Stripe SDK blocks, so its calls run on a small thread pool. /success
+# reloads reuse a retrieved checkout session for STRIPE_SESSION_CACHE_TTL_S.
+STRIPE_THREADS             = int(os.getenv("ARIS_STRIPE_THREADS", 8))
+STRIPE_SESSION_CACHE_TTL_S = float(os.getenv("ARIS_STRIPE_SESSION_CACHE_TTL", 60))
+
+# Paid checkouts are stored by /webhook and applied to balances in the
+# background, TOPUP_BATCH_SIZE events at a time. An event that keeps failing
+# is marked "failed" after TOPUP_MAX_ATTEMPTS tries. A worker claims an event
+# for TOPUP_LEASE_S before applying it; if the worker dies, the event is
+# picked up again once the lease runs out. Each balance document remembers
+# its last TOPUP_EVENT_HISTORY event ids to make replays no-ops.
+TOPUP_BATCH_SIZE      = int(os.getenv("ARIS_TOPUP_BATCH_SIZE", 100))
+TOPUP_POLL_INTERVAL_S = float(os.getenv("ARIS_TOPUP_POLL_INTERVAL", 1))
+TOPUP_MAX_ATTEMPTS    = int(os.getenv("ARIS_TOPUP_MAX_ATTEMPTS", 5))
+TOPUP_LEASE_S         = float(os.getenv("ARIS_TOPUP_LEASE", 60))
+TOPUP_EVENT_HISTORY   = 100
 
 stripe.api_key = STRIPE_SECRET_KEY
+stripe_pool = StripePool(max_workers=STRIPE_THREADS, session_ttl=STRIPE_SESSION_CACHE_TTL_S)
+
+# --- METRICS (served at /metrics) ---
+metrics = Registry()
+DEPENDENCY_SECONDS = metrics.histogram(
+    "aris_dependency_duration_seconds", "Latency of calls to storage and Stripe.", ("dependency", "operation"),
+)
+DISCOVER_LOOKUPS = metrics.counter(
+    "aris_discover_lookups_total", "/discover lookups by source (index = in-memory hit).", ("source",),
+)
+HEARTBEATS = metrics.counter(
+    "aris_heartbeats_total", "/heartbeat beats by outcome (checkpoint = written to storage).", ("result",),
+)
+
+# --- STORAGE SETUP ---
+storage = open_storage(STORAGE_URL)
+accounts_collection = TimedCollection(storage.accounts, DEPENDENCY_SECONDS, "accounts")
+agents_collection = TimedCollection(storage.agents, DEPENDENCY_SECONDS, "agents")
+usage_collection = TimedCollection(storage.usage_logs, DEPENDENCY_SECONDS, "usage_logs")
+rollups_collection = TimedCollection(storage.usage_rollups, DEPENDENCY_SECONDS, "usage_rollups")
+sessions_collection = TimedCollection(storage.sessions, DEPENDENCY_SECONDS, "sessions")
+balance_shards_collection = TimedCollection(storage.balance_shards, DEPENDENCY_SECONDS, "balance_shards")
+stripe_events_collection = TimedCollection(storage.stripe_events, DEPENDENCY_SECONDS, "stripe_events")
+
+account_cache = AccountCache(
+    ttl=ACCOUNT_CACHE_TTL_S,
+    negative_ttl=ACCOUNT_CACHE_NEGATIVE_TTL_S,
+    max_entries=ACCOUNT_CACHE_MAX_ENTRIES,
+    max_negative_entries=ACCOUNT_CACHE_MAX_ENTRIES,
+)
+
+discovery = DiscoveryIndex(heartbeat_interval=HEARTBEAT_INTERVAL_S, max_missed=HEARTBEAT_MAX_MISSED,
+                           checkpoint_interval=HEARTBEAT_CHECKPOINT_S)
+
+
+# Rollup batches whose write failed, by batch id. Each bucket remembers the
+# ids of the last ROLLUP_BATCH_HISTORY batches it counted, so a retry only
+# applies the buckets the failed write missed.
+ROLLUP_BATCH_HISTORY = 32
+MAX_FAILED_ROLLUPS = 1000
+_failed_rollups: Dict[str, Dict[RollupKey, Dict[str, float]]] = {}
+
+
+async def _write_usage_batch(events: list) -> None:
+    try:
+        await usage_collection.insert_many(events, ordered=False)
+    except BulkWriteError as e:
+        # insert_many gives every event its _id up front, so when a write
+        # fails part-way the writer's retry re-sends events already stored.
+        # Those come back as duplicate keys and count as written; the rest of
+        # the batch was still inserted (unordered), and the rollups below
+        # have not been applied yet.
+        details = e.details
+        if details.get("writeConcernErrors") or any(
+            err.get("code") != 11000 for err in details.get("writeErrors", [])
+        ):
+            raise
+    # Rollups are derived from the logs just written. A failure here is not
+    # raised: the writer's retry would insert the events again under a new
+    # rollup batch and count them twice. The batch is parked and retried
+    # ahead of the next one instead.
+    await _retry_rollups()
+    batch_id, folded = secrets.token_hex(8), fold(events)
+    try:
+        await _apply_rollups(batch_id, folded)
+    except Exception as e:
+        logger.error("Usage rollup update failed for %d events; retrying with the next batch: %s", len(events), e)
+        _failed_rollups[batch_id] = folded
+        while len(_failed_rollups) > MAX_FAILED_ROLLUPS:
+            dropped = _failed_rollups.pop(next(iter(_failed_rollups)))
+            logger.error("Dropped a failed rollup batch of %d buckets; rebuild them from usage_logs", len(dropped))
 
-# --- MONGODB SETUP ---
-client = AsyncIOMotorClient(MONGO_URI)
-db = client.aris_registry
-accounts_collection = db.accounts
-agents_collection = db.agents
-usage_collection = db.usage_logs
 
-app = FastAPI(title="Aris Registry (Production)", version="1.0")
+def _rollup_filter(key: RollupKey) -> Dict[str, Any]:
+    api_key, capability, granularity, bucket = key
+    return {"api_key": api_key, "capability": capability, "granularity": granularity, "bucket": bucket}
+
+
+async def _apply_rollups(batch_id: str, folded: Dict[RollupKey, Dict[str, float]], retry: bool = False) -> None:
+    mark = {"rollup_batches": {"$each": [batch_id], "$slice": -ROLLUP_BATCH_HISTORY}}
+    guard: Dict[str, Any] = {}
+    if retry:
+        # Buckets must exist first: an upsert can't carry the guard.
+        await rollups_collection.bulk_write([
+            UpdateOne(_rollup_filter(key), {"$setOnInsert": {"rollup_batches": []}}, upsert=True) for key in folded
+        ], ordered=False)
+        guard = {"rollup_batches": {"$ne": batch_id}}
+    ops = [
+        UpdateOne({**_rollup_filter(key), **guard}, {"$inc": counters, "$push": mark}, upsert=not retry)
+        for key, counters in folded.items()
+    ]
+    await rollups_collection.bulk_write(ops, ordered=False)
+
+
+async def _retry_rollups() -> None:
+    """Apply the parked rollup batches; the ones that fail again stay parked."""
+    for batch_id, folded in list(_failed_rollups.items()):
+        try:
+            await _apply_rollups(batch_id, folded, retry=True)
+        except Exception as e:
+            logger.error("Usage rollup retry failed for %d buckets: %s", len(folded), e)
+            return
+        del _failed_rollups[batch_id]
+
+
+usage_writer = UsageWriter(
+    _write_usage_batch,
+    max_batch=USAGE_BATCH_SIZE,
+    flush_interval=USAGE_FLUSH_INTERVAL_S,
+    max_queue=USAGE_QUEUE_SIZE,
+)
+
+
+async def _apply_topup(event: dict) -> str:
+    """Credit one stored checkout event to its account (idempotent). Returns the API key."""
+    # Creating the account is an idempotent upsert on its own; the credit
+    # below carries the per-event guard. email is uniquely indexed, so when
+    # two workers create the same new account at once, the loser's upsert
+    # fails and its retry finds the winner's document.
+    for attempt in range(2):
+        try:
+            account = await accounts_collection.find_one_and_update(
+                {"email": event["email"]},
+                {"$setOnInsert": {
+                    "api_key": f"aris_live_{secrets.token_urlsafe(32)}", "created_at": time.time(), "balance": 0.0,
+                }},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            break
+        except DuplicateKeyError:
+            if attempt:
+                raise
+    api_key = account["api_key"]
+    # Sharded balances: the account document takes shard 0's part of the
+    # top-up, the other shards get the rest.
+    parts = balances.split(event["amount_usd"], BALANCE_SHARDS)
+    if await balances.credit_once(accounts_collection, balance_shards_collection, api_key, parts,
+                                  event["_id"], history=TOPUP_EVENT_HISTORY):
+        logger.info("Stripe checkout applied; $%.2f credited to %s", event["amount_usd"], event["email"])
+    # The balance changed (or the key is brand new): drop stale cache state.
+    account_cache.invalidate(api_key)
+    return api_key
+
+
+async def _process_topups(batch_size: int) -> int:
+    """Apply up to *batch_size* pending checkout events; returns how many were picked up."""
+    now = time.time()
+    claimable = {"$or": [{"status": "pending"}, {"status": "processing", "lease_until": {"$lt": now}}]}
+    events = await stripe_events_collection.find(claimable) \
+        .sort([("received_at", ASCENDING)]).limit(batch_size).to_list(length=None)
+    ops = []
+    for event in events:
+        # Claim the event first: the filter is re-checked atomically, so of
+        # several workers that read it, only one goes on to apply it.
+        claimed = await stripe_events_collection.find_one_and_update(
+            {"_id": event["_id"], **claimable},
+            {"$set": {"status": "processing", "lease_until": now + TOPUP_LEASE_S}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if claimed is None:
+            continue
+        event = claimed
+        try:
+            api_key = await _apply_topup(event)
+        except asyncio.CancelledError:
+            # Shutting down: hand the event back rather than wait out the lease.
+            await stripe_events_collection.update_one({"_id": event["_id"]}, {"$set": {"status": "pending"}})
+            raise
+        except Exception as e:
+            failed = event.get("attempts", 0) + 1 >= TOPUP_MAX_ATTEMPTS
+            logger.error("Top-up %s failed (attempt %d)%s: %s", event["_id"], event.get("attempts", 0) + 1,
+                         "; giving up" if failed else "", e)
+            update = {"$inc": {"attempts": 1},
+                      "$set": {"status": "failed" if failed else "pending", "last_error": str(e)}}
+        else:
+            update = {"$set": {"status": "applied", "api_key": api_key, "applied_at": time.time()}}
+        ops.append(UpdateOne({"_id": event["_id"]}, update))
+    if ops:
+        await stripe_events_collection.bulk_write(ops, ordered=False)
+    return len(events)
+
+
+topup_worker = TopUpWorker(_process_topups, batch_size=TOPUP_BATCH_SIZE, poll_interval=TOPUP_POLL_INTERVAL_S)
+
+
+async def _lookup_account(api_key: str) -> Optional[dict]:
+    """Resolve an API key to its account, via the cache. Returns None for unknown keys."""
+    account = account_cache.get(api_key)
+    if account is MISSING:
+        if BALANCE_SHARDS > 1:
+            account = await balances.load_account(accounts_collection, balance_shards_collection, api_key)
+        else:
+            account = await accounts_collection.find_one({"api_key": api_key})
+        account_cache.put(api_key, account)
+    return account
+
+
+def _index_specs() -> List[Tuple[str, Any, Any, Dict[str, Any], bool]]:
+    """(name, collection, keys, options, required) for every index the registry relies on."""
+    return [
+        # Not required: legacy data may hold duplicate keys or DIDs, which the
+        # failure log points at. Lookups still work without these.
+        ("accounts", accounts_collection, "api_key", {"unique": True}, False),
+        # Partial, not sparse: a sparse index still covers an explicit
+        # email: null, so two accounts created without an email would collide.
+        ("accounts", accounts_collection, "email",
+         {"unique": True, "partialFilterExpression": {"email": {"$type": "string"}}}, False),
+        ("agents", agents_collection, "did", {"unique": True}, False),
+        ("agents", agents_collection, "capabilities", {}, False),
+        ("agents", agents_collection, "last_seen", {}, False),
+        ("usage_logs", usage_collection, [("api_key", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)], {}, False),
+        # Required: without them a budget token's usage could be recorded
+        # twice, a rollup bucket or balance shard split in two, and pending
+        # top-ups found by a collection scan on every poll.
+        ("sessions", sessions_collection, "jti", {"unique": True}, True),
+        ("rollups", rollups_collection,
+         [("api_key", ASCENDING), ("granularity", ASCENDING), ("bucket", ASCENDING), ("capability", ASCENDING)],
+         {"unique": True}, True),
+        ("balance_shards", balance_shards_collection, [("api_key", ASCENDING), ("shard", ASCENDING)], {"unique": True}, True),
+        ("stripe_events", stripe_events_collection, [("status", ASCENDING), ("received_at", ASCENDING)], {}, True),
+    ]
+
+
+async def _ensure_indexes() -> None:
+    """
+    Create the storage indexes one by one, so a failure skips only that index
+    and is logged by name. Raises RuntimeError if a required one is missing.
+    """
+    missing = []
+    for name, collection, keys, options, required in _index_specs():
+        try:
+            await collection.create_index(keys, **options)
+        except Exception as e:
+            logger.error("Could not create index %s on %s: %s", keys, name, e)
+            if required:
+                missing.append(f"{name} {keys}")
+    if missing:
+        raise RuntimeError("Required storage indexes are missing: " + "; ".join(missing))
+
+
+async def _sync_discovery() -> None:
+    """Background task: hydrate the discovery index, then keep it in sync."""
+    while True:
+        try:
+            since = time.time() - discovery.ttl
+            docs = await agents_collection.find({"last_seen": {"$gte": since}}).to_list(length=None)
+            if not discovery.hydrated:
+                # First pass also picks up registrations that predate last_seen.
+                docs += await agents_collection.find({"last_seen": {"$exists": False}}).to_list(length=None)
+            discovery.merge(docs)
+            expired = discovery.expire()
+            if expired:
+                logger.info("Expired %d agents that stopped heartbeating", expired)
+        except Exception as e:
+            logger.warning("Discovery sync failed: %s", e)
+        await asyncio.sleep(HEARTBEAT_INTERVAL_S)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    account_cache.clear()
+    discovery.clear()
+    # Before serving: a missing required index fails startup.
+    await _ensure_indexes()
+    folded = await balances.fold(accounts_collection, balance_shards_collection, BALANCE_SHARDS)
+    if folded:
+        logger.info("Folded %d balance shards past ARIS_BALANCE_SHARDS=%d back into their accounts",
+                    folded, BALANCE_SHARDS)
+    usage_writer.start()
+    topup_worker.start()
+    sync_task = asyncio.create_task(_sync_discovery())
+    yield
+    sync_task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await sync_task
+    # Drain queued usage events so a graceful shutdown never loses a billed event.
+    await usage_writer.stop()
+    await _retry_rollups()
+    if _failed_rollups:
+        logger.error("%d usage rollup batches were never applied; rebuild their buckets from usage_logs",
+                     len(_failed_rollups))
+    await topup_worker.stop()
+    stripe_pool.shutdown()
+
+
+app = FastAPI(title="Aris Registry (Production)", version="1.0", lifespan=lifespan)
+install_metrics(app, metrics)
+
+metrics.callback(
+    "aris_account_cache_lookups_total", "Account cache lookups by result.",
+    lambda: {("hit",): account_cache.hits, ("negative_hit",): account_cache.negative_hits,
+             ("miss",): account_cache.misses},
+    kind="counter", labelnames=("result",),
+)
+metrics.callback("aris_discovery_index_agents", "Live agents in the discovery index.", lambda: len(discovery))
+metrics.callback("aris_usage_queue_depth", "Usage events waiting to be written.",
+                 lambda: usage_writer.stats()["queued"])
+metrics.callback("aris_usage_events_written_total", "Usage events written to storage.",
+                 lambda: usage_writer.events_written, kind="counter")
+metrics.callback("aris_stripe_session_cache_hits_total", "/success lookups served without calling Stripe.",
+                 lambda: stripe_pool.session_hits, kind="counter")
 
 # --- MODELS ---
+class NodeLoad(BaseModel):
+    """Load signals a node reports with each heartbeat; returned as-is by /discover."""
+    in_flight: int = 0
+    queue_depth: int = 0
+    p50_ms: Optional[float] = None
+    p95_ms: Optional[float] = None
+    p99_ms: Optional[float] = None
+    qps: Optional[float] = None
+    jobs_completed: Optional[int] = None
+    jobs_failed: Optional[int] = None
+
 class AgentRegistration(BaseModel):
     did: str
     endpoint: str
     capabilities: List[str]
+    load: Optional[NodeLoad] = None
+
+class Heartbeat(BaseModel):
+    did: str
+    # The "version" /register returned; a mismatch means the registration changed.
+    version: str
+    load: Optional[NodeLoad] = None
 
 class SessionRequest(BaseModel):
     payer_did: str
     target_did: str
     capability: str
+    # Prepay this many calls instead of a flat per-session fee (optional).
+    calls: Optional[int] = None
+
+class MeterReport(BaseModel):
+    jti: str
+    calls: int
+
+class UsageReport(BaseModel):
+    reports: List[MeterReport]
 
 # --- 1. STOREFRONT & CHECKOUT ---
 
@@ -67,14 +474,16 @@ async def create_checkout(price_id: str):
     price_id should be one of your Aris Starter, Builder, or Pro IDs.
     """
     try:
-        session = stripe.checkout.Session.create(
-            payment_method_types=['card'],
-            line_items=[{'price': price_id, 'quantity': 1}],
-            mode='payment',
-            customer_creation="always",
-            success_url="https://aris-registry.onrender.com/success?session_id={CHECKOUT_SESSION_ID}",
-            cancel_url="https://aris-registry.onrender.com/",
-        )
+        with DEPENDENCY_SECONDS.time("stripe", "checkout.create"):
+            session = await stripe_pool.run(
+                stripe.checkout.Session.create,
+                payment_method_types=['card'],
+                line_items=[{'price': price_id, 'quantity': 1}],
+                mode='payment',
+                customer_creation="always",
+                success_url="https://aris-registry.onrender.com/success?session_id={CHECKOUT_SESSION_ID}",
+                cancel_url="https://aris-registry.onrender.com/",
+            )
         return RedirectResponse(url=session.url, status_code=303)
     except Exception as e:
         return {"error": str(e)}
@@ -82,7 +491,8 @@ async def create_checkout(price_id: str):
 @app.get("/success", response_class=HTMLResponse)
 async def success_page(session_id: str):
     """Simple confirmation page that pulls the key from DB after payment."""
-    session = stripe.checkout.Session.retrieve(session_id)
+    with DEPENDENCY_SECONDS.time("stripe", "checkout.retrieve"):
+        session = await stripe_pool.retrieve_session(stripe.checkout.Session.retrieve, session_id)
     email = session.get("customer_details", {}).get("email")
     
     # Attempt to find the newly created key
@@ -108,35 +518,36 @@ async def success_page(session_id: str):
 @app.post("/webhook")
 async def stripe_webhook(request: Request):
     """
-    The only place where API keys are generated.
-    Triggered by Stripe after successful payment.
+    Triggered by Stripe after successful payment. Paid checkouts are recorded
+    here and credited by topup_worker, which also issues new API keys.
     """
     payload = await request.body()
     sig_header = request.headers.get("stripe-signature")
 
     try:
-        event = stripe.Webhook.construct_event(payload, sig_header, STRIPE_WEBHOOK_SECRET)
+        with DEPENDENCY_SECONDS.time("stripe", "webhook.verify"):
+            event = await stripe_pool.run(stripe.Webhook.construct_event, payload, sig_header, STRIPE_WEBHOOK_SECRET)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid Webhook Signature")
 
     if event['type'] == 'checkout.session.completed':
         session = event['data']['object']
-        customer_email = session.get("customer_details", {}).get("email")
-        amount_paid = session.get("amount_total") / 100 
-        
-        # GENERATE KEY ONLY AFTER PAYMENT
-        new_api_key = f"aris_live_{secrets.token_urlsafe(32)}"
-        
-        # Upsert: If email exists, add balance. If not, create and set key.
-        await accounts_collection.update_one(
-            {"email": customer_email},
-            {
-                "$setOnInsert": {"api_key": new_api_key, "created_at": time.time()},
-                "$inc": {"balance": amount_paid}
-            },
-            upsert=True
-        )
-        logger.info("Stripe checkout completed; API key issued for %s", customer_email)
+        # Store the paid checkout and ack; topup_worker credits it. Keyed by
+        # the Stripe event id, so a redelivery is a duplicate key, not a new top-up.
+        try:
+            await stripe_events_collection.insert_one({
+                "_id": event["id"],
+                "type": event["type"],
+                "email": session.get("customer_details", {}).get("email"),
+                "amount_usd": (session.get("amount_total") or 0) / 100,
+                "status": "pending",
+                "attempts": 0,
+                "received_at": time.time(),
+            })
+        except DuplicateKeyError:
+            logger.info("Stripe event %s already received", event["id"])
+        else:
+            topup_worker.notify()
 
     return {"status": "success"}
 
@@ -144,52 +555,104 @@ async def stripe_webhook(request: Request):
 
 @app.post("/register")
 async def register_agent(agent: AgentRegistration):
+    """
+    Registers a node (or refreshes its full registration). Returns the
+    registration ``version`` the node quotes in its ``/heartbeat`` beats.
+    """
+    now = time.time()
+    registration = agent.model_dump()
+    discovery.upsert(registration, last_seen=now)
     await agents_collection.update_one(
         {"did": agent.did},
-        {"$set": agent.model_dump()},
+        {"$set": {**registration, "last_seen": now}},
         upsert=True
     )
-    return {"status": "registered"}
+    return {"status": "registered", "version": registration_version(registration)}
+
+@app.post("/heartbeat")
+async def heartbeat(beat: Heartbeat):
+    """
+    Liveness and load from a registered node. Handled in memory; storage is
+    only written when the node's checkpoint is due. 409 asks the node to
+    ``/register`` again (unknown here, expired, or registration changed).
+    """
+    load = beat.load.model_dump() if beat.load is not None else None
+    due = discovery.beat(beat.did, beat.version, load)
+    if due is None:
+        HEARTBEATS.inc("reregister")
+        raise HTTPException(409, "Unknown or changed registration; POST /register")
+    if due:
+        HEARTBEATS.inc("checkpoint")
+        update = {"last_seen": time.time()}
+        if load is not None:
+            update["load"] = load
+        await agents_collection.update_one({"did": beat.did}, {"$set": update})
+    else:
+        HEARTBEATS.inc("coalesced")
+    return {"status": "ok"}
 
 @app.get("/discover")
 async def discover(capability: str):
-    cursor = agents_collection.find({"capabilities": capability})
-    agents = await cursor.to_list(length=100)
-    for a in agents: a.pop("_id", None)
-    return {"agents": agents}
+    """Live nodes for *capability*, answered from the in-memory discovery index."""
+    if discovery.hydrated:
+        DISCOVER_LOOKUPS.inc("index")
+        return {"agents": discovery.lookup(capability)}
+    DISCOVER_LOOKUPS.inc("storage")
+
+    # Cold start: index not hydrated yet, ask Mongo (live agents only).
+    cursor = agents_collection.find(
+        {"capabilities": capability, "last_seen": {"$not": {"$lt": time.time() - discovery.ttl}}},
+        {"_id": 0, "last_seen": 0},
+    )
+    return {"agents": await cursor.to_list(length=100)}
 
 @app.post("/handshake")
 async def handshake(req: SessionRequest, x_api_key: Optional[str] = Header(None)):
-    """Verifies balance, deducts cost, logs usage, and issues a ZK-session token."""
+    """
+    Verifies balance, deducts cost, logs usage, and issues a ZK-session token.
+
+    With ``calls`` set, the caller prepays that many calls at ``CALL_COST_USD``
+    each and gets a longer-lived token with a ``budget`` claim; the target node
+    meters it and reports usage back through ``/usage/report``.
+    """
     if not x_api_key:
         raise HTTPException(401, "Missing API Key")
-
-    user_account = await accounts_collection.find_one({"api_key": x_api_key})
-    if not user_account:
+    if req.calls is not None and not 1 <= req.calls <= MAX_BUDGET_CALLS:
+        raise HTTPException(422, f"calls must be between 1 and {MAX_BUDGET_CALLS}")
+    if account_cache.get(x_api_key) is None:
         raise HTTPException(403, "Invalid API Key")
 
-    # Check and Deduct Balance
-    current_balance = user_account.get("balance", 0)
-    if current_balance < HANDSHAKE_COST_USD:
-        raise HTTPException(402, "Insufficient Balance")
+    cost = HANDSHAKE_COST_USD if req.calls is None else round(req.calls * CALL_COST_USD, 6)
 
-    await accounts_collection.update_one(
-        {"api_key": x_api_key},
-        {"$inc": {"balance": -HANDSHAKE_COST_USD}}
-    )
+    if BALANCE_SHARDS > 1:
+        user_account, balance_after = await _debit_sharded(x_api_key, cost)
+    else:
+        # Check and Deduct Balance in one atomic round trip. The balance guard lives
+        # in the filter, so concurrent handshakes can never overdraw the account.
+        user_account = await accounts_collection.find_one_and_update(
+            {"api_key": x_api_key, "balance": {"$gte": cost}},
+            {"$inc": {"balance": -cost}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if not user_account:
+            # Cold path only: tell an unknown key apart from an empty wallet.
+            user_account = await _lookup_account(x_api_key)
+            if not user_account:
+                raise HTTPException(403, "Invalid API Key")
+            # Credit may still sit in balance shards, topped up by a worker that
+            # ran with a higher ARIS_BALANCE_SHARDS: consolidating folds it in.
+            stranded = await balance_shards_collection.find_one({"api_key": x_api_key, "balance": {"$gt": 0}})
+            left = None
+            if stranded:
+                left = await balances.debit(accounts_collection, balance_shards_collection, x_api_key, cost, 1)
+            if left is None:
+                raise HTTPException(402, "Insufficient Balance")
+            user_account = {**user_account, "balance": left}
+        account_cache.put(x_api_key, user_account)
+        balance_after = round(user_account.get("balance", 0), 6)
 
-    # --- Log Usage ---
-    await usage_collection.insert_one({
-        "api_key": x_api_key,
-        "email": user_account.get("email"),
-        "payer_did": req.payer_did,
-        "target_did": req.target_did,
-        "capability": req.capability,
-        "cost_usd": HANDSHAKE_COST_USD,
-        "balance_before": current_balance,
-        "balance_after": round(current_balance - HANDSHAKE_COST_USD, 6),
-        "timestamp": time.time(),
-    })
+    balance_before = round(balance_after + cost, 6)
+    now = time.time()
 
     # Issue ZK-Token
     payload = {
@@ -197,14 +660,144 @@ async def handshake(req: SessionRequest, x_api_key: Optional[str] = Header(None)
         "sub": req.payer_did,
         "aud": req.target_did,
         "scope": req.capability,
-        "exp": time.time() + 300
+        "exp": now + SESSION_TOKEN_TTL_S
     }
+    if req.calls is not None:
+        payload.update(jti=secrets.token_hex(16), budget=req.calls, exp=now + BUDGET_TOKEN_TTL_S)
+        await sessions_collection.insert_one({
+            "jti": payload["jti"],
+            "api_key": x_api_key,
+            "target_did": req.target_did,
+            "capability": req.capability,
+            "calls": req.calls,
+            "calls_used": 0,
+            "cost_usd": cost,
+            "created_at": now,
+            "expires_at": payload["exp"],
+        })
     token = jwt.encode(payload, ARIS_PRIVATE_KEY, algorithm="HS256")
 
-    return {
+    # --- Log Usage (queued; written in batches off the critical path) ---
+    event = {
+        "api_key": x_api_key,
+        "email": user_account.get("email"),
+        "payer_did": req.payer_did,
+        "target_did": req.target_did,
+        "capability": req.capability,
+        "cost_usd": cost,
+        "balance_before": balance_before,
+        "balance_after": balance_after,
+        "timestamp": now,
+    }
+    if req.calls is not None:
+        event["calls"] = req.calls
+    await usage_writer.submit(event)
+
+    response = {
         "session_token": token,
-        "remaining_balance": round(current_balance - HANDSHAKE_COST_USD, 6)
+        "remaining_balance": round(user_account.get("balance", 0), 6)
     }
+    if req.calls is not None:
+        response["budget"] = {"calls": req.calls, "cost_usd": cost, "expires_at": payload["exp"]}
+    return response
+
+
+async def _debit_sharded(api_key: str, cost: float) -> Tuple[dict, float]:
+    """
+    Debit *cost* from one of the account's balance shards. Returns the account
+    with its estimated total balance after the debit, and what the debited
+    shard holds now.
+
+    The shard guards make the debit itself exact, and so is the shard balance,
+    read from the shard's post-image: that is what the usage log records. The
+    total is the cached total minus *cost*, so like ``/balance`` it may trail
+    debits made on other workers by up to ``ARIS_ACCOUNT_CACHE_TTL`` seconds.
+    """
+    account = await _lookup_account(api_key)
+    if not account:
+        raise HTTPException(403, "Invalid API Key")
+    shard_after = await balances.debit(accounts_collection, balance_shards_collection, api_key, cost, BALANCE_SHARDS)
+    if shard_after is None:
+        account_cache.invalidate(api_key)
+        raise HTTPException(402, "Insufficient Balance")
+
+    # Start from the cache again: other handshakes may have debited meanwhile.
+    cached = account_cache.get(api_key)
+    if isinstance(cached, dict):
+        account = cached
+    if account.get("balance", 0) >= cost:
+        account = {**account, "balance": round(account["balance"] - cost, 6)}
+        account_cache.put(api_key, account)
+    else:
+        # The cached total is behind (a top-up landed elsewhere): re-read it.
+        account_cache.invalidate(api_key)
+        account = await _lookup_account(api_key)
+    return account, shard_after
+
+
+def _node_did(x_aris_node_token: Optional[str]) -> str:
+    """
+    The DID a worker node signed its short-lived registry token as (shared
+    session secret, audience ``aris-registry``). Raises 401 otherwise.
+    """
+    if not x_aris_node_token:
+        raise HTTPException(401, "Missing node token")
+    try:
+        claims = jwt.decode(x_aris_node_token, ARIS_PRIVATE_KEY, algorithms=["HS256"], audience="aris-registry")
+    except jwt.InvalidTokenError as exc:
+        raise HTTPException(401, f"Invalid node token: {exc}")
+    node_did = claims.get("iss")
+    if not node_did:
+        raise HTTPException(401, "Node token has no issuer")
+    return node_did
+
+
+@app.post("/usage/report")
+async def report_usage(report: UsageReport, x_aris_node_token: Optional[str] = Header(None)):
+    """
+    Bulk usage report from a worker node: calls served per budget session since
+    its last report. A node can only report on sessions issued to it.
+
+    Served calls are recorded as reported. A session whose recorded calls pass
+    its budget (served by several workers, or across a node restart) is
+    flagged with ``calls_over``, and the reply lists every reported session
+    that is used up so the node stops serving it.
+    """
+    node_did = _node_did(x_aris_node_token)
+
+    ops = [
+        UpdateOne({"jti": r.jti, "target_did": node_did}, {"$inc": {"calls_used": r.calls}})
+        for r in report.reports
+        if r.calls > 0
+    ]
+    exhausted = []
+    if ops:
+        await sessions_collection.bulk_write(ops, ordered=False)
+        reported = [r.jti for r in report.reports if r.calls > 0]
+        docs = await sessions_collection.find(
+            {"jti": {"$in": reported}, "target_did": node_did}, {"jti": 1, "calls": 1, "calls_used": 1},
+        ).to_list(length=None)
+        exhausted = [d["jti"] for d in docs if d["calls_used"] >= d["calls"]]
+        over = [UpdateOne({"jti": d["jti"]}, {"$set": {"calls_over": d["calls_used"] - d["calls"]}})
+                for d in docs if d["calls_used"] > d["calls"]]
+        if over:
+            logger.warning("Node %s served %d session(s) past their prepaid budget", node_did, len(over))
+            await sessions_collection.bulk_write(over, ordered=False)
+    return {"status": "ok", "sessions": len(ops), "exhausted": exhausted}
+
+
+@app.get("/usage/session/{jti}")
+async def session_usage(jti: str, x_aris_node_token: Optional[str] = Header(None)):
+    """
+    Calls recorded so far on a budget session issued to the calling node. A
+    node asks once per session per process, so after a restart (or on another
+    worker) it counts on from here instead of from zero.
+    """
+    node_did = _node_did(x_aris_node_token)
+    session = await sessions_collection.find_one({"jti": jti, "target_did": node_did})
+    if session is None:
+        raise HTTPException(404, "Unknown session")
+    return {"jti": jti, "calls": session["calls"], "calls_used": session.get("calls_used", 0)}
 
 
 # --- 4. ACCOUNT APIs ---
@@ -219,11 +812,14 @@ async def get_balance(x_api_key: Optional[str] = Header(None)):
 
     Returns:
         email, balance (USD), and account creation time.
+
+    Served from the per-process account cache, so the balance may trail
+    debits made on other workers by up to ``ARIS_ACCOUNT_CACHE_TTL`` seconds.
     """
     if not x_api_key:
         raise HTTPException(status_code=401, detail="Missing API Key. Pass x-api-key header.")
 
-    user_account = await accounts_collection.find_one({"api_key": x_api_key})
+    user_account = await _lookup_account(x_api_key)
     if not user_account:
         raise HTTPException(status_code=403, detail="Invalid API Key.")
 
@@ -234,9 +830,24 @@ async def get_balance(x_api_key: Optional[str] = Header(None)):
     }
 
 
+def _encode_usage_cursor(doc: dict) -> str:
+    raw = f"{doc['timestamp']!r}:{doc['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_usage_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, oid = raw.split(":", 1)
+        return float(timestamp), ObjectId(oid)
+    except (ValueError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+
 @app.get("/usage")
 async def get_usage(
     limit: int = 50,
+    cursor: Optional[str] = None,
     x_api_key: Optional[str] = Header(None)
 ):
     """
@@ -246,38 +857,190 @@ async def get_usage(
         x-api-key: Your Aris API key
 
     Query params:
-        limit: Max number of records to return (default 50, max 200)
+        limit:  Max number of records to return (default 50, max 200)
+        cursor: ``next_cursor`` from the previous page, to continue after it
 
     Returns:
-        List of usage events with timestamp, capability, cost, and balance snapshots.
+        One page of usage events, newest first, with timestamp, capability, cost,
+        and balance snapshots. ``next_cursor`` is null on the last page.
+        ``total_spent_usd`` is the account's all-time spend, summed from its
+        daily rollups, so it is the same on every page.
     """
     if not x_api_key:
         raise HTTPException(status_code=401, detail="Missing API Key. Pass x-api-key header.")
 
-    user_account = await accounts_collection.find_one({"api_key": x_api_key})
+    user_account = await _lookup_account(x_api_key)
     if not user_account:
         raise HTTPException(status_code=403, detail="Invalid API Key.")
 
-    limit = min(limit, 200)  # Hard cap
+    limit = max(1, min(limit, USAGE_PAGE_MAX))  # Hard cap
 
-    cursor = usage_collection.find(
-        {"api_key": x_api_key},
-        {"_id": 0, "api_key": 0}  # Strip internal fields
-    ).sort("timestamp", -1).limit(limit)
+    query = {"api_key": x_api_key}
+    if cursor:
+        timestamp, oid = _decode_usage_cursor(cursor)
+        query["$or"] = [
+            {"timestamp": {"$lt": timestamp}},
+            {"timestamp": timestamp, "_id": {"$lt": oid}},
+        ]
 
-    records = await cursor.to_list(length=limit)
+    # Keyset pagination: every page is a short range scan of the
+    # (api_key, timestamp, _id) index, however deep into the history it starts.
+    # One extra record tells us whether another page follows. The total reads
+    # one rollup document per day and capability instead of the whole history.
+    docs, days = await asyncio.gather(
+        usage_collection.find(
+            query,
+            {"api_key": 0}  # Strip internal fields
+        ).sort([("timestamp", DESCENDING), ("_id", DESCENDING)]).limit(limit + 1).to_list(length=limit + 1),
+        rollups_collection.find(
+            {"api_key": x_api_key, "granularity": "day"}, {"_id": 0, "cost_usd": 1}
+        ).to_list(length=None),
+    )
+
+    records = docs[:limit]
+    next_cursor = _encode_usage_cursor(records[-1]) if len(docs) > limit else None
+    for r in records:
+        r.pop("_id", None)
 
-    total_spent = sum(r.get("cost_usd", 0) for r in records)
+    total_spent = sum(d.get("cost_usd", 0) for d in days)
 
     return {
         "email": user_account.get("email"),
         "records_returned": len(records),
         "total_spent_usd": round(total_spent, 6),
         "usage": records,
+        "next_cursor": next_cursor,
     }
 
 
+@app.get("/usage/summary")
+async def get_usage_summary(
+    granularity: Literal["hour", "day"] = "day",
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    capability: Optional[str] = None,
+    x_api_key: Optional[str] = Header(None),
+):
+    """
+    Spend totals, per-capability totals and a per-bucket time series for the
+    authenticated account.
+
+    Query params:
+        granularity: ``hour`` or ``day`` buckets (default ``day``)
+        since, until: unix-time window, default the last 30 days. Whole buckets
+                      are counted: ``since`` is rounded down to its bucket.
+        capability: Only this capability
+
+    Read from the hourly/daily rollups, so the cost grows with the number of
+    buckets in the window, not with the number of events.
+    """
+    if not x_api_key:
+        raise HTTPException(status_code=401, detail="Missing API Key. Pass x-api-key header.")
+
+    user_account = await _lookup_account(x_api_key)
+    if not user_account:
+        raise HTTPException(status_code=403, detail="Invalid API Key.")
+
+    until = time.time() if until is None else until
+    since = until - USAGE_SUMMARY_WINDOW_S if since is None else since
+    start = bucket_start(since, granularity)
+    if until <= start:
+        raise HTTPException(status_code=400, detail="until must be after since.")
+    if (until - start) / GRANULARITIES[granularity] > USAGE_SUMMARY_MAX_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Window spans more than {USAGE_SUMMARY_MAX_BUCKETS} {granularity} buckets; narrow it.",
+        )
+
+    query = {"api_key": x_api_key, "granularity": granularity, "bucket": {"$gte": start, "$lt": until}}
+    if capability:
+        query["capability"] = capability
+    docs = await rollups_collection.find(query, {"_id": 0, "rollup_batches": 0}).to_list(length=None)
+
+    return {"email": user_account.get("email"), **summarize(docs, granularity, start, until)}
+
+
+async def _stream_usage(query: dict, fmt: str):
+    cursor = usage_collection.find(query, {"_id": 0, "api_key": 0}).sort(
+        [("timestamp", ASCENDING), ("_id", ASCENDING)]
+    ).batch_size(USAGE_EXPORT_BATCH)
+
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=USAGE_EXPORT_FIELDS, extrasaction="ignore") if fmt == "csv" else None
+    if writer:
+        writer.writeheader()
+    try:
+        rows = 0
+        async for doc in cursor:
+            if writer:
+                writer.writerow(doc)
+            else:
+                buf.write(json.dumps(doc) + "\n")
+            rows += 1
+            if rows % USAGE_EXPORT_BATCH == 0:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        if buf.tell():
+            yield buf.getvalue()
+    finally:
+        await cursor.close()
+
+
+@app.get("/usage/export")
+async def export_usage(
+    fmt: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    x_api_key: Optional[str] = Header(None),
+):
+    """
+    Streams the full usage history for the authenticated account, oldest first.
+
+    Query params:
+        format: ``ndjson`` (one event per line, default) or ``csv``
+        since:  Only events at or after this unix timestamp
+        until:  Only events before this unix timestamp
+
+    Rows are read through a single batched server-side cursor and written out
+    as they arrive, so memory stays flat however long the history is.
+    """
+    if not x_api_key:
+        raise HTTPException(status_code=401, detail="Missing API Key. Pass x-api-key header.")
+
+    user_account = await _lookup_account(x_api_key)
+    if not user_account:
+        raise HTTPException(status_code=403, detail="Invalid API Key.")
+
+    query: dict = {"api_key": x_api_key}
+    if since is not None or until is not None:
+        query["timestamp"] = {}
+        if since is not None:
+            query["timestamp"]["$gte"] = since
+        if until is not None:
+            query["timestamp"]["$lt"] = until
+
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _stream_usage(query, fmt),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="aris-usage.{fmt}"'},
+    )
+
+
+# --- ENTRY POINT ---
+def start():
+    """Entry point used by setup.py console_scripts (``aris-registry``)."""
+    parser = argparse.ArgumentParser(description="Aris Registry")
+    # One worker by default. Each worker keeps its own account cache, discovery
+    # index and usage writer, so more of them are opt-in (--workers / ARIS_WORKERS).
+    add_server_arguments(parser, port=int(os.environ.get("PORT", 8000)), workers=1)
+    args = parser.parse_args()
+
+    if STORAGE_URL.startswith("memory://") and args.workers > 1:
+        parser.error("memory:// storage is per process; run it with --workers 1")
+    serve("registry.main:app", args)
+
+
 if __name__ == "__main__":
-    import uvicorn
-    port = int(os.environ.get("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
+    start()
\ No newline at end of file
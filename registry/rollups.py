@@ -0,0 +1,106 @@
+"""
+Pre-aggregated usage rollups.
+
+Every usage event is also counted into per-(api_key, capability) buckets for
+its hour and its day, so spend questions read a few rollup documents instead
+of scanning ``usage_logs``. Rollups are maintained by the usage writer: each
+batch is folded in memory with :func:`fold`, then applied as one ``$inc``
+upsert per bucket, so a 500-event batch costs a handful of writes. Each bucket
+also records the ids of the batches it counted, so a failed write can be
+retried without counting a batch twice.
+
+``usage_logs`` stays the source of truth. :func:`raw_pipeline` computes the
+same numbers straight from the logs, for audits and to rebuild a bucket.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+GRANULARITIES = {"hour": 3600, "day": 86400}
+
+COUNTERS = ("events", "cost_usd", "calls")
+
+RollupKey = Tuple[str, str, str, int]    # (api_key, capability, granularity, bucket)
+
+
+def bucket_start(timestamp: float, granularity: str) -> int:
+    size = GRANULARITIES[granularity]
+    return int(timestamp // size) * size
+
+
+def fold(events: Iterable[Dict[str, Any]]) -> Dict[RollupKey, Dict[str, float]]:
+    """Fold usage events into ``(api_key, capability, granularity, bucket) → counters``."""
+    out: Dict[RollupKey, Dict[str, float]] = {}
+    for e in events:
+        for granularity in GRANULARITIES:
+            key = (e["api_key"], e.get("capability", ""), granularity, bucket_start(e["timestamp"], granularity))
+            c = out.get(key)
+            if c is None:
+                c = out[key] = {"events": 0, "cost_usd": 0.0, "calls": 0}
+            c["events"] += 1
+            c["cost_usd"] += e.get("cost_usd", 0)
+            c["calls"] += e.get("calls", 0)
+    return out
+
+
+def summarize(docs: Iterable[Dict[str, Any]], granularity: str, since: float, until: float) -> Dict[str, Any]:
+    """
+    Combine rollup documents (or :func:`raw_pipeline` rows) into a total,
+    per-capability totals and a time series with one point per bucket.
+    """
+    total = dict.fromkeys(COUNTERS, 0)
+    by_capability: Dict[str, Dict[str, float]] = {}
+    series: Dict[float, Dict[str, float]] = {}
+    for d in docs:
+        for target in (
+            total,
+            by_capability.setdefault(d["capability"], dict.fromkeys(COUNTERS, 0)),
+            series.setdefault(d["bucket"], dict.fromkeys(COUNTERS, 0)),
+        ):
+            for name in COUNTERS:
+                target[name] += d.get(name, 0)
+
+    return {
+        "granularity": granularity,
+        "since": since,
+        "until": until,
+        "total": _rounded(total),
+        "by_capability": {cap: _rounded(c) for cap, c in sorted(by_capability.items())},
+        "series": [{"bucket": bucket, **_rounded(c)} for bucket, c in sorted(series.items())],
+    }
+
+
+def raw_pipeline(
+    api_key: str,
+    granularity: str,
+    since: float,
+    until: float,
+    capability: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    The equivalent aggregation over raw ``usage_logs``: O(events) in the window.
+    Emits rows shaped like rollup documents, so :func:`summarize` accepts both.
+    """
+    size = GRANULARITIES[granularity]
+    match: Dict[str, Any] = {"api_key": api_key, "timestamp": {"$gte": since, "$lt": until}}
+    if capability:
+        match["capability"] = capability
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": {
+                "capability": "$capability",
+                "bucket": {"$subtract": ["$timestamp", {"$mod": ["$timestamp", size]}]},
+            },
+            "events":   {"$sum": 1},
+            "cost_usd": {"$sum": "$cost_usd"},
+            "calls":    {"$sum": {"$ifNull": ["$calls", 0]}},
+        }},
+        {"$project": {
+            "_id": 0, "capability": "$_id.capability", "bucket": "$_id.bucket",
+            "events": 1, "cost_usd": 1, "calls": 1,
+        }},
+    ]
+
+
+def _rounded(counters: Dict[str, float]) -> Dict[str, float]:
+    return {**counters, "cost_usd": round(counters["cost_usd"], 6)}
@@ -0,0 +1,31 @@
+"""
+Pluggable storage for the registry.
+
+:func:`open_storage` picks a backend from a URL:
+
+    mongodb://… / mongodb+srv://…   MongoDB through Motor (production)
+    sqlite:///aris.db               SQLite in WAL mode, for single-box deployments
+    memory://                       in-process dicts, for tests and local load tests
+
+Every backend exposes the same collections with the same Motor-style API (see
+:mod:`registry.storage.base`), so the registry code does not know which one it
+is talking to. Bulk writes take :class:`UpdateOne` from here rather than
+pymongo's, so every backend can read them.
+"""
+
+from registry.storage.base import COLLECTIONS, Storage, UpdateOne
+
+
+def open_storage(url: str) -> Storage:
+    if url.startswith(("mongodb://", "mongodb+srv://")):
+        from registry.storage.mongo import MongoStorage
+        return MongoStorage(url)
+    if url.startswith("sqlite://"):
+        from registry.storage.sqlite import SQLiteStorage
+        path = url[len("sqlite:///"):] if url.startswith("sqlite:///") else url[len("sqlite://"):]
+        return SQLiteStorage(path or ":memory:")
+    if url.startswith("memory://"):
+        from registry.storage.memory import MemoryStorage
+        return MemoryStorage()
+    raise ValueError(f"Unsupported storage URL: {url!r} (expected mongodb://, sqlite:/// or memory://)")
+
@@ -0,0 +1,121 @@
+"""
+The storage contract shared by every backend.
+
+A :class:`Storage` exposes one attribute per registry collection. Each speaks
+the subset of Motor's ``AsyncIOMotorCollection`` API the registry uses:
+
+    find_one, find (→ cursor with sort / skip / limit / batch_size / to_list /
+    async iteration / close), count_documents, insert_one, insert_many,
+    update_one, find_one_and_update, bulk_write (:class:`UpdateOne` requests),
+    delete_many, create_index
+
+with Mongo query and update semantics, so registry code is written once,
+against Motor, and runs unchanged on every backend.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pymongo
+from pymongo.errors import BulkWriteError
+
+COLLECTIONS = (
+    "accounts", "agents", "usage_logs", "usage_rollups", "sessions", "balance_shards", "stripe_events",
+)
+
+
+class UpdateOne(pymongo.UpdateOne):
+    """
+    pymongo's ``UpdateOne`` that keeps its arguments readable, so the backends
+    that execute bulk writes themselves don't reach into pymongo's internals.
+    Motor takes it like any other ``UpdateOne``.
+    """
+
+    def __init__(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool = False):
+        super().__init__(filter, update, upsert=upsert)
+        self.filter = filter
+        self.update = update
+        self.upsert = upsert
+
+
+def bulk_ops(requests: Iterable[Any]) -> List[Tuple[Dict[str, Any], Dict[str, Any], bool]]:
+    """``(filter, update, upsert)`` for each :class:`UpdateOne` in a bulk_write."""
+    ops = []
+    for op in requests:
+        if not isinstance(op, UpdateOne):
+            raise TypeError(f"bulk_write takes registry.storage.UpdateOne requests, not {type(op).__name__}")
+        ops.append((op.filter, op.update, bool(op.upsert)))
+    return ops
+
+
+def duplicate_inserts(inserted: int, errors: List[Tuple[int, str]]) -> BulkWriteError:
+    """
+    The ``BulkWriteError`` Mongo raises when documents of an ``insert_many``
+    hit a duplicate key; *errors* holds ``(index, message)`` for each of them.
+    """
+    return BulkWriteError({
+        "writeErrors": [{"index": i, "code": 11000, "errmsg": msg} for i, msg in errors],
+        "writeConcernErrors": [], "nInserted": inserted, "nUpserted": 0, "nMatched": 0, "nModified": 0,
+        "nRemoved": 0, "upserted": [],
+    })
+
+
+class Cursor:
+    """Lazy query cursor; backends implement :meth:`_fetch` (and may stream in :meth:`_batches`)."""
+
+    def __init__(self):
+        self._sort: Optional[List[Tuple[str, int]]] = None
+        self._skip = 0
+        self._limit = 0
+        self._batch_size = 0
+
+    def sort(self, key_or_list, direction: Optional[int] = None) -> "Cursor":
+        self._sort = [(key_or_list, direction or 1)] if isinstance(key_or_list, str) else list(key_or_list)
+        return self
+
+    def skip(self, n: int) -> "Cursor":
+        self._skip = n
+        return self
+
+    def limit(self, n: int) -> "Cursor":
+        self._limit = n
+        return self
+
+    def batch_size(self, n: int) -> "Cursor":
+        self._batch_size = n
+        return self
+
+    async def _fetch(self) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def _batches(self):
+        yield await self._fetch()
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        docs = await self._fetch()
+        return docs if length is None else docs[:length]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        async for batch in self._batches():
+            for doc in batch:
+                yield doc
+
+    async def close(self) -> None:
+        pass
+
+
+class Storage:
+    """Named collections for one registry deployment."""
+
+    accounts: Any
+    agents: Any
+    usage_logs: Any
+    usage_rollups: Any
+    sessions: Any
+    balance_shards: Any
+    stripe_events: Any
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,234 @@
+"""
+In-memory storage backend (``memory://``).
+
+Documents live in per-collection dicts inside the registry process, so data is
+lost on restart and every worker has its own copy: use it for tests, local load
+tests and single-worker demos. Each operation runs without yielding to the
+event loop, which makes conditional updates such as the balance guard atomic.
+
+``create_index`` builds a hash index on the leading field, used for equality
+lookups; unique indexes are enforced and raise ``DuplicateKeyError`` (sparse
+ones skip documents missing the indexed fields, partial ones documents that
+don't match their ``partialFilterExpression``). There are no ordered indexes:
+a sorted read filters and sorts every document matching the leading field, so
+a deep ``/usage`` page costs O(history) here. Use the SQLite backend for load
+tests over large histories.
+"""
+
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+from registry.storage.base import COLLECTIONS, Cursor, Storage, bulk_ops, duplicate_inserts
+from registry.storage.query import (
+    MISSING, apply_update, compile_filter, equality_fields, get_field, index_keys, project, sort_docs,
+)
+
+
+def _hashable(value: Any) -> Any:
+    return tuple(value) if isinstance(value, list) else value
+
+
+class MemoryCursor(Cursor):
+
+    def __init__(self, collection: "MemoryCollection", query, projection):
+        super().__init__()
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+
+    async def _fetch(self) -> List[Dict[str, Any]]:
+        return self._collection._select(self._query, self._projection, self._sort, self._skip, self._limit)
+
+
+class MemoryCollection:
+
+    def __init__(self, name: str):
+        self.name = name
+        self._docs: Dict[Any, Dict[str, Any]] = {}
+        # leading field → value → _ids
+        self._indexes: Dict[str, Dict[Any, Set[Any]]] = {}
+        # unique key tuple spec → {values: _id}
+        self._unique: Dict[tuple, Dict[tuple, Any]] = {}
+        # unique spec → predicate over the documents it covers (sparse or partial indexes)
+        self._covers: Dict[tuple, Callable[[Dict[str, Any]], bool]] = {}
+
+    # --- indexes ---------------------------------------------------------
+
+    async def create_index(self, keys, unique: bool = False, sparse: bool = False,
+                           partialFilterExpression: Optional[Dict[str, Any]] = None, **kwargs) -> str:
+        fields = tuple(f for f, _ in index_keys(keys))
+        if fields[0] not in self._indexes and fields[0] != "_id":
+            index = self._indexes[fields[0]] = defaultdict(set)
+            for _id, doc in self._docs.items():
+                for v in self._index_values(doc, fields[0]):
+                    index[v].add(_id)
+        if unique and fields not in self._unique:
+            if partialFilterExpression is not None:
+                self._covers[fields] = compile_filter(partialFilterExpression)
+            elif sparse:
+                self._covers[fields] = lambda doc, fields=fields: any(doc.get(f) is not None for f in fields)
+            self._unique[fields] = {self._unique_key(doc, fields): _id for _id, doc in self._docs.items()
+                                    if self._unique_indexed(doc, fields)}
+        return "_".join(fields)
+
+    @staticmethod
+    def _index_values(doc, field):
+        value = get_field(doc, field)
+        if isinstance(value, list):
+            return {_hashable(v) for v in value}
+        return {None if value is MISSING else _hashable(value)}
+
+    @staticmethod
+    def _unique_key(doc, fields):
+        return tuple(_hashable(doc.get(f)) for f in fields)
+
+    def _unique_indexed(self, doc, fields) -> bool:
+        covers = self._covers.get(fields)
+        return covers is None or covers(doc)
+
+    def _check_unique(self, doc, _id):
+        for fields, seen in self._unique.items():
+            if not self._unique_indexed(doc, fields):
+                continue
+            owner = seen.get(self._unique_key(doc, fields))
+            if owner is not None and owner != _id:
+                raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {fields}")
+
+    def _store(self, doc, old: Optional[Dict[str, Any]] = None) -> None:
+        _id = doc["_id"]
+        self._check_unique(doc, _id)
+        if old is not None:
+            self._unindex(old)
+        self._docs[_id] = doc
+        for field, index in self._indexes.items():
+            for v in self._index_values(doc, field):
+                index[v].add(_id)
+        for fields, seen in self._unique.items():
+            if self._unique_indexed(doc, fields):
+                seen[self._unique_key(doc, fields)] = _id
+
+    def _unindex(self, doc) -> None:
+        _id = doc["_id"]
+        for field, index in self._indexes.items():
+            for v in self._index_values(doc, field):
+                index[v].discard(_id)
+        for fields, seen in self._unique.items():
+            if seen.get(self._unique_key(doc, fields)) == _id:
+                del seen[self._unique_key(doc, fields)]
+
+    # --- reads -----------------------------------------------------------
+
+    def _candidates(self, query) -> List[Dict[str, Any]]:
+        query = query or {}
+        if "_id" in query and not isinstance(query["_id"], dict):
+            doc = self._docs.get(query["_id"])
+            return [doc] if doc else []
+        for field, value in equality_fields(query).items():
+            index = self._indexes.get(field)
+            if index is not None and not isinstance(value, (dict, list)):
+                return [self._docs[_id] for _id in index.get(value, ())]
+        return list(self._docs.values())
+
+    def _matching(self, query) -> List[Dict[str, Any]]:
+        test = compile_filter(query)
+        return [d for d in self._candidates(query) if test(d)]
+
+    def _select(self, query, projection, sort, skip, limit) -> List[Dict[str, Any]]:
+        docs = self._matching(query)
+        # Without a sort, insertion order (ObjectIds are time-ordered), like a Mongo scan.
+        docs = sort_docs(docs, sort or [("_id", 1)], top=skip + limit if limit else 0)[skip:]
+        return [project(d, projection) for d in docs]
+
+    async def find_one(self, query=None, projection=None, **kwargs) -> Optional[Dict[str, Any]]:
+        docs = self._matching(query)
+        return project(docs[0], projection) if docs else None
+
+    def find(self, query=None, projection=None, **kwargs) -> MemoryCursor:
+        return MemoryCursor(self, query, projection)
+
+    async def count_documents(self, query, **kwargs) -> int:
+        return len(self._matching(query))
+
+    # --- writes ----------------------------------------------------------
+
+    def _insert(self, doc) -> Any:
+        doc.setdefault("_id", ObjectId())
+        if doc["_id"] in self._docs:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: _id_")
+        self._store(dict(doc))
+        return doc["_id"]
+
+    async def insert_one(self, doc, **kwargs) -> InsertOneResult:
+        return InsertOneResult(self._insert(doc), True)
+
+    async def insert_many(self, docs, ordered: bool = True, **kwargs) -> InsertManyResult:
+        ids, errors = [], []
+        for i, doc in enumerate(docs):
+            try:
+                ids.append(self._insert(doc))
+            except DuplicateKeyError as exc:
+                errors.append((i, str(exc)))
+                if ordered:
+                    break
+        if errors:
+            raise duplicate_inserts(len(ids), errors)
+        return InsertManyResult(ids, True)
+
+    def _update(self, query, update, upsert) -> tuple:
+        """Returns (before, after, upserted_id) for the first matching document."""
+        docs = self._matching(query)
+        if docs:
+            before = docs[0]
+            after = dict(before)
+            apply_update(after, update)
+            self._store(after, old=before)
+            return before, after, None
+        if not upsert:
+            return None, None, None
+        doc = equality_fields(query)
+        apply_update(doc, update, inserting=True)
+        _id = self._insert(doc)
+        return None, self._docs[_id], _id
+
+    async def update_one(self, query, update, upsert: bool = False, **kwargs) -> UpdateResult:
+        before, after, upserted = self._update(query, update, upsert)
+        raw = {"n": int(after is not None), "nModified": int(before is not None and before != after)}
+        if upserted is not None:
+            raw["upserted"] = upserted
+        return UpdateResult(raw, True)
+
+    async def find_one_and_update(self, query, update, projection=None, upsert: bool = False,
+                                  return_document: bool = False, **kwargs) -> Optional[Dict[str, Any]]:
+        before, after, _ = self._update(query, update, upsert)
+        doc = after if return_document else before
+        return project(doc, projection) if doc is not None else None
+
+    async def bulk_write(self, requests, ordered: bool = True, **kwargs) -> BulkWriteResult:
+        matched = modified = 0
+        upserted = []
+        for query, update, upsert in bulk_ops(requests):
+            before, after, upserted_id = self._update(query, update, upsert)
+            matched += before is not None
+            modified += before is not None and before != after
+            if upserted_id is not None:
+                upserted.append({"index": len(upserted), "_id": upserted_id})
+        return BulkWriteResult({"nInserted": 0, "nMatched": matched, "nModified": modified, "nRemoved": 0,
+                                "nUpserted": len(upserted), "upserted": upserted}, True)
+
+    async def delete_many(self, query, **kwargs) -> DeleteResult:
+        docs = self._matching(query)
+        for d in docs:
+            self._unindex(d)
+            del self._docs[d["_id"]]
+        return DeleteResult({"n": len(docs)}, True)
+
+
+class MemoryStorage(Storage):
+
+    def __init__(self):
+        for name in COLLECTIONS:
+            setattr(self, name, MemoryCollection(name))
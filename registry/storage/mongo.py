@@ -0,0 +1,23 @@
+"""
+MongoDB storage backend (``mongodb://`` / ``mongodb+srv://``): the production default.
+
+Collections are Motor collections on the ``aris_registry`` database, so the
+registry's queries go to Mongo untouched.
+"""
+
+from registry.storage.base import COLLECTIONS, Storage
+
+
+class MongoStorage(Storage):
+
+    def __init__(self, uri: str, database: str = "aris_registry"):
+        # Imported here so the other backends run without motor installed.
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        self.client = AsyncIOMotorClient(uri)
+        self.db = self.client[database]
+        for name in COLLECTIONS:
+            setattr(self, name, self.db[name])
+
+    def close(self) -> None:
+        self.client.close()
@@ -0,0 +1,200 @@
+"""
+Mongo query semantics for the non-Mongo backends.
+
+Covers what the registry sends: equality (array fields match on any element),
+``$eq $ne $gt $gte $lt $lte $in $nin $exists $type $not``, ``$or``/``$and``, updates
+with ``$set $inc $setOnInsert $unset $push`` (``$each``/``$slice``), and inclusion/exclusion projections.
+A missing field never satisfies a comparison, as in Mongo.
+"""
+
+import heapq
+import operator
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# get_field() result for an absent field (distinct from an explicit None).
+MISSING = object()
+
+# $type aliases → Python types.
+_TYPES = {"string": str, "double": float, "int": int, "bool": bool, "object": dict, "array": list, "null": type(None)}
+
+
+def get_field(doc: Dict[str, Any], path: str) -> Any:
+    if "." not in path:
+        return doc.get(path, MISSING)
+    value: Any = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return MISSING
+        value = value[part]
+    return value
+
+
+def _compare(op: str, value: Any, arg: Any) -> bool:
+    if op == "$exists":
+        return (value is not MISSING) == bool(arg)
+    if op == "$type":
+        return value is not MISSING and isinstance(value, _TYPES[arg])
+    if op == "$not":
+        return not _condition(arg)(value)
+    if op == "$ne":
+        return not _compare("$eq", value, arg)
+    if op == "$nin":
+        return not _compare("$in", value, arg)
+
+    candidates = value if isinstance(value, list) else (value,)
+    if op == "$eq":
+        if arg is None and value is MISSING:
+            return True
+        return value == arg or any(v == arg for v in candidates)
+    if op == "$in":
+        return any(_compare("$eq", value, a) for a in arg)
+    for v in candidates:
+        if v is MISSING or v is None:
+            continue
+        try:
+            if (op == "$gt" and v > arg) or (op == "$gte" and v >= arg) \
+                    or (op == "$lt" and v < arg) or (op == "$lte" and v <= arg):
+                return True
+        except TypeError:
+            continue
+    return False
+
+
+_ORDER = {"$gt": operator.gt, "$gte": operator.ge, "$lt": operator.lt, "$lte": operator.le}
+
+
+def _op_test(op: str, arg: Any) -> Callable[[Any], bool]:
+    cmp = _ORDER.get(op)
+    if cmp is None:
+        return lambda value: _compare(op, value, arg)
+
+    def test(value):
+        if isinstance(value, list):
+            return _compare(op, value, arg)
+        if value is MISSING or value is None:
+            return False
+        try:
+            return cmp(value, arg)
+        except TypeError:
+            return False
+    return test
+
+
+def _all(tests: List[Callable[[Any], bool]]) -> Callable[[Any], bool]:
+    if len(tests) == 1:
+        return tests[0]
+
+    def test(x):
+        for t in tests:
+            if not t(x):
+                return False
+        return True
+    return test
+
+
+def _any(tests: List[Callable[[Any], bool]]) -> Callable[[Any], bool]:
+    def test(x):
+        for t in tests:
+            if t(x):
+                return True
+        return False
+    return test
+
+
+def _condition(cond: Any) -> Callable[[Any], bool]:
+    if isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond):
+        return _all([_op_test(op, arg) for op, arg in cond.items()])
+    if not isinstance(cond, (list, dict)) and cond is not None:
+        # Fast path for the common scalar equality.
+        return lambda value: value == cond or (isinstance(value, list) and cond in value)
+    return lambda value: _compare("$eq", value, cond)
+
+
+def compile_filter(query: Optional[Dict[str, Any]]) -> Callable[[Dict[str, Any]], bool]:
+    """Turn a query into a predicate over documents, parsing it once."""
+    tests: List[Callable[[Dict[str, Any]], bool]] = []
+    for field, cond in (query or {}).items():
+        if field in ("$or", "$and"):
+            subs = [compile_filter(sub) for sub in cond]
+            tests.append(_any(subs) if field == "$or" else _all(subs))
+        elif "." in field:
+            test = _condition(cond)
+            tests.append(lambda doc, field=field, test=test: test(get_field(doc, field)))
+        else:
+            test = _condition(cond)
+            tests.append(lambda doc, field=field, test=test: test(doc.get(field, MISSING)))
+    return _all(tests) if tests else (lambda doc: True)
+
+
+def equality_fields(query: Dict[str, Any]) -> Dict[str, Any]:
+    """Top-level ``field: value`` pairs of *query*: the seed of an upserted document."""
+    return {
+        k: v for k, v in query.items()
+        if not k.startswith("$") and not (isinstance(v, dict) and any(op.startswith("$") for op in v))
+    }
+
+
+def apply_update(doc: Dict[str, Any], update: Dict[str, Any], inserting: bool = False) -> None:
+    """Apply an update document to *doc* in place."""
+    for field, value in update.get("$set", {}).items():
+        doc[field] = value
+    if inserting:
+        for field, value in update.get("$setOnInsert", {}).items():
+            doc[field] = value
+    for field, delta in update.get("$inc", {}).items():
+        doc[field] = doc.get(field, 0) + delta
+    for field in update.get("$unset", {}):
+        doc.pop(field, None)
+    for field, value in update.get("$push", {}).items():
+        items = list(doc.get(field, []))
+        if isinstance(value, dict) and "$each" in value:
+            items.extend(value["$each"])
+            limit = value.get("$slice")
+            if limit is not None:
+                items = items[limit:] if limit < 0 else items[:limit]
+        else:
+            items.append(value)
+        doc[field] = items
+
+
+def project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not projection:
+        return dict(doc)
+    include = {k for k, v in projection.items() if v and k != "_id"}
+    if include:
+        out = {k: doc[k] for k in include if k in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            out["_id"] = doc["_id"]
+        return out
+    return {k: v for k, v in doc.items() if projection.get(k, 1)}
+
+
+def _sort_value(doc: Dict[str, Any], field: str) -> Tuple[int, Any]:
+    value = get_field(doc, field)
+    return (0, 0) if value is MISSING or value is None else (1, value)
+
+
+def sort_docs(docs: List[Dict[str, Any]], spec: Iterable[Tuple[str, int]], top: int = 0) -> List[Dict[str, Any]]:
+    """
+    *docs* ordered by a Mongo sort spec (missing/None lowest, as in Mongo).
+    With *top*, only the first *top* documents are returned, via a heap.
+    """
+    spec = list(spec)
+    if len({direction < 0 for _, direction in spec}) == 1:
+        descending = spec[0][1] < 0
+        key = lambda doc: [_sort_value(doc, field) for field, _ in spec]  # noqa: E731
+        if top and top < len(docs):
+            return (heapq.nlargest if descending else heapq.nsmallest)(top, docs, key=key)
+        return sorted(docs, key=key, reverse=descending)
+    # Mixed directions: one stable pass per key, least significant first.
+    docs = list(docs)
+    for field, direction in reversed(spec):
+        docs.sort(key=lambda doc, field=field: _sort_value(doc, field), reverse=direction < 0)
+    return docs[:top] if top else docs
+
+
+def index_keys(keys: Any) -> List[Tuple[str, int]]:
+    """Normalise a ``create_index`` key spec (``"field"`` or ``[(field, direction)]``)."""
+    if isinstance(keys, str):
+        return [(keys, 1)]
+    return [(field, direction) for field, direction in keys]
@@ -0,0 +1,374 @@
+"""
+SQLite storage backend (``sqlite:///relative/path.db``, ``sqlite:////abs/path.db``).
+
+For single-box deployments: no Mongo to run, and several registry workers on
+one machine can share the file. The database runs in WAL mode, so readers never
+block the writer.
+
+Each collection is a table of JSON documents ``(id, doc)``. Queries are
+compiled to SQL over ``json_extract``, and ``create_index`` becomes an
+expression index on the same expressions, so lookups such as
+``{"api_key": ...}`` are index seeks. Writes run in ``BEGIN IMMEDIATE``
+transactions: the balance guard in a conditional update holds across worker
+processes exactly as it does in Mongo.
+
+sqlite3 is blocking, so every statement runs on one dedicated thread and the
+event loop only awaits it. Streaming cursors (``batch_size`` set) read through
+their own connection.
+"""
+
+import asyncio
+import json
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+from registry.storage.base import COLLECTIONS, Cursor, Storage, bulk_ops, duplicate_inserts
+from registry.storage.query import apply_update, equality_fields, index_keys, project
+
+_FIELD = re.compile(r"^[A-Za-z_][A-Za-z0-9_.]*$")
+_COMPARISONS = {"$eq": "=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+
+def _param(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, separators=(",", ":"))
+    return value
+
+
+def _encode(doc: Dict[str, Any]) -> Tuple[str, str]:
+    body = {k: v for k, v in doc.items() if k != "_id"}
+    return str(doc["_id"]), json.dumps(body, separators=(",", ":"))
+
+
+def _decode(row) -> Dict[str, Any]:
+    _id, body = row
+    doc = json.loads(body)
+    doc["_id"] = ObjectId(_id) if ObjectId.is_valid(_id) else _id
+    return doc
+
+
+class _Compiler:
+    """Mongo filter → SQL ``WHERE`` clause for one collection."""
+
+    def __init__(self, arrays: Set[str]):
+        self.arrays = arrays
+        self.params: List[Any] = []
+
+    @staticmethod
+    def field(name: str) -> str:
+        if name == "_id":
+            return "id"
+        if not _FIELD.match(name):
+            raise ValueError(f"Unsupported field name: {name!r}")
+        return f"json_extract(doc, '$.{name}')"
+
+    def where(self, query: Optional[Dict[str, Any]]) -> str:
+        clauses = []
+        for name, cond in (query or {}).items():
+            if name in ("$or", "$and"):
+                parts = [self.where(sub) for sub in cond]
+                clauses.append("(" + f" {name[1:].upper()} ".join(parts or ["0" if name == "$or" else "1"]) + ")")
+            elif isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond):
+                clauses.extend(self.op(name, op, arg) for op, arg in cond.items())
+            else:
+                clauses.append(self.op(name, "$eq", cond))
+        return " AND ".join(clauses) or "1"
+
+    def _value_test(self, name: str, sql_op: str, args: List[Any]) -> str:
+        column = self.field(name)
+        marks = ", ".join("?" * len(args))
+        rhs = f"({marks})" if sql_op == "IN" else "?"
+        self.params.extend(_param(a) for a in args)
+        if name in self.arrays:
+            # Array fields match when any element does (json_each also yields a lone scalar).
+            return f"EXISTS (SELECT 1 FROM json_each(doc, '$.{name}') WHERE value {sql_op} {rhs})"
+        return f"{column} {sql_op} {rhs}"
+
+    def op(self, name: str, op: str, arg: Any) -> str:
+        if op == "$eq" and arg is None:
+            return f"{self.field(name)} IS NULL"
+        if op in _COMPARISONS:
+            return self._value_test(name, _COMPARISONS[op], [arg])
+        if op == "$in":
+            return self._value_test(name, "IN", list(arg)) if arg else "0"
+        if op == "$ne":
+            return f"NOT COALESCE({self.op(name, '$eq', arg)}, 0)"
+        if op == "$nin":
+            return f"NOT COALESCE({self.op(name, '$in', arg)}, 0)"
+        if op == "$not":
+            return f"NOT COALESCE(({self.where({name: arg})}), 0)"
+        if op == "$exists":
+            if self.field(name) == "id":
+                return "1" if arg else "0"
+            return f"json_type(doc, '$.{name}') IS {'NOT ' if arg else ''}NULL"
+        raise ValueError(f"Unsupported query operator: {op}")
+
+
+class SQLiteCursor(Cursor):
+
+    def __init__(self, collection: "SQLiteCollection", query, projection):
+        super().__init__()
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._reader: Optional[sqlite3.Cursor] = None
+
+    def _sql(self, arrays: Set[str]) -> Tuple[str, List[Any]]:
+        compiler = _Compiler(arrays)
+        sql = f'SELECT id, doc FROM "{self._collection.name}" WHERE {compiler.where(self._query)}'
+        if self._sort:
+            sql += " ORDER BY " + ", ".join(
+                f"{compiler.field(f)} {'DESC' if d < 0 else 'ASC'}" for f, d in self._sort
+            )
+        else:
+            sql += " ORDER BY rowid"
+        if self._limit or self._skip:
+            sql += f" LIMIT {int(self._limit) or -1} OFFSET {int(self._skip)}"
+        return sql, compiler.params
+
+    async def _fetch(self) -> List[Dict[str, Any]]:
+        storage = self._collection._storage
+
+        def run(conn):
+            sql, params = self._sql(storage._arrays[self._collection.name])
+            return conn.execute(sql, params).fetchall()
+
+        rows = await storage._run(run)
+        return [project(_decode(r), self._projection) for r in rows]
+
+    async def _batches(self):
+        storage = self._collection._storage
+        if not self._batch_size or storage.path == ":memory:":
+            yield await self._fetch()
+            return
+
+        def open_reader(conn):
+            sql, params = self._sql(storage._arrays[self._collection.name])
+            return storage._connect().execute(sql, params)
+
+        self._reader = await storage._run(open_reader)
+        try:
+            while True:
+                rows = await storage._run(lambda conn: self._reader.fetchmany(self._batch_size))
+                if not rows:
+                    break
+                yield [project(_decode(r), self._projection) for r in rows]
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        reader, self._reader = self._reader, None
+        if reader is not None:
+            await self._collection._storage._run(lambda conn: reader.connection.close())
+
+
+class SQLiteCollection:
+
+    def __init__(self, storage: "SQLiteStorage", name: str):
+        self._storage = storage
+        self.name = name
+
+    # --- helpers (run on the storage thread) ------------------------------
+
+    def _select_one(self, conn, query) -> Optional[Dict[str, Any]]:
+        compiler = _Compiler(self._storage._arrays[self.name])
+        row = conn.execute(
+            f'SELECT id, doc FROM "{self.name}" WHERE {compiler.where(query)} LIMIT 1',
+            compiler.params,
+        ).fetchone()
+        return _decode(row) if row else None
+
+    def _note_arrays(self, conn, doc) -> None:
+        known = self._storage._arrays[self.name]
+        for field, value in doc.items():
+            if isinstance(value, list) and field not in known:
+                conn.execute("INSERT OR IGNORE INTO _aris_arrays VALUES (?, ?)", (self.name, field))
+                known.add(field)
+
+    def _insert(self, conn, doc) -> Any:
+        doc.setdefault("_id", ObjectId())
+        self._note_arrays(conn, doc)
+        conn.execute(f'INSERT INTO "{self.name}" (id, doc) VALUES (?, ?)', _encode(doc))
+        return doc["_id"]
+
+    def _update(self, conn, query, update, upsert) -> tuple:
+        before = self._select_one(conn, query)
+        if before is not None:
+            after = dict(before)
+            apply_update(after, update)
+            self._note_arrays(conn, after)
+            _id, body = _encode(after)
+            conn.execute(f'UPDATE "{self.name}" SET doc = ? WHERE id = ?', (body, _id))
+            return before, after, None
+        if not upsert:
+            return None, None, None
+        doc = equality_fields(query)
+        apply_update(doc, update, inserting=True)
+        _id = self._insert(conn, doc)
+        return None, doc, _id
+
+    async def _write(self, fn, *args):
+        return await self._storage._run(self._storage._transaction, lambda conn: fn(conn, *args))
+
+    # --- API --------------------------------------------------------------
+
+    async def create_index(self, keys, unique: bool = False, **kwargs) -> str:
+        spec = index_keys(keys)
+        name = f"ix_{self.name}_" + "_".join(f.replace(".", "_") for f, _ in spec)
+        columns = ", ".join(f"{_Compiler.field(f)} {'DESC' if d < 0 else 'ASC'}" for f, d in spec)
+        sql = f'CREATE {"UNIQUE " if unique else ""}INDEX IF NOT EXISTS "{name}" ON "{self.name}" ({columns})'
+        await self._storage._run(lambda conn: conn.execute(sql))
+        return name
+
+    async def find_one(self, query=None, projection=None, **kwargs) -> Optional[Dict[str, Any]]:
+        doc = await self._storage._run(lambda conn: self._select_one(conn, query))
+        return project(doc, projection) if doc is not None else None
+
+    def find(self, query=None, projection=None, **kwargs) -> SQLiteCursor:
+        return SQLiteCursor(self, query, projection)
+
+    async def count_documents(self, query, **kwargs) -> int:
+        def run(conn):
+            compiler = _Compiler(self._storage._arrays[self.name])
+            sql = f'SELECT COUNT(*) FROM "{self.name}" WHERE {compiler.where(query)}'
+            return conn.execute(sql, compiler.params).fetchone()[0]
+        return await self._storage._run(run)
+
+    async def insert_one(self, doc, **kwargs) -> InsertOneResult:
+        return InsertOneResult(await self._write(self._insert, doc), True)
+
+    async def insert_many(self, docs, ordered: bool = True, **kwargs) -> InsertManyResult:
+        def run(conn):
+            # A failed INSERT only aborts its own statement, so the documents
+            # before it (and, unordered, after it) still commit, as in Mongo.
+            ids, errors = [], []
+            for i, doc in enumerate(docs):
+                try:
+                    ids.append(self._insert(conn, doc))
+                except sqlite3.IntegrityError as exc:
+                    errors.append((i, str(exc)))
+                    if ordered:
+                        break
+            return ids, errors
+        ids, errors = await self._write(run)
+        if errors:
+            raise duplicate_inserts(len(ids), errors)
+        return InsertManyResult(ids, True)
+
+    async def update_one(self, query, update, upsert: bool = False, **kwargs) -> UpdateResult:
+        def run(conn):
+            return self._update(conn, query, update, upsert)
+        before, after, upserted = await self._write(run)
+        raw = {"n": int(after is not None), "nModified": int(before is not None and before != after)}
+        if upserted is not None:
+            raw["upserted"] = upserted
+        return UpdateResult(raw, True)
+
+    async def find_one_and_update(self, query, update, projection=None, upsert: bool = False,
+                                  return_document: bool = False, **kwargs) -> Optional[Dict[str, Any]]:
+        def run(conn):
+            return self._update(conn, query, update, upsert)
+        before, after, _ = await self._write(run)
+        doc = after if return_document else before
+        return project(doc, projection) if doc is not None else None
+
+    async def bulk_write(self, requests, ordered: bool = True, **kwargs) -> BulkWriteResult:
+        ops = bulk_ops(requests)
+
+        def run(conn):
+            return [self._update(conn, q, u, upsert) for q, u, upsert in ops]
+
+        results = await self._write(run)
+        upserted = [{"index": i, "_id": r[2]} for i, r in enumerate(results) if r[2] is not None]
+        return BulkWriteResult({
+            "nInserted": 0,
+            "nMatched": sum(r[0] is not None for r in results),
+            "nModified": sum(r[0] is not None and r[0] != r[1] for r in results),
+            "nRemoved": 0,
+            "nUpserted": len(upserted),
+            "upserted": upserted,
+        }, True)
+
+    async def delete_many(self, query, **kwargs) -> DeleteResult:
+        def run(conn):
+            compiler = _Compiler(self._storage._arrays[self.name])
+            return conn.execute(f'DELETE FROM "{self.name}" WHERE {compiler.where(query)}', compiler.params).rowcount
+        return DeleteResult({"n": await self._write(run)}, True)
+
+
+class SQLiteStorage(Storage):
+
+    def __init__(self, path: str):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="aris-sqlite")
+        self._conn: Optional[sqlite3.Connection] = None
+        # collection → top-level fields that hold arrays (they need element-wise matching).
+        # Shared through _aris_arrays; reloaded whenever another connection has committed.
+        self._arrays: Dict[str, Set[str]] = {name: set() for name in COLLECTIONS}
+        self._data_version: Optional[int] = None
+        for name in COLLECTIONS:
+            setattr(self, name, SQLiteCollection(self, name))
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _open(self) -> sqlite3.Connection:
+        conn = self._connect()
+        for name in COLLECTIONS:
+            conn.execute(f'CREATE TABLE IF NOT EXISTS "{name}" (id TEXT PRIMARY KEY, doc TEXT NOT NULL)')
+        conn.execute("CREATE TABLE IF NOT EXISTS _aris_arrays (collection TEXT, field TEXT, PRIMARY KEY (collection, field))")
+        return conn
+
+    def _refresh_arrays(self, conn) -> None:
+        # Another worker on the same file may have stored an array in a field
+        # this process has only seen scalars in. data_version changes whenever
+        # another connection commits, so the reload is skipped otherwise.
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return
+        self._data_version = version
+        for collection, field in conn.execute("SELECT collection, field FROM _aris_arrays"):
+            self._arrays.setdefault(collection, set()).add(field)
+
+    def _transaction(self, fn, conn):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Under the write lock, so no other worker can add an array field mid-transaction.
+            self._refresh_arrays(conn)
+            result = fn(conn)
+        except sqlite3.IntegrityError as exc:
+            conn.execute("ROLLBACK")
+            raise DuplicateKeyError(str(exc)) from exc
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    def _call(self, fn, *args):
+        if self._conn is None:
+            self._conn = self._open()
+        self._refresh_arrays(self._conn)
+        return fn(*args, self._conn)
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._call, fn, *args)
+
+    def close(self) -> None:
+        def shutdown():
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        self._executor.submit(shutdown).result()
+        self._executor.shutdown()
@@ -0,0 +1,79 @@
+"""
+Latency instrumentation for storage collections.
+
+:class:`TimedCollection` wraps any backend's collection and records how long
+each call takes in a histogram labelled ``("storage", "<collection>.<method>")``.
+Queries are timed when they actually run (``to_list``), not when ``find``
+builds the cursor. Streaming iteration (``async for``) passes through untimed,
+because one long export would otherwise skew the distribution.
+"""
+
+import time
+from typing import Any
+
+# Collection methods that return an awaitable round trip.
+TIMED_METHODS = (
+    "find_one", "count_documents", "insert_one", "insert_many", "update_one",
+    "find_one_and_update", "bulk_write", "delete_many", "create_index",
+)
+
+
+class TimedCursor:
+    def __init__(self, cursor, child):
+        self._cursor = cursor
+        self._child = child
+
+    def sort(self, *args, **kwargs) -> "TimedCursor":
+        self._cursor = self._cursor.sort(*args, **kwargs)
+        return self
+
+    def skip(self, n: int) -> "TimedCursor":
+        self._cursor = self._cursor.skip(n)
+        return self
+
+    def limit(self, n: int) -> "TimedCursor":
+        self._cursor = self._cursor.limit(n)
+        return self
+
+    def batch_size(self, n: int) -> "TimedCursor":
+        self._cursor = self._cursor.batch_size(n)
+        return self
+
+    async def to_list(self, length=None):
+        t0 = time.perf_counter()
+        try:
+            return await self._cursor.to_list(length=length)
+        finally:
+            self._child.observe(time.perf_counter() - t0)
+
+    def __aiter__(self):
+        return self._cursor.__aiter__()
+
+    async def close(self) -> None:
+        await self._cursor.close()
+
+
+class TimedCollection:
+    """A collection whose round trips are observed into *histogram*."""
+
+    def __init__(self, collection, histogram, name: str):
+        self._collection = collection
+        self._find_child = histogram.labels("storage", f"{name}.find")
+        for method in TIMED_METHODS:
+            setattr(self, method, self._timed(getattr(collection, method), histogram.labels("storage", f"{name}.{method}")))
+
+    @staticmethod
+    def _timed(fn, child):
+        async def call(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - t0)
+        return call
+
+    def find(self, *args, **kwargs) -> TimedCursor:
+        return TimedCursor(self._collection.find(*args, **kwargs), self._find_child)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._collection, name)
@@ -0,0 +1,99 @@
+"""
+Runs the blocking Stripe SDK off the registry's event loop.
+
+The Stripe SDK is synchronous: a ``Session.create`` round trip called straight
+from an ``async def`` handler freezes every other request on that worker,
+handshakes included, until Stripe answers. :class:`StripePool` hands each call
+to a small, fixed-size thread pool and awaits the result, so the loop keeps
+serving while checkouts are in flight. Once every thread is busy, further
+Stripe calls wait for a free one; nothing else does.
+
+Checkout-session lookups from ``/success`` (reloads, back-button, several tabs)
+are cached for a short TTL, and concurrent lookups of the same session share
+one Stripe call.
+
+The executor is created on first use, so forked workers never inherit one,
+and is rebuilt after :meth:`shutdown`.
+"""
+
+import asyncio
+import functools
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class StripePool:
+    def __init__(
+        self,
+        max_workers: int = 8,
+        session_ttl: float = 60.0,
+        max_sessions: int = 1_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_workers = max_workers
+        self.session_ttl = session_ttl
+        self.max_sessions = max_sessions
+        self._clock = clock
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # session_id → (expires_at, session)
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+        # session_id → in-flight lookup shared by concurrent callers
+        self._pending: Dict[str, asyncio.Future] = {}
+
+        self.calls = 0
+        self.session_hits = 0
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Await ``fn(*args, **kwargs)`` run on the pool."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stripe")
+        self.calls += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    async def retrieve_session(self, retrieve: Callable[[str], Any], session_id: str) -> Any:
+        """``retrieve(session_id)`` on the pool, answered from the cache while fresh."""
+        entry = self._sessions.get(session_id)
+        if entry is not None:
+            if entry[0] > self._clock():
+                self._sessions.move_to_end(session_id)
+                self.session_hits += 1
+                return entry[1]
+            del self._sessions[session_id]
+
+        pending = self._pending.get(session_id)
+        if pending is not None:
+            self.session_hits += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[session_id] = future
+        try:
+            session = await self.run(retrieve, session_id)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody else may be waiting; don't leave "exception never retrieved" behind.
+            future.exception()
+            raise
+        else:
+            future.set_result(session)
+            self._sessions[session_id] = (self._clock() + self.session_ttl, session)
+            if len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return session
+        finally:
+            del self._pending[session_id]
+
+    def clear(self) -> None:
+        self._sessions.clear()
+
+    def shutdown(self) -> None:
+        """Release the threads (app shutdown). Calls already running finish first."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
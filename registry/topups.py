@@ -0,0 +1,92 @@
+"""
+Background application of Stripe top-ups.
+
+``/webhook`` only verifies the signature, stores the event in
+``stripe_events`` keyed by its Stripe event id (``_id``), and acks. A
+redelivered event is a duplicate key and is acked without being stored twice, so
+webhook latency does not depend on how many top-ups are waiting.
+
+:class:`TopUpWorker` applies the stored events. The webhook wakes it, and it
+also polls every ``poll_interval`` seconds, which picks up events stored by
+other workers or left pending by a crash. Each pass hands up to ``batch_size``
+pending events to the *process* callback, and keeps going while batches come
+back full.
+
+Every registry worker polls the same events, so the *process* callback claims
+each event (``status`` "processing" with a ``lease_until``) before applying
+it. An event whose worker died is claimable again once its lease runs out.
+Applying an event is also idempotent end to end (see
+:func:`registry.balances.credit_once`), so a replay after a crash never
+credits a balance twice.
+"""
+
+import asyncio
+import contextlib
+import logging
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# process(batch_size) → number of events it picked up
+Process = Callable[[int], Awaitable[int]]
+
+
+class TopUpWorker:
+    def __init__(self, process: Process, batch_size: int = 100, poll_interval: float = 1.0):
+        self._process = process
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        # One pass at a time per event loop: a drain() waits for the background
+        # pass in progress instead of skipping the events it has claimed.
+        self._passes: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self) -> None:
+        """Start the worker on the running event loop (called from the app lifespan)."""
+        if self._task is not None and not self._task.done():
+            return
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the worker. Events still pending stay stored for the next start."""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    def notify(self) -> None:
+        """Wake the worker: a new event was stored."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def drain(self) -> int:
+        """Apply pending events until a batch comes back short. Returns how many were picked up."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._passes = loop, asyncio.Lock()
+        total = 0
+        async with self._passes:
+            while True:
+                n = await self._process(self.batch_size)
+                total += n
+                if n < self.batch_size:
+                    return total
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            # The poll is a timer on the same event a notify() sets.
+            timer = loop.call_later(self.poll_interval, self._wake.set)
+            try:
+                await self._wake.wait()
+            finally:
+                timer.cancel()
+            self._wake.clear()
+            try:
+                await self.drain()
+            except Exception as e:
+                logger.warning("Top-up processing failed: %s", e)
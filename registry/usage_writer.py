@@ -0,0 +1,157 @@
+"""
+Batched, asynchronous writer for ``usage_logs``.
+
+Handshakes hand their usage event to :meth:`UsageWriter.submit`, which only
+enqueues it. A single background task drains the queue and writes events with
+one ``insert_many`` per batch, flushing when ``max_batch`` events are waiting
+or ``flush_interval`` seconds after the first event of a batch arrived.
+
+The queue is bounded: when the database falls behind, ``submit`` waits for
+room instead of dropping events, which pushes back on new handshakes.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+Sink = Callable[[List[Dict[str, Any]]], Awaitable[Any]]
+
+# Queued by flush(): tells the flusher to write what it holds without waiting.
+_FLUSH = object()
+
+
+class UsageWriter:
+    def __init__(
+        self,
+        sink: Sink,
+        max_batch: int = 500,
+        flush_interval: float = 0.2,
+        max_queue: int = 10_000,
+        max_retries: int = 5,
+    ):
+        self._sink = sink
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._progress: Optional[asyncio.Condition] = None
+        self._submitted = 0
+        self._completed = 0
+
+        self.events_written = 0
+        self.events_dropped = 0
+        self.batches_written = 0
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────── #
+
+    def start(self) -> None:
+        """Start the flusher on the running event loop (called from the app lifespan)."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._progress = asyncio.Condition()
+        self._submitted = self._completed = 0
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Write everything still queued, then stop the flusher."""
+        if self._task is None:
+            return
+        if self._task.get_loop() is not asyncio.get_running_loop():
+            self._task = None  # owned by a loop that is already gone
+            return
+        if not self._task.done():
+            await self.flush()
+            self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    @property
+    def running(self) -> bool:
+        return (
+            self._task is not None
+            and not self._task.done()
+            and self._task.get_loop() is asyncio.get_running_loop()
+        )
+
+    # ── Producer side ─────────────────────────────────────────────────────── #
+
+    async def submit(self, event: Dict[str, Any]) -> None:
+        """Queue one usage event; waits only when the queue is full."""
+        if not self.running:
+            self.start()
+        self._submitted += 1
+        await self._queue.put(event)
+
+    async def flush(self) -> None:
+        """Write every event submitted before this call now, and wait until it is stored."""
+        if not self.running:
+            return
+        target = self._submitted
+        await self._queue.put(_FLUSH)
+        async with self._progress:
+            await self._progress.wait_for(lambda: self._completed >= target)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued":          self._queue.qsize() if self._queue else 0,
+            "events_written":  self.events_written,
+            "events_dropped":  self.events_dropped,
+            "batches_written": self.batches_written,
+        }
+
+    # ── Flusher ───────────────────────────────────────────────────────────── #
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = []
+            item = await self._queue.get()
+            deadline = loop.time() + self.flush_interval
+            while item is not _FLUSH:
+                batch.append(item)
+                if len(batch) >= self.max_batch:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+
+            if batch:
+                await self._write(batch)
+                async with self._progress:
+                    self._completed += len(batch)
+                    self._progress.notify_all()
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> None:
+        delay = 0.1
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                await self._sink(batch)
+                self.events_written += len(batch)
+                self.batches_written += 1
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    self.events_dropped += len(batch)
+                    logger.error("Dropping %d usage events after %d failed writes: %s", len(batch), attempt, e)
+                    return
+                logger.warning("Usage batch write failed (attempt %d): %s; retrying", attempt, e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 2.0)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Node Admission Control Under Overload
+=====================================
+Drives the real LLM worker node in-process (over ASGI) against a simulated
+backend whose requests slow down together once more than ``--slots`` run at
+once, like a GPU batching more sequences than it has room for (processor
+sharing: ``--service-ms`` per request at up to ``--slots`` concurrent, slower
+in proportion beyond that).
+
+Requests arrive open-loop (Poisson) at ``--overload`` × the backend's
+capacity for ``--duration`` seconds. Each client gives up after
+``--deadline`` seconds, which cancels its request all the way down to the
+backend. Goodput counts answers that arrived within the deadline.
+
+Modes:
+  unbounded   every request goes straight to the backend (the old behaviour)
+  admission   AdmissionController with --slots concurrency, a queue of
+              2 × --slots and a queue deadline of half the client deadline;
+              the excess gets 429 + Retry-After right away
+
+Usage:
+    python scripts/bench_admission.py
+    python scripts/bench_admission.py --overload 5 --duration 20 --modes admission
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import jwt
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+import agent_node.llm_agent as node  # noqa: E402
+from agent_node.admission import AdmissionController  # noqa: E402
+
+TICK_S = 0.02
+
+
+class SharedBackend:
+    """Processor-sharing stand-in for Ollama."""
+
+    def __init__(self, slots: int, service_s: float):
+        self.slots = slots
+        self.service_s = service_s
+        self.active = 0
+        self.work_done_s = 0.0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.active += 1
+        remaining = self.service_s
+        try:
+            while remaining > 0:
+                await asyncio.sleep(TICK_S)
+                step = min(remaining, TICK_S * min(1.0, self.slots / self.active))
+                remaining -= step
+                self.work_done_s += step
+        finally:
+            self.active -= 1
+        return httpx.Response(200, json={"response": "ok", "done": True})
+
+
+async def run(mode: str, args) -> dict:
+    backend = SharedBackend(args.slots, args.service_ms / 1000)
+    node.http_client = httpx.AsyncClient(transport=httpx.MockTransport(backend.handle))
+    node.node_stats = node.NodeStats()
+    if mode == "admission":
+        node.admission = AdmissionController(args.slots, 2 * args.slots, args.deadline / 2, stats=node.node_stats)
+    else:
+        node.admission = AdmissionController(10 ** 9, 0)
+
+    token = jwt.encode({"sub": "did:aris:bench", "aud": node.MY_DID, "exp": time.time() + 3600},
+                       node.ARIS_PUBLIC_KEY, algorithm="HS256")
+    capacity = args.slots / (args.service_ms / 1000)
+    rate = capacity * args.overload
+    outcomes = {"ok": [], "shed": 0, "timeout": 0, "error": 0}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=node.app), base_url="http://node") as http:
+        async def one():
+            t0 = time.perf_counter()
+            try:
+                resp = await asyncio.wait_for(
+                    http.post("/generate", json={"prompt": "x"}, headers={"x-aris-token": token}), args.deadline)
+            except asyncio.TimeoutError:
+                outcomes["timeout"] += 1
+                return
+            if resp.status_code == 429:
+                outcomes["shed"] += 1
+            elif resp.status_code == 200 and resp.json()["status"] == "success":
+                outcomes["ok"].append(time.perf_counter() - t0)
+            else:
+                outcomes["error"] += 1
+
+        rng = random.Random(args.seed)
+        tasks = []
+        t_start = time.perf_counter()
+        t_end = t_start + args.duration
+        while time.perf_counter() < t_end:
+            tasks.append(asyncio.create_task(one()))
+            await asyncio.sleep(rng.expovariate(rate))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - t_start
+
+    await node.http_client.aclose()
+    ok = sorted(outcomes["ok"])
+    return {
+        "mode": mode, "offered": len(tasks) / args.duration, "capacity": capacity,
+        "goodput": len(ok) / args.duration, "ok": len(ok), "shed": outcomes["shed"],
+        "timeout": outcomes["timeout"], "error": outcomes["error"],
+        "p50": statistics.median(ok) if ok else float("nan"),
+        "p95": ok[int(0.95 * (len(ok) - 1))] if ok else float("nan"),
+        # Share of the backend's full-speed capacity spent on work, kept or wasted.
+        "utilisation": backend.work_done_s / args.slots / elapsed,
+    }
+
+
+async def main(args):
+    print(f"backend: {args.slots} slots × {args.service_ms:g} ms, client deadline {args.deadline:g} s, "
+          f"offered load {args.overload:g}× capacity for {args.duration:g} s")
+    print(f"{'mode':<10} {'offered/s':>9} {'goodput/s':>9} {'ok':>5} {'429':>5} {'timeout':>7} "
+          f"{'p50 s':>6} {'p95 s':>6} {'busy':>5}")
+    for mode in args.modes:
+        r = await run(mode, args)
+        print(f"{r['mode']:<10} {r['offered']:9.1f} {r['goodput']:9.1f} {r['ok']:5d} {r['shed']:5d} "
+              f"{r['timeout']:7d} {r['p50']:6.2f} {r['p95']:6.2f} {r['utilisation']:5.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Goodput of a worker node under overload")
+    parser.add_argument("--slots",      type=int,   default=4, help="Requests the backend runs at full speed")
+    parser.add_argument("--service-ms", type=float, default=200)
+    parser.add_argument("--overload",   type=float, default=3, help="Offered load as a multiple of capacity")
+    parser.add_argument("--deadline",   type=float, default=2.0, help="Client timeout, seconds")
+    parser.add_argument("--duration",   type=float, default=10)
+    parser.add_argument("--seed",       type=int,   default=7)
+    parser.add_argument("--modes", nargs="+", default=["unbounded", "admission"],
+                        choices=["unbounded", "admission"])
+    asyncio.run(main(parser.parse_args()))
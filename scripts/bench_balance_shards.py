@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Sharded Balance Benchmark
+=========================
+Debits one hot API key from many concurrent handshakes through
+registry.balances, against an in-memory store that models Mongo's per-document
+write lock: every write to a document holds that document's lock for
+--lock-ms, and every call costs a jittered --rtt-ms round trip.
+
+With one shard every debit queues on the account document, so throughput is
+capped at 1000 / lock_ms debits per second. With N shards the queue splits N
+ways. A second, under-funded pass checks that no shard count ever overdraws.
+
+Usage:
+    python scripts/bench_balance_shards.py
+    python scripts/bench_balance_shards.py --debits 5000 --concurrency 256 --shards 1 4 16
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from unittest.mock import patch
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from registry import balances  # noqa: E402
+
+API_KEY = "aris_live_bench"
+COST = 0.10
+
+
+class LockedCollection:
+    """Documents keyed by shard; writes serialize per document, reads do not."""
+
+    def __init__(self, store, shard_field: bool):
+        self.store = store
+        self.shard_field = shard_field
+
+    def _shard(self, query):
+        return query.get("shard", 0) if self.shard_field else 0
+
+    async def _write(self, query, fn):
+        await asyncio.sleep(self.store.rtt * random.uniform(0.5, 1.5))
+        shard = self._shard(query)
+        async with self.store.locks[shard]:
+            await asyncio.sleep(self.store.lock)
+            return fn(shard)
+
+    def _guard(self, query, shard):
+        floor = query.get("balance", {})
+        value = self.store.balance[shard]
+        return value >= floor.get("$gte", float("-inf")) and value > floor.get("$gt", float("-inf"))
+
+    async def update_one(self, query, update, upsert=False):
+        def apply(shard):
+            if not self._guard(query, shard):
+                return _Result(0)
+            self.store.balance[shard] = round(self.store.balance[shard] + update["$inc"]["balance"], 6)
+            return _Result(1)
+        return await self._write(query, apply)
+
+    async def find_one_and_update(self, query, update, return_document=None, **kw):
+        def apply(shard):
+            if not self._guard(query, shard):
+                return None
+            before = self.store.balance[shard]
+            self.store.balance[shard] = update["$set"]["balance"]
+            return {"balance": before}
+        return await self._write(query, apply)
+
+    async def bulk_write(self, ops, ordered=True):
+        await asyncio.gather(*[self.update_one(q, u) for q, u, _ in ops])
+
+    def find(self, query, projection=None):
+        store = self.store
+
+        class _Cursor:
+            async def to_list(self, length):
+                await asyncio.sleep(store.rtt)
+                return [{"shard": s, "balance": b} for s, b in store.balance.items()
+                        if s > 0 and b > query.get("balance", {}).get("$gt", float("-inf"))]
+        return _Cursor()
+
+
+class _Result:
+    def __init__(self, modified_count):
+        self.modified_count = modified_count
+
+
+class Store:
+    def __init__(self, n, total, rtt, lock):
+        self.rtt, self.lock = rtt, lock
+        self.locks = defaultdict(asyncio.Lock)
+        self.balance = dict(enumerate(balances.split(total, n)))
+        self.accounts = LockedCollection(self, shard_field=False)
+        self.shards = LockedCollection(self, shard_field=True)
+
+    def total(self):
+        return round(sum(self.balance.values()), 6)
+
+
+async def _run(n, total, args):
+    store = Store(n, total, args.rtt_ms / 1000, args.lock_ms / 1000)
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async def one():
+        async with sem:
+            return await balances.debit(store.accounts, store.shards, API_KEY, COST, n)
+
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*[one() for _ in range(args.debits)])
+    wall = time.perf_counter() - t0
+    return results.count(True), wall, store
+
+
+async def main(args):
+    with patch.object(balances, "UpdateOne", side_effect=lambda f, u, upsert: (f, u, upsert)):
+        print(f"Funded: {args.debits} debits of ${COST:.2f}, concurrency={args.concurrency}, "
+              f"rtt~{args.rtt_ms}ms, lock={args.lock_ms}ms")
+        base = None
+        for n in args.shards:
+            ok, wall, store = await _run(n, args.debits * COST * 2, args)
+            rate = args.debits / wall
+            base = base or rate
+            print(f"  shards={n:<3} ok={ok:<6} {rate:9.0f} debits/s  ({rate / base:4.1f}x)")
+
+        scarce = round(args.debits / 3 * COST, 6)
+        print(f"Under-funded (${scarce:.2f} for {args.debits} debits):")
+        for n in args.shards:
+            ok, _, store = await _run(n, scarce, args)
+            low = min(store.balance.values())
+            print(f"  shards={n:<3} ok={ok:<6} left=${store.total():.2f}  "
+                  f"overdrawn: {'YES' if low < -1e-9 or ok * COST > scarce + 1e-9 else 'no'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark sharded balance debits for one hot API key")
+    parser.add_argument("--debits",      type=int,   default=3000)
+    parser.add_argument("--concurrency", type=int,   default=128)
+    parser.add_argument("--rtt-ms",      type=float, default=1.0, help="Simulated Mongo round-trip time")
+    parser.add_argument("--lock-ms",     type=float, default=0.5, help="Time a write holds its document lock")
+    parser.add_argument("--shards",      type=int,   nargs="+", default=[1, 2, 4, 8, 16])
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Micro-batching of /generate Against a Batch-Capable Backend
+===========================================================
+Drives the real LLM worker node in-process (over ASGI) against a simulated
+OpenAI-compatible completions backend that runs one batch at a time. A batch
+of n prompts holds the GPU for ``--base-ms`` + n × ``--per-item-ms``, so the
+fixed cost of a forward pass is shared by every prompt in it, as with vLLM.
+
+``--clients`` closed-loop clients each send non-streaming ``/generate``
+requests back to back for ``--duration`` seconds.
+
+Modes:
+  off   every request is its own backend call (max batch size 1)
+  on    MicroBatcher with --max-batch and --window-ms; concurrent requests
+        for the same model and sampling parameters share one call
+
+Admission control is disabled so that only batching differs between modes.
+
+Usage:
+    python scripts/bench_batching.py
+    python scripts/bench_batching.py --clients 64 --max-batch 32 --window-ms 10
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import jwt
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+import agent_node.llm_agent as node  # noqa: E402
+from agent_node.admission import AdmissionController  # noqa: E402
+from agent_node.batching import MicroBatcher  # noqa: E402
+
+
+class BatchBackend:
+    """Completions stand-in: one batch on the GPU at a time."""
+
+    def __init__(self, base_s: float, per_item_s: float):
+        self.base_s = base_s
+        self.per_item_s = per_item_s
+        self.gpu = asyncio.Lock()
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        prompts = json.loads(request.content)["prompt"]
+        async with self.gpu:
+            await asyncio.sleep(self.base_s + self.per_item_s * len(prompts))
+        return httpx.Response(200, json={"choices": [{"index": i, "text": f"re:{p}"} for i, p in enumerate(prompts)]})
+
+
+async def run(mode: str, args) -> dict:
+    backend = BatchBackend(args.base_ms / 1000, args.per_item_ms / 1000)
+    node.http_client = httpx.AsyncClient(transport=httpx.MockTransport(backend.handle))
+    node.node_stats = node.NodeStats()
+    node.admission = AdmissionController(10 ** 9, 0)
+    node.BATCH_URL = "http://backend/v1/completions"
+    max_batch = args.max_batch if mode == "on" else 1
+    node.batcher = MicroBatcher(node._complete_batch, max_batch, args.window_ms / 1000)
+
+    token = jwt.encode({"sub": "did:aris:bench", "aud": node.MY_DID, "exp": time.time() + 3600},
+                       node.ARIS_PUBLIC_KEY, algorithm="HS256")
+    latencies, errors = [], 0
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=node.app), base_url="http://node") as http:
+        async def client(i: int, t_end: float):
+            nonlocal errors
+            n = 0
+            while time.perf_counter() < t_end:
+                t0 = time.perf_counter()
+                resp = await http.post("/generate", json={"prompt": f"{i}-{n}", "temperature": 0.7},
+                                       headers={"x-aris-token": token}, timeout=60)
+                body = resp.json()
+                if resp.status_code == 200 and body["status"] == "success" and body["result"] == f"re:{i}-{n}":
+                    latencies.append(time.perf_counter() - t0)
+                else:
+                    errors += 1
+                n += 1
+
+        t_start = time.perf_counter()
+        await asyncio.gather(*(client(i, t_start + args.duration) for i in range(args.clients)))
+        elapsed = time.perf_counter() - t_start
+
+    await node.http_client.aclose()
+    latencies.sort()
+    return {
+        "mode": mode, "ok": len(latencies), "errors": errors, "throughput": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) * 1000 if latencies else float("nan"),
+        "p95": latencies[int(0.95 * (len(latencies) - 1))] * 1000 if latencies else float("nan"),
+        "batch": node.batcher.prompts / max(1, node.batcher.batches),
+    }
+
+
+async def main(args):
+    print(f"backend: {args.base_ms:g} ms + {args.per_item_ms:g} ms/prompt per batch, "
+          f"{args.clients} clients for {args.duration:g} s, window {args.window_ms:g} ms")
+    print(f"{'mode':<5} {'req/s':>8} {'ok':>6} {'errors':>6} {'p50 ms':>7} {'p95 ms':>7} {'batch':>6}")
+    for mode in args.modes:
+        r = await run(mode, args)
+        print(f"{r['mode']:<5} {r['throughput']:8.1f} {r['ok']:6d} {r['errors']:6d} "
+              f"{r['p50']:7.1f} {r['p95']:7.1f} {r['batch']:6.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput of /generate with and without micro-batching")
+    parser.add_argument("--clients",     type=int,   default=32)
+    parser.add_argument("--duration",    type=float, default=5)
+    parser.add_argument("--base-ms",     type=float, default=40, help="Fixed cost of one backend batch")
+    parser.add_argument("--per-item-ms", type=float, default=2,  help="Extra cost per prompt in a batch")
+    parser.add_argument("--max-batch",   type=int,   default=16)
+    parser.add_argument("--window-ms",   type=float, default=5)
+    parser.add_argument("--modes", nargs="+", default=["off", "on"], choices=["off", "on"])
+    asyncio.run(main(parser.parse_args()))
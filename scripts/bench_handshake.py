@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Registry /handshake Benchmark
+=============================
+Fires concurrent handshakes at the registry app (in-process, no sockets) backed by
+an in-memory collection that injects a jittered per-call Mongo round-trip latency.
+
+Compares the legacy read → $inc → insert flow against the atomic
+find_one_and_update debit, reporting latency percentiles, throughput, and
+whether an under-funded account was overdrawn.
+
+Usage:
+    python scripts/bench_handshake.py
+    python scripts/bench_handshake.py --requests 2000 --concurrency 200 --rtt-ms 2
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+from unittest.mock import patch
+
+import httpx
+import jwt
+from fastapi import FastAPI, Header, HTTPException
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+import registry.main as reg  # noqa: E402
+
+API_KEY = "aris_live_bench"
+BODY = {"payer_did": "did:aris:bench", "target_did": "did:aris:node", "capability": "ai.generate"}
+
+
+class LatencyCollection:
+    """In-memory accounts/usage collection; every call costs one jittered round trip."""
+
+    def __init__(self, rtt: float, balance: float = 0.0):
+        self.rtt = rtt
+        self.round_trips = 0
+        self.doc = {"api_key": API_KEY, "email": "bench@aris.ai", "balance": balance}
+
+    async def _trip(self):
+        self.round_trips += 1
+        await asyncio.sleep(self.rtt * random.uniform(0.5, 1.5))
+
+    async def find_one(self, query, *a, **kw):
+        await self._trip()
+        return dict(self.doc) if query.get("api_key") == API_KEY else None
+
+    async def update_one(self, query, update, **kw):
+        await self._trip()
+        self.doc["balance"] += update["$inc"]["balance"]
+
+    async def find_one_and_update(self, query, update, **kw):
+        await self._trip()
+        if self.doc["balance"] < query["balance"]["$gte"]:
+            return None
+        self.doc["balance"] += update["$inc"]["balance"]
+        return dict(self.doc)
+
+    async def insert_one(self, doc):
+        await self._trip()
+
+
+def _legacy_app() -> FastAPI:
+    """The pre-atomic handler: read, check, $inc, insert — three serial round trips."""
+    app = FastAPI()
+
+    @app.post("/handshake")
+    async def handshake(req: reg.SessionRequest, x_api_key: Optional[str] = Header(None)):
+        user_account = await reg.accounts_collection.find_one({"api_key": x_api_key})
+        if not user_account:
+            raise HTTPException(403, "Invalid API Key")
+        current_balance = user_account.get("balance", 0)
+        if current_balance < reg.HANDSHAKE_COST_USD:
+            raise HTTPException(402, "Insufficient Balance")
+        await reg.accounts_collection.update_one(
+            {"api_key": x_api_key}, {"$inc": {"balance": -reg.HANDSHAKE_COST_USD}}
+        )
+        await reg.usage_collection.insert_one({"api_key": x_api_key, "timestamp": time.time()})
+        token = jwt.encode({"sub": req.payer_did, "exp": time.time() + 300}, reg.ARIS_PRIVATE_KEY, algorithm="HS256")
+        return {"session_token": token, "remaining_balance": round(current_balance - reg.HANDSHAKE_COST_USD, 6)}
+
+    return app
+
+
+async def _run(label, app, args, start_balance):
+    rtt = args.rtt_ms / 1000
+    accounts, usage = LatencyCollection(rtt, start_balance), LatencyCollection(rtt)
+    sem = asyncio.Semaphore(args.concurrency)
+    latencies, statuses = [], []
+
+    with patch.object(reg, "accounts_collection", accounts), patch.object(reg, "usage_collection", usage):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://registry") as http:
+
+            async def one():
+                async with sem:
+                    t0 = time.perf_counter()
+                    r = await http.post("/handshake", json=BODY, headers={"x-api-key": API_KEY})
+                    latencies.append((time.perf_counter() - t0) * 1000)
+                    statuses.append(r.status_code)
+
+            t0 = time.perf_counter()
+            await asyncio.gather(*[one() for _ in range(args.requests)])
+            wall = time.perf_counter() - t0
+        await asyncio.gather(*list(reg._background_tasks))
+
+    latencies.sort()
+    pct = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+    ok = statuses.count(200)
+    print(
+        f"  {label:<7} ok={ok:<5} p50={pct(0.50):7.2f}ms  p99={pct(0.99):7.2f}ms  "
+        f"rps={args.requests / wall:7.0f}  final_balance=${accounts.doc['balance']:8.2f}"
+    )
+    return accounts.doc["balance"]
+
+
+async def main(args):
+    funded = args.requests * reg.HANDSHAKE_COST_USD * 10
+    print(f"Fully funded: {args.requests} handshakes, concurrency={args.concurrency}, rtt~{args.rtt_ms}ms")
+    await _run("legacy", _legacy_app(), args, funded)
+    await _run("atomic", reg.app, args, funded)
+
+    # Fund only a third of the requests so the balance guard races under contention.
+    scarce = round(args.requests / 3 * reg.HANDSHAKE_COST_USD, 6)
+    print(f"Under-funded (${scarce:.2f} for {args.requests} handshakes):")
+    for label, app in (("legacy", _legacy_app()), ("atomic", reg.app)):
+        final = await _run(label, app, args, scarce)
+        print(f"          overdrawn: {'YES' if final < -1e-9 else 'no'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark registry handshake billing")
+    parser.add_argument("--requests",    type=int,   default=1000)
+    parser.add_argument("--concurrency", type=int,   default=10)
+    parser.add_argument("--rtt-ms",      type=float, default=2.0, help="Simulated Mongo round-trip time")
+    asyncio.run(main(parser.parse_args()))
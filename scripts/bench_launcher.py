@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Registry Launcher Throughput Benchmark
+======================================
+Starts the real ``aris-registry`` launcher in a subprocess under several
+configurations and measures requests/s on two cheap, cache-served endpoints
+(``/discover`` and ``/balance``), so the numbers show server overhead rather
+than storage latency:
+
+  default     what ``python registry/main.py`` used to run: one worker, asyncio + h11,
+              5 s keep-alive, backlog 2048
+  tuned       one worker, uvloop + httptools (when installed), 75 s keep-alive, backlog 4096
+  tuned xN    the same with N worker processes (--workers, default: CPU count)
+
+The load generator is a raw HTTP/1.1 keep-alive client (--connections sockets,
+one request in flight each) running in this process. On a machine with few
+cores it competes with the server for CPU, so the multi-worker gain shown is a
+lower bound.
+
+Storage is a scratch SQLite file, seeded with one account and a few agents.
+
+Usage:
+    python scripts/bench_launcher.py
+    python scripts/bench_launcher.py --duration 10 --connections 128 --workers 4
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from registry.storage.sqlite import SQLiteStorage  # noqa: E402
+
+API_KEY = "aris_live_bench"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _seed(db_path: str) -> None:
+    storage = SQLiteStorage(db_path)
+    await storage.accounts.insert_one({"api_key": API_KEY, "email": "bench@aris.ai", "balance": 1e6})
+    await storage.agents.insert_many([
+        {"did": f"did:aris:{i}", "endpoint": f"http://node-{i}", "capabilities": ["ai.generate"],
+         "last_seen": time.time() + 3600}
+        for i in range(20)
+    ])
+    storage.close()
+
+
+async def _wait_ready(port: int, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET /discover?capability=ai.generate HTTP/1.1\r\nHost: x\r\n\r\n")
+            await writer.drain()
+            status = await reader.readline()
+            writer.close()
+            if b" 200 " in status:
+                return
+        except OSError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+
+async def _connection(port: int, request: bytes, stop_at: float, counts: list) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        while time.monotonic() < stop_at:
+            writer.write(request)
+            status = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                if line[:15].lower() == b"content-length:":
+                    length = int(line[15:])
+            await reader.readexactly(length)
+            counts[0 if b" 200 " in status else 1] += 1
+    finally:
+        writer.close()
+
+
+async def _load(port: int, path: str, args) -> float:
+    request = f"GET {path} HTTP/1.1\r\nHost: registry\r\nx-api-key: {API_KEY}\r\n\r\n".encode()
+    counts = [0, 0]
+    t0 = time.monotonic()
+    stop_at = t0 + args.duration
+    await asyncio.gather(*[_connection(port, request, stop_at, counts) for _ in range(args.connections)])
+    if counts[1]:
+        print(f"    ({counts[1]} non-200 responses)")
+    return counts[0] / (time.monotonic() - t0)
+
+
+async def _run(label: str, flags: list, db_path: str, args) -> None:
+    port = _free_port()
+    env = {**os.environ, "ARIS_STORAGE_URL": f"sqlite:///{db_path}", "ARIS_HEARTBEAT_INTERVAL": "1"}
+    cmd = [sys.executable, "-c", "from registry.main import start; start()",
+           "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning", *flags]
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env)
+    try:
+        await _wait_ready(port)
+        await asyncio.sleep(1.5)        # let every worker hydrate its discovery index
+        results = [await _load(port, path, args) for path in ("/discover?capability=ai.generate", "/balance")]
+        print(f"  {label:<16} discover {results[0]:8.0f} req/s   balance {results[1]:8.0f} req/s")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+async def main(args):
+    print(f"{args.connections} keep-alive connections, {args.duration}s per endpoint, {os.cpu_count()} CPU(s)")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = f"{tmp}/aris.db"
+        await _seed(db_path)
+        await _run("default", ["--workers", "1", "--loop", "asyncio", "--http", "h11",
+                               "--keep-alive", "5", "--backlog", "2048"], db_path, args)
+        await _run("tuned", ["--workers", "1"], db_path, args)
+        await _run(f"tuned x{args.workers}", ["--workers", str(args.workers)], db_path, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare registry launcher configurations")
+    parser.add_argument("--duration",    type=float, default=5)
+    parser.add_argument("--connections", type=int,   default=64)
+    parser.add_argument("--workers",     type=int,   default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    asyncio.run(main(args))
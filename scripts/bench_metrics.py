@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Metrics Instrumentation Microbenchmark
+======================================
+Measures what aris_server.metrics adds to each request, in-process and without I/O:
+
+  counter.inc           labelled counter increment
+  histogram.observe     labelled histogram observation (bisect into fixed buckets)
+  timer                 ``with histogram.time(...)`` around an empty block
+  timed storage call    TimedCollection wrapper around a no-op coroutine, minus the bare call
+  middleware            MetricsMiddleware around a minimal ASGI app, minus the bare app
+  render                one /metrics scrape with --series label sets per histogram
+
+For scale it also times one request through a bare FastAPI app (one JSON route,
+no middleware), called directly over ASGI.
+
+Usage:
+    python scripts/bench_metrics.py
+    python scripts/bench_metrics.py --iterations 500000 --series 50
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from fastapi import FastAPI  # noqa: E402
+
+from aris_server.metrics import MetricsMiddleware, Registry  # noqa: E402
+from registry.storage.timed import TimedCollection  # noqa: E402
+
+
+def _per_op_us(fn, n):
+    t0 = time.perf_counter()
+    fn(n)
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+async def _per_op_async_us(fn, n):
+    t0 = time.perf_counter()
+    await fn(n)
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+class _Collection:
+    async def find_one(self, *args, **kwargs):
+        return None
+
+    def __getattr__(self, name):
+        return self.find_one
+
+
+async def _bare_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def _send(message):
+    pass
+
+
+async def _receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def main(args):
+    n = args.iterations
+    metrics = Registry()
+    counter = metrics.counter("bench_total", "Bench.", ("route",))
+    histogram = metrics.histogram("bench_seconds", "Bench.", ("dependency", "operation"))
+    for name, help_ in (("aris_http_requests_total", "x"),):
+        metrics.counter(name, help_, ("method", "route", "status"))
+    metrics.histogram("aris_http_request_duration_seconds", "x", ("method", "route"))
+    metrics.gauge("aris_http_requests_in_flight", "x").labels()
+
+    def inc(n):
+        for _ in range(n):
+            counter.inc("/handshake")
+
+    def observe(n):
+        for _ in range(n):
+            histogram.observe(0.0042, "storage", "accounts.find_one")
+
+    def timer(n):
+        for _ in range(n):
+            with histogram.time("storage", "accounts.find_one"):
+                pass
+
+    raw = _Collection()
+    timed = TimedCollection(raw, histogram, "accounts")
+
+    async def raw_calls(n):
+        for _ in range(n):
+            await raw.find_one({"api_key": "k"})
+
+    async def timed_calls(n):
+        for _ in range(n):
+            await timed.find_one({"api_key": "k"})
+
+    middleware = MetricsMiddleware(_bare_app, metrics)
+    route = SimpleNamespace(path="/handshake")
+
+    def scope():
+        return {"type": "http", "method": "POST", "path": "/handshake", "route": route}
+
+    async def bare_requests(n):
+        for _ in range(n):
+            await _bare_app(scope(), _receive, _send)
+
+    async def middleware_requests(n):
+        for _ in range(n):
+            await middleware(scope(), _receive, _send)
+
+    print(f"{n:,} iterations per measurement")
+    print(f"  counter.inc          {_per_op_us(inc, n):6.3f} us")
+    print(f"  histogram.observe    {_per_op_us(observe, n):6.3f} us")
+    print(f"  timer                {_per_op_us(timer, n):6.3f} us")
+    storage_cost = await _per_op_async_us(timed_calls, n) - await _per_op_async_us(raw_calls, n)
+    print(f"  timed storage call   {storage_cost:6.3f} us added per call")
+    middleware_cost = await _per_op_async_us(middleware_requests, n) - await _per_op_async_us(bare_requests, n)
+    print(f"  middleware           {middleware_cost:6.3f} us added per request")
+
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    async def fastapi_requests(n):
+        for _ in range(n):
+            await app({"type": "http", "method": "GET", "path": "/ping", "raw_path": b"/ping",
+                       "query_string": b"", "headers": [], "root_path": ""}, _receive, _send)
+
+    await fastapi_requests(10)      # build the middleware stack
+    print(f"  (bare FastAPI request {await _per_op_async_us(fastapi_requests, n // 20):6.1f} us, for scale)")
+
+    for i in range(args.series):
+        histogram.observe(0.01, "storage", f"op_{i}")
+    t0 = time.perf_counter()
+    text = metrics.render()
+    print(f"  render               {(time.perf_counter() - t0) * 1000:6.3f} ms "
+          f"({len(text.splitlines())} lines)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the cost of the metrics instrumentation")
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("--series",     type=int, default=40, help="Extra label sets rendered per scrape")
+    asyncio.run(main(parser.parse_args()))
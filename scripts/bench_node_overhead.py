@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Worker Node Overhead Load Test
+==============================
+Starts a stub Ollama (fixed ``--backend-ms`` latency) and the real LLM worker
+node, each in its own uvicorn process, then drives ``/generate`` with
+``--concurrency`` concurrent clients. The same load is first sent straight to
+the stub; node overhead is the latency added on top of that baseline, and its
+median should stay under 5ms.
+
+All three processes share the host's cores, so run it on a machine with at
+least 4 of them; on a single core the load generator itself dominates and the
+numbers mostly measure CPU contention.
+
+Mode ``legacy`` patches the node back to a new httpx.AsyncClient per request
+(the original behaviour) for comparison.
+
+Usage:
+    python scripts/bench_node_overhead.py
+    python scripts/bench_node_overhead.py --concurrency 256 --requests 5000 --modes pooled
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Fresh interpreters, so each server reads its env config at import time.
+_mp = multiprocessing.get_context("spawn")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _serve_stub(port: int, backend_ms: float):
+    import uvicorn
+    from fastapi import FastAPI
+
+    stub = FastAPI()
+
+    @stub.post("/api/generate")
+    async def generate(body: dict):
+        await asyncio.sleep(backend_ms / 1000)
+        return {"response": "ok", "done": True}
+
+    uvicorn.run(stub, host="127.0.0.1", port=port, log_level="warning", backlog=4096)
+
+
+def _serve_node(port: int, backend_url: str, legacy: bool):
+    os.environ["ARIS_OLLAMA_URL"] = backend_url
+    os.environ["ARIS_REGISTRY"] = "http://127.0.0.1:9/register"   # heartbeats fail fast
+    logging.disable(logging.WARNING)
+    import uvicorn
+    import agent_node.llm_agent as node
+
+    if legacy:
+        class _PerRequestClient:
+            async def post(self, url, **kwargs):
+                async with httpx.AsyncClient() as client:
+                    return await client.post(url, **kwargs)
+
+            async def aclose(self):
+                pass
+
+        node._build_http_client = _PerRequestClient
+
+    uvicorn.run(node.app, host="127.0.0.1", port=port, log_level="error", backlog=4096)
+
+
+def _token():
+    import jwt
+    from agent_node.llm_agent import ARIS_PUBLIC_KEY, MY_DID
+    return jwt.encode({"sub": "bench", "aud": MY_DID, "exp": time.time() + 3600}, ARIS_PUBLIC_KEY, algorithm="HS256")
+
+
+async def _wait_ready(url: str):
+    async with httpx.AsyncClient() as client:
+        for _ in range(200):
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.05)
+    raise RuntimeError(f"{url} did not start")
+
+
+async def _drive(url: str, body: dict, headers: dict, args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    latencies = []
+    errors = 0
+    remaining = args.requests
+
+    async with httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(60.0, pool=None)) as client:
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                t0 = time.perf_counter()
+                resp = await client.post(url, json=body, headers=headers)
+                if resp.status_code == 200 and resp.json().get("status", "success") == "success":
+                    latencies.append(time.perf_counter() - t0)
+                else:
+                    errors += 1
+
+        # Warm up connections before measuring.
+        await asyncio.gather(*[client.post(url, json=body, headers=headers) for _ in range(args.concurrency)])
+        t0 = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(args.concurrency)])
+        elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    if not latencies:
+        return {"rate": 0.0, "p50": float("nan"), "p99": float("nan"), "errors": errors}
+    return {
+        "rate":   len(latencies) / elapsed,
+        "p50":    statistics.median(latencies) * 1000,
+        "p99":    latencies[int(0.99 * (len(latencies) - 1))] * 1000,
+        "errors": errors,
+    }
+
+
+def _report(label: str, r: dict, baseline: dict = None):
+    line = f"{label:<8}{r['rate']:10.0f} req/s   p50={r['p50']:7.2f}ms  p99={r['p99']:7.2f}ms"
+    if baseline:
+        line += f"   overhead p50={r['p50'] - baseline['p50']:6.2f}ms  p99={r['p99'] - baseline['p99']:6.2f}ms"
+    print(f"{line}   errors={r['errors']}")
+
+
+def _run(args):
+    stub_port = _free_port()
+    stub_url = f"http://127.0.0.1:{stub_port}"
+    stub = _mp.Process(target=_serve_stub, args=(stub_port, args.backend_ms), daemon=True)
+    stub.start()
+    try:
+        asyncio.run(_wait_ready(f"{stub_url}/docs"))
+        baseline = asyncio.run(_drive(f"{stub_url}/api/generate", {"model": "m", "prompt": "hi"}, {}, args))
+        _report("direct", baseline)
+
+        headers = {"x-aris-token": _token()}
+        for mode in args.modes:
+            node_port = _free_port()
+            node_url = f"http://127.0.0.1:{node_port}"
+            node = _mp.Process(
+                target=_serve_node, args=(node_port, stub_url, mode == "legacy"), daemon=True,
+            )
+            node.start()
+            try:
+                asyncio.run(_wait_ready(f"{node_url}/docs"))
+                _report(mode, asyncio.run(_drive(f"{node_url}/generate", {"prompt": "hi"}, headers, args)), baseline)
+            finally:
+                node.terminate()
+    finally:
+        stub.terminate()
+
+
+def main(args):
+    print(f"backend={args.backend_ms}ms concurrency={args.concurrency} requests={args.requests}")
+    _run(args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the LLM worker node against a stub Ollama")
+    parser.add_argument("--backend-ms",  type=float, default=50.0)
+    parser.add_argument("--concurrency", type=int,   default=64)
+    parser.add_argument("--requests",    type=int,   default=2000)
+    parser.add_argument("--modes", nargs="+", default=["legacy", "pooled"], choices=["legacy", "pooled"])
+    main(parser.parse_args())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Node Selection Benchmark
+========================
+Simulates N worker nodes (each runs ``--slots`` jobs at a time, like a single
+Ollama backend) and a fleet of SDK clients. Every client opens a session by
+picking a node from a /discover snapshot, sends ``--session-requests`` calls to
+it, then re-discovers. The snapshot's load signals refresh once per
+``--heartbeat-ms``, so selectors act on stale data the way real clients do.
+
+Reports completed requests/s per strategy as N grows; ideal scaling is linear.
+
+Usage:
+    python scripts/bench_node_selection.py
+    python scripts/bench_node_selection.py --nodes 1 2 4 8 16 --duration 2
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from aris.routing import EwmaLatency, FirstNode, LeastLoaded, PowerOfTwoChoices  # noqa: E402
+
+STRATEGIES = {
+    "first":        FirstNode,
+    "least-loaded": LeastLoaded,
+    "p2c":          PowerOfTwoChoices,
+    "ewma":         EwmaLatency,
+}
+
+
+class SimNode:
+    def __init__(self, i: int, slots: int, service_s: float):
+        self.endpoint = f"http://node-{i}:9006"
+        self.did = f"did:aris:node-{i}"
+        self.service_s = service_s
+        self._slots = asyncio.Semaphore(slots)
+        self.in_flight = 0  # running + waiting for a slot
+
+    async def handle(self):
+        self.in_flight += 1
+        try:
+            async with self._slots:
+                await asyncio.sleep(self.service_s * random.uniform(0.8, 1.2))
+        finally:
+            self.in_flight -= 1
+
+
+async def _run(strategy, n_nodes, args):
+    nodes = [SimNode(i, args.slots, args.service_ms / 1000) for i in range(n_nodes)]
+    snapshot = []
+
+    def heartbeat():
+        snapshot[:] = [
+            {"did": n.did, "endpoint": n.endpoint, "load": {"in_flight": n.in_flight, "queue_depth": 0}}
+            for n in nodes
+        ]
+
+    async def heartbeats():
+        while True:
+            heartbeat()
+            await asyncio.sleep(args.heartbeat_ms / 1000)
+
+    by_endpoint = {n.endpoint: n for n in nodes}
+    completed = 0
+    deadline = time.perf_counter() + args.duration
+
+    async def client():
+        nonlocal completed
+        selector = STRATEGIES[strategy]()
+        while time.perf_counter() < deadline:
+            node = by_endpoint[selector.select(list(snapshot))["endpoint"]]
+            for _ in range(args.session_requests):
+                t0 = time.perf_counter()
+                await node.handle()
+                selector.observe(node.endpoint, time.perf_counter() - t0)
+                completed += 1
+                if time.perf_counter() >= deadline:
+                    break
+
+    heartbeat()
+    hb = asyncio.create_task(heartbeats())
+    await asyncio.gather(*[client() for _ in range(args.clients_per_node * n_nodes)])
+    hb.cancel()
+    return completed / args.duration
+
+
+async def main(args):
+    print(f"service={args.service_ms}ms slots/node={args.slots} clients/node={args.clients_per_node} "
+          f"heartbeat={args.heartbeat_ms}ms session={args.session_requests} reqs")
+    header = "".join(f"{f'N={n}':>10}" for n in args.nodes)
+    print(f"{'strategy':<14}{header}   (requests/s; scaling vs N={args.nodes[0]})")
+    for strategy in STRATEGIES:
+        rates = [await _run(strategy, n, args) for n in args.nodes]
+        cells = "".join(f"{r:10.0f}" for r in rates)
+        scale = " ".join(f"{r / rates[0]:.1f}x" for r in rates)
+        print(f"{strategy:<14}{cells}   {scale}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark SDK node selection strategies")
+    parser.add_argument("--nodes",            type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--slots",            type=int,   default=1)
+    parser.add_argument("--service-ms",       type=float, default=10.0)
+    parser.add_argument("--clients-per-node", type=int,   default=4)
+    parser.add_argument("--heartbeat-ms",     type=float, default=200.0)
+    parser.add_argument("--session-requests", type=int,   default=10)
+    parser.add_argument("--duration",         type=float, default=1.0)
+    asyncio.run(main(parser.parse_args()))
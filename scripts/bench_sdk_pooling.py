@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+SDK Connection Pooling Benchmark
+================================
+Runs a local keep-alive HTTP stub standing in for the registry and compares:
+
+  per-call   a fresh ``requests.get`` per call (the SDK's original transport;
+             every call pays a new TCP connect, plus a TLS handshake in production)
+  pooled     ``Aris.balance()`` over the client's shared keep-alive session
+
+Add ``--rtt-ms`` to model a network round trip on connection setup, which is
+where pooling saves the most.
+
+Usage:
+    python scripts/bench_sdk_pooling.py
+    python scripts/bench_sdk_pooling.py --calls 2000 --threads 8 --rtt-ms 5
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from aris.client import Aris  # noqa: E402
+
+BODY = json.dumps({"email": "bench@aris.dev", "balance_usd": 1.0, "created_at": 0}).encode()
+
+
+class _Registry(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+
+class _SlowAcceptServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 512
+    connect_delay_s = 0.0
+
+    def get_request(self):
+        conn, addr = super().get_request()
+        if self.connect_delay_s:
+            time.sleep(self.connect_delay_s)     # one RTT for the TCP handshake
+        return conn, addr
+
+
+def _run(fn, calls, threads):
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(lambda _: fn(), range(calls)))
+    return calls / (time.perf_counter() - t0)
+
+
+def main(args):
+    server = _SlowAcceptServer(("127.0.0.1", 0), _Registry)
+    server.connect_delay_s = args.rtt_ms / 1000
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def per_call():
+        requests.get(f"{url}/balance", headers={"x-api-key": "bench"}, timeout=10).json()
+
+    client = Aris(api_key="bench", registry_url=url, pool_size=args.threads)
+
+    print(f"calls={args.calls} threads={args.threads} connect_rtt={args.rtt_ms}ms")
+    legacy = _run(per_call, args.calls, args.threads)
+    pooled = _run(client.balance, args.calls, args.threads)
+    print(f"{'per-call':<10}{legacy:10.0f} calls/s")
+    print(f"{'pooled':<10}{pooled:10.0f} calls/s   ({pooled / legacy:.1f}x)")
+
+    client.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark SDK connection pooling")
+    parser.add_argument("--calls",   type=int,   default=1000)
+    parser.add_argument("--threads", type=int,   default=4)
+    parser.add_argument("--rtt-ms",  type=float, default=0.0)
+    main(parser.parse_args())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+SDK Session Table Benchmark
+===========================
+Runs a local keep-alive HTTP stub standing in for the registry and a worker
+node, then drives one shared ``Aris`` client with alternating ``generate()``
+and ``chat()`` calls from several threads. Compares:
+
+  single-slot  the SDK's original behaviour: one session at a time, dropped
+               whenever the capability changes (so every switch pays a
+               discover plus a billed handshake)
+  table        the per-(capability, node) session table
+
+``--handshake-ms`` models the registry's work per handshake (an atomic
+balance debit plus the usage write).
+
+Usage:
+    python scripts/bench_session_table.py
+    python scripts/bench_session_table.py --calls 4000 --threads 8 --handshake-ms 5
+"""
+
+import argparse
+import itertools
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from aris.client import Aris  # noqa: E402
+
+
+class _Stub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    handshake_delay_s = 0.0
+    handshakes = itertools.count(1)
+    endpoint = ""
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._send({"agents": [{"did": "did:aris:bench-node", "endpoint": self.endpoint,
+                                "capabilities": ["ai.generate", "ai.chat"]}]})
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path == "/handshake":
+            time.sleep(self.handshake_delay_s)
+            self._send({"session_token": f"tok-{next(self.handshakes)}", "remaining_balance": 1.0})
+        elif self.path == "/chat":
+            self._send({"role": "assistant", "content": "hi", "model": "tinyllama", "status": "success"})
+        else:
+            self._send({"result": "ok", "status": "success"})
+
+
+class _SingleSlot(Aris):
+    """The original client: holding a session for one capability evicts every other."""
+
+    def _ensure_session(self, capability, stale=None):
+        with self._sessions_lock:
+            if any(cap != capability for cap in self._active):
+                self._active.clear()
+                self._sessions.clear()
+        return super()._ensure_session(capability, stale)
+
+
+def _run(client, calls, threads):
+    def call(i):
+        if i % 2:
+            client.generate("hi")
+        else:
+            client.chat([{"role": "user", "content": "hi"}])
+
+    before = next(_Stub.handshakes)
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(call, range(calls)))
+    rate = calls / (time.perf_counter() - t0)
+    return rate, next(_Stub.handshakes) - before - 1
+
+
+def main(args):
+    _Stub.handshake_delay_s = args.handshake_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    _Stub.endpoint = url
+
+    print(f"calls={args.calls} threads={args.threads} handshake={args.handshake_ms}ms  (alternating generate/chat)")
+    results = {}
+    for name, cls in (("single-slot", _SingleSlot), ("table", Aris)):
+        with cls(api_key="bench", registry_url=url, pool_size=args.threads) as client:
+            results[name] = _run(client, args.calls, args.threads)
+
+    base = results["single-slot"][0]
+    for name, (rate, handshakes) in results.items():
+        print(f"{name:<12}{rate:10.0f} calls/s  {handshakes:6d} handshakes   ({rate / base:.1f}x)")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the SDK session table on mixed traffic")
+    parser.add_argument("--calls",        type=int,   default=1000)
+    parser.add_argument("--threads",      type=int,   default=4)
+    parser.add_argument("--handshake-ms", type=float, default=2.0)
+    main(parser.parse_args())
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Registry Storage Backend Benchmark
+==================================
+Drives the real registry app in-process (httpx ASGI transport, no sockets)
+against each storage backend and reports per-endpoint latency:
+
+  handshake   balance debit + session token + queued usage event
+  discover    the Mongo/storage path, i.e. before the discovery index hydrates
+  usage       one /usage page from the middle of a seeded history
+
+Backends: memory://, a scratch SQLite file (WAL) and, with --mongo-uri, a
+scratch Mongo database (dropped afterwards).
+
+Usage:
+    python scripts/bench_storage.py
+    python scripts/bench_storage.py --requests 2000 --history 100000 --mongo-uri mongodb://localhost:27017
+"""
+
+import argparse
+import asyncio
+import contextlib
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+import registry.main as reg  # noqa: E402
+from registry.storage import open_storage  # noqa: E402
+
+API_KEY = "aris_live_bench"
+CAPABILITIES = [f"cap.{i}" for i in range(50)]
+COLLECTIONS = {
+    "accounts_collection": "accounts", "agents_collection": "agents", "usage_collection": "usage_logs",
+    "rollups_collection": "usage_rollups", "sessions_collection": "sessions",
+    "balance_shards_collection": "balance_shards", "stripe_events_collection": "stripe_events",
+}
+
+
+def _pct(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+async def _seed(storage, args):
+    await reg._ensure_indexes()
+    await storage.accounts.insert_one({"api_key": API_KEY, "email": "bench@aris.ai", "balance": 1e9})
+    await storage.agents.insert_many([
+        {"did": f"did:aris:{i}", "endpoint": f"http://node-{i}", "capabilities": random.sample(CAPABILITIES, 3),
+         "last_seen": time.time()}
+        for i in range(args.agents)
+    ])
+    start = time.time() - args.history
+    for offset in range(0, args.history, 10_000):
+        await storage.usage_logs.insert_many([
+            {"api_key": API_KEY, "capability": "ai.generate", "cost_usd": 0.1, "timestamp": start + i}
+            for i in range(offset, min(args.history, offset + 10_000))
+        ])
+
+
+async def _bench(label, storage, args):
+    with contextlib.ExitStack() as stack:
+        for attr, name in COLLECTIONS.items():
+            stack.enter_context(patch.object(reg, attr, getattr(storage, name)))
+        await _seed(storage, args)
+        reg.account_cache.clear()
+        reg.discovery.clear()
+        reg.usage_writer.start()
+
+        transport = httpx.ASGITransport(app=reg.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://registry") as http:
+            headers = {"x-api-key": API_KEY}
+            page = (await http.get("/usage", params={"limit": 50}, headers=headers)).json()
+            for _ in range(args.history // 100):                # walk to the middle of the history
+                if not page["next_cursor"]:
+                    break
+                cursor = page["next_cursor"]
+                page = (await http.get("/usage", params={"limit": 50, "cursor": cursor}, headers=headers)).json()
+
+            calls = {
+                "handshake": lambda: http.post("/handshake", headers=headers, json={
+                    "payer_did": "did:aris:p", "target_did": "did:aris:0", "capability": "ai.generate"}),
+                "discover": lambda: http.get("/discover", params={"capability": random.choice(CAPABILITIES)}),
+                "usage": lambda: http.get("/usage", params={"limit": 50, "cursor": cursor}, headers=headers),
+            }
+            for name, call in calls.items():
+                samples = []
+                for _ in range(args.requests):
+                    t0 = time.perf_counter()
+                    r = await call()
+                    samples.append((time.perf_counter() - t0) * 1000)
+                    assert r.status_code == 200, r.text
+                print(f"  {label:<7} {name:<10} p50={_pct(samples, 0.5):7.2f}ms  p99={_pct(samples, 0.99):7.2f}ms")
+
+        await reg.usage_writer.stop()
+
+
+async def main(args):
+    print(f"{args.requests} sequential requests per endpoint; {args.history:,} usage events, {args.agents} agents")
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = [("memory", "memory://"), ("sqlite", f"sqlite:///{tmp}/aris.db")]
+        if args.mongo_uri:
+            backends.append(("mongo", args.mongo_uri))
+        for label, url in backends:
+            storage = open_storage(url)
+            try:
+                await _bench(label, storage, args)
+            finally:
+                if label == "mongo":
+                    await storage.client.drop_database(storage.db.name)
+                storage.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare registry latency across storage backends")
+    parser.add_argument("--requests",  type=int, default=500)
+    parser.add_argument("--history",   type=int, default=20_000, help="Usage events seeded for the key")
+    parser.add_argument("--agents",    type=int, default=500)
+    parser.add_argument("--mongo-uri", default=None, help="Also benchmark a scratch database on this Mongo")
+    asyncio.run(main(parser.parse_args()))
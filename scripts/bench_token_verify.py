@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Session Token Verification Microbenchmark
+=========================================
+Measures per-call cost of verifying an Aris session token on a worker node:
+
+  decode    jwt.decode + HMAC-SHA256 check on every call (the original path)
+  cached    agent_node.auth.TokenVerifier, the same token reused across a
+            session (the steady state: one decode, then cache hits)
+  cold      TokenVerifier with a distinct token per call (every call misses;
+            shows the bookkeeping overhead on top of a full decode)
+
+Usage:
+    python scripts/bench_token_verify.py
+    python scripts/bench_token_verify.py --calls 200000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import jwt
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from agent_node.auth import TokenVerifier  # noqa: E402
+from aris.session_defaults import DEFAULT_SESSION_HS256_SECRET as SECRET  # noqa: E402
+
+AUD = "did:aris:llm-node-01"
+
+
+def _token(i=0):
+    return jwt.encode(
+        {"sub": "did:aris:customer-sdk", "aud": AUD, "scope": "ai.chat", "exp": time.time() + 3600, "jti": str(i)},
+        SECRET,
+        algorithm="HS256",
+    )
+
+
+def _time(fn, calls):
+    t0 = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - t0) / calls * 1e6
+
+
+def main(args):
+    token = _token()
+    cold_tokens = [_token(i) for i in range(args.calls)]
+
+    decode = _time(lambda i: jwt.decode(token, SECRET, algorithms=["HS256"], audience=AUD), args.calls)
+    warm = TokenVerifier(SECRET, AUD)
+    cached = _time(lambda i: warm.verify(token), args.calls)
+    cold_verifier = TokenVerifier(SECRET, AUD, max_entries=args.calls)
+    cold = _time(lambda i: cold_verifier.verify(cold_tokens[i]), args.calls)
+
+    print(f"calls={args.calls}")
+    print(f"{'decode':<8}{decode:8.2f} us/call")
+    print(f"{'cached':<8}{cached:8.2f} us/call   ({decode / cached:.0f}x faster)")
+    print(f"{'cold':<8}{cold:8.2f} us/call   (miss overhead {cold - decode:+.2f} us)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark session token verification")
+    parser.add_argument("--calls", type=int, default=50_000)
+    main(parser.parse_args())
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Usage Rollup Benchmark
+======================
+Compares answering a /usage/summary question (30 days of daily spend per
+capability for one heavy API key) two ways:
+
+  raw      group every event in the window (the $group pipeline over usage_logs)
+  rollup   read the pre-aggregated day buckets and combine them
+
+Two engines:
+
+  memory   events held in flat arrays; "raw" is a Python scan of all of them.
+           Runs anywhere and shows the O(events) vs O(buckets) shape.
+  mongo    seeds a scratch database on --mongo-uri through the same rollup code
+           the registry uses, then times the real aggregation against the
+           rollup find(). Drops the database afterwards unless --keep.
+
+Usage:
+    python scripts/bench_usage_rollups.py --events 1000000
+    python scripts/bench_usage_rollups.py --engine mongo --mongo-uri mongodb://localhost:27017
+"""
+
+import argparse
+import random
+import sys
+import time
+from array import array
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from registry.rollups import GRANULARITIES, fold, raw_pipeline, summarize  # noqa: E402
+
+API_KEY = "aris_live_bench"
+CAPABILITIES = ("ai.generate", "ai.chat", "math.add", "gov.rfp.bidder")
+COSTS = (0.10, 0.01, 0.50)
+CHUNK = 100_000
+
+
+def _events(n, days, seed=1):
+    """Yield chunks of usage events spread uniformly over the last *days* days."""
+    rng = random.Random(seed)
+    now = time.time()
+    start = now - days * 86400
+    for offset in range(0, n, CHUNK):
+        yield [
+            {
+                "api_key": API_KEY,
+                "capability": rng.choice(CAPABILITIES),
+                "cost_usd": rng.choice(COSTS),
+                "timestamp": rng.uniform(start, now),
+            }
+            for _ in range(min(CHUNK, n - offset))
+        ]
+
+
+def _merge(rollups, chunk):
+    for key, counters in fold(chunk).items():
+        target = rollups.setdefault(key, dict.fromkeys(counters, 0))
+        for name, value in counters.items():
+            target[name] += value
+
+
+def _time(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def bench_memory(args, since, until):
+    caps = {c: i for i, c in enumerate(CAPABILITIES)}
+    ts, cap, cost = array("d"), array("B"), array("d")
+    rollups = {}
+    t0 = time.perf_counter()
+    for chunk in _events(args.events, args.days):
+        for e in chunk:
+            ts.append(e["timestamp"])
+            cap.append(caps[e["capability"]])
+            cost.append(e["cost_usd"])
+        _merge(rollups, chunk)
+    print(f"seeded {args.events:,} events, {len(rollups):,} rollup docs in {time.perf_counter() - t0:.1f}s")
+
+    size = GRANULARITIES["day"]
+
+    def raw():
+        groups = {}
+        for t, c, x in zip(ts, cap, cost):
+            if since <= t < until:
+                g = groups.setdefault((c, t - t % size), [0, 0.0])
+                g[0] += 1
+                g[1] += x
+        docs = [{"capability": CAPABILITIES[c], "bucket": b, "events": n, "cost_usd": x} for (c, b), (n, x) in groups.items()]
+        return summarize(docs, "day", since, until)
+
+    # Stand-in for the (api_key, granularity, bucket) index: day buckets by start.
+    by_bucket = {}
+    for (_, c, g, b), counters in rollups.items():
+        if g == "day":
+            by_bucket.setdefault(b, []).append({"capability": c, "bucket": b, **counters})
+
+    def rollup():
+        first = int(since // size * size)
+        docs = [d for b in range(first, int(until), size) for d in by_bucket.get(b, ())]
+        return summarize(docs, "day", since, until)
+
+    return raw, rollup
+
+
+def bench_mongo(args, since, until):
+    from pymongo import ASCENDING, MongoClient, UpdateOne
+
+    client = MongoClient(args.mongo_uri)
+    db = client[args.db]
+    usage, rollups = db.usage_logs, db.usage_rollups
+    if not args.reuse:
+        db.drop_collection("usage_logs")
+        db.drop_collection("usage_rollups")
+        usage.create_index([("api_key", ASCENDING), ("timestamp", -1), ("_id", -1)])
+        rollups.create_index(
+            [("api_key", ASCENDING), ("granularity", ASCENDING), ("bucket", ASCENDING), ("capability", ASCENDING)],
+            unique=True,
+        )
+        t0 = time.perf_counter()
+        for chunk in _events(args.events, args.days):
+            usage.insert_many(chunk, ordered=False)
+            rollups.bulk_write([
+                UpdateOne({"api_key": k, "capability": c, "granularity": g, "bucket": b}, {"$inc": counters}, upsert=True)
+                for (k, c, g, b), counters in fold(chunk).items()
+            ], ordered=False)
+        print(f"seeded {args.events:,} events in {time.perf_counter() - t0:.1f}s")
+
+    def raw():
+        return summarize(usage.aggregate(raw_pipeline(API_KEY, "day", since, until), allowDiskUse=True),
+                         "day", since, until)
+
+    def rollup():
+        query = {"api_key": API_KEY, "granularity": "day", "bucket": {"$gte": since, "$lt": until}}
+        return summarize(rollups.find(query, {"_id": 0}), "day", since, until)
+
+    def cleanup():
+        if not args.keep:
+            client.drop_database(args.db)
+        client.close()
+
+    return raw, rollup, cleanup
+
+
+def main(args):
+    until = time.time()
+    since = (until - 30 * 86400) // 86400 * 86400
+
+    cleanup = None
+    if args.engine == "mongo":
+        raw, rollup, cleanup = bench_mongo(args, since, until)
+    else:
+        raw, rollup = bench_memory(args, since, until)
+
+    raw_s, raw_result = _time(raw, args.repeat)
+    rollup_s, rollup_result = _time(rollup, args.repeat)
+    assert raw_result["total"]["events"] == rollup_result["total"]["events"]
+
+    print(f"window: 30 days, {raw_result['total']['events']:,} events, {len(rollup_result['series'])} day buckets")
+    print(f"{'raw':<8}{raw_s * 1000:12.1f} ms")
+    print(f"{'rollup':<8}{rollup_s * 1000:12.3f} ms   ({raw_s / rollup_s:,.0f}x)")
+
+    if cleanup:
+        cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark usage rollups against raw-log aggregation")
+    parser.add_argument("--engine",    choices=("memory", "mongo"), default="memory")
+    parser.add_argument("--events",    type=int, default=10_000_000)
+    parser.add_argument("--days",      type=int, default=365)
+    parser.add_argument("--repeat",    type=int, default=3)
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db",        default="aris_bench_rollups")
+    parser.add_argument("--reuse",     action="store_true", help="mongo: skip seeding, reuse the existing data")
+    parser.add_argument("--keep",      action="store_true", help="mongo: keep the database afterwards")
+    main(parser.parse_args())
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Usage-Log Write Benchmark
+=========================
+Compares one ``insert_one`` per handshake against the registry's batched
+``UsageWriter`` (``insert_many``) using an in-memory collection that models a
+Mongo deployment: each call costs one round trip plus a small per-document
+cost, and at most ``--pool`` calls run at once (the driver's connection pool).
+
+Usage:
+    python scripts/bench_usage_writer.py
+    python scripts/bench_usage_writer.py --events 50000 --rtt-ms 1 --pool 100
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from registry.usage_writer import UsageWriter  # noqa: E402
+
+
+class ModelCollection:
+    def __init__(self, rtt: float, per_doc: float, pool: int):
+        self.rtt = rtt
+        self.per_doc = per_doc
+        self._pool = asyncio.Semaphore(pool)
+        self.round_trips = 0
+        self.docs = 0
+
+    async def _call(self, n: int):
+        async with self._pool:
+            self.round_trips += 1
+            await asyncio.sleep(self.rtt + self.per_doc * n)
+            self.docs += n
+
+    async def insert_one(self, doc):
+        await self._call(1)
+
+    async def insert_many(self, docs, ordered=False):
+        await self._call(len(docs))
+
+
+def _event(i: int) -> dict:
+    return {"api_key": "aris_live_bench", "capability": "ai.generate", "cost_usd": 0.10, "timestamp": i}
+
+
+async def _per_insert(args, coll):
+    await asyncio.gather(*[coll.insert_one(_event(i)) for i in range(args.events)])
+
+
+async def _batched(args, coll):
+    writer = UsageWriter(coll.insert_many, max_batch=args.batch, flush_interval=args.interval_ms / 1000)
+    for i in range(args.events):
+        await writer.submit(_event(i))
+    await writer.stop()
+
+
+async def main(args):
+    print(f"{args.events} usage events, rtt={args.rtt_ms}ms, pool={args.pool}, batch={args.batch}")
+    for label, run in (("per-insert", _per_insert), ("batched", _batched)):
+        coll = ModelCollection(args.rtt_ms / 1000, args.per_doc_us / 1e6, args.pool)
+        t0 = time.perf_counter()
+        await run(args, coll)
+        wall = time.perf_counter() - t0
+        assert coll.docs == args.events
+        print(f"  {label:<11} {wall * 1000:8.1f}ms  {args.events / wall:10.0f} events/s  "
+              f"round_trips={coll.round_trips}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark usage-log write strategies")
+    parser.add_argument("--events",      type=int,   default=20000)
+    parser.add_argument("--rtt-ms",      type=float, default=1.0)
+    parser.add_argument("--per-doc-us",  type=float, default=5.0, help="Server-side cost per document")
+    parser.add_argument("--pool",        type=int,   default=100, help="Driver connection pool size")
+    parser.add_argument("--batch",       type=int,   default=500)
+    parser.add_argument("--interval-ms", type=float, default=200)
+    asyncio.run(main(parser.parse_args()))
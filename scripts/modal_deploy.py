@@ -22,29 +22,35 @@ image = (
 async def generate(request: dict):
     """
     Sovereign Inference Endpoint
-    Standard OpenAI-compatible payload handling.
+    OpenAI completions-style payload handling. ``prompt`` may be a list, as
+    sent by nodes with ``ARIS_BATCH_URL`` set; vLLM generates the whole list
+    in one batch and returns one choice per prompt, in order.
     """
     from vllm import LLM, SamplingParams
     
     prompt = request.get("prompt", "")
+    prompts = prompt if isinstance(prompt, list) else [prompt]
     model_name = "meta-llama/Meta-Llama-3.1-8B-Instruct"
     
     # Inference execution (vLLM Engine)
     llm = LLM(model=model_name)
     sampling_params = SamplingParams(
-        temperature=0.7, 
-        top_p=0.9, 
-        max_tokens=2048
+        temperature=request.get("temperature", 0.7), 
+        top_p=request.get("top_p", 0.9), 
+        max_tokens=request.get("max_tokens", 2048)
     )
     
-    outputs = llm.generate([prompt], sampling_params)
+    outputs = llm.generate(prompts, sampling_params)
     return {
         "choices": [
             {
+                "index": i,
+                "text": output.outputs[0].text,
                 "message": {
                     "role": "assistant",
-                    "content": outputs[0].outputs[0].text
+                    "content": output.outputs[0].text
                 }
             }
+            for i, output in enumerate(outputs)
         ]
     }
@@ -42,11 +42,15 @@ setup(
         "passlib[bcrypt]",
         "click",  # Added for future CLI enhancements
     ],
+    extras_require={
+        # Faster event loop and HTTP parser, picked up automatically by the launchers.
+        "server": ["uvloop; sys_platform != 'win32'", "httptools"],
+    },
 
     entry_points={
         "console_scripts": [
             "aris-registry=registry.main:start",
-            "aris-node=agent_node.llm_agent:start",
+            "aris-node=agent_node.launcher:start",
         ]
     },
 )
\ No newline at end of file